@@ -74,6 +74,7 @@ const Index = () => {
         state: {
           prompt: promptText,
           inferredPlan: { ...planData, location: userLocation },
+          planToken: planRes.value.plan_token,
           userLocation
         }
       });
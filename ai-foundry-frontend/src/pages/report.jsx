@@ -4,6 +4,17 @@ import BackButton from '../components/BackButton'
 import CardGrid from '../components/cards/CardGrid'
 import Chatbot from '../components/Chatbot'
 
+// Large fields (landing page, BRD, strategy, govt scrape) arrive as {blob, size} references
+function resolveBlobs(data, blobs) {
+  const resolved = { ...data }
+  for (const [key, value] of Object.entries(resolved)) {
+    if (value && typeof value === 'object' && typeof value.blob === 'string' && value.blob in blobs) {
+      resolved[key] = blobs[value.blob]
+    }
+  }
+  return resolved
+}
+
 export default function Report(){
   const loc = useLocation()
   const navigate = useNavigate()
@@ -19,6 +30,8 @@ export default function Report(){
   const [generatedAssets, setGeneratedAssets] = useState({})
   const [landingPageCode, setLandingPageCode] = useState(null)
   const wsRef = useRef(null)
+  // Text of large state fields, keyed by digest; the server sends each blob once per stream
+  const blobsRef = useRef({})
   const outputRef = useRef(null)
   const [running, setRunning] = useState(false)
   const [brdUrl, setBrdUrl] = useState(null)
@@ -353,7 +366,9 @@ export default function Report(){
         if (message.event === 'step') {
           const nodeName = message.node
           try {
-            const jsonData = typeof message.data === 'string' ? JSON.parse(message.data) : message.data
+            const rawData = typeof message.data === 'string' ? JSON.parse(message.data) : message.data
+            Object.assign(blobsRef.current, message.blobs || {})
+            const jsonData = resolveBlobs(rawData, blobsRef.current)
             setJsonState(jsonData)
             if (nodeName === 'planner_agent') {
               const plannerFields = {
@@ -545,6 +560,8 @@ export default function Report(){
 
     // Build payload with all confirmed plan fields so the planner agent skips LLM
     const payload = { initial_prompt: prompt }
+    // Lets the planner agent reuse the /infer_plan result for any field left empty
+    if (locationState.planToken) payload.plan_token = locationState.planToken
     if (editPlan.goal) payload.goal = editPlan.goal
     if (editPlan.topic) payload.topic = editPlan.topic
     if (editPlan.target_audience) payload.target_audience = editPlan.target_audience
@@ -0,0 +1,179 @@
+"""
+Memory and serialization cost of large CampaignState fields: inline text vs blob references.
+
+Streams a 20-node campaign through the real /ws_stream_campaign endpoint (TestClient),
+with the compiled graph swapped for a LangGraph StateGraph over CampaignState whose nodes
+return the same kind of updates as the real agents: a large raw government scrape,
+research/validation loops, strategy and BRD markdown, landing page HTML. No LLM calls,
+so what is measured is LangGraph's per-step state handling plus the endpoint's
+validate/serialize/send work. Each mode runs in its own interpreter:
+
+  inline   BLOB_STORE=0, fields are plain strings (previous behaviour)
+  blobs    BLOB_STORE=1, fields are BlobRefs; the WebSocket sends each blob's text once
+
+Reported per mode: Python heap peak over the run and per step (tracemalloc), wall
+time per run, and WebSocket bytes per run.
+
+Usage:
+    python benchmarks/bench_blobs.py [--runs 5] [--govt-kb 300] [--page-kb 60]
+"""
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import statistics
+import contextlib
+import subprocess
+import tracemalloc
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PARAGRAPH = ("Applicants must file the incorporation documents with the registrar within thirty days "
+             "and keep proof of registration at the registered office. ")
+
+
+def text(kb: float, tag: str) -> str:
+    body = PARAGRAPH * int(kb * 1024 / len(PARAGRAPH) + 1)
+    return f"{tag}\n{body[: int(kb * 1024)]}"
+
+
+def build_graph(args):
+    """20 nodes, each returning an update shaped like the real agent's."""
+    from langgraph.graph import StateGraph, END
+    from foundry_server import CampaignState
+    from blobstore import offload, text_of
+
+    def planner(state):
+        return {"goal": "Launch a webinar", "topic": "Telemedicine platform", "target_audience": "Clinic owners",
+                "company_name": "Acme Health", "location": "India"}
+
+    def jurisdiction(state):
+        return {"jurisdiction_info": {"department_name": "Ministry of Corporate Affairs",
+                                      "department_url": "https://www.mca.gov.in", "jurisdiction_type": "Company Registration"},
+                "registration_procedure": [f"Step {i}: file form {i}" for i in range(8)],
+                "raw_govt_content": offload(text(args.govt_kb, "govt"))}
+
+    def research(state):
+        assert len(text_of(state.raw_govt_content)) > 1000  # nodes still read the full scrape
+        return {"audience_persona": {"pain_point": "paperwork"}, "core_messaging": {"cta": "Save your seat"},
+                "required_documents": [{"document_name": f"Doc {i}", "issuing_authority": "MCA"} for i in range(8)]}
+
+    def validation(state):
+        text_of(state.raw_govt_content)
+        return {"validation_rounds": state.validation_rounds + 1, "overall_confidence": 0.5 + 0.1 * state.validation_rounds,
+                "step_confidence": {str(i): 0.8 for i in range(8)}, "validation_mismatches": ["GST authority"]}
+
+    def strategy(state):
+        return {"strategy_markdown": offload(text(args.doc_kb / 2, "strategy"))}
+
+    def content(state):
+        return {"webinar_details": {"title": "Launch right", "abstract": "Walkthrough"}, "blog_post": text(4, "blog")}
+
+    def design(state):
+        return {"generated_assets": {"webinar_banner_url": "https://images.example/banner.jpg"}}
+
+    def web(state):
+        return {"landing_page_code": offload(text(args.page_kb, "<html>")), "landing_page_url": "campaign_preview.html"}
+
+    def brd(state):
+        text_of(state.strategy_markdown)
+        return {"brd_url": "brd.pdf", "brd_markdown": offload(text(args.doc_kb, "brd"))}
+
+    def ops(state):
+        return {"automation_status": {"slack": "sent", "telegram": "sent"}}
+
+    sequence = [planner, jurisdiction, research, validation, research, validation, research, validation,
+                strategy, content, design, web, content, design, web, strategy, brd, brd, ops, ops]
+    builder = StateGraph(CampaignState)
+    names = []
+    for i, node in enumerate(sequence):
+        names.append(f"{i:02d}_{node.__name__}")
+        builder.add_node(names[-1], node)
+    builder.set_entry_point(names[0])
+    for a, b in zip(names, names[1:]):
+        builder.add_edge(a, b)
+    builder.add_edge(names[-1], END)
+    return builder.compile()
+
+
+def measure(args) -> Dict[str, Any]:
+    from fastapi.testclient import TestClient
+    import foundry_server
+    from blobstore import blob_store
+
+    foundry_server.foundry_app = build_graph(args)
+    client = TestClient(foundry_server.app)
+
+    def run(trace: bool):
+        steps, total_bytes = [], 0
+        started = time.perf_counter()
+        with client.websocket_connect("/ws_stream_campaign") as ws:
+            ws.send_json({"initial_prompt": "Plan a webinar launch for Acme Health in India"})
+            while True:
+                raw = ws.receive_text()
+                total_bytes += len(raw.encode("utf-8"))
+                message = json.loads(raw)
+                if message["event"] != "step":
+                    assert message["event"] == "done", message
+                    break
+                if trace:
+                    steps.append(tracemalloc.get_traced_memory()[1] / 1e6)
+                    tracemalloc.reset_peak()
+        return time.perf_counter() - started, total_bytes, steps
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        run(False)  # warm-up: imports, graph compile
+        timings = [run(False) for _ in range(args.runs)]
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        _, _, step_peaks = run(True)
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+    return {
+        "run_ms_p50": statistics.median(t for t, _, _ in timings) * 1000,
+        "ws_kb_per_run": timings[0][1] / 1024,
+        "steps": len(step_peaks),
+        "heap_peak_mb": max(step_peaks),
+        "heap_peak_mb_median_step": statistics.median(step_peaks),
+        "retained_mb": retained / 1e6,
+        "blob_store": blob_store.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory benchmark: inline large state fields vs blob references")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--govt-kb", type=float, default=300, help="size of the raw government scrape")
+    parser.add_argument("--page-kb", type=float, default=60, help="size of the landing page HTML")
+    parser.add_argument("--doc-kb", type=float, default=40, help="size of the BRD (strategy is half)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args)))
+        return
+
+    results = {}
+    for mode, flag in (("inline", "0"), ("blobs", "1")):
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", "--runs", str(args.runs),
+                              "--govt-kb", str(args.govt_kb), "--page-kb", str(args.page_kb), "--doc-kb", str(args.doc_kb)],
+                             env=dict(os.environ, BLOB_STORE=flag), check=True, capture_output=True, text=True)
+        results[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    print(f"20-node run, govt scrape {args.govt_kb:g} KB, landing page {args.page_kb:g} KB, BRD {args.doc_kb:g} KB, "
+          f"{args.runs} runs\n")
+    header = f"{'mode':<8}{'run ms':>9}{'ws KB/run':>11}{'heap peak MB':>14}{'median step MB':>16}{'retained MB':>13}"
+    print(header)
+    print("-" * len(header))
+    for mode, r in results.items():
+        print(f"{mode:<8}{r['run_ms_p50']:>9.1f}{r['ws_kb_per_run']:>11.0f}{r['heap_peak_mb']:>14.2f}"
+              f"{r['heap_peak_mb_median_step']:>16.2f}{r['retained_mb']:>13.2f}")
+    print(f"\nblob store (blobs mode): {results['blobs']['blob_store']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Drive the sch.py booking outbox against the local Calendly stand-in.
+
+Starts the stand-in on a free localhost port with injected latency/failures, enqueues
+N bookings into a fresh outbox, runs the BookingWorker until every row is scheduled or
+failed, and reports throughput, retries and the final status counts. Also checks that
+nothing was booked twice and that a restart (worker stopped mid-run) loses nothing.
+
+Then runs two workers at once on one outbox file (as gateway.py --workers 2 does), the
+second starting while the first has bookings in flight, and reports what was booked twice.
+Finally runs bookings that take longer than the lease (renewed while they run) and counts
+bookings attempted more than once.
+
+Usage:
+    python benchmarks/bench_booking_outbox.py [--bookings 200] [--latency 0.1] [--failure-rate 0.3]
+"""
+import os
+import io
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+import contextlib
+from collections import Counter
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+import uvicorn
+
+from calendly_standin import create_app
+from booking_outbox import BookingOutbox, BookingWorker, post_calendly_booking
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_standin(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def drain(outbox: BookingOutbox) -> None:
+    while outbox.counts().get("pending", 0) + outbox.counts().get("in_progress", 0):
+        await asyncio.sleep(0.05)
+
+
+async def two_workers(args, book) -> dict:
+    """Two outboxes (= two processes) on one file, the second started mid-run; returns the final counts."""
+    db_path = os.path.join(tempfile.mkdtemp(), "outbox.db")
+    first, second = BookingOutbox(db_path), BookingOutbox(db_path)
+
+    def enqueue(calls):
+        for i in calls:
+            first.enqueue(f"pair-{i}", f"Pair {i}", f"pair{i}@example.com", f"2026-12-{1 + i % 28:02d}T10:00:00")
+
+    workers = [BookingWorker(outbox, book, concurrency=args.concurrency, max_attempts=args.max_attempts,
+                             base_backoff=0.05, max_backoff=1.0, poll_interval=0.05)
+               for outbox in (first, second)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        enqueue(range(args.concurrency))
+        workers[0].start()
+        await asyncio.sleep(args.latency / 2)  # all of them are in flight on the first worker
+        workers[1].start()
+        enqueue(range(args.concurrency, args.bookings))
+        await drain(first)
+        for worker in workers:
+            await worker.stop()
+    return first.counts()
+
+
+async def slow_bookings(args) -> Dict[str, int]:
+    """Bookings slower than the outbox lease: each should still be attempted exactly once."""
+    outbox = BookingOutbox(os.path.join(tempfile.mkdtemp(), "outbox.db"), lease=0.3)
+    for i in range(args.concurrency):
+        outbox.enqueue(f"slow-{i}", f"Slow {i}", f"slow{i}@example.com", "2026-12-01T10:00:00")
+    attempts = Counter()
+
+    async def book(row):
+        attempts[row["call_id"]] += 1
+        await asyncio.sleep(1.0)
+        return {"uri": row["call_id"]}
+
+    worker = BookingWorker(outbox, book, concurrency=args.concurrency, poll_interval=0.05, attempt_timeout=2.0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        worker.start()
+        await drain(outbox)
+        await worker.stop()
+    return {"bookings": len(attempts), "attempted twice": sum(n > 1 for n in attempts.values())}
+
+
+async def run(args) -> None:
+    standin = create_app(latency=args.latency, failure_rate=args.failure_rate,
+                         timeout_rate=args.timeout_rate, hang_seconds=2.0)
+    port = _free_port()
+    server = start_standin(standin, port)
+    base = f"http://127.0.0.1:{port}"
+
+    db_path = os.path.join(tempfile.mkdtemp(), "outbox.db")
+    outbox = BookingOutbox(db_path)
+    for i in range(args.bookings):
+        outbox.enqueue(f"call-{i}", f"User {i}", f"user{i}@example.com", f"2026-11-{1 + i % 28:02d}T10:00:00")
+    outbox.enqueue("call-0", "User 0", "user0@example.com", "2026-11-01T10:00:00")  # duplicate: ignored
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=1.0) as client:
+        async def book(row):
+            return await post_calendly_booking(client, base, "standin-key", "standin/event",
+                                               row["name"], row["email"], row["start_time"])
+
+        def make_worker():
+            return BookingWorker(outbox, book, concurrency=args.concurrency, max_attempts=args.max_attempts,
+                                 base_backoff=0.05, max_backoff=1.0, poll_interval=0.05)
+
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            worker = make_worker()
+            worker.start()
+            # Simulated restart: stop mid-run, then a new worker picks up where it left off
+            await asyncio.sleep(args.restart_after)
+            await worker.stop()
+            worker = make_worker()
+            worker.start()
+            await drain(outbox)
+            await worker.stop()
+        elapsed = time.perf_counter() - started
+
+        duplicates_before = standin.state.stats["duplicates"]
+        pair_counts = await two_workers(args, book)
+        pair_duplicates = standin.state.stats["duplicates"] - duplicates_before
+    slow = await slow_bookings(args)
+
+    counts = outbox.counts()
+    attempts = sum(outbox.get(f"call-{i}")["attempts"] for i in range(args.bookings))
+    stats = dict(standin.state.stats, duplicates=duplicates_before)
+    server.should_exit = True
+
+    print(f"bookings={args.bookings} latency={args.latency}s failure_rate={args.failure_rate} "
+          f"timeout_rate={args.timeout_rate} concurrency={args.concurrency}")
+    print(f"elapsed={elapsed:.2f}s throughput={args.bookings / elapsed:.1f} bookings/s")
+    print(f"status={counts} attempts={attempts} (retries={attempts - args.bookings})")
+    print(f"stand-in={stats}")
+    print(f"lost={args.bookings - sum(counts.values())} "
+          f"double-booked={stats['duplicates']} (stand-in counts a retry after a client timeout as a duplicate)")
+    print(f"two workers on one file: status={pair_counts} double-booked={pair_duplicates}")
+    print(f"bookings slower than the lease: {slow}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--failure-rate", type=float, default=0.3)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-attempts", type=int, default=6)
+    parser.add_argument("--restart-after", type=float, default=0.5, help="Seconds before the simulated restart")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Throughput benchmark for sch.py call-log analysis against a fake LLM.
+
+Compares N calls to POST /call-logs (one transcript per request, sequential as the
+telephony webhook delivers them today) with one POST /call-logs/batch (NDJSON in,
+NDJSON out, bounded-concurrency abatch + keyword pre-filter), then prints the
+pre-filter / rule-based fast-path stats from GET /call-logs/stats.
+
+--trap-ratio of the booked calls open with a date where a name could be ("It's Tuesday
+at 3pm", "This is June 5th"); the report counts results whose name is a date word,
+which should stay at zero. --put-off-ratio of the calls without a meeting get as far as a
+time, a name and an email, but the user puts it off ("let me check my calendar and get
+back to you") or asks for another week; the report counts those the rule-based fast path
+would book, which should also stay at zero.
+
+Usage:
+    python benchmarks/bench_call_log_batch.py [--calls 300] [--latency 0.2] [--intent-ratio 0.4] [--ambiguous-ratio 0.3] [--trap-ratio 0.2] [--put-off-ratio 0.3]
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import tempfile
+import asyncio
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from fakes import FakeChatModel
+from meeting_extractor import extract_meeting
+
+NAMES = ["Priya Shah", "John Miller", "Amara Okafor", "Lena Fischer", "Carlos Ruiz"]
+DATE_WORDS = {"monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday", "june", "noon"}
+
+
+def make_call_log(i: int, with_meeting: bool, ambiguous: bool = False, trap: bool = False,
+                  put_off: bool = False) -> dict:
+    name = random.choice(NAMES)
+    email = name.lower().replace(" ", ".") + "@example.com"
+    if with_meeting and trap:
+        # A date where the name cue would be; half of them give the real name later
+        later = f" I'm {name}." if i % 2 else ""
+        turns = [
+            ("assistant", "When would suit you for a demo?"),
+            ("user", random.choice([f"It's Tuesday at 3pm for me, my email is {email}.{later}",
+                                    f"This is June 5th at noon then, email {email}.{later}",
+                                    f"I'm Friday at 10am, yes. Email {email}.{later}"])),
+            ("assistant", "Perfect, I'll send you a calendar invite."),
+        ]
+    elif with_meeting and ambiguous:
+        # Two candidate times and only a first name: the fast path defers to the LLM
+        turns = [
+            ("assistant", "Would Monday at 10am or Tuesday at 3pm work for a demo?"),
+            ("user", f"Tuesday I guess. It's {name.split()[0]}, email {email}."),
+            ("assistant", "Perfect, I'll send you a calendar invite."),
+        ]
+    elif with_meeting:
+        turns = [
+            ("assistant", "Would you like to schedule a meeting to see a demo?"),
+            ("user", f"Sure, tomorrow at 2pm works. I'm {name}, my email is {email}."),
+            ("assistant", "Great, you're booked for tomorrow at 2pm."),
+        ]
+    elif put_off:
+        # Scheduling talk with every field present, but nothing was agreed
+        turns = random.choice([[
+            ("assistant", "Can we get a demo scheduled for tomorrow at 2pm?"),
+            ("user", f"Okay let me check my calendar and get back to you. I'm {name}, {email}."),
+            ("assistant", "No problem, talk soon."),
+        ], [
+            ("assistant", "Would tomorrow at 2pm work for a demo?"),
+            ("user", f"Tomorrow's not great, can we do next week? I'm {name}, {email}."),
+            ("assistant", "Sure, I'll send you a calendar invite and we can find a time."),
+            ("user", "Okay, thanks."),
+        ]])
+    else:
+        turns = [
+            ("assistant", "Hi, do you have 30 seconds to hear about our product?"),
+            ("user", "Sorry, not interested. Please remove me from your list."),
+        ]
+    return {
+        "callId": f"call-{i}",
+        "timestamp": "2026-10-19T10:00:00",
+        "logs": {"transcript": [{"role": r, "transcript": t} for r, t in turns]},
+    }
+
+
+def fake_analysis(messages) -> str:
+    text = messages[-1].content
+    email = next((w.strip(".,") for w in text.split() if "@" in w), None)
+    return json.dumps({
+        "meeting_scheduled": email is not None,
+        "time": "2026-10-20T14:00:00" if email else None,
+        "name": "Test User" if email else None,
+        "email": email,
+    })
+
+
+async def run(args) -> None:
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    # A fresh outbox/call store per run, so earlier runs' results aren't replayed as duplicates
+    os.environ.setdefault("SCH_DB_PATH", os.path.join(tempfile.mkdtemp(), "bench_state.db"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        import sch
+    fake = FakeChatModel(responder=fake_analysis, latency=args.latency)
+    sch.log_analysis_chain = sch.log_analysis_prompt | fake | sch.log_analysis_parser
+    sch.BATCH_MAX_CONCURRENCY = args.concurrency
+
+    random.seed(7)
+    logs, put_off = [], []
+    for i in range(args.calls):
+        with_meeting = random.random() < args.intent_ratio
+        putting_off = not with_meeting and random.random() < args.put_off_ratio
+        logs.append(make_call_log(i, with_meeting, random.random() < args.ambiguous_ratio,
+                                  random.random() < args.trap_ratio, putting_off))
+        if putting_off:
+            put_off.append(logs[-1])
+    put_off_booked = 0
+    for log in put_off:
+        local = extract_meeting(log["logs"]["transcript"], log["timestamp"])
+        put_off_booked += local.is_confident and local.meeting_scheduled
+    transport = httpx.ASGITransport(app=sch.app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            for log in logs:
+                (await client.post("/call-logs", json=log)).raise_for_status()
+            single_seconds = time.perf_counter() - started
+        single_llm_calls, fake.calls = fake.calls, 0
+
+        body = "".join(json.dumps(log) + "\n" for log in logs)
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            response = await client.post("/call-logs/batch", content=body,
+                                         headers={"content-type": "application/x-ndjson"})
+            batch_seconds = time.perf_counter() - started
+        results = [json.loads(line) for line in response.text.splitlines()]
+        stats = (await client.get("/call-logs/stats")).json()
+
+    print(f"calls={args.calls} llm_latency={args.latency}s concurrency={args.concurrency}")
+    print(f"{'mode':<10}{'seconds':>10}{'calls/s':>10}{'llm calls':>11}")
+    print(f"{'single':<10}{single_seconds:>10.2f}{args.calls / single_seconds:>10.1f}{single_llm_calls:>11}")
+    print(f"{'batch':<10}{batch_seconds:>10.2f}{args.calls / batch_seconds:>10.1f}{fake.calls:>11}")
+    date_names = sum(1 for r in results if str((r.get("details") or {}).get("name")).split()[0].lower() in DATE_WORDS)
+    print(f"results={len(results)} speedup={single_seconds / batch_seconds:.1f}x date words taken as names={date_names}")
+    print(f"put-off calls={len(put_off)} booked by the fast path={put_off_booked}")
+    print(f"fast-path hit rate={stats['fast_path_hit_rate']:.0%} llm skip rate={stats['llm_skip_rate']:.0%} "
+          f"avg ms={stats['avg_ms']} est. seconds saved={stats['estimated_seconds_saved']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--intent-ratio", type=float, default=0.4, help="Share of calls that booked a meeting")
+    parser.add_argument("--ambiguous-ratio", type=float, default=0.3,
+                        help="Share of booked calls the rule-based fast path can't settle")
+    parser.add_argument("--trap-ratio", type=float, default=0.2,
+                        help="Share of booked calls with a date where the name cue would be")
+    parser.add_argument("--put-off-ratio", type=float, default=0.3,
+                        help="Share of calls without a meeting where the user puts off a proposed time")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
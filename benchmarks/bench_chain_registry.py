@@ -0,0 +1,141 @@
+"""
+Per-call chain overhead: chains rebuilt inside the call vs the registered chains (runtime.register_chain).
+
+The four call sites that used to build their chain on every call, run against
+fakes.FakeChatModel with no latency (so only the local work is left):
+
+  portal      resolve_jurisdiction_from_portal: new ChatPromptTemplate + .partial + chain
+  fallback    search_jurisdiction_fallback_with_extract: the same
+  procedure   jurisdiction_agent_node: structured_chain(procedure_prompt, llm0, parser)
+  research    research_agent_node: structured_chain(research_prompt, llm0, parser)
+
+For each: microseconds per call when the chain is rebuilt (what the code did) and when
+the registered chain is reused, and the build cost alone. Finally checks the date the
+planner prompt sends after the clock moves past midnight, with the old import-time
+literal and with the {today} partial.
+
+Usage:
+    python benchmarks/bench_chain_registry.py [--calls 300]
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import date, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from langchain_core.prompts import ChatPromptTemplate
+
+import runtime
+from bench_graph import SyntheticLLM
+from fakes import FakeChatModel
+from structured import structured_chain
+
+PORTAL_INPUTS = {"country": "India", "topic": "telemedicine", "content": "Ministry of Corporate Affairs " * 100}
+FALLBACK_INPUTS = {"country": "India", "topic": "telemedicine", "company_name": "Acme Health",
+                   "search_results": str([{"url": "https://www.mca.gov.in", "content": "Company registration " * 50}])}
+PROCEDURE_INPUTS = {"department_name": "Ministry of Corporate Affairs", "department_url": "https://www.mca.gov.in",
+                    "location": "India", "topic": "telemedicine", "website_content": "SPICe+ form " * 200,
+                    "procedure_search": "Register with the ROC " * 50}
+RESEARCH_INPUTS = {"topic": "telemedicine", "target_audience": "clinic owners", "scraped_content": "Acme Health " * 200,
+                   "search_results": "Clinics want online consults " * 50,
+                   "department_name": "Ministry of Corporate Affairs", "department_url": "https://www.mca.gov.in",
+                   "registration_procedure": "1. Reserve the name\n2. File SPICe+", "location": "India",
+                   "campaign_date": "2026-03-15", "regulatory_news": "No recent news."}
+
+
+def rebuilt_builders(fs, llm):
+    """The chains as the call sites built them before the registry, one builder per site."""
+
+    def portal():
+        prompt = ChatPromptTemplate.from_messages([
+            ("system",
+             "Task: From this government portal content, find the ONE agency that handles business/startup/company registration. "
+             "Return JSON only (name + real URL). Do not hallucinate.\n{format_instructions}"),
+            ("human",
+             "Country: {country}\nTopic: {topic}\n\nCONTENT:\n{content}")
+        ]).partial(format_instructions=fs.jurisdiction_parser.get_format_instructions())
+        return structured_chain(prompt, llm, fs.jurisdiction_parser)
+
+    def fallback():
+        prompt = ChatPromptTemplate.from_messages([
+            ("system",
+             "Task: Use search results to identify the correct real government department for company/startup registration. "
+             "Return JSON only.\n{format_instructions}"),
+            ("human",
+             "Country: {country}\nTopic: {topic}\nCompany: {company_name}\nSearch:\n{search_results}")
+        ]).partial(format_instructions=fs.jurisdiction_parser.get_format_instructions())
+        return structured_chain(prompt, llm, fs.jurisdiction_parser)
+
+    return {
+        "portal": portal,
+        "fallback": fallback,
+        "procedure": lambda: structured_chain(fs.procedure_prompt, llm, fs.procedure_parser),
+        "research": lambda: structured_chain(fs.research_prompt, llm, fs.research_parser),
+    }
+
+
+def per_call_us(fn, calls: int) -> float:
+    fn()  # first call outside the timing (imports, lazy builds)
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def stale_date_check(fs) -> dict:
+    """The date in the planner prompt after midnight: import-time literal vs the {today} partial."""
+    literal = "Today's date is " + str(date.today())
+
+    class Tomorrow(date):
+        @classmethod
+        def today(cls):
+            return date.fromordinal(date.today().toordinal() + 1)
+
+    real, runtime.date = runtime.date, Tomorrow
+    try:
+        sent = fs.planner_prompt.format_messages(brief="x")[0].content
+    finally:
+        runtime.date = real
+    expected = str(date.today() + timedelta(days=1))
+    return {"literal": literal.split()[-1], "partial": sent.split("Today's date is ")[1][:10], "expected": expected}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-call chain construction against registered chains")
+    parser.add_argument("--calls", type=int, default=300)
+    args = parser.parse_args()
+
+    import foundry_server as fs
+
+    llm = FakeChatModel(responder=SyntheticLLM(), latency=0.0)
+    # The registered chains resolve llm0 when they are first built
+    fs.llm0 = llm
+    registered = {"portal": (fs.portal_jurisdiction_chain, PORTAL_INPUTS),
+                  "fallback": (fs.fallback_jurisdiction_chain, FALLBACK_INPUTS),
+                  "procedure": (fs.procedure_chain, PROCEDURE_INPUTS),
+                  "research": (fs.research_chain, RESEARCH_INPUTS)}
+    builders = rebuilt_builders(fs, llm)
+
+    print(f"{args.calls} calls per site, model latency 0\n")
+    header = f"{'site':<11}{'build us':>10}{'rebuilt us/call':>17}{'registered us/call':>20}{'saved':>8}"
+    print(header)
+    print("-" * len(header))
+    for site, (chain, inputs) in registered.items():
+        build = builders[site]
+        build_us = per_call_us(build, args.calls)
+        rebuilt_us = per_call_us(lambda: build().invoke(inputs), args.calls)
+        registered_us = per_call_us(lambda: chain.invoke(inputs), args.calls)
+        print(f"{site:<11}{build_us:>10.0f}{rebuilt_us:>17.0f}{registered_us:>20.0f}"
+              f"{1 - registered_us / rebuilt_us:>8.0%}")
+
+    dates = stale_date_check(fs)
+    print(f"\nplanner prompt date after midnight (expected {dates['expected']}): "
+          f"import-time literal {dates['literal']}, {{today}} partial {dates['partial']}")
+
+
+if __name__ == "__main__":
+    main()
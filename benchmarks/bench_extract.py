@@ -0,0 +1,238 @@
+"""
+HTML-to-text extraction: html_extract vs the previous BeautifulSoup paths.
+
+Runs every page of a corpus of government-style pages through:
+
+  bs4_all        BeautifulSoup(html.parser) + get_text, script/style removed
+                 (what WebBaseLoader and the previous scraper.html_to_text returned)
+  bs4_first      first main/article/div via BeautifulSoup (old _scrape_govt_website fallback)
+  extract_stdlib html_extract.extract with the stdlib parser
+  extract_lxml   html_extract.extract with lxml (skipped when lxml is not installed)
+
+and reports pages/s, MB/s of HTML, average characters kept, and, for generated pages
+whose main content is known, recall (share of main-content sentences kept), precision
+(share of output characters that are main content) and recall within the first 4000
+characters (the slice the research prompt sees).
+
+The default corpus is generated from five layouts seen on real portals: semantic
+HTML5 (header/nav/main/aside/footer), legacy ASP.NET table layouts, Drupal-style div
+soup with <br>-separated prose, pages saved with a consent dialog open (cookie/modal
+classes and aria-hidden on <body>), and oversized pages with mega-menus. Real pages saved
+with "Save page as" can be used instead (throughput and kept characters only):
+
+Usage:
+    python benchmarks/bench_extract.py [--pages 40] [--repeat 3] [--save DIR] [--corpus DIR]
+"""
+import os
+import sys
+import glob
+import time
+import random
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+import html_extract
+
+AGENCIES = ["City Clerk", "Department of Revenue", "Planning Office", "Fire Marshal", "Health Department", "Secretary of State"]
+DOCUMENTS = ["certificate of incorporation", "zoning approval", "proof of insurance", "tax registration", "fire inspection report", "food handler permit"]
+EVENTS = ["opening the premises", "changing ownership", "the annual renewal date", "hiring employees", "the first sale"]
+MENU = ["Residents", "Business", "Visitors", "Government", "Services", "Departments", "Pay a bill", "Report a problem",
+        "Jobs", "News", "Events", "Contact", "Permits", "Parks", "Libraries", "Transportation", "Public safety", "Utilities"]
+
+
+def sentence(rng: random.Random, i: int) -> str:
+    return (
+        f"Applicants must submit the {rng.choice(DOCUMENTS)} to the {rng.choice(AGENCIES)} "
+        f"within {rng.randint(5, 90)} days of {rng.choice(EVENTS)}, quoting reference {i:05d}."
+    )
+
+
+def links(rng: random.Random, count: int, cls: str = "") -> str:
+    items = "".join(f'<li{cls}><a href="/{i}">{rng.choice(MENU)} {i % 7 or ""}</a></li>' for i in range(count))
+    return f"<ul>{items}</ul>"
+
+
+def footer_text() -> str:
+    return ("<p>City Hall, 100 Main Street, Springfield. Open Monday to Friday, 8am to 5pm. "
+            "Copyright 2025 City of Springfield. All rights reserved.</p>")
+
+
+def main_blocks(rng: random.Random, paragraphs: int, br_prose: bool = False) -> Tuple[str, List[str]]:
+    """Main-content HTML and the sentences it contains."""
+    sentences, parts, n = [], [], 0
+    for p in range(paragraphs):
+        group = [sentence(rng, n + k) for k in range(rng.randint(1, 3))]
+        n += len(group)
+        sentences += group
+        if p and p % 6 == 0:
+            parts.append(f"<h2>Section {p // 6}: requirements</h2>")
+        if br_prose:
+            parts.append(" ".join(group) + "<br><br>\n")
+        elif p % 5 == 3:
+            parts.append("<ul>" + "".join(f"<li>{s}</li>" for s in group) + "</ul>")
+        else:
+            parts.append(f"<p>{' '.join(group)}</p>\n")
+    return "".join(parts), sentences
+
+
+def page_semantic(rng, paragraphs, menu):
+    body, sentences = main_blocks(rng, paragraphs)
+    html = f"""<!DOCTYPE html><html lang="en"><head><title>Business licence | Springfield</title>
+<style>body{{font-family:sans-serif}}</style><script>window.dataLayer=[];</script></head><body>
+<div class="skip-link"><a href="#main">Skip to main content</a></div>
+<div id="cookie-consent">We use cookies to improve this site. <button>Accept</button></div>
+<header role="banner"><div class="logo">City of Springfield</div>{links(rng, 8)}</header>
+<nav class="mega-menu" aria-label="Main">{links(rng, menu)}</nav>
+<div class="breadcrumbs"><a href="/">Home</a> &gt; <a href="/business">Business</a></div>
+<main id="main"><article><h1>Apply for a business licence</h1>{body}</article></main>
+<aside class="related"><h2>Related services</h2>{links(rng, 12)}</aside>
+<footer><div class="footer-cols">{links(rng, 24)}{footer_text()}</div></footer>
+<script src="/analytics.js"></script></body></html>"""
+    return html, sentences
+
+
+def page_legacy_table(rng, paragraphs, menu):
+    body, sentences = main_blocks(rng, paragraphs)
+    html = f"""<html><head><title>Licensing - Department of Revenue</title></head><body>
+<form method="post" id="aspnetForm"><input type="hidden" name="__VIEWSTATE" value="{'x' * 2000}">
+<div id="header"><img src="seal.gif" alt="State seal"><span>Department of Revenue</span>{links(rng, 10)}</div>
+<table id="layout" width="100%"><tr><td id="leftnav" width="200">{links(rng, menu)}</td>
+<td id="contentcell"><span id="ctl00_PageTitle"><b>Business tax registration</b></span>
+<div id="ctl00_ContentPlaceHolder1_body">{body}</div></td></tr></table>
+<div id="footer">{links(rng, 10)}{footer_text()}</div></form></body></html>"""
+    return html, sentences
+
+
+def page_div_soup(rng, paragraphs, menu):
+    body, sentences = main_blocks(rng, paragraphs, br_prose=True)
+    html = f"""<!DOCTYPE html><html><head><title>Food service permits</title></head><body class="page-node">
+<div id="page-wrapper"><div class="top-bar utility-menu">{links(rng, 6)}</div>
+<div class="site-alert">Offices closed Monday for the holiday.</div>
+<div id="primary-menu" class="menu">{links(rng, menu)}</div>
+<div class="layout-container"><div class="region region-content"><h1 class="page-title">Food service permits</h1>
+<div class="field field--name-body field-item">{body}</div></div>
+<div class="region region-sidebar-second"><div class="block">{links(rng, 15)}</div></div></div>
+<div class="site-info">{footer_text()}{links(rng, 8)}</div></div></body></html>"""
+    return html, sentences
+
+
+def page_modal_open(rng, paragraphs, menu):
+    # Captured with the consent dialog up: the page root carries the banner/modal classes
+    # and is aria-hidden, which must not take the content with it
+    body, sentences = main_blocks(rng, paragraphs)
+    html = f"""<!DOCTYPE html><html class="ads-enabled"><head><title>Building permits</title></head>
+<body class="cookie-consent modal-open" aria-hidden="true">
+<header>{links(rng, 8)}</header><nav>{links(rng, menu)}</nav>
+<main class="ads-slot-wrapper" aria-hidden="true"><h1>Building permits</h1>{body}</main>
+<footer>{links(rng, 12)}{footer_text()}</footer>
+<div role="dialog" class="cookie-consent">We use cookies. <button>Accept</button></div></body></html>"""
+    return html, sentences
+
+
+LAYOUTS = [page_semantic, page_legacy_table, page_div_soup, page_modal_open]
+
+
+def generate(pages: int, seed: int = 11) -> List[Tuple[str, str, Optional[List[str]]]]:
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(pages):
+        layout = LAYOUTS[i % len(LAYOUTS)]
+        if i % 10 == 9:  # oversized: long regulation text under a mega-menu
+            html, sentences = layout(rng, rng.randint(800, 1200), 600)
+        else:
+            html, sentences = layout(rng, rng.randint(4, 60), rng.randint(40, 150))
+        corpus.append((f"{i:03d}-{layout.__name__[5:]}.html", html, sentences))
+    return corpus
+
+
+def load(directory: str) -> List[Tuple[str, str, Optional[List[str]]]]:
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.htm*"))):
+        with open(path, "rb") as f:
+            raw = f.read()
+        corpus.append((os.path.basename(path), raw.decode("utf-8", errors="replace"), None))
+    return corpus
+
+
+def bs4_all(html: str) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "noscript", "template", "svg"]):
+        tag.decompose()
+    return soup.get_text(separator="\n", strip=True)
+
+
+def bs4_first(html: str) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+    main_content = soup.find(["main", "article", "div"]) or soup.body
+    return main_content.get_text(separator="\n", strip=True) if main_content else ""
+
+
+METHODS = {
+    "bs4_all": bs4_all,
+    "bs4_first": bs4_first,
+    "extract_stdlib": lambda html: html_extract.extract(html, backend="stdlib").text,
+}
+if html_extract.etree is not None:
+    METHODS["extract_lxml"] = lambda html: html_extract.extract(html, backend="lxml").text
+
+
+def score(text: str, sentences: List[str]) -> Dict[str, float]:
+    flat = " ".join(text.split())
+    head = " ".join(text[:4000].split())
+    kept = [s for s in sentences if s in flat]
+    return {
+        "recall": len(kept) / len(sentences),
+        "precision": min(1.0, sum(len(s) for s in kept) / max(1, len(flat))),
+        "recall_4k": sum(s in head for s in sentences) / len(sentences),
+    }
+
+
+def run(corpus, repeat: int) -> None:
+    total_mb = sum(len(html.encode()) for _, html, _ in corpus) / 1e6
+    print(f"corpus: {len(corpus)} pages, {total_mb:.1f} MB of HTML, repeat {repeat}\n")
+    header = f"{'method':<16}{'pages/s':>9}{'MB/s':>8}{'avg chars':>11}{'recall':>8}{'precision':>11}{'recall@4k':>11}"
+    print(header)
+    print("-" * len(header))
+    for name, method in METHODS.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            outputs = [method(html) for _, html, _ in corpus]
+        elapsed = (time.perf_counter() - start) / repeat
+        line = f"{name:<16}{len(corpus) / elapsed:>9.1f}{total_mb / elapsed:>8.2f}{sum(map(len, outputs)) / len(corpus):>11.0f}"
+        scored = [score(text, sentences) for text, (_, _, sentences) in zip(outputs, corpus) if sentences]
+        if scored:
+            means = {k: sum(s[k] for s in scored) / len(scored) for k in scored[0]}
+            line += f"{means['recall']:>8.1%}{means['precision']:>11.1%}{means['recall_4k']:>11.1%}"
+        print(line)
+
+    strategies: Dict[str, int] = {}
+    for _, html, _ in corpus:
+        strategy = html_extract.extract(html).strategy
+        strategies[strategy] = strategies.get(strategy, 0) + 1
+    print(f"\nhtml_extract strategies ({html_extract.EXTRACT_BACKEND}): {strategies}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML main-content extraction")
+    parser.add_argument("--pages", type=int, default=40, help="generated pages (ignored with --corpus)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--corpus", help="directory of saved .html pages to use instead of generated ones")
+    parser.add_argument("--save", help="write the generated corpus to this directory")
+    args = parser.parse_args()
+
+    corpus = load(args.corpus) if args.corpus else generate(args.pages, args.seed)
+    if args.save and not args.corpus:
+        os.makedirs(args.save, exist_ok=True)
+        for name, html, _ in corpus:
+            with open(os.path.join(args.save, name), "w", encoding="utf-8") as f:
+                f.write(html)
+    run(corpus, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
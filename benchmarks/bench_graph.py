@@ -0,0 +1,405 @@
+"""
+End-to-end benchmark of the campaign graph, offline, from a recorded tape (see replay.py).
+
+Runs the full graph through the real /ws_stream_campaign WebSocket endpoint with every
+external call (Groq, Tavily, Unsplash, Slack, Telegram, page fetches) replayed from a
+tape, and reports per-node and total latency, Python heap peak per node (tracemalloc
+pass), process RSS, and WebSocket bytes per step.
+
+    replay      (default) benchmark against a tape; without --tape a synthetic demo tape
+                is generated first (schema-valid LLM answers, search results, govt pages)
+    record      run the graph once (plus one /infer_plan and /chat call) against the
+                live services, writing a tape (needs the usual GROQ/TAVILY/UNSPLASH keys)
+    synthesize  write the synthetic demo tape only
+
+Latency injected on replay (--latency): "recorded" (default), "recorded*0.1", "0" for
+pure in-process overhead, or per kind, e.g. "llm=1.5,search=0.8,http=0.2".
+
+Regression check: --json saves results, and --baseline compares against a saved
+file and exits 1 when total or per-node p50 latency, or WebSocket bytes, grow past
+--tolerance.
+
+Usage:
+    python benchmarks/bench_graph.py [replay] [--tape T] [--runs 3] [--latency recorded*0.1] [--json out.json] [--baseline base.json]
+    python benchmarks/bench_graph.py record --tape benchmarks/tapes/live.jsonl [--prompt "..."]
+    python benchmarks/bench_graph.py synthesize --tape benchmarks/tapes/demo.jsonl
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+import statistics
+import contextlib
+import subprocess
+import tracemalloc
+from collections import defaultdict
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import replay
+
+DEFAULT_PROMPT = (
+    "Plan a webinar launch for Acme Health's telemedicine platform, aimed at independent "
+    "clinic owners in India, going live on 2026-03-15."
+)
+# Recorded next to the campaign so tapes also cover the HTTP endpoints (see bench_ws_load.py)
+CHAT_REQUEST = {
+    "question": "Which documents do we need before launch?",
+    "brd_markdown": "# Business Requirements Document\n\n## Executive Summary\nLaunch a telemedicine webinar.",
+    "strategy_markdown": "# Strategic Approach\n\n## Phase 1\n- Build awareness.",
+}
+# Ops agent only posts when these are set; dummy values make the calls (and their tape entries) happen.
+OPS_ENV = {
+    "SLACK_WEBHOOK_URL": "https://hooks.slack.com/services/T0BENCH01/B0BENCH01/benchbenchbench1",
+    "TELEGRAM_BOT_TOKEN": "123456789:bench-token-bench-token",
+    "TELEGRAM_CHAT_ID": "-100123456",
+}
+
+
+# --- Synthetic backends (used to produce the demo tape) ---
+
+def _json(obj: Any) -> str:
+    return json.dumps(obj, indent=2)
+
+
+class SyntheticLLM:
+    """Schema-valid answers for every chain in the graph, chosen from the system prompt."""
+
+    def __init__(self):
+        self.validations = 0
+
+    def __call__(self, messages) -> str:
+        system, human = messages[0].content, messages[-1].content
+        if "expert parsing assistant" in system:
+            return _json({
+                "goal": "Launch a webinar", "topic": "Telemedicine platform",
+                "target_audience": "Independent clinic owners", "company_name": "Acme Health",
+                "source_docs_url": None, "campaign_date": "2026-03-15", "location": "India",
+            })
+        if "government portal content" in system or "Use search results" in system:
+            return _json({
+                "department_name": "Ministry of Corporate Affairs",
+                "department_url": "https://www.mca.gov.in/content/mca/global/en/home.html",
+                "jurisdiction_type": "Company Registration",
+            })
+        if "extracting registration procedures" in system:
+            return _json({"registration_steps": [
+                f"Step {i}: file form SPICe+ part {'AB'[i % 2]} with the Registrar of Companies and pay the prescribed fee."
+                for i in range(1, 9)
+            ]})
+        if "marketing strategist" in system:
+            return _json({
+                "audience_persona": {"pain_point": "Compliance paperwork for new clinics", "motivation": "Launch faster",
+                                     "preferred_channel": "Webinars and email"},
+                "core_messaging": {"value_proposition": "Register and launch your telemedicine clinic in weeks",
+                                   "tone_of_voice": "Clear and reassuring", "call_to_action": "Save your seat"},
+                "required_documents": [
+                    {"document_name": name, "issuing_authority": "Ministry of Corporate Affairs",
+                     "purpose": "Company incorporation", "deadline_note": "30 days before launch"}
+                    for name in ("SPICe+ form", "DIN", "DSC", "PAN", "TAN", "GST registration", "Clinical Establishment licence")
+                ],
+            })
+        if "compliance auditor" in system:
+            self.validations += 1
+            first = self.validations == 1
+            return _json({
+                "is_validated": not first, "overall_confidence": 0.55 if first else 0.86,
+                "step_confidence": {str(i): 0.5 if first else 0.9 for i in range(8)},
+                "document_confidence": {"SPICe+ form": 0.9, "DIN": 0.8},
+                "mismatches": ["Issuing authority for GST registration should be GSTN"] if first else [],
+                "missing_docs": ["Shops and Establishments registration"] if first else [],
+                "missing_steps": [],
+            })
+        if "marketing copywriter" in system:
+            return _json({
+                "webinar_details": {"title": "Launch Your Telemedicine Clinic Right",
+                                    "abstract": "A practical walkthrough of registration, licensing and launch. " * 2},
+                "social_posts": [
+                    {"platform": "Instagram", "content": "Opening a telemedicine clinic? Join our live session. #health", "image_prompt": "doctor laptop"},
+                    {"platform": "X (Twitter)", "content": "Registration, licences, launch: one webinar. Save your seat.", "image_prompt": "clinic team"},
+                ],
+                "webinar_image_prompt": "telemedicine",
+            })
+        if "raw HTML" in system:
+            return "\n".join(
+                f'<section id="{sid}"><h2>{sid.title()}</h2>' + "<p>Acme Health helps clinics launch faster.</p>" * 12 + "</section>"
+                for sid in ("home", "about", "contact")
+            )
+        if "Chief Strategist" in system:
+            return "# Strategic Approach\n\n" + "".join(
+                f"## Phase {i}\n- Build awareness with clinic owners through targeted content.\n- Measure sign-ups weekly.\n\n"
+                for i in range(1, 6)
+            )
+        if "PROMETHEO campaign platform" in system:
+            return "- SPICe+ incorporation form\n- GST registration\n- Clinical Establishment licence"
+        if "Senior Product Manager" in system:
+            return "# Business Requirements Document\n\n## Executive Summary\n" + "".join(
+                f"## {i}. Section {i}\n" + "- Requirement: the platform shall support clinic onboarding within 10 minutes.\n" * 15 + "\n"
+                for i in range(1, 8)
+            )
+        return f"Acknowledged: {human[:80]}"
+
+
+class SyntheticSearch:
+    name = "tavily_search"
+
+    def invoke(self, query, config=None, **kwargs):
+        rng = random.Random(str(query))
+        return {
+            "query": query,
+            "results": [
+                {"title": f"Result {i} for {query[:40]}", "url": f"https://example.gov/{rng.randint(1000, 9999)}",
+                 "content": "Companies must file incorporation documents with the registrar and obtain tax registrations. " * 4,
+                 "score": round(rng.random(), 3)}
+                for i in range(5)
+            ],
+        }
+
+
+def synthetic_http(method: str, url: str, body: Any) -> Dict[str, Any]:
+    if "api.unsplash.com" in url:
+        return {"status": 200, "headers": {"content-type": "application/json"},
+                "text": json.dumps({"results": [{"urls": {"regular": "https://images.unsplash.com/photo-bench?w=1080"}}]})}
+    if "hooks.slack.com" in url:
+        return {"status": 200, "headers": {"content-type": "text/plain"}, "text": "ok"}
+    if "api.telegram.org" in url:
+        return {"status": 200, "headers": {"content-type": "application/json"},
+                "text": json.dumps({"ok": True, "result": {"message_id": 1}})}
+    import bench_extract
+
+    html, _ = bench_extract.page_semantic(random.Random(url), 40, 120)
+    return {"status": 200, "headers": {"content-type": "text/html; charset=utf-8"}, "text": html}
+
+
+def model_latency(entry: Dict[str, Any]) -> float:
+    """Plausible service latency for a synthetic tape entry."""
+    kind, response = entry["kind"], entry["response"]
+    if kind == "llm":
+        return 0.35 + len(response.get("content") or "") / 1500
+    if kind == "search":
+        return 0.9
+    url = entry["request"]["url"]
+    return 0.25 if "unsplash" in url else 0.3 if "slack" in url or "telegram" in url else 0.6
+
+
+# --- Running the graph ---
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        return 0.0
+
+
+def run_campaign(client, prompt: str, trace_memory: bool = False) -> Dict[str, Any]:
+    """One campaign over the WebSocket; per-step seconds/bytes (and heap peak when tracing)."""
+    steps: List[Dict[str, Any]] = []
+    total_bytes = 0
+    if trace_memory:
+        tracemalloc.reset_peak()
+    started = last = time.perf_counter()
+    with client.websocket_connect("/ws_stream_campaign") as ws:
+        ws.send_json({"initial_prompt": prompt})
+        while True:
+            text = ws.receive_text()
+            now = time.perf_counter()
+            size = len(text.encode("utf-8"))
+            total_bytes += size
+            message = json.loads(text)
+            if message["event"] == "step":
+                step = {"node": message["node"], "seconds": now - last, "bytes": size}
+                if trace_memory:
+                    step["heap_peak_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+                    tracemalloc.reset_peak()
+                steps.append(step)
+                last = now
+            elif message["event"] == "error":
+                raise RuntimeError(f"campaign failed: {message.get('data')}")
+            else:
+                break
+    return {"seconds": time.perf_counter() - started, "first_step": steps[0]["seconds"] if steps else None,
+            "bytes": total_bytes, "steps": steps}
+
+
+def _client():
+    from fastapi.testclient import TestClient
+    import foundry_server
+
+    return TestClient(foundry_server.app), foundry_server
+
+
+def record_session(tape: "replay.Tape", prompt: str) -> None:
+    """One campaign plus one /infer_plan and one /chat call, recorded into `tape`."""
+    replay.install(tape)
+    client, _ = _client()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_campaign(client, prompt)
+        client.post("/infer_plan", json={"initial_prompt": prompt}).raise_for_status()
+        client.post("/chat", json=CHAT_REQUEST).raise_for_status()
+
+
+def benchmark(args) -> Dict[str, Any]:
+    tape = replay.Tape(args.tape, "replay", latency=args.latency)
+    replay.install(tape)
+    client, foundry_server = _client()
+    from cache import shared_cache
+
+    runs = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(args.runs):
+            shared_cache.clear()
+            tape.rewind()
+            runs.append(run_campaign(client, args.prompt))
+        shared_cache.clear()
+        tape.rewind()
+        tracemalloc.start()
+        memory_run = run_campaign(client, args.prompt, trace_memory=True)
+        tracemalloc.stop()
+
+    per_node: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+    for run in runs:
+        for step in run["steps"]:
+            per_node[step["node"]]["seconds"].append(step["seconds"])
+            per_node[step["node"]]["bytes"].append(step["bytes"])
+    for step in memory_run["steps"]:
+        per_node[step["node"]]["heap_peak_mb"].append(step["heap_peak_mb"])
+
+    nodes = {
+        node: {
+            "steps_per_run": len(values["seconds"]) / len(runs),
+            "p50_ms": statistics.median(values["seconds"]) * 1000,
+            "max_ms": max(values["seconds"]) * 1000,
+            "ws_bytes": statistics.mean(values["bytes"]),
+            "heap_peak_mb": max(values["heap_peak_mb"] or [0.0]),
+        }
+        for node, values in per_node.items()
+    }
+    return {
+        "tape": tape.stats(),
+        "runs": len(runs),
+        "total_p50_ms": statistics.median(r["seconds"] for r in runs) * 1000,
+        "first_step_p50_ms": statistics.median(r["first_step"] for r in runs) * 1000,
+        "ws_bytes_per_run": statistics.mean(r["bytes"] for r in runs),
+        "heap_peak_mb": max((s["heap_peak_mb"] for s in memory_run["steps"]), default=0.0),
+        "rss_mb": rss_mb(),
+        "max_rss_mb": max(rss_mb(), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024),
+        "nodes": nodes,
+        "speculation": dict(foundry_server.speculation_stats),
+    }
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    tape = result["tape"]
+    print(f"tape: {tape['path']}  latency: {tape['latency']}  runs: {result['runs']}")
+    print(f"replayed calls: {tape['calls']}  fallbacks: {tape['fallbacks']}  injected: {tape['injected_seconds']}s\n")
+    header = f"{'node':<22}{'steps/run':>10}{'p50 ms':>10}{'max ms':>10}{'ws KB':>9}{'heap MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for node, n in result["nodes"].items():
+        print(f"{node:<22}{n['steps_per_run']:>10.1f}{n['p50_ms']:>10.1f}{n['max_ms']:>10.1f}"
+              f"{n['ws_bytes'] / 1024:>9.1f}{n['heap_peak_mb']:>9.2f}")
+    print("-" * len(header))
+    print(f"total p50 {result['total_p50_ms']:.0f} ms, first step {result['first_step_p50_ms']:.0f} ms, "
+          f"{result['ws_bytes_per_run'] / 1024:.0f} KB over WebSocket per run")
+    print(f"python heap peak {result['heap_peak_mb']:.1f} MB, rss {result['rss_mb']:.0f} MB (max {result['max_rss_mb']:.0f} MB)")
+    speculation = result.get("speculation") or {}
+    if speculation.get("started"):
+        print(f"jurisdiction speculation: {speculation['hits']} hits, {speculation['misses']} misses, "
+              f"{speculation['saved_seconds']:.2f}s saved")
+
+
+def regressions(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    def worse(now: float, before: float, slack: float) -> bool:
+        return now > before * (1 + tolerance) + slack
+
+    found = []
+    for metric, slack in (("total_p50_ms", 20.0), ("ws_bytes_per_run", 256.0)):
+        if worse(result[metric], baseline[metric], slack):
+            found.append(f"{metric}: {baseline[metric]:.0f} -> {result[metric]:.0f}")
+    for node, n in result["nodes"].items():
+        before = baseline.get("nodes", {}).get(node)
+        if before and worse(n["p50_ms"], before["p50_ms"], 10.0):
+            found.append(f"{node} p50_ms: {before['p50_ms']:.0f} -> {n['p50_ms']:.0f}")
+    return found
+
+
+def synthesize(path: str, prompt: str) -> None:
+    backends = {"llm": lambda model: _fake_chat(), "search": SyntheticSearch, "http": synthetic_http}
+    record_session(replay.Tape(path, "record", backends=backends), prompt)
+    with open(path, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            entry["elapsed"] = round(model_latency(entry), 3)
+            f.write(json.dumps(entry) + "\n")
+    print(f"synthesized {len(entries)} calls into {path}")
+
+
+_responder = SyntheticLLM()
+
+
+def _fake_chat():
+    from fakes import FakeChatModel
+
+    return FakeChatModel(responder=_responder, latency=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the campaign graph")
+    parser.add_argument("mode", nargs="?", default="replay", choices=["replay", "record", "synthesize"])
+    parser.add_argument("--tape", help="tape file (default: a synthetic demo tape in a temp dir)")
+    parser.add_argument("--prompt", default=DEFAULT_PROMPT)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--latency", default="recorded")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results file from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    for name in ("tape", "json", "baseline"):  # resolved before moving to the scratch dir
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    for key, value in OPS_ENV.items():
+        os.environ.setdefault(key, value)
+    # The BRD node writes PDFs to ./campaign_outputs; keep them out of the working tree.
+    workdir = tempfile.mkdtemp(prefix="bench_graph_")
+    os.chdir(workdir)
+
+    if args.mode == "record":
+        if not args.tape:
+            parser.error("record needs --tape")
+        record_session(replay.Tape(args.tape, "record"), args.prompt)
+        print(f"recorded {replay.stats()['calls']} into {args.tape}")
+        return
+    if args.mode == "synthesize":
+        synthesize(args.tape or os.path.join(workdir, "campaign_demo.jsonl"), args.prompt)
+        return
+
+    if not args.tape:
+        # Separate interpreter: recording builds LLM clients and pools bound to the recording tape.
+        args.tape = os.path.join(workdir, "campaign_demo.jsonl")
+        subprocess.run([sys.executable, os.path.abspath(__file__), "synthesize", "--tape", args.tape,
+                        "--prompt", args.prompt], check=True)
+    result = benchmark(args)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(result, json.load(f), args.tolerance)
+        if found:
+            print("\nREGRESSIONS:\n  " + "\n  ".join(found))
+            sys.exit(1)
+        print("\nno regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
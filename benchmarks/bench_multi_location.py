@@ -0,0 +1,112 @@
+"""
+Multi-location campaigns: K separate campaigns vs one campaign with `locations`.
+
+Runs the graph through the real /ws_stream_campaign WebSocket endpoint against the
+synthetic backends of bench_graph.py (schema-valid LLM answers, search results, govt
+pages), with --llm-latency seconds per model call, for K = 1..--max-locations countries:
+
+  separate  one campaign per country, one after another (what the frontend did before)
+  batched   one campaign with "locations": [...]; jurisdiction → research → validation
+            runs per country in parallel, planner/strategy/content/design/web/brd/ops once
+
+and reports wall time and the external calls made (LLM, search, HTTP), so the batched
+cost can be compared with 1 + K x (per-location work). Caches are cleared before every
+measurement.
+
+Usage:
+    python benchmarks/bench_multi_location.py [--max-locations 4] [--llm-latency 0.2]
+"""
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import replay
+import bench_graph
+from fakes import FakeChatModel
+
+COUNTRIES = ("India", "Germany", "Kenya", "Brazil", "Singapore", "Canada")
+
+
+def run(client, locations):
+    with client.websocket_connect("/ws_stream_campaign") as ws:
+        ws.send_json({"initial_prompt": bench_graph.DEFAULT_PROMPT, "locations": locations})
+        while True:
+            message = ws.receive_json()
+            if message["event"] == "error":
+                raise RuntimeError(f"campaign failed: {message.get('data')}")
+            if message["event"] != "step":
+                return
+
+
+def measure(client, campaigns):
+    from cache import shared_cache
+
+    shared_cache.clear()
+    before = dict(replay.stats()["calls"])
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for locations in campaigns:
+            run(client, locations)
+    calls = {kind: n - before.get(kind, 0) for kind, n in replay.stats()["calls"].items()}
+    return {"seconds": time.perf_counter() - started, "calls": calls}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multi-location campaigns against separate runs")
+    parser.add_argument("--max-locations", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per model call")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    if args.json:
+        args.json = os.path.abspath(args.json)
+    for key, value in bench_graph.OPS_ENV.items():
+        os.environ.setdefault(key, value)
+    # The BRD node writes PDFs to ./campaign_outputs; keep them out of the working tree.
+    workdir = tempfile.mkdtemp(prefix="bench_multi_location_")
+    os.chdir(workdir)
+
+    # Record mode with synthetic backends: every call is made (and counted), nothing is replayed
+    backends = {"llm": lambda model: FakeChatModel(responder=bench_graph._responder, latency=args.llm_latency),
+                "search": bench_graph.SyntheticSearch, "http": bench_graph.synthetic_http}
+    replay.install(replay.Tape(os.path.join(workdir, "calls.jsonl"), "record", backends=backends))
+    from fastapi.testclient import TestClient
+    import foundry_server
+
+    client = TestClient(foundry_server.app)
+    measure(client, [[COUNTRIES[0]]])  # builds clients and graphs
+
+    results = {}
+    for k in range(1, args.max_locations + 1):
+        countries = list(COUNTRIES[:k])
+        results[k] = {"separate": measure(client, [[c] for c in countries]), "batched": measure(client, [countries])}
+
+    header = f"{'K':>3}  {'mode':<10}{'seconds':>9}{'llm':>6}{'search':>8}{'http':>6}"
+    print(f"LLM latency {args.llm_latency:g}s per call; search/HTTP answered instantly\n")
+    print(header)
+    print("-" * len(header))
+    for k, by_mode in results.items():
+        for mode, r in by_mode.items():
+            calls = r["calls"]
+            print(f"{k:>3}  {mode:<10}{r['seconds']:>9.2f}{calls.get('llm', 0):>6}{calls.get('search', 0):>8}"
+                  f"{calls.get('http', 0):>6}")
+    if len(results) > 1:
+        one = results[1]["batched"]["calls"].get("llm", 0)
+        two = results[2]["batched"]["calls"].get("llm", 0)
+        print(f"\nbatched LLM calls: {one} for one location, +{two - one} per extra location")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Structured-output parsing: strict PydanticOutputParser vs structured.py's tolerant parser.
+
+Takes schema-valid replies for the foundry's structured chains (planner, jurisdiction,
+procedure, research, validation, content; the same answers bench_graph.py synthesizes)
+and damages them the way LLM replies typically are damaged: code fences, prose around
+the JSON, trailing commas, Python-style dicts, comments, unquoted keys, percentages for
+scores, dropped null fields, and truncation. Each reply goes through:
+
+  strict     PydanticOutputParser (what every chain used before)
+  tolerant   structured_chain(...) with a stand-in model that answers a re-ask with the
+             undamaged reply, so replies the local repair cannot save are counted as re-asks
+
+and the report gives, per defect, the share parsed strictly, repaired locally, re-asked,
+failed, plus parse time.
+
+Usage:
+    python benchmarks/bench_parsing.py [--variants 20]
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+import structured
+from bench_graph import SyntheticLLM
+from fakes import FakeChatModel
+
+# system-prompt phrase SyntheticLLM keys on -> schema it answers
+SCHEMAS = {
+    "expert parsing assistant": "PlannerOutput",
+    "government portal content": "JurisdictionInfo",
+    "extracting registration procedures": "ProcedureOutput",
+    "marketing strategist": "ResearchOutput",
+    "compliance auditor": "ValidationOutput",
+    "marketing copywriter": "ContentAgentOutput",
+}
+
+
+def _dump_python(obj) -> str:
+    return repr(obj)  # single quotes, None/True/False
+
+
+def _percent(obj):
+    if isinstance(obj, float) and 0 <= obj <= 1:
+        return f"{obj * 100:.0f}%"
+    if isinstance(obj, dict):
+        return {k: _percent(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_percent(v) for v in obj]
+    return obj
+
+
+DEFECTS = {
+    "clean": lambda obj, text, rng: text,
+    "fenced": lambda obj, text, rng: f"```json\n{text}\n```",
+    "prose": lambda obj, text, rng: f"Sure! Here is the JSON you asked for:\n\n{text}\n\nLet me know if you need changes.",
+    "trailing_commas": lambda obj, text, rng: re.sub(r"(\S)(\s*[}\]])", r"\1,\2", text),
+    "python_dict": lambda obj, text, rng: _dump_python(obj),
+    "comments": lambda obj, text, rng: text.replace(",\n", ",  // checked\n", 3),
+    "unquoted_keys": lambda obj, text, rng: re.sub(r'"(\w+)":', r"\1:", text),
+    "percent_scores": lambda obj, text, rng: json.dumps(_percent(obj), indent=2),
+    "dropped_nulls": lambda obj, text, rng: json.dumps({k: v for k, v in obj.items() if v is not None}, indent=2),
+    "truncated": lambda obj, text, rng: text[: int(len(text) * rng.uniform(0.85, 0.98))],
+}
+
+
+def replies():
+    """(schema model, undamaged reply) for every structured chain in foundry_server."""
+    import foundry_server
+
+    responder = SyntheticLLM()
+    for phrase, schema in SCHEMAS.items():
+        text = responder([SimpleNamespace(content=phrase), SimpleNamespace(content="")])
+        yield getattr(foundry_server, schema), text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tolerant structured-output parsing")
+    parser.add_argument("--variants", type=int, default=20, help="damaged copies per reply and defect")
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = defaultdict(Counter)
+    timing = defaultdict(lambda: [0.0, 0.0, 0])  # defect -> [strict s, tolerant s, n]
+    prompt = ChatPromptTemplate.from_messages([("human", "{reply}")])
+
+    for model, text in replies():
+        obj = json.loads(text)
+        strict = PydanticOutputParser(pydantic_object=model)
+        tolerant = structured.TolerantOutputParser(pydantic_object=model)
+        # The stand-in "LLM" echoes the reply it is given (the damaged one) and answers a re-ask with the clean one
+        llm = FakeChatModel(latency=0, responder=lambda m, clean=text: clean if "could not be parsed" in m[0].content
+                            else m[-1].content)
+        chain = structured.structured_chain(prompt, llm, tolerant)
+        for defect, damage in DEFECTS.items():
+            for _ in range(args.variants if defect == "truncated" else 1):
+                damaged = damage(obj, text, rng)
+                start = time.perf_counter()
+                try:
+                    strict.parse(damaged)
+                    strict_ok = True
+                except OutputParserException:
+                    strict_ok = False
+                middle = time.perf_counter()
+                before = dict(structured.parse_stats().get(model.__name__, {}))
+                try:
+                    chain.invoke({"reply": damaged})
+                    after = structured.parse_stats()[model.__name__]
+                    if after.get("reasked", 0) > before.get("reasked", 0):
+                        outcome = "reasked"
+                    elif after.get("repaired", 0) > before.get("repaired", 0):
+                        outcome = "repaired"
+                    else:
+                        outcome = "clean"
+                except OutputParserException:
+                    outcome = "failed"
+                end = time.perf_counter()
+                results[defect]["strict_ok"] += strict_ok
+                results[defect][outcome] += 1
+                results[defect]["n"] += 1
+                t = timing[defect]
+                t[0] += middle - start
+                t[1] += end - middle
+                t[2] += 1
+
+    header = (f"{'defect':<16}{'n':>5}{'strict ok':>11}{'tol. clean':>12}{'repaired':>10}{'re-asked':>10}"
+              f"{'failed':>8}{'strict us':>11}{'tol. us':>9}")
+    print(header)
+    print("-" * len(header))
+    totals = Counter()
+    for defect, c in results.items():
+        totals.update(c)
+        n = c["n"]
+        strict_s, tolerant_s, runs = timing[defect]
+        print(f"{defect:<16}{n:>5}{c['strict_ok'] / n:>11.0%}{c['clean'] / n:>12.0%}{c['repaired'] / n:>10.0%}"
+              f"{c['reasked'] / n:>10.0%}{c['failed'] / n:>8.0%}{strict_s / runs * 1e6:>11.0f}{tolerant_s / runs * 1e6:>9.0f}")
+    n = totals["n"]
+    print("-" * len(header))
+    print(f"{'all':<16}{n:>5}{totals['strict_ok'] / n:>11.0%}{totals['clean'] / n:>12.0%}{totals['repaired'] / n:>10.0%}"
+          f"{totals['reasked'] / n:>10.0%}{totals['failed'] / n:>8.0%}")
+    print("\n(tolerant timings include the stand-in model call; re-asked replies pay a second one)")
+    print(f"parse_stats: {json.dumps(structured.parse_stats())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Items/sec for catalog onboarding: one-by-one /generate-prompt vs /generate-prompt/bulk.
+
+Serves N product pages from a few local HTTP servers (each port stands in for one
+host, with per-request latency), swaps prompt.py's LLM for a fake with fixed latency,
+and mixes in a few unreachable URLs to show per-item errors. The bulk run streams
+NDJSON; time-to-first-result and items/sec are reported for both.
+
+Usage:
+    python benchmarks/bench_prompt_bulk.py [--products 200] [--hosts 4] [--page-latency 0.05] [--latency 0.3]
+"""
+import os
+import io
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import threading
+import contextlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from fakes import FakeChatModel
+from bench_booking_outbox import _free_port, start_standin
+
+
+def start_catalog_host(page_latency: float) -> int:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(page_latency)
+            body = f"<html><body><h1>Product {self.path}</h1><p>Specs and pricing for {self.path}.</p></body></html>".encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
+
+
+def _closed_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def catalog(n: int, ports, bad_every: int):
+    dead = _closed_port()
+    products = []
+    for i in range(n):
+        port = dead if bad_every and i % bad_every == bad_every - 1 else ports[i % len(ports)]
+        products.append({"product_name": f"SKU-{i}", "product_url": f"http://127.0.0.1:{port}/sku/{i}"})
+    return products
+
+
+async def run(args) -> None:
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    with contextlib.redirect_stdout(io.StringIO()):
+        import prompt
+    fake = FakeChatModel(responder=lambda messages: "You are a friendly AI sales assistant...", latency=args.latency)
+    prompt.llm = fake
+    ports = [start_catalog_host(args.page_latency) for _ in range(args.hosts)]
+
+    # A real server (ASGITransport would buffer the streamed response)
+    port = _free_port()
+    with contextlib.redirect_stdout(io.StringIO()):
+        server = start_standin(prompt.app, port)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+        print(f"products={args.products} hosts={args.hosts} page latency={args.page_latency}s "
+              f"fake LLM latency={args.latency}s bulk concurrency={prompt.PROMPT_BULK_CONCURRENCY} "
+              f"per-host={prompt.scraper.per_host} host delay={prompt.scraper.host_delay}s")
+        print(f"{'mode':<10}{'seconds':>9}{'items/s':>9}{'first':>9}{'ok':>6}{'errors':>8}{'LLM calls':>11}")
+
+        # Separate product names per run so neither hits the other's cache
+        for mode in ("single", "bulk"):
+            products = [{**p, "product_name": f"{mode}-{p['product_name']}"}
+                        for p in catalog(args.products, ports, args.bad_every)]
+            fake.calls = 0
+            ok = errors = 0
+            first = None
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                if mode == "single":
+                    for product in products:
+                        response = await client.post("/generate-prompt", json=product)
+                        first = first or time.perf_counter() - started
+                        ok, errors = (ok + 1, errors) if response.status_code == 200 else (ok, errors + 1)
+                else:
+                    async with client.stream("POST", "/generate-prompt/bulk", json=products) as response:
+                        async for line in response.aiter_lines():
+                            if not line:
+                                continue
+                            first = first or time.perf_counter() - started
+                            record = json.loads(line)
+                            ok, errors = (ok + 1, errors) if record["status"] == "ok" else (ok, errors + 1)
+            elapsed = time.perf_counter() - started
+            print(f"{mode:<10}{elapsed:>9.2f}{args.products / elapsed:>9.1f}{first:>8.2f}s{ok:>6}{errors:>8}{fake.calls:>11}")
+    server.should_exit = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--hosts", type=int, default=4)
+    parser.add_argument("--page-latency", type=float, default=0.05, help="Seconds per page request")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake LLM latency in seconds")
+    parser.add_argument("--bad-every", type=int, default=25, help="Every Nth product points at a dead host (0 = none)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
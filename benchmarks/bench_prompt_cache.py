@@ -0,0 +1,128 @@
+"""
+Latency of POST /generate-prompt with and without the prompt cache.
+
+Serves a product page from a local HTTP server, swaps prompt.py's LLM for a fake with
+fixed latency, then measures:
+
+  uncached   N concurrent create_system_prompt() calls (the old path: N scrapes, N LLM calls)
+  cold       N concurrent identical requests → coalesced into 1 scrape + 1 LLM call
+  warm       N sequential requests served from the cache
+  stale      TTL expired: served stale immediately, refreshed in the background; an
+             unchanged page costs a scrape but no LLM call, a changed page one LLM call
+
+Usage:
+    python benchmarks/bench_prompt_cache.py [--requests 50] [--latency 0.5]
+"""
+import os
+import io
+import sys
+import time
+import asyncio
+import argparse
+import threading
+import contextlib
+import statistics
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from fakes import FakeChatModel
+
+PAGE = {"body": "<html><body><h1>Acme Widget</h1><p>The widget that does everything.</p></body></html>"}
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    hits = 0
+
+    def do_GET(self):
+        PageHandler.hits += 1
+        body = PAGE["body"].encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_page_server() -> str:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/product?utm_source=dialer"
+
+
+def ms(values):
+    values = sorted(values)
+    return (f"p50={statistics.median(values) * 1000:8.1f}ms  "
+            f"p95={values[int(len(values) * 0.95) - 1] * 1000:8.1f}ms")
+
+
+async def run(args) -> None:
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    with contextlib.redirect_stdout(io.StringIO()):
+        import prompt
+    fake = FakeChatModel(responder=lambda messages: "You are a friendly AI sales assistant...", latency=args.latency)
+    prompt.llm = fake
+    url = start_page_server()
+    body = {"product_name": "Acme Widget", "product_url": url}
+
+    transport = httpx.ASGITransport(app=prompt.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://prompt") as client:
+        async def timed_request():
+            started = time.perf_counter()
+            response = await client.post("/generate-prompt", json=body)
+            response.raise_for_status()
+            return time.perf_counter() - started, response.headers["X-Prompt-Cache"]
+
+        async def timed_uncached():
+            started = time.perf_counter()
+            await prompt.create_system_prompt("Acme Widget", url)
+            return time.perf_counter() - started
+
+        def report(label, latencies, scrapes, llm_calls):
+            print(f"{label:<9} {ms(latencies)}  scrapes={scrapes:<4} llm_calls={llm_calls}")
+
+        print(f"requests={args.requests} fake LLM latency={args.latency}s")
+        with contextlib.redirect_stdout(io.StringIO()):
+            latencies = await asyncio.gather(*(timed_uncached() for _ in range(args.requests)))
+        report("uncached", latencies, PageHandler.hits, fake.calls)
+
+        PageHandler.hits, fake.calls = 0, 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = await asyncio.gather(*(timed_request() for _ in range(args.requests)))
+        report("cold", [r[0] for r in results], PageHandler.hits, fake.calls)
+
+        PageHandler.hits, fake.calls = 0, 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = [await timed_request() for _ in range(args.requests)]
+        report("warm", [r[0] for r in results], PageHandler.hits, fake.calls)
+
+        for label, change in (("stale", False), ("changed", True)):
+            PageHandler.hits, fake.calls = 0, 0
+            prompt.PROMPT_CACHE_TTL = 0.0
+            if change:
+                PAGE["body"] = PAGE["body"].replace("everything", "everything, now faster")
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = [await timed_request() for _ in range(args.requests)]
+                await asyncio.gather(*prompt._refresh_tasks.values())
+            statuses = {s: sum(1 for _, x in results if x == s) for s in ("hit", "stale", "miss")}
+            report(label, [r[0] for r in results], PageHandler.hits, fake.calls)
+            print(f"          served: {statuses}")
+
+        print("stats:", (await client.get("/generate-prompt/stats")).json())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake LLM latency in seconds")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Circuit breakers, hedged requests and campaign deadlines under injected faults.
+
+Drives campaign-shaped sequences of external calls (2 government page scrapes,
+6 Tavily searches, 4 Unsplash lookups) against fakes.FaultyService stand-ins patched
+into foundry_server, in two modes:
+
+  direct     the stand-ins are called as the nodes called them before: every hang is
+             waited out to the client timeout, on every campaign
+  resilient  through foundry_server.fetch_govt_page / web_search / get_unsplash_image,
+             i.e. per-dependency circuit breakers, hedged searches and image lookups,
+             and a --deadline per campaign
+
+for each scenario:
+
+  healthy        fast services with a slow tail (--tail share of searches/images take 1 s)
+  flaky_search   30% of searches fail with a connection error
+  search_outage  Tavily hangs until its timeout on every call
+  govt_hang      the government site hangs until its timeout on every call
+
+Campaigns run one after another, so breaker state carries over as it would in the
+server. Timeouts are scaled down (search 2 s, scrape 1.5 s, images 1 s) so a run takes
+about a minute. Each scenario and mode runs in its own interpreter.
+
+Usage:
+    python benchmarks/bench_resilience.py [--campaigns 20] [--deadline 4]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+SCENARIOS = ("healthy", "flaky_search", "search_outage", "govt_hang")
+MODES = ("direct", "resilient")
+SCALED_ENV = {"SEARCH_TIMEOUT": "2.5", "SCRAPE_TIMEOUT": "2", "HEDGE_AFTER": "0.3", "BREAKER_RESET": "5"}
+GOVT_URL = "https://www.registry.gov.example/business/register"
+
+
+def services(scenario, tail):
+    from fakes import FaultyService
+    from scraper import FetchResult
+
+    search = FaultyService(lambda query: [{"url": "https://news.example/a", "content": f"Results for {query}"}],
+                           latency=0.08, slow_rate=tail, slow_latency=1.0, timeout=2.0, seed=1,
+                           error_rate=0.3 if scenario == "flaky_search" else 0.0,
+                           down=scenario == "search_outage")
+    images = FaultyService(lambda params: {"results": [{"urls": {"regular": f"https://images.example/{params['query']}.jpg"}}]},
+                           latency=0.06, slow_rate=tail, slow_latency=1.0, timeout=1.0, seed=2)
+    site = FaultyService(lambda url: FetchResult(url=url, status=200, kind="html", text="Register your company. " * 200),
+                         latency=0.15, timeout=1.5, seed=3, down=scenario == "govt_hang")
+
+    def fetch_sync(url, timeout=None):
+        # The scraper reports failures in the result instead of raising
+        try:
+            return site(url)
+        except Exception as e:
+            return FetchResult(url=url, error=f"{type(e).__name__}: {e}")
+
+    return search, images, site, fetch_sync
+
+
+def measure(args):
+    import io
+    import contextlib
+    import foundry_server as fs
+    from resilience import campaign_deadline, dependency_stats
+
+    search, images, site, fetch_sync = services(args.scenario, args.tail)
+    fs.tavily_tool = search
+    fs._unsplash_search = images
+    fs.scraper = type("StandInScraper", (), {"fetch_sync": staticmethod(fetch_sync)})()
+
+    def direct(i):
+        failed = 0
+        for url in (GOVT_URL, GOVT_URL + "/steps"):
+            failed += not fetch_sync(url).ok
+        for q in range(6):
+            try:
+                search(f"campaign {i} query {q}")
+            except Exception:
+                failed += 1
+        for q in range(4):
+            try:
+                images({"query": f"campaign-{i}-image-{q}"})
+            except Exception:
+                failed += 1
+        return failed
+
+    def resilient(i):
+        failed = 0
+        with campaign_deadline(args.deadline):
+            for url in (GOVT_URL, GOVT_URL + "/steps"):
+                failed += not fs.fetch_govt_page(url).ok
+            for q in range(6):
+                try:
+                    fs.web_search(f"campaign {i} query {q}")
+                except Exception:
+                    failed += 1
+            for q in range(4):
+                failed += "placehold.co" in fs.get_unsplash_image(f"campaign-{i}-image-{q}")
+        return failed
+
+    run = direct if args.mode == "direct" else resilient
+    times, failures = [], []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(args.campaigns):
+            started = time.perf_counter()
+            failures.append(run(i))
+            times.append(time.perf_counter() - started)
+    return {
+        "p50_s": statistics.median(times),
+        "p95_s": statistics.quantiles(times, n=20, method="inclusive")[-1],
+        "max_s": max(times),
+        "total_s": sum(times),
+        "fallbacks_per_campaign": statistics.mean(failures),
+        "service_calls": {"search": search.counters["calls"], "images": images.counters["calls"],
+                          "govt": site.counters["calls"]},
+        "dependencies": dependency_stats() if args.mode == "resilient" else {},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark circuit breakers, hedging and deadlines under faults")
+    parser.add_argument("--campaigns", type=int, default=20)
+    parser.add_argument("--deadline", type=float, default=4.0, help="campaign deadline in resilient mode (seconds)")
+    parser.add_argument("--tail", type=float, default=0.05, help="share of slow searches/image lookups")
+    parser.add_argument("--scenario", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    if args.scenario:
+        print(json.dumps(measure(args)))
+        return
+
+    results = {}
+    for scenario in SCENARIOS:
+        for mode in MODES:
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--scenario", scenario, "--mode", mode,
+                                  "--campaigns", str(args.campaigns), "--deadline", str(args.deadline),
+                                  "--tail", str(args.tail)],
+                                 env=dict(os.environ, **SCALED_ENV), check=True, capture_output=True, text=True)
+            results[(scenario, mode)] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    print(f"{args.campaigns} campaigns per row, 12 external calls each; resilient deadline {args.deadline:g}s\n")
+    header = (f"{'scenario':<15}{'mode':<11}{'p50 s':>7}{'p95 s':>7}{'max s':>7}{'total s':>9}"
+              f"{'fallbacks':>11}{'search':>8}{'images':>8}{'govt':>6}{'hedges':>8}{'opened':>8}")
+    print(header)
+    print("-" * len(header))
+    for (scenario, mode), r in results.items():
+        deps = r["dependencies"].values()
+        hedges = sum(d["hedges"] for d in deps)
+        opened = sum(d["opened"] for d in deps)
+        calls = r["service_calls"]
+        print(f"{scenario:<15}{mode:<11}{r['p50_s']:>7.2f}{r['p95_s']:>7.2f}{r['max_s']:>7.2f}{r['total_s']:>9.1f}"
+              f"{r['fallbacks_per_campaign']:>11.1f}{calls['search']:>8}{calls['images']:>8}{calls['govt']:>6}"
+              f"{hedges if mode == 'resilient' else '-':>8}{opened if mode == 'resilient' else '-':>8}")
+    print("\n(service calls include hedged backups; fallbacks are calls whose result the campaign could not use)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({f"{s}/{m}": r for (s, m), r in results.items()}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Scrape engine vs the previous scraping paths on a local fixture site.
+
+Serves a mixed catalog from several local "hosts" (one port each): normal pages,
+oversized pages, slow pages, PDFs and HTML without a Content-Type. Then scrapes every
+URL concurrently three ways:
+
+  webbase   WebBaseLoader(url).load() in asyncio.to_thread (old prompt.py / portal path)
+  requests  requests.get(url, timeout=5) + BeautifulSoup (old govt-site fallback)
+  engine    scraper.ScrapeEngine.fetch_many (pooled, per-host caps, max bytes, timeouts)
+
+and reports wall time, megabytes read by the client, peak concurrent requests per host
+(seen by the server; timed-out requests stay counted until the server gives up on them),
+failures, and pages that produced text.
+
+Usage:
+    python benchmarks/bench_scraper.py [--urls 200] [--hosts 4] [--latency 0.05] [--slow 6] [--timeout 3]
+"""
+import os
+import io
+import sys
+import time
+import asyncio
+import argparse
+import threading
+import contextlib
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from bs4 import BeautifulSoup
+
+from scraper import ScrapeEngine
+
+PARAGRAPH = "<p>Register your company with the national business registry before trading. </p>\n"
+
+
+class FixtureStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = defaultdict(int)
+        self.peak = defaultdict(int)
+        self.bytes_sent = 0
+        self.requests = 0
+
+    def reset(self):
+        with self.lock:
+            self.active.clear()
+            self.peak.clear()
+            self.bytes_sent = 0
+            self.requests = 0
+
+
+STATS = FixtureStats()
+
+
+def make_handler(latency: float, slow: float, big_mb: int):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, body: bytes, content_type=None, chunk: int = 64 * 1024):
+            self.send_response(200)
+            if content_type:
+                self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                for i in range(0, len(body), chunk):
+                    self.wfile.write(body[i:i + chunk])
+                    with STATS.lock:
+                        STATS.bytes_sent += len(body[i:i + chunk])
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+
+        def do_GET(self):
+            port = self.server.server_address[1]
+            with STATS.lock:
+                STATS.requests += 1
+                STATS.active[port] += 1
+                STATS.peak[port] = max(STATS.peak[port], STATS.active[port])
+            try:
+                time.sleep(latency)
+                kind = self.path.split("/")[1]
+                page = f"<html><head><title>{self.path}</title></head><body><main>{PARAGRAPH * 200}</main></body></html>"
+                if kind == "slow":
+                    time.sleep(slow)
+                    self._send(page.encode(), "text/html; charset=utf-8")
+                elif kind == "big":
+                    self._send(("<html><body>" + PARAGRAPH * (big_mb * 13000) + "</body></html>").encode(), "text/html")
+                elif kind == "pdf":
+                    self._send(b"%PDF-1.7\n" + os.urandom(2 * 1024 * 1024), "application/pdf")
+                elif kind == "noctype":
+                    self._send(page.encode())
+                else:
+                    self._send(page.encode(), "text/html; charset=utf-8")
+            finally:
+                with STATS.lock:
+                    STATS.active[port] -= 1
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_fixture(hosts: int, latency: float, slow: float, big_mb: int):
+    ports = []
+    for _ in range(hosts):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(latency, slow, big_mb))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        ports.append(server.server_address[1])
+    return ports
+
+
+def catalog(n: int, ports):
+    kinds = ["page"] * 16 + ["big", "slow", "pdf", "noctype"]
+    # Every host serves every kind of page
+    return [f"http://127.0.0.1:{ports[i % len(ports)]}/{kinds[(i // len(ports)) % len(kinds)]}/{i}" for i in range(n)]
+
+
+async def scrape_webbase(urls):
+    from langchain_community.document_loaders import WebBaseLoader
+
+    received = 0
+
+    def count(response, *args, **kwargs):
+        nonlocal received
+        received += len(response.content)
+
+    def load(url):
+        loader = WebBaseLoader(url)
+        loader.session.hooks["response"].append(count)
+        return loader.load()
+
+    async def one(url):
+        try:
+            docs = await asyncio.to_thread(load, url)
+            return bool(docs and docs[0].page_content.strip())
+        except Exception:
+            return None
+    return await asyncio.gather(*(one(u) for u in urls)), received
+
+
+async def scrape_requests(urls):
+    session = requests.Session()
+    received = 0
+
+    def one(url):
+        nonlocal received
+        try:
+            response = session.get(url, timeout=5)
+            received += len(response.content)
+            if response.status_code != 200 or "pdf" in response.headers.get("content-type", ""):
+                return False
+            return bool(BeautifulSoup(response.content, "html.parser").get_text(strip=True))
+        except Exception:
+            return None
+    return await asyncio.gather(*(asyncio.to_thread(one, u) for u in urls)), received
+
+
+async def scrape_engine(urls, timeout):
+    engine = ScrapeEngine(timeout=timeout, max_bytes=1024 * 1024)
+    try:
+        results = await engine.fetch_many(urls)
+    finally:
+        await engine.close()
+    outcomes = [None if r.error else bool(r.ok and r.text) for r in results]
+    errors = Counter(f"{r.url.split('/')[3]}: {r.error.split(':')[0]}" for r in results if r.error)
+    sys.stderr.write(f"engine errors: {dict(errors)}\n")
+    return outcomes, sum(r.bytes_read for r in results), sum(r.truncated for r in results)
+
+
+async def run(args):
+    ports = start_fixture(args.hosts, args.latency, args.slow, args.big_mb)
+    urls = catalog(args.urls, ports)
+    print(f"urls={args.urls} hosts={args.hosts} latency={args.latency}s slow={args.slow}s big={args.big_mb}MB "
+          f"(engine: timeout {args.timeout}s, 1MB cap, per-host {ScrapeEngine().per_host})")
+    print(f"{'mode':<10}{'seconds':>9}{'MB read':>9}{'peak/host':>11}{'failed':>8}{'with text':>11}{'truncated':>11}")
+    for mode in args.modes.split(","):
+        STATS.reset()
+        started = time.perf_counter()
+        truncated = "-"
+        with contextlib.redirect_stdout(io.StringIO()):
+            if mode == "webbase":
+                outcomes, received = await scrape_webbase(urls)
+            elif mode == "requests":
+                outcomes, received = await scrape_requests(urls)
+            else:
+                outcomes, received, truncated = await scrape_engine(urls, args.timeout)
+        elapsed = time.perf_counter() - started
+        print(f"{mode:<10}{elapsed:>9.2f}{received / 1e6:>9.1f}{max(STATS.peak.values()):>11}"
+              f"{sum(o is None for o in outcomes):>8}{sum(bool(o) for o in outcomes):>11}{truncated:>11}")
+        await asyncio.sleep(args.slow)  # let abandoned slow requests finish before the next mode
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=200)
+    parser.add_argument("--hosts", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05, help="Per-request server latency")
+    parser.add_argument("--slow", type=float, default=6.0, help="Extra latency of the slow pages")
+    parser.add_argument("--big-mb", type=int, default=8, help="Size of the oversized pages")
+    parser.add_argument("--timeout", type=float, default=3.0, help="Engine timeout")
+    parser.add_argument("--modes", default="webbase,requests,engine")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Per-booking availability lookups vs the cached, batched SlotScheduler.
+
+Runs the Calendly stand-in (benchmarks/calendly_standin.py) with slot enforcement on, then
+books N meetings whose requested times cluster around the same few hours — the "hundreds
+of calls finish together" case:
+
+  naive    every booking queries availability, picks the nearest free slot, then books it;
+           concurrent bookers race for the same slot and retry on 409
+  cached   slot_availability.SlotScheduler: availability prefetched per 7-day window,
+           concurrent requests batched and given distinct slots up front
+
+Usage:
+    python benchmarks/bench_slot_availability.py [--bookings 120] [--concurrency 16] [--latency 0.05]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from calendly_standin import create_app
+from bench_booking_outbox import _free_port, start_standin
+from booking_outbox import PermanentBookingError, post_calendly_booking
+from slot_availability import FreeSlots, SlotScheduler, align_up, fetch_calendly_availability
+
+EVENT_TYPE = "standin/event"
+API_KEY = "standin-key"
+SLOT = timedelta(minutes=30)
+
+
+def preferred_times(n: int, seed: int = 3):
+    rng = random.Random(seed)
+    day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    return [day + timedelta(hours=rng.choice([10, 11, 14]), minutes=rng.choice([0, 30])) for _ in range(n)]
+
+
+async def run_naive(client, base, preferred, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    not_before = align_up(datetime.now() + timedelta(hours=1), SLOT)
+    booked, conflicts = [], 0
+
+    async def book(i, target):
+        nonlocal conflicts
+        async with semaphore:
+            for _ in range(10):
+                # Same 14-day horizon as the cache, in Calendly's 7-day request limit
+                slots = FreeSlots()
+                for week in range(2):
+                    window_start = not_before + timedelta(days=7 * week)
+                    for start, end in await fetch_calendly_availability(
+                            client, base, API_KEY, EVENT_TYPE, window_start, window_start + timedelta(days=7)):
+                        slots.add(start, end)
+                slot = slots.nearest(target, SLOT, SLOT, not_before)
+                if slot is None:
+                    return
+                try:
+                    await post_calendly_booking(client, base, API_KEY, EVENT_TYPE, f"User {i}",
+                                                f"user{i}@example.com", slot.isoformat())
+                except PermanentBookingError:
+                    conflicts += 1  # someone else took it between lookup and booking
+                    continue
+                booked.append((target, slot))
+                return
+
+    await asyncio.gather(*(book(i, t) for i, t in enumerate(preferred)))
+    return booked, conflicts
+
+
+async def run_cached(client, base, preferred, concurrency):
+    async def fetch(event_type, start, end):
+        return await fetch_calendly_availability(client, base, API_KEY, event_type, start, end)
+
+    scheduler = SlotScheduler(fetch)
+    semaphore = asyncio.Semaphore(concurrency)
+    booked, conflicts = [], 0
+
+    async def book(i, target):
+        nonlocal conflicts
+        async with semaphore:
+            slot = await scheduler.assign(EVENT_TYPE, target, f"call-{i}")
+            try:
+                await post_calendly_booking(client, base, API_KEY, EVENT_TYPE, f"User {i}",
+                                            f"user{i}@example.com", slot.isoformat())
+            except PermanentBookingError:
+                conflicts += 1
+                scheduler.release(f"call-{i}")
+                return
+            scheduler.confirm(f"call-{i}")
+            booked.append((target, slot))
+
+    await scheduler.prefetch(EVENT_TYPE)
+    await asyncio.gather(*(book(i, t) for i, t in enumerate(preferred)))
+    return booked, conflicts, scheduler.stats()
+
+
+async def run(args):
+    preferred = preferred_times(args.bookings)
+    print(f"bookings={args.bookings} concurrency={args.concurrency} latency={args.latency}s")
+    print(f"{'mode':<8} {'elapsed':>8} {'avail reqs':>10} {'book reqs':>9} {'409s':>5} {'unique':>7} {'avg shift':>10}")
+    for mode in ("naive", "cached"):
+        standin = create_app(latency=args.latency, enforce_slots=True)
+        port = _free_port()
+        server = start_standin(standin, port)
+        base = f"http://127.0.0.1:{port}"
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(limits=limits, timeout=10.0) as client:
+            started = time.perf_counter()
+            if mode == "naive":
+                booked, conflicts = await run_naive(client, base, preferred, args.concurrency)
+                extra = None
+            else:
+                booked, conflicts, extra = await run_cached(client, base, preferred, args.concurrency)
+            elapsed = time.perf_counter() - started
+        server.should_exit = True
+        stats = standin.state.stats
+        shift = sum(abs((s - t).total_seconds()) for t, s in booked) / max(len(booked), 1) / 60
+        print(f"{mode:<8} {elapsed:>7.2f}s {stats['availability_requests']:>10} {stats['requests']:>9} "
+              f"{stats['conflicts']:>5} {len({s for _, s in booked}):>7} {shift:>8.0f}m")
+        if extra:
+            print(f"         scheduler: batches={extra['batches']} avg_batch_size={extra['avg_batch_size']} "
+                  f"exact={extra['assigned_exact']} moved={extra['assigned_moved']}")
+        await asyncio.sleep(0.2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=120)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.05)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
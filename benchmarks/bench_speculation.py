@@ -0,0 +1,135 @@
+"""
+Speculative jurisdiction discovery: gazetteer hit rate and latency saved.
+
+Part 1 runs gazetteer.guess_country over a set of campaign briefs labelled with the
+country a planner would pick, and reports how often speculation would start and be
+kept (hit), start and be thrown away (wrong guess), or not start (no guess), plus
+the cost of a guess.
+
+Part 2 runs the full campaign graph from replay tapes (see bench_graph.py) with
+JURISDICTION_SPECULATION off and on, and reports total and planner+jurisdiction
+latency, the time saved, and the server's speculation counters. Each setting gets
+its own synthetic tape, since the speculative lookup issues its own requests.
+
+Usage:
+    python benchmarks/bench_speculation.py [--runs 3] [--latency recorded] [--skip-graph]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import gazetteer
+
+# (brief, country the planner would set as location; None when the brief names none)
+BRIEFS: List[Tuple[str, Optional[str]]] = [
+    ("Plan a webinar launch for Acme Health's telemedicine platform, aimed at independent clinic owners in India, going live on 2026-03-15.", "India"),
+    ("Launch campaign for a vegan bakery opening in Toronto next spring.", "Canada"),
+    ("We are a fintech startup in Lagos offering micro-loans to market traders.", "Nigeria"),
+    ("Promote our B2B payroll SaaS to HR managers at mid-size companies in the UK.", "United Kingdom"),
+    ("Webinar for our AI tutoring app targeting parents of high-school students in the US.", "United States"),
+    ("Register and launch a coffee roastery in Melbourne; audience is cafe owners.", "Australia"),
+    ("Promote a solar-panel leasing company to homeowners in Nairobi and Mombasa.", "Kenya"),
+    ("Launch an e-commerce brand for handmade leather goods based in Marrakech.", "Morocco"),
+    ("Announce our logistics platform for SMEs in Dubai and Abu Dhabi.", "United Arab Emirates"),
+    ("Go-to-market plan for a German-engineered e-bike brand launching in Berlin.", "Germany"),
+    ("Kick off a campaign for our edtech startup in Bengaluru aimed at college students.", "India"),
+    ("Whitepaper promotion for cybersecurity consulting, targeting CISOs in Singapore.", "Singapore"),
+    ("Launch a telehealth service for rural clinics in Brazil, starting in Sao Paulo.", "Brazil"),
+    ("Promote a Paris-based fashion rental startup to young professionals.", "France"),
+    ("Open a craft brewery in Cape Town and market it to tourists.", "South Africa"),
+    ("Campaign for a proptech startup in Cairo helping landlords find tenants.", "Egypt"),
+    ("Product launch for a robotics kit in Tokyo schools.", "Japan"),
+    ("Launch a mobile banking app for freelancers, launching in Mexico City first.", "Mexico"),
+    ("Marketing for an organic skincare line made in Dublin.", "Ireland"),
+    ("Our SaaS helps restaurants in Amsterdam manage reservations; plan a launch webinar.", "Netherlands"),
+    # Several countries: no guess (the planner picks one, speculation would be a coin toss)
+    ("Expand our remote-hiring platform from London to New York next quarter.", "United States"),
+    ("Fintech in Lagos and Nairobi targeting market traders in both cities.", "Nigeria"),
+    ("A Canadian founder opening a cafe in Paris.", "France"),
+    # Wrong guess: the place named is not where the business registers
+    ("Sell our Texas-made hot sauce to grocery chains in Canada.", "Canada"),
+    ("Launch a travel agency that sells Bali holiday packages to Australians.", "Australia"),
+    # No place at all
+    ("Launch webinar for our new project-management SaaS aimed at agencies.", None),
+    ("Promote a whitepaper about zero-trust security for CTOs.", None),
+    ("Announce the beta of our note-taking app for students.", None),
+]
+
+
+def gazetteer_report(repeat: int = 200) -> Dict[str, float]:
+    outcomes = {"hit": 0, "wrong_guess": 0, "no_guess": 0}
+    for brief, expected in BRIEFS:
+        guess = gazetteer.guess_country(brief)
+        if guess is None:
+            outcomes["no_guess"] += 1
+        elif guess == expected:
+            outcomes["hit"] += 1
+        else:
+            outcomes["wrong_guess"] += 1
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for brief, _ in BRIEFS:
+            gazetteer.guess_country(brief)
+    us_per_guess = (time.perf_counter() - start) / (repeat * len(BRIEFS)) * 1e6
+    started = outcomes["hit"] + outcomes["wrong_guess"]
+    return {**outcomes, "briefs": len(BRIEFS), "us_per_guess": us_per_guess,
+            "hit_rate": outcomes["hit"] / len(BRIEFS),
+            "kept_when_started": outcomes["hit"] / started if started else 0.0}
+
+
+def graph_run(enabled: bool, runs: int, latency: str, workdir: str) -> dict:
+    env = dict(os.environ, JURISDICTION_SPECULATION="1" if enabled else "0")
+    tape = os.path.join(workdir, f"tape_{int(enabled)}.jsonl")
+    out = os.path.join(workdir, f"result_{int(enabled)}.json")
+    script = os.path.join(BENCH_DIR, "bench_graph.py")
+    subprocess.run([sys.executable, script, "synthesize", "--tape", tape], env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    subprocess.run([sys.executable, script, "--tape", tape, "--runs", str(runs), "--latency", latency, "--json", out],
+                   env=env, check=True, stdout=subprocess.DEVNULL)
+    with open(out) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark speculative jurisdiction discovery")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--latency", default="recorded")
+    parser.add_argument("--skip-graph", action="store_true", help="only the gazetteer part")
+    args = parser.parse_args()
+
+    g = gazetteer_report()
+    print(f"gazetteer over {g['briefs']} briefs: {g['hit']} hits, {g['wrong_guess']} wrong guesses, "
+          f"{g['no_guess']} no guess; hit rate {g['hit_rate']:.0%}, kept when started {g['kept_when_started']:.0%}, "
+          f"{g['us_per_guess']:.1f} us per guess")
+    if args.skip_graph:
+        return
+
+    workdir = tempfile.mkdtemp(prefix="bench_speculation_")
+    results = {enabled: graph_run(enabled, args.runs, args.latency, workdir) for enabled in (False, True)}
+
+    def front(result):  # planner + jurisdiction, the part speculation overlaps
+        return sum(result["nodes"][n]["p50_ms"] for n in ("planner_agent", "jurisdiction_agent"))
+
+    print(f"\ncampaign graph, {args.runs} runs, latency {args.latency}")
+    header = f"{'speculation':<14}{'total p50 ms':>14}{'planner+jurisdiction ms':>25}"
+    print(header)
+    print("-" * len(header))
+    for enabled, result in results.items():
+        print(f"{'on' if enabled else 'off':<14}{result['total_p50_ms']:>14.0f}{front(result):>25.0f}")
+    saved = results[False]["total_p50_ms"] - results[True]["total_p50_ms"]
+    print("-" * len(header))
+    s = results[True]["speculation"]
+    print(f"saved {saved:.0f} ms per campaign (p50); server counters: {s['hits']} hits, {s['misses']} misses, "
+          f"{s['no_guess']} no guess, {s['saved_seconds']:.2f}s saved, {s['wasted_seconds']:.2f}s wasted")
+
+
+if __name__ == "__main__":
+    main()
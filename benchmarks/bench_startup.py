@@ -0,0 +1,78 @@
+"""
+Startup-time benchmark for the PROMETHEO servers.
+
+Each server module is imported in a fresh interpreter (dummy credentials, no network) and we
+measure:
+  - import:        time to `import <module>`
+  - first request: time for the first `GET /` through the ASGI app
+  - warm-up:       time to build every lazy LLM client / tool / chain (`runtime.warm_up`)
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--json startup.json]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["foundry_server", "prompt", "sch"]
+
+DUMMY_ENV = {
+    "GROQ_API_KEY": "bench", "GROQ_API_KEY0": "bench", "GROQ_API_KEY1": "bench",
+    "GROQ_API_KEY2": "bench", "GROQ_API_KEY3": "bench", "TAVILY_API_KEY": "bench",
+    "CALENDLY_API_KEY": "bench", "CALENDLY_EVENT_TYPE_URL": "https://example.invalid/event",
+}
+
+# Runs inside the child interpreter; prints one JSON line with the timings.
+CHILD = r"""
+import io, sys, json, time, contextlib
+t0 = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    mod = __import__(sys.argv[1])
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+client = TestClient(mod.app)
+t2 = time.perf_counter()
+client.get("/")
+t3 = time.perf_counter()
+import runtime
+with contextlib.redirect_stdout(io.StringIO()):
+    runtime.warm_up(mod.LAZY_COMPONENTS)
+t4 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "first_request": t3 - t2, "warm_up": t4 - t3}))
+"""
+
+
+def run_once(module: str) -> dict:
+    env = {**os.environ, **DUMMY_ENV, "PROMETHEO_WARMUP": ""}
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, module],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", dest="json_path", default=None, help="Write results to this file")
+    args = parser.parse_args()
+
+    report = {}
+    print(f"{'module':<16}{'import ms':>12}{'1st req ms':>12}{'warm-up ms':>12}")
+    for module in MODULES:
+        runs = [run_once(module) for _ in range(args.runs)]
+        medians = {k: statistics.median(r[k] for r in runs) * 1000 for k in runs[0]}
+        report[module] = medians
+        print(f"{module:<16}{medians['import']:>12.1f}{medians['first_request']:>12.1f}{medians['warm_up']:>12.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"runs": args.runs, "median_ms": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
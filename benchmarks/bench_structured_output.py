@@ -0,0 +1,170 @@
+"""
+Structured output: format instructions + tolerant parser vs the model's native tool calling.
+
+Runs the real prompts of the seven structured chains (PlannerOutput, JurisdictionInfo,
+ProcedureOutput, ResearchOutput, ValidationOutput, ContentAgentOutput from the foundry,
+MeetingAnalysis from sch) through structured.structured_chain against fakes.FakeChatModel,
+once per method:
+
+  parser            {format_instructions} in the system prompt, free-text JSON reply,
+                    TolerantOutputParser (the default)
+  function_calling  the schema goes as a tool definition (it is sent, and counted, on
+                    every call too), no format instructions in the prompt
+
+The mock backend answers with a schema-valid reply and damages a share of them. Free-text
+replies get the defects of bench_parsing.py (fences, prose, trailing commas, truncation,
+...) at --text-defects; tool calls are syntactically valid JSON by construction, so only
+schema slips (a dropped field, "85%" scores) or a prose answer instead of a tool call occur,
+at --tool-defects. Both rates are inputs, not findings: what is measured is the prompt
+size, what the damaged replies cost (local repair or a re-ask) and what still fails.
+Latency is modelled as --latency per call plus --per-1k seconds per thousand prompt tokens.
+
+Usage:
+    python benchmarks/bench_structured_output.py [--calls 40] [--text-defects 0.2] [--tool-defects 0.05]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+from collections import defaultdict
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from langchain_core.exceptions import OutputParserException
+
+import structured
+from bench_graph import SyntheticLLM
+from bench_parsing import DEFECTS, SCHEMAS
+from fakes import FakeChatModel
+
+METHODS = ("parser", "function_calling")
+MEETING = {"meeting_scheduled": True, "time": "2026-03-16T14:00:00", "name": "Priya Raman",
+           "email": "priya.raman@example.com"}
+CONTEXT = ("The applicant registers the company with the Registrar of Companies, obtains a PAN and TAN, "
+           "and files for GST before invoicing. ")
+
+
+def cases():
+    """(schema name, prompt, parser, undamaged reply) for each structured chain."""
+    import foundry_server
+    import sch
+
+    prompts = {
+        "PlannerOutput": (foundry_server.planner_prompt, foundry_server.planner_parser),
+        "JurisdictionInfo": (foundry_server.jurisdiction_prompt, foundry_server.jurisdiction_parser),
+        "ProcedureOutput": (foundry_server.procedure_prompt, foundry_server.procedure_parser),
+        "ResearchOutput": (foundry_server.research_prompt, foundry_server.research_parser),
+        "ValidationOutput": (foundry_server.validation_prompt, foundry_server.validation_parser),
+        "ContentAgentOutput": (foundry_server.content_prompt, foundry_server.content_parser),
+    }
+    responder = SyntheticLLM()
+    for phrase, schema in SCHEMAS.items():
+        text = responder([SimpleNamespace(content=phrase), SimpleNamespace(content="")])
+        yield (schema, *prompts[schema], text)
+    yield "MeetingAnalysis", sch.log_analysis_prompt, sch.log_analysis_parser, json.dumps(MEETING, indent=2)
+
+
+def tool_slip(obj, rng):
+    """What goes wrong with a tool call: a field left out, a percentage score, or no tool call at all."""
+    kind = rng.choice(("dropped_field", "percent_scores", "prose"))
+    if kind == "prose":
+        return "I've prepared the details you asked for above; let me know if anything needs changing."
+    if kind == "percent_scores":
+        return DEFECTS["percent_scores"](obj, json.dumps(obj), rng)
+    damaged = dict(obj)
+    damaged.pop(rng.choice(sorted(damaged)), None)
+    return json.dumps(damaged)
+
+
+def responder_for(method, text, rate, rng):
+    obj = json.loads(text)
+    text_defects = [d for d in DEFECTS if d != "clean"]
+
+    def respond(messages):
+        if "could not be parsed" in messages[0].content:
+            return text  # the re-ask gets the clean reply
+        if rng.random() >= rate:
+            return text
+        if method == "parser":
+            return DEFECTS[rng.choice(text_defects)](obj, text, rng)
+        return tool_slip(obj, rng)
+
+    return respond
+
+
+def run(method, schema, prompt, parser, text, args):
+    rng = random.Random(f"{args.seed}-{schema}-{method}")
+    rate = args.text_defects if method == "parser" else args.tool_defects
+    llm = FakeChatModel(responder=responder_for(method, text, rate, rng), latency=args.latency,
+                        latency_per_1k_tokens=args.per_1k)
+    chain = structured.structured_chain(prompt, llm, parser, method=method)
+    inputs = {name: CONTEXT * 4 for name in prompt.input_variables}
+    latencies, failures = [], 0
+    for _ in range(args.calls):
+        start = time.perf_counter()
+        try:
+            chain.invoke(inputs)
+        except OutputParserException:
+            failures += 1
+        latencies.append(time.perf_counter() - start)
+    key = schema if method == "parser" else f"{schema}:{method}"
+    stats = structured.parse_stats().get(key, {})
+    return {
+        "prompt_tokens": llm.prompt_tokens / args.calls,
+        "llm_calls": llm.calls / args.calls,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": statistics.quantiles(latencies, n=20)[-1] * 1000,
+        "repaired": stats.get("repaired", 0) / args.calls,
+        "reasked": stats.get("reasked", 0) / args.calls,
+        "failed": failures / args.calls,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parser-based vs native structured output")
+    parser.add_argument("--calls", type=int, default=40, help="chain calls per schema and method")
+    parser.add_argument("--text-defects", type=float, default=0.2, help="share of damaged free-text replies")
+    parser.add_argument("--tool-defects", type=float, default=0.05, help="share of tool calls with a schema slip")
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds per model call")
+    parser.add_argument("--per-1k", type=float, default=0.01, help="extra seconds per 1000 prompt tokens")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    results = defaultdict(dict)
+    for schema, prompt, schema_parser, text in cases():
+        for method in METHODS:
+            results[schema][method] = run(method, schema, prompt, schema_parser, text, args)
+
+    header = (f"{'schema':<20}{'method':<18}{'prompt tok':>11}{'llm calls':>10}{'p50 ms':>8}{'p95 ms':>8}"
+              f"{'repaired':>10}{'re-asked':>10}{'failed':>8}")
+    print(f"{args.calls} calls per row; defect rates: text {args.text_defects:.0%}, tool {args.tool_defects:.0%}\n")
+    print(header)
+    print("-" * len(header))
+    totals = defaultdict(lambda: defaultdict(float))
+    for schema, by_method in results.items():
+        for method, r in by_method.items():
+            for k, v in r.items():
+                totals[method][k] += v / len(results)
+            print(f"{schema:<20}{method:<18}{r['prompt_tokens']:>11.0f}{r['llm_calls']:>10.2f}{r['p50_ms']:>8.1f}"
+                  f"{r['p95_ms']:>8.1f}{r['repaired']:>10.0%}{r['reasked']:>10.0%}{r['failed']:>8.0%}")
+    print("-" * len(header))
+    for method, r in totals.items():
+        print(f"{'mean':<20}{method:<18}{r['prompt_tokens']:>11.0f}{r['llm_calls']:>10.2f}{r['p50_ms']:>8.1f}"
+              f"{r['p95_ms']:>8.1f}{r['repaired']:>10.0%}{r['reasked']:>10.0%}{r['failed']:>8.0%}")
+    saved = 1 - totals["function_calling"]["prompt_tokens"] / totals["parser"]["prompt_tokens"]
+    print(f"\nfunction_calling sends {saved:.0%} fewer prompt tokens per call (tool definition included; "
+          f"~4 chars/token estimate)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Tenant fairness under contention: no budgets vs quotas.UsageLedger admission control.
+
+A heavy tenant starts --heavy campaigns at once (--runaway of them stuck in a validation
+loop that keeps calling the LLM); a moment later a light tenant starts --light campaigns.
+Every campaign is --steps LLM calls in a row through a chat model with the ledger's
+callback attached (fakes.FakeChatModel, --latency per call), and all calls share a
+provider that serves --capacity at once (the four Groq keys), first come first served.
+
+  unlimited  every campaign runs at once and no call is refused (what the servers did)
+  budgets    TENANT_MAX_CONCURRENT campaigns per tenant (the rest queue), and a campaign
+             request budget that stops the runaway loops
+
+Reported per tenant: campaigns finished, p50/max campaign time (including time queued),
+LLM calls made and refused, and tokens.
+
+Usage:
+    python benchmarks/bench_tenant_budgets.py [--heavy 16] [--light 2] [--capacity 4] [--latency 0.1]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from collections import defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import FakeChatModel
+from quotas import Budget, BudgetExceeded, UsageCallback, UsageLedger
+
+PROMPT = "Validate the research for the campaign against the registration procedure. " * 30
+
+
+async def campaign(ledger, llm, capacity, tenant, steps, requests, results, runaway=False):
+    started = time.perf_counter()
+    calls = refused = 0
+    async with ledger.admission(tenant, "campaign", slot=True, requests=requests) as work:
+        remaining = steps * 5 if runaway else steps
+        while remaining:
+            remaining -= 1
+            try:
+                async with capacity:
+                    await llm.ainvoke(PROMPT)
+                calls += 1
+            except BudgetExceeded:
+                refused += 1
+                break  # the node falls back instead of calling again
+    results[tenant].append({"seconds": time.perf_counter() - started, "calls": calls, "refused": refused,
+                            "tokens": work.tokens})
+
+
+async def scenario(args, limited: bool) -> dict:
+    concurrent = args.concurrent if limited else 10_000
+    requests = args.campaign_requests if limited else 0
+    ledger = UsageLedger(window=3600, admission_wait=600, max_queued=1000,
+                         budgets=lambda tenant: Budget(tokens=0, requests=0, concurrent=concurrent))
+    llm = FakeChatModel(responder=lambda messages: "Validated. " * 40, latency=args.latency,
+                        callbacks=[UsageCallback(ledger)])
+    capacity = asyncio.Semaphore(args.capacity)
+    results = defaultdict(list)
+    started = time.perf_counter()
+    heavy = [asyncio.create_task(campaign(ledger, llm, capacity, "heavy", args.steps, requests, results,
+                                          runaway=i < args.runaway))
+             for i in range(args.heavy)]
+    await asyncio.sleep(args.light_delay)
+    light = [asyncio.create_task(campaign(ledger, llm, capacity, "light", args.steps, requests, results))
+             for _ in range(args.light)]
+    await asyncio.gather(*heavy, *light)
+    return {"results": results, "seconds": time.perf_counter() - started}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-tenant admission control under contention")
+    parser.add_argument("--heavy", type=int, default=16, help="campaigns started by the heavy tenant")
+    parser.add_argument("--runaway", type=int, default=2, help="heavy campaigns stuck in a validation loop")
+    parser.add_argument("--light", type=int, default=2, help="campaigns started by the light tenant")
+    parser.add_argument("--light-delay", type=float, default=0.5, help="seconds before the light tenant starts")
+    parser.add_argument("--steps", type=int, default=8, help="LLM calls per campaign")
+    parser.add_argument("--capacity", type=int, default=4, help="calls the provider serves at once")
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per LLM call")
+    parser.add_argument("--concurrent", type=int, default=4, help="TENANT_MAX_CONCURRENT")
+    parser.add_argument("--campaign-requests", type=int, default=12, help="CAMPAIGN_REQUEST_BUDGET")
+    args = parser.parse_args()
+
+    print(f"heavy: {args.heavy} campaigns ({args.runaway} runaway), light: {args.light} campaigns after "
+          f"{args.light_delay:g}s; {args.steps} calls each, provider capacity {args.capacity}, "
+          f"{args.latency:g}s per call\n")
+    header = f"{'mode':<11}{'tenant':<8}{'done':>6}{'p50 s':>8}{'max s':>8}{'calls':>7}{'refused':>9}{'tokens':>9}"
+    print(header)
+    print("-" * len(header))
+    for mode, limited in (("unlimited", False), ("budgets", True)):
+        outcome = asyncio.run(scenario(args, limited))
+        for tenant in ("heavy", "light"):
+            runs = outcome["results"][tenant]
+            seconds = [r["seconds"] for r in runs]
+            print(f"{mode:<11}{tenant:<8}{len(runs):>6}{statistics.median(seconds):>8.2f}{max(seconds):>8.2f}"
+                  f"{sum(r['calls'] for r in runs):>7}{sum(r['refused'] for r in runs):>9}"
+                  f"{sum(r['tokens'] for r in runs):>9}")
+        print(f"{'':<11}all done in {outcome['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
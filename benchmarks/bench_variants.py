@@ -0,0 +1,147 @@
+"""
+Landing-page variants for A/B tests: N /regenerate_landing_page round trips vs one /variants request.
+
+Both go through the real foundry_server endpoints (in process, via TestClient) with the
+regeneration model replaced by fakes.FakeChatModel (--latency per call plus --per-1k
+seconds per thousand prompt tokens):
+
+  sequential  N POST /regenerate_landing_page, one after another, each resending the
+              persona, messaging and assets (what the web editor does)
+  variants    one POST /variants with count=N: concurrent calls (VARIANT_CONCURRENCY),
+              streamed back as they finish, near-duplicates dropped
+
+The mock model answers a share of the calls (--dup-rate) with the same generic page, as
+a model at temperature 0.9 still does with an unchanged prompt; the other answers differ.
+Reported: wall time, request bytes, LLM calls, and how many distinct pages reach the
+client (pages at or above VARIANT_SIMILARITY to an earlier one count as repeats). The
+in-process client buffers the NDJSON stream, so time to the first variant is not measured.
+
+Usage:
+    python benchmarks/bench_variants.py [--count 6] [--latency 1.0] [--dup-rate 0.3]
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import contextlib
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import replay
+from fakes import FakeChatModel
+
+CONTEXT = {
+    "topic": "telemedicine platform for independent clinics",
+    "company_name": "Acme Health",
+    "audience_persona": {"pain_point": "Registration paperwork and licensing delays " * 6,
+                         "motivation": "Open the clinic's online practice within weeks " * 4,
+                         "preferred_channel": "Webinars, email guides"},
+    "core_messaging": {"value_proposition": "Launch a compliant telemedicine practice without the guesswork " * 4,
+                       "tone_of_voice": "Professional, supportive", "call_to_action": "Join the live session"},
+    "generated_assets": {"webinar_banner_url": "https://images.unsplash.com/photo-bench?w=1080",
+                         **{f"post_{i}_image_url": f"https://images.unsplash.com/photo-{i}?w=1080" for i in range(1, 4)}},
+}
+WORDS = ("clinic patients licence launch doctors online consult register compliance weeks minutes trust "
+         "records secure video schedule payments support team growth rural city care").split()
+
+
+def responder(dup_rate, seed):
+    rng = random.Random(seed)
+
+    def page(text):
+        return "\n".join(f'<section id="{sid}"><h2>{sid.title()}</h2><p>{text}</p></section>'
+                         for sid in ("home", "about", "contact"))
+
+    def respond(messages):
+        if rng.random() < dup_rate:
+            return page("Acme Health helps clinics launch telemedicine faster. " * 6)
+        return page(" ".join(rng.choice(WORDS) for _ in range(60)))
+
+    return respond
+
+
+def sequential(client, count):
+    sent, pages = 0, []
+    started = time.perf_counter()
+    for _ in range(count):
+        body = json.dumps(CONTEXT)
+        sent += len(body)
+        response = client.post("/regenerate_landing_page", content=body, headers={"content-type": "application/json"})
+        pages.append(response.json()["html"])
+    return {"seconds": time.perf_counter() - started, "request_bytes": sent, "pages": pages}
+
+
+def variants(client, count):
+    body = json.dumps({**CONTEXT, "count": count, "kinds": ["landing_page"]})
+    pages, duplicates = [], 0
+    started = time.perf_counter()
+    with client.stream("POST", "/variants", content=body, headers={"content-type": "application/json"}) as response:
+        for line in response.iter_lines():
+            record = json.loads(line)
+            if record["status"] == "ok":
+                pages.append(record["html"])
+            duplicates += record["status"] == "duplicate"
+    return {"seconds": time.perf_counter() - started, "request_bytes": len(body),
+            "pages": pages, "dropped": duplicates}
+
+
+def distinct(pages):
+    import foundry_server
+
+    seen = []
+    for html in pages:
+        fingerprint = foundry_server._fingerprint(html)
+        if all(foundry_server._similarity(fingerprint, other) < foundry_server.VARIANT_SIMILARITY for other in seen):
+            seen.append(fingerprint)
+    return len(seen)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the variants API against repeated regeneration")
+    parser.add_argument("--count", type=int, default=6, help="variants wanted")
+    parser.add_argument("--latency", type=float, default=1.0, help="seconds per model call")
+    parser.add_argument("--per-1k", type=float, default=0.05, help="extra seconds per 1000 prompt tokens")
+    parser.add_argument("--dup-rate", type=float, default=0.3, help="share of calls answered with the generic page")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_variants_"))
+
+    def model(name):
+        return FakeChatModel(responder=responder(args.dup_rate, args.seed), latency=args.latency,
+                             latency_per_1k_tokens=args.per_1k)
+
+    # Record mode with a fake backend: every call is made and counted, nothing is replayed
+    replay.install(replay.Tape(os.path.join(os.getcwd(), "calls.jsonl"), "record", backends={"llm": model}))
+    from fastapi.testclient import TestClient
+    import foundry_server
+
+    client = TestClient(foundry_server.app)
+    results = {}
+    for name, run in (("sequential", sequential), ("variants", variants)):
+        before = replay.stats()["calls"].get("llm", 0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = run(client, args.count)
+        result["llm_calls"] = replay.stats()["calls"].get("llm", 0) - before
+        result["distinct"] = distinct(result["pages"])
+        results[name] = result
+
+    print(f"{args.count} variants wanted; model latency {args.latency:g}s + {args.per_1k:g}s/1k tokens, "
+          f"{args.dup_rate:.0%} generic answers; VARIANT_CONCURRENCY={foundry_server.VARIANT_CONCURRENCY}\n")
+    header = f"{'mode':<12}{'seconds':>9}{'req bytes':>11}{'llm calls':>11}{'pages':>7}{'distinct':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(f"{name:<12}{r['seconds']:>9.2f}{r['request_bytes']:>11}{r['llm_calls']:>11}"
+              f"{len(r['pages']):>7}{r['distinct']:>10}")
+    print(f"\n/variants dropped {results['variants']['dropped']} near-duplicates before sending them")
+
+
+if __name__ == "__main__":
+    main()
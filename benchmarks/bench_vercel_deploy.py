@@ -0,0 +1,163 @@
+"""
+Vercel deployments: the old blocking inline-HTML call vs vercel_deploy.VercelDeployer.
+
+Starts the Vercel stand-in (benchmarks/vercel_standin.py) on a free localhost port and
+runs, for each client:
+
+  redeploy  the same landing page deployed --redeploys times in a row (edit, deploy, no
+            change, deploy again): bytes sent and time
+  burst     --burst deploys of the same project and page at once (double clicks, two
+            tabs): deployments created, time, and the longest event-loop stall while
+            they run (the old handler called `requests` from inside the async endpoint)
+
+  legacy    what /deploy_to_vercel did: requests.post of the full HTML in the JSON body
+  async     VercelDeployer on a pooled httpx.AsyncClient: files by SHA, coalesced deploys
+
+and finally follows one deployment to READY with `watch()`.
+
+Usage:
+    python benchmarks/bench_vercel_deploy.py [--redeploys 10] [--burst 8] [--page-kb 40]
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import threading
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import httpx
+import requests
+import uvicorn
+
+from vercel_standin import create_app
+from vercel_deploy import VercelDeployer
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_standin(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def legacy_deploy(session: requests.Session, base: str, project: str, html: str) -> dict:
+    response = session.post(f"{base}/v13/deployments", headers={"Authorization": "Bearer standin"},
+                            json={"name": project, "files": [{"file": "index.html", "data": html}],
+                                  "projectSettings": {"framework": None}}, timeout=30)
+    return response.json()
+
+
+async def max_stall(work) -> tuple:
+    """(result of `work`, longest gap between 5 ms ticks of the event loop while it ran)."""
+    worst = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal worst
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(0.005)
+            now = time.perf_counter()
+            worst = max(worst, now - last - 0.005)
+            last = now
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0)  # let the ticker start before `work` runs
+    try:
+        result = await work
+    finally:
+        done.set()
+        await tick
+    return result, worst
+
+
+async def run(args, base: str, standin) -> dict:
+    html = "<!doctype html><html><body>" + "<p>Acme Health launches telemedicine.</p>" * (args.page_kb * 24) + "</body></html>"
+    stats = standin.state.stats
+    session = requests.Session()
+    results = {}
+
+    async def measure(name, work):
+        before = dict(stats)
+        started = time.perf_counter()
+        _, stall = await max_stall(work)
+        results[name] = {"seconds": time.perf_counter() - started, "stall_ms": stall * 1000,
+                         **{k: stats[k] - before[k] for k in ("bytes_received", "deployments", "uploads")}}
+
+    async def legacy_redeploys():
+        for _ in range(args.redeploys):
+            legacy_deploy(session, base, "bench-legacy", html)
+
+    async def legacy_burst():
+        # The old handler blocked the loop, so concurrent requests ran one after another
+        await asyncio.gather(*(asyncio.sleep(0, legacy_deploy(session, base, "bench-legacy-burst", html))
+                               for _ in range(args.burst)))
+
+    limits = httpx.Limits(max_connections=20, max_keepalive_connections=20)
+    async with httpx.AsyncClient(limits=limits) as client:
+        deployer = VercelDeployer("standin", lambda: client, api_base=base)
+
+        async def async_redeploys():
+            for _ in range(args.redeploys):
+                await deployer.deploy("bench-async", {"index.html": html})
+
+        async def async_burst():
+            await asyncio.gather(*(deployer.deploy("bench-async-burst", {"index.html": html.replace("Acme", "Acme2")})
+                                   for _ in range(args.burst)))
+
+        await measure("legacy redeploy", legacy_redeploys())
+        await measure("async redeploy", async_redeploys())
+        await measure("legacy burst", legacy_burst())
+        await measure("async burst", async_burst())
+
+        created = await deployer.deploy("bench-watch", {"index.html": html + "<!-- v2 -->"})
+        started = time.perf_counter()
+        states = [status["state"] async for status in deployer.watch(created["id"], interval=0.25)]
+        results["watch"] = {"states": states, "seconds": time.perf_counter() - started}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the async Vercel deployment client")
+    parser.add_argument("--redeploys", type=int, default=10)
+    parser.add_argument("--burst", type=int, default=8)
+    parser.add_argument("--page-kb", type=int, default=40, help="landing page size (KB)")
+    parser.add_argument("--latency", type=float, default=0.1, help="stand-in seconds per request")
+    parser.add_argument("--build-seconds", type=float, default=1.5)
+    args = parser.parse_args()
+
+    standin = create_app(latency=args.latency, build_seconds=args.build_seconds)
+    port = _free_port()
+    server = start_standin(standin, port)
+    try:
+        results = asyncio.run(run(args, f"http://127.0.0.1:{port}", standin))
+    finally:
+        server.should_exit = True
+
+    print(f"{args.page_kb} KB page, {args.latency:g}s per API request, {args.redeploys} redeploys, burst of {args.burst}\n")
+    header = f"{'scenario':<18}{'seconds':>9}{'KB sent':>9}{'deployments':>13}{'uploads':>9}{'max stall ms':>14}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        if name == "watch":
+            continue
+        print(f"{name:<18}{r['seconds']:>9.2f}{r['bytes_received'] / 1024:>9.0f}{r['deployments']:>13}"
+              f"{r['uploads']:>9}{r['stall_ms']:>14.0f}")
+    watch = results["watch"]
+    print(f"\nwatch(): {' -> '.join(watch['states'])} in {watch['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Load test for the campaign WebSocket, with /chat and /infer_plan traffic alongside.
+
+For each load level, opens N `/ws_stream_campaign` sessions (each sends a StreamRequest
+and reads until `done`), starting them evenly over --ramp seconds, while firing /chat
+and /infer_plan requests at a fixed rate (open loop) until the last session ends. It records:
+
+  ws connect            time to complete the WebSocket handshake
+  time to first step    request sent -> first `step` event
+  inter-step            gap between consecutive events of one session
+  session total         request sent -> `done`
+  message size          bytes per WebSocket message
+  chat / infer_plan     HTTP latency (failed answers are counted as errors)
+
+and prints p50/p90/p95/p99/max tables per level plus a JSON report (--json).
+
+By default the server is started here, in its own process: foundry_server under uvicorn
+with LLM, search and HTTP calls replayed from a tape (replay.py) at the configured
+latency, so no credentials or network are needed. Without --tape a synthetic tape is
+made with bench_graph.py. Use --url to load-test a server you started yourself.
+
+Usage:
+    python benchmarks/bench_ws_load.py [--sessions 5 20 50] [--ramp 5] [--chat-rps 2] [--plan-rps 1]
+                                       [--latency recorded*0.2] [--workers 1] [--json report.json]
+    python benchmarks/bench_ws_load.py --url http://127.0.0.1:8000 --sessions 10
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from typing import Any, Dict, List
+
+import httpx
+import websockets
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_graph import CHAT_REQUEST, DEFAULT_PROMPT, OPS_ENV
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"n": 0}
+    ordered = sorted(values)
+    summary = {"n": len(ordered)}
+    summary.update({f"p{p}": percentile(ordered, p) for p in PERCENTILES})
+    summary["max"] = ordered[-1]
+    return summary
+
+
+# --- Server under test ---
+
+def start_server(tape: str, latency: str, workers: int, workdir: str) -> (subprocess.Popen, str):
+    port = _free_port()
+    env = dict(os.environ, PROMETHEO_TAPE="replay", PROMETHEO_TAPE_PATH=tape, PROMETHEO_TAPE_LATENCY=latency,
+               PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    for key, value in OPS_ENV.items():
+        env.setdefault(key, value)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "foundry_server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited: {process.stderr.read().decode()[-2000:]}")
+        try:
+            if httpx.get(base + "/", timeout=1).status_code == 200:
+                return process, base
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("server did not start within 60s")
+
+
+# --- Load ---
+
+async def ws_session(ws_url: str, prompt: str, delay: float, timeout: float) -> Dict[str, Any]:
+    await asyncio.sleep(delay)
+    session: Dict[str, Any] = {"steps": 0, "gaps_ms": [], "sizes": [], "error": None}
+    started = time.perf_counter()
+    try:
+        async with websockets.connect(ws_url, max_size=None, open_timeout=timeout) as ws:
+            session["connect_ms"] = (time.perf_counter() - started) * 1000
+            sent = last = time.perf_counter()
+            await ws.send(json.dumps({"initial_prompt": prompt}))
+            while True:
+                message = await asyncio.wait_for(ws.recv(), timeout)
+                now = time.perf_counter()
+                session["sizes"].append(len(message.encode("utf-8") if isinstance(message, str) else message))
+                event = json.loads(message)
+                if event["event"] == "step":
+                    if session["steps"] == 0:
+                        session["first_step_ms"] = (now - sent) * 1000
+                    else:
+                        session["gaps_ms"].append((now - last) * 1000)
+                    session["steps"] += 1
+                    last = now
+                elif event["event"] == "error":
+                    session["error"] = f"server error: {str(event.get('data'))[:120]}"
+                    break
+                else:
+                    session["total_ms"] = (now - sent) * 1000
+                    break
+    except asyncio.TimeoutError:
+        session["error"] = f"no message within {timeout}s"
+    except Exception as e:
+        session["error"] = f"{type(e).__name__}: {str(e)[:120]}"
+    return session
+
+
+async def http_load(client: httpx.AsyncClient, path: str, payload: Dict[str, Any], rps: float,
+                    stop: asyncio.Event) -> Dict[str, Any]:
+    """Open-loop requests at `rps` until `stop` is set; latency per request."""
+    latencies: List[float] = []
+    errors: List[str] = []
+
+    async def one():
+        started = time.perf_counter()
+        try:
+            response = await client.post(path, json=payload)
+            ok = response.status_code == 200 and response.json().get("success", True)
+            if not ok:
+                errors.append(f"{response.status_code}: {response.text[:120]}")
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {str(e)[:120]}")
+        else:
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    tasks = []
+    if rps > 0:
+        interval = 1.0 / rps
+        next_at = time.perf_counter()
+        while not stop.is_set():
+            tasks.append(asyncio.create_task(one()))
+            next_at += interval
+            try:
+                await asyncio.wait_for(stop.wait(), max(0.0, next_at - time.perf_counter()))
+            except asyncio.TimeoutError:
+                pass
+    await asyncio.gather(*tasks)
+    return {"latencies": latencies, "errors": errors}
+
+
+async def run_level(base: str, sessions: int, args) -> Dict[str, Any]:
+    ws_url = base.replace("http", "ws", 1) + "/ws_stream_campaign"
+    stop = asyncio.Event()
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=base, timeout=args.timeout,
+                                 limits=httpx.Limits(max_connections=None, max_keepalive_connections=50)) as client:
+        side = [
+            asyncio.create_task(http_load(client, "/chat", CHAT_REQUEST, args.chat_rps, stop)),
+            asyncio.create_task(http_load(client, "/infer_plan", {"initial_prompt": args.prompt}, args.plan_rps, stop)),
+        ]
+        results = await asyncio.gather(*(
+            ws_session(ws_url, args.prompt, i * args.ramp / sessions, args.timeout) for i in range(sessions)
+        ))
+        stop.set()
+        chat, plan = await asyncio.gather(*side)
+    wall = time.perf_counter() - started
+
+    ok = [r for r in results if not r["error"]]
+    return {
+        "sessions": sessions,
+        "ramp_s": args.ramp,
+        "wall_s": wall,
+        "completed": len(ok),
+        "errors": [r["error"] for r in results if r["error"]],
+        "sessions_per_s": len(ok) / wall if wall else 0.0,
+        "steps_per_session": (sum(r["steps"] for r in ok) / len(ok)) if ok else 0.0,
+        "metrics": {
+            "ws connect ms": summarize([r["connect_ms"] for r in results if "connect_ms" in r]),
+            "time to first step ms": summarize([r["first_step_ms"] for r in ok if "first_step_ms" in r]),
+            "inter-step ms": summarize([g for r in ok for g in r["gaps_ms"]]),
+            "session total ms": summarize([r["total_ms"] for r in ok]),
+            "message size KB": summarize([s / 1024 for r in results for s in r["sizes"]]),
+            "chat ms": summarize(chat["latencies"]),
+            "infer_plan ms": summarize(plan["latencies"]),
+        },
+        "http_errors": {"chat": chat["errors"][:10], "infer_plan": plan["errors"][:10],
+                        "chat_count": len(chat["errors"]), "infer_plan_count": len(plan["errors"])},
+    }
+
+
+def print_level(level: Dict[str, Any]) -> None:
+    print(f"\n== {level['sessions']} sessions over {level['ramp_s']:g}s ramp: {level['completed']} completed, "
+          f"{len(level['errors'])} failed, wall {level['wall_s']:.1f}s, {level['sessions_per_s']:.2f} sessions/s, "
+          f"{level['steps_per_session']:.1f} steps/session ==")
+    header = f"{'metric':<24}{'n':>6}" + "".join(f"{'p' + str(p):>10}" for p in PERCENTILES) + f"{'max':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, s in level["metrics"].items():
+        if not s["n"]:
+            print(f"{name:<24}{0:>6}")
+            continue
+        print(f"{name:<24}{s['n']:>6}" + "".join(f"{s['p' + str(p)]:>10.1f}" for p in PERCENTILES) + f"{s['max']:>10.1f}")
+    errors = level["errors"] + level["http_errors"]["chat"] + level["http_errors"]["infer_plan"]
+    if errors:
+        counts = {e: errors.count(e) for e in dict.fromkeys(errors)}
+        print("errors: " + "; ".join(f"{n}x {e}" for e, n in list(counts.items())[:5]))
+
+
+async def run(args, base: str) -> List[Dict[str, Any]]:
+    levels = []
+    for sessions in args.sessions:
+        level = await run_level(base, sessions, args)
+        print_level(level)
+        levels.append(level)
+    return levels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /ws_stream_campaign with /chat and /infer_plan alongside")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[5, 20, 50], help="concurrent sessions per level")
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds over which each level's sessions start")
+    parser.add_argument("--chat-rps", type=float, default=2.0)
+    parser.add_argument("--plan-rps", type=float, default=1.0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="max seconds to wait for any single message")
+    parser.add_argument("--prompt", default=DEFAULT_PROMPT)
+    parser.add_argument("--url", help="base URL of a running server (default: start one with replayed backends)")
+    parser.add_argument("--tape", help="tape for the started server (default: synthesize one)")
+    parser.add_argument("--latency", default="recorded*0.2", help="replay latency for the started server (see replay.py)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the started server")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    process = None
+    base = args.url.rstrip("/") if args.url else None
+    if base is None:
+        workdir = tempfile.mkdtemp(prefix="bench_ws_load_")
+        tape = os.path.abspath(args.tape) if args.tape else os.path.join(workdir, "campaign_demo.jsonl")
+        if not args.tape:
+            subprocess.run([sys.executable, os.path.join(BENCH_DIR, "bench_graph.py"), "synthesize", "--tape", tape,
+                            "--prompt", args.prompt], check=True)
+        process, base = start_server(tape, args.latency, args.workers, workdir)
+        print(f"server: {base} (foundry_server, {args.workers} worker(s), replay latency {args.latency})")
+    try:
+        levels = asyncio.run(run(args, base))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    if args.json:
+        config = {k: v for k, v in vars(args).items() if k != "json"}
+        with open(args.json, "w") as f:
+            json.dump({"config": config, "levels": levels}, f, indent=2)
+        print(f"\nreport written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
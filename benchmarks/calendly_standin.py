@@ -0,0 +1,102 @@
+"""
+Local Calendly stand-in with injectable latency and failures.
+
+    POST /scheduled_events             books a slot (or fails, see below)
+    GET  /event_type_available_times   free 30-minute slots (weekdays 9-17) minus booked ones
+    GET  /stats                        requests seen, bookings made, failures injected
+
+Failure injection (constructor args or CLI flags):
+    latency       seconds added to every request
+    failure_rate  share of requests answered with 503
+    timeout_rate  share of requests that hang for `hang_seconds` (client timeouts)
+    enforce_slots answer 409 when a slot is booked twice (off by default so any time can be booked)
+
+Run standalone:
+    python benchmarks/calendly_standin.py --port 8950 --latency 0.2 --failure-rate 0.3
+"""
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+from typing import Any, Dict, Set
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from starlette.requests import ClientDisconnect
+
+
+def create_app(latency: float = 0.1, failure_rate: float = 0.0, timeout_rate: float = 0.0,
+               hang_seconds: float = 30.0, seed: int = 7, enforce_slots: bool = False) -> FastAPI:
+    rng = random.Random(seed)
+    app = FastAPI(title="Calendly stand-in")
+    app.state.stats = {
+        "requests": 0, "bookings": 0, "failures": 0, "hangs": 0, "duplicates": 0,
+        "availability_requests": 0, "conflicts": 0,
+    }
+    app.state.bookings: Dict[str, Dict[str, Any]] = {}
+    app.state.taken: Set[str] = set()
+
+    @app.get("/event_type_available_times")
+    async def available_times(event_type: str, start_time: str, end_time: str):
+        app.state.stats["availability_requests"] += 1
+        await asyncio.sleep(latency)
+        start, end = datetime.fromisoformat(start_time), datetime.fromisoformat(end_time)
+        slot = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        collection = []
+        while slot < end:
+            if slot >= start and slot.weekday() < 5 and 9 <= slot.hour < 17 and slot.isoformat() not in app.state.taken:
+                collection.append({"status": "available", "start_time": slot.isoformat(), "invitees_remaining": 1})
+            slot += timedelta(minutes=30)
+        return {"collection": collection}
+
+    @app.post("/scheduled_events")
+    async def scheduled_events(request: Request):
+        stats = app.state.stats
+        stats["requests"] += 1
+        await asyncio.sleep(latency)
+        roll = rng.random()
+        if roll < timeout_rate:
+            stats["hangs"] += 1
+            await asyncio.sleep(hang_seconds)
+        elif roll < timeout_rate + failure_rate:
+            stats["failures"] += 1
+            return JSONResponse({"title": "Service Unavailable"}, status_code=503)
+
+        try:
+            payload = await request.json()
+        except ClientDisconnect:  # caller gave up (timeout or worker restart)
+            return Response(status_code=499)
+        invitee = payload.get("invitee", {})
+        if enforce_slots and payload.get("start_time") in app.state.taken:
+            stats["conflicts"] += 1
+            return JSONResponse({"title": "Slot already booked"}, status_code=409)
+        app.state.taken.add(payload.get("start_time"))
+        key = f"{invitee.get('email')}|{payload.get('start_time')}"
+        if key in app.state.bookings:
+            stats["duplicates"] += 1
+        stats["bookings"] += 1
+        booking = {
+            "uri": f"https://calendly.standin/scheduled_events/{stats['bookings']}",
+            "name": f"Meeting with {invitee.get('name')}",
+            "start_time": payload.get("start_time"),
+            "end_time": payload.get("end_time"),
+        }
+        app.state.bookings[key] = booking
+        return {"resource": booking}
+
+    @app.get("/stats")
+    async def get_stats():
+        return app.state.stats
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Calendly stand-in")
+    parser.add_argument("--port", type=int, default=8950)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency, args.failure_rate, args.timeout_rate), host="127.0.0.1", port=args.port)
@@ -0,0 +1,122 @@
+"""
+Offline stand-ins shared by the benchmarks.
+
+`FakeChatModel` is a chat model with configurable latency whose reply is computed from
+the prompt, so real prompt | llm | parser chains can be exercised without Groq. Tools
+bound with `bind_tools` (what `with_structured_output` uses) turn a JSON-object reply
+into a tool call; any other reply comes back as plain text, as when a model answers
+instead of calling the tool.
+
+`FaultyService` stands in for the other external services, with injected slowness,
+errors and outages.
+"""
+import json
+import time
+import random
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+
+def approx_tokens(text: str) -> int:
+    """Rough prompt-token count (about four characters per token for English and JSON)."""
+    return max(1, len(text) // 4)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that sleeps `latency` seconds (plus `latency_per_1k_tokens` per thousand
+    prompt tokens) and answers with `responder(messages)`.
+    """
+
+    responder: Callable[[List[BaseMessage]], str]
+    latency: float = 0.05
+    latency_per_1k_tokens: float = 0.0
+    calls: int = 0
+    prompt_tokens: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-bench"
+
+    def bind_tools(self, tools: List[Any], *, tool_choice: Any = None, **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], tool_choice=tool_choice, **kwargs)
+
+    def _delay(self, messages: List[BaseMessage], kwargs: Dict[str, Any]) -> float:
+        # Tool definitions are sent with every request and count as prompt tokens too
+        sent = "".join(str(m.content) for m in messages) + json.dumps(kwargs.get("tools") or "")
+        tokens = approx_tokens(sent)
+        self.prompt_tokens += tokens
+        return self.latency + tokens / 1000 * self.latency_per_1k_tokens
+
+    def _result(self, messages: List[BaseMessage], kwargs: Dict[str, Any]) -> ChatResult:
+        self.calls += 1
+        reply = self.responder(messages)
+        message = AIMessage(content=reply)
+        if kwargs.get("tools"):
+            try:
+                args = json.loads(reply)
+            except ValueError:
+                args = None
+            if isinstance(args, dict):
+                name = kwargs["tools"][0]["function"]["name"]
+                message = AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{self.calls}"}])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self._delay(messages, kwargs))
+        return self._result(messages, kwargs)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self._delay(messages, kwargs))
+        return self._result(messages, kwargs)
+
+
+class FaultyService:
+    """
+    Fault-injecting stand-in for an external service (search API, image API, a website).
+
+    Each call sleeps `latency` seconds (`slow_latency` for a `slow_rate` share of calls),
+    raises ConnectionError for an `error_rate` share, and while `down` is set hangs until
+    `timeout` (the client's own timeout) and raises TimeoutError. The answer is
+    `respond(*args, **kwargs)`. `invoke` is an alias, so it can stand in for a LangChain tool.
+    """
+
+    def __init__(self, respond: Callable[..., Any], latency: float = 0.05, slow_rate: float = 0.0,
+                 slow_latency: float = 1.0, error_rate: float = 0.0, timeout: float = 2.0,
+                 down: bool = False, seed: int = 0):
+        self.respond = respond
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.error_rate = error_rate
+        self.timeout = timeout
+        self.down = down
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {"calls": 0, "errors": 0, "timeouts": 0}
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            self.counters["calls"] += 1
+            roll, slow = self._rng.random(), self._rng.random() < self.slow_rate
+        if self.down:
+            time.sleep(self.timeout)
+            with self._lock:
+                self.counters["timeouts"] += 1
+            raise TimeoutError(f"no answer within {self.timeout:.1f}s")
+        time.sleep(self.slow_latency if slow else self.latency)
+        if roll < self.error_rate:
+            with self._lock:
+                self.counters["errors"] += 1
+            raise ConnectionError("connection reset by peer")
+        return self.respond(*args, **kwargs)
+
+    invoke = __call__
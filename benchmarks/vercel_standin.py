@@ -0,0 +1,89 @@
+"""
+Local stand-in for the parts of the Vercel API the foundry uses.
+
+    POST /v2/files                 stores a file under its SHA-1 (x-vercel-digest header)
+    POST /v13/deployments          creates a deployment; files are given inline ("data") or
+                                   by "sha", and unknown SHAs fail with missing_files
+    GET  /v13/deployments/{id}     QUEUED, then BUILDING, then READY after `build_seconds`
+    GET  /stats                    requests, uploads, bytes received, deployments, polls
+
+Run standalone (then point the server at it with VERCEL_API_BASE=http://127.0.0.1:8960):
+    python benchmarks/vercel_standin.py --port 8960 --latency 0.05 --build-seconds 3
+"""
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+from typing import Any, Dict
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def create_app(latency: float = 0.05, build_seconds: float = 2.0) -> FastAPI:
+    app = FastAPI(title="Vercel stand-in")
+    app.state.stats = {"requests": 0, "bytes_received": 0, "uploads": 0, "deployments": 0,
+                       "missing_files": 0, "polls": 0}
+    app.state.files: Dict[str, bytes] = {}
+    app.state.deployments: Dict[str, Dict[str, Any]] = {}
+
+    async def received(request: Request) -> bytes:
+        body = await request.body()
+        app.state.stats["requests"] += 1
+        app.state.stats["bytes_received"] += len(body)
+        await asyncio.sleep(latency)
+        return body
+
+    @app.post("/v2/files")
+    async def upload_file(request: Request):
+        body = await received(request)
+        digest = request.headers.get("x-vercel-digest", "")
+        if hashlib.sha1(body).hexdigest() != digest:
+            return JSONResponse({"error": {"code": "invalid_digest", "message": "Digest does not match"}},
+                                status_code=400)
+        app.state.stats["uploads"] += 1
+        app.state.files[digest] = body
+        return {"urls": []}
+
+    @app.post("/v13/deployments")
+    async def create_deployment(request: Request):
+        payload = json.loads(await received(request))
+        missing = [f["sha"] for f in payload.get("files", []) if "data" not in f and f.get("sha") not in app.state.files]
+        if missing:
+            app.state.stats["missing_files"] += 1
+            return JSONResponse({"error": {"code": "missing_files", "message": "Missing files", "missing": missing}},
+                                status_code=400)
+        app.state.stats["deployments"] += 1
+        deployment_id = f"dpl_{app.state.stats['deployments']}"
+        deployment = {"id": deployment_id, "name": payload.get("name"), "created": time.monotonic(),
+                      "url": f"{payload.get('name')}-{deployment_id}.vercel.standin"}
+        app.state.deployments[deployment_id] = deployment
+        return JSONResponse({"id": deployment_id, "name": deployment["name"], "url": deployment["url"],
+                             "readyState": "QUEUED"}, status_code=200)
+
+    @app.get("/v13/deployments/{deployment_id}")
+    async def get_deployment(deployment_id: str):
+        app.state.stats["polls"] += 1
+        deployment = app.state.deployments.get(deployment_id)
+        if deployment is None:
+            return JSONResponse({"error": {"code": "not_found", "message": "Deployment not found"}}, status_code=404)
+        age = time.monotonic() - deployment["created"]
+        state = "QUEUED" if age < build_seconds * 0.2 else "BUILDING" if age < build_seconds else "READY"
+        return {"id": deployment_id, "name": deployment["name"], "url": deployment["url"], "readyState": state}
+
+    @app.get("/stats")
+    async def get_stats():
+        return app.state.stats
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Vercel API stand-in")
+    parser.add_argument("--port", type=int, default=8960)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--build-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency, args.build_seconds), host="127.0.0.1", port=args.port)
@@ -0,0 +1,151 @@
+"""
+Content-addressed store for large text in campaign state.
+
+Big `CampaignState` fields (the raw government scrape, landing page HTML, BRD and
+strategy markdown) are put here once and carried through the graph as a `BlobRef`
+(sha256 + size), so LangGraph's per-step state copies/validation and the WebSocket
+serialization handle a few dozen bytes instead of the full text. Nodes that need
+the text call `text_of(...)`, which resolves the reference on demand.
+
+Blobs live in memory up to BLOB_MEMORY_MB; past that the least recently used are
+spilled to files under BLOB_SPILL_DIR and read back from disk when asked for. Spilled
+files beyond BLOB_DISK_MB are deleted oldest first, so a reference is only guaranteed
+for about as long as a campaign takes, not forever. BLOB_STORE=0 keeps the fields
+inline (plain strings) as before.
+"""
+import os
+import re
+import sys
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional, Union
+
+from pydantic import BaseModel
+
+BLOB_STORE_ENABLED = os.getenv("BLOB_STORE", "1") == "1"
+BLOB_MEMORY_MB = float(os.getenv("BLOB_MEMORY_MB", "64"))
+BLOB_DISK_MB = float(os.getenv("BLOB_DISK_MB", "1024"))
+BLOB_SPILL_DIR = os.getenv("BLOB_SPILL_DIR") or os.path.join(tempfile.gettempdir(), "prometheo_blobs")
+_DIGEST_RE = re.compile(r"[0-9a-f]{64}")
+
+
+class BlobMissing(KeyError):
+    """The blob was never stored here, or was evicted from disk."""
+
+
+class BlobRef(BaseModel):
+    """Reference to a text blob; this is what graph state and WebSocket steps carry."""
+    blob: str  # sha256 hex digest of the UTF-8 text
+    size: int  # characters
+
+    def text(self) -> str:
+        return blob_store.get(self.blob)
+
+
+class BlobStore:
+    """Thread-safe LRU of text blobs keyed by digest, spilling to disk past `max_memory_bytes`."""
+
+    def __init__(self, max_memory_bytes: int, spill_dir: str, max_disk_bytes: int):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.spill_dir = spill_dir
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"puts": 0, "dedup_hits": 0, "memory_reads": 0, "disk_reads": 0, "spilled": 0, "evicted": 0}
+
+    def put(self, text: str) -> BlobRef:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            self.counters["puts"] += 1
+            if digest in self._memory:
+                self.counters["dedup_hits"] += 1
+                self._memory.move_to_end(digest)
+            else:
+                self._memory[digest] = text
+                self._memory_bytes += sys.getsizeof(text)
+                self._spill_over_budget()
+        return BlobRef(blob=digest, size=len(text))
+
+    def get(self, digest: str) -> str:
+        if not _DIGEST_RE.fullmatch(digest):  # digests come from URLs too; never build other paths
+            raise BlobMissing(digest)
+        with self._lock:
+            text = self._memory.get(digest)
+            if text is not None:
+                self._memory.move_to_end(digest)
+                self.counters["memory_reads"] += 1
+                return text
+            self.counters["disk_reads"] += 1
+        try:
+            with open(self._path(digest), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise BlobMissing(digest) from None
+
+    def __contains__(self, digest: str) -> bool:
+        with self._lock:
+            if digest in self._memory:
+                return True
+        return os.path.exists(self._path(digest))
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.spill_dir, digest)
+
+    def _spill_over_budget(self) -> None:
+        # Called with the lock held. The newest blob always stays in memory.
+        spilled = False
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            digest, text = self._memory.popitem(last=False)
+            self._memory_bytes -= sys.getsizeof(text)
+            path = self._path(digest)
+            if not os.path.exists(path):  # same digest, same content: already on disk
+                os.makedirs(self.spill_dir, exist_ok=True)
+                tmp = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(text)
+                os.replace(tmp, path)
+            self.counters["spilled"] += 1
+            spilled = True
+        if spilled:
+            self._trim_disk()
+
+    def _trim_disk(self) -> None:
+        files = [e for e in os.scandir(self.spill_dir) if e.is_file() and not e.name.endswith(".tmp")]
+        used = sum(e.stat().st_size for e in files)
+        for entry in sorted(files, key=lambda e: e.stat().st_mtime):
+            if used <= self.max_disk_bytes:
+                break
+            used -= entry.stat().st_size
+            os.remove(entry.path)
+            self.counters["evicted"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"enabled": BLOB_STORE_ENABLED, "in_memory": len(self._memory),
+                    "memory_mb": round(self._memory_bytes / 1e6, 2), **self.counters}
+
+
+blob_store = BlobStore(
+    max_memory_bytes=int(BLOB_MEMORY_MB * 1024 * 1024),
+    spill_dir=BLOB_SPILL_DIR,
+    max_disk_bytes=int(BLOB_DISK_MB * 1024 * 1024),
+)
+
+BlobText = Optional[Union[BlobRef, str]]
+
+
+def offload(text: Optional[str]) -> BlobText:
+    """Store non-empty text and return its reference (the text itself when BLOB_STORE=0)."""
+    if not text or not BLOB_STORE_ENABLED:
+        return text
+    return blob_store.put(text)
+
+
+def text_of(value: BlobText) -> str:
+    """The text behind a state field, whether it holds a BlobRef, a string or nothing."""
+    if isinstance(value, BlobRef):
+        return value.text()
+    return value or ""
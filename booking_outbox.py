@@ -0,0 +1,323 @@
+"""
+Durable outbox for Calendly bookings (used by sch.py).
+
+Detected meetings are written to a SQLite `booking_outbox` table instead of being handed
+to FastAPI BackgroundTasks, so they survive restarts. `BookingWorker` drains the table on
+the event loop: bounded concurrency, pooled HTTP client, exponential backoff with jitter,
+and a status per callId that the API can report.
+
+Row lifecycle: pending → in_progress → scheduled | failed (pending again between retries).
+A claimed row records its owner (one per BookingOutbox) and a lease, which the worker renews
+while the booking runs; several worker processes can share the file, and only other
+owners' rows whose lease has expired are taken back. Each attempt is cut off after
+BOOKING_ATTEMPT_TIMEOUT, shorter than the lease.
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+DEFAULT_DB_PATH = os.getenv("SCH_DB_PATH", "sch_state.db")
+BOOKING_CONCURRENCY = int(os.getenv("BOOKING_CONCURRENCY", "4"))
+BOOKING_MAX_ATTEMPTS = int(os.getenv("BOOKING_MAX_ATTEMPTS", "6"))
+BOOKING_BASE_BACKOFF = float(os.getenv("BOOKING_BASE_BACKOFF", "2"))
+BOOKING_MAX_BACKOFF = float(os.getenv("BOOKING_MAX_BACKOFF", "300"))
+BOOKING_POLL_INTERVAL = float(os.getenv("BOOKING_POLL_INTERVAL", "1"))
+BOOKING_TIMEOUT = float(os.getenv("BOOKING_TIMEOUT", "15"))
+# One booking attempt: slot assignment (may fetch availability) plus the POST
+BOOKING_ATTEMPT_TIMEOUT = float(os.getenv("BOOKING_ATTEMPT_TIMEOUT", "90"))
+# How long a claimed row belongs to its worker without a renewal before another may retry it
+BOOKING_LEASE = float(os.getenv("BOOKING_LEASE", "120"))
+
+
+class PermanentBookingError(Exception):
+    """The booking API rejected the request; retrying won't help (e.g. 400/401/404)."""
+
+
+class BookingOutbox:
+    """SQLite-backed queue of bookings keyed by callId."""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, lease: float = BOOKING_LEASE):
+        self.path = path
+        self.lease = lease
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS booking_outbox (
+                call_id          TEXT PRIMARY KEY,
+                name             TEXT NOT NULL,
+                email            TEXT NOT NULL,
+                start_time       TEXT NOT NULL,
+                status           TEXT NOT NULL,
+                attempts         INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at  REAL NOT NULL,
+                last_error       TEXT,
+                result_json      TEXT,
+                created_at       REAL NOT NULL,
+                updated_at       REAL NOT NULL,
+                owner            TEXT,
+                lease_until      REAL
+            )
+            """
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(booking_outbox)")}
+        for column, kind in (("owner", "TEXT"), ("lease_until", "REAL")):
+            if column not in columns:  # tables created before leases
+                self._conn.execute(f"ALTER TABLE booking_outbox ADD COLUMN {column} {kind}")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS booking_outbox_due ON booking_outbox (status, next_attempt_at)"
+        )
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def enqueue(self, call_id: str, name: str, email: str, start_time: str) -> bool:
+        """Add a booking; returns False if this callId is already in the outbox."""
+        now = time.time()
+        cursor = self._execute(
+            "INSERT OR IGNORE INTO booking_outbox "
+            "(call_id, name, email, start_time, status, attempts, next_attempt_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, 'pending', 0, ?, ?, ?)",
+            (call_id, name, email, start_time, now, now, now),
+        )
+        return cursor.rowcount == 1
+
+    def claim_due(self, limit: int) -> List[Dict[str, Any]]:
+        """Move up to `limit` due rows to in_progress under our lease. Safe with several processes on one file."""
+        if limit <= 0:
+            return []
+        now = time.time()
+        rows = self._execute(
+            "SELECT call_id FROM booking_outbox WHERE status = 'pending' AND next_attempt_at <= ? "
+            "ORDER BY next_attempt_at LIMIT ?",
+            (now, limit),
+        ).fetchall()
+        claimed = []
+        for row in rows:
+            cursor = self._execute(
+                "UPDATE booking_outbox SET status = 'in_progress', owner = ?, lease_until = ?, updated_at = ? "
+                "WHERE call_id = ? AND status = 'pending'",
+                (self.owner, now + self.lease, now, row["call_id"]),
+            )
+            if cursor.rowcount == 1:
+                claimed.append(self.get(row["call_id"]))
+        return claimed
+
+    def mark_scheduled(self, call_id: str, result: Dict[str, Any]) -> None:
+        self._execute(
+            "UPDATE booking_outbox SET status = 'scheduled', attempts = attempts + 1, last_error = NULL, "
+            "result_json = ?, updated_at = ? WHERE call_id = ? AND owner = ? AND status = 'in_progress'",
+            (json.dumps(result), time.time(), call_id, self.owner),
+        )
+
+    def mark_retry(self, call_id: str, error: str, next_attempt_at: float) -> None:
+        self._execute(
+            "UPDATE booking_outbox SET status = 'pending', attempts = attempts + 1, last_error = ?, "
+            "next_attempt_at = ?, updated_at = ? WHERE call_id = ? AND owner = ? AND status = 'in_progress'",
+            (error, next_attempt_at, time.time(), call_id, self.owner),
+        )
+
+    def mark_failed(self, call_id: str, error: str) -> None:
+        self._execute(
+            "UPDATE booking_outbox SET status = 'failed', attempts = attempts + 1, last_error = ?, "
+            "updated_at = ? WHERE call_id = ? AND owner = ? AND status = 'in_progress'",
+            (error, time.time(), call_id, self.owner),
+        )
+
+    def renew_leases(self) -> None:
+        """Extend the lease of every row we hold (called while their bookings run)."""
+        now = time.time()
+        self._execute(
+            "UPDATE booking_outbox SET lease_until = ? WHERE owner = ? AND status = 'in_progress'",
+            (now + self.lease, self.owner),
+        )
+
+    def recover_in_progress(self, own: bool = True) -> int:
+        """
+        Re-queue other owners' in_progress rows whose lease has expired (their worker
+        crashed or hung), plus all of our own when `own` (a stopped worker restarting).
+        Rows live workers hold, our own included, are left alone otherwise.
+        """
+        now = time.time()
+        expired = "(lease_until IS NULL OR lease_until < ?)"
+        where = f"(owner = ? OR {expired})" if own else f"owner IS NOT ? AND {expired}"
+        cursor = self._execute(
+            "UPDATE booking_outbox SET status = 'pending', owner = NULL, lease_until = NULL, "
+            f"next_attempt_at = ?, updated_at = ? WHERE status = 'in_progress' AND {where}",
+            (now, now, self.owner, now),
+        )
+        return cursor.rowcount
+
+    def get(self, call_id: str) -> Optional[Dict[str, Any]]:
+        row = self._execute("SELECT * FROM booking_outbox WHERE call_id = ?", (call_id,)).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        result_json = record.pop("result_json")
+        record["result"] = json.loads(result_json) if result_json else None
+        return record
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._execute("SELECT status, COUNT(*) AS n FROM booking_outbox GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def booking_window(start_time: str):
+    """(start, end) ISO strings for a 30-minute meeting; bad LLM times fall back to tomorrow."""
+    try:
+        start_dt = datetime.fromisoformat(start_time)
+    except (TypeError, ValueError):
+        start_dt = datetime.now() + timedelta(days=1)  # Book for tomorrow
+    return start_dt.isoformat(), (start_dt + timedelta(minutes=30)).isoformat()
+
+
+async def post_calendly_booking(
+    client: httpx.AsyncClient, api_base: str, api_key: str, event_type_url: str,
+    name: str, email: str, start_time: str,
+) -> Dict[str, Any]:
+    """POST one booking; raises PermanentBookingError for non-retryable rejections."""
+    start, end = booking_window(start_time)
+    response = await client.post(
+        f"{api_base.rstrip('/')}/scheduled_events",
+        headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+        json={
+            "event_type": event_type_url,
+            "invitee": {"name": name, "email": email},
+            "start_time": start,
+            "end_time": end,
+        },
+        timeout=BOOKING_TIMEOUT,
+    )
+    if response.status_code == 429 or response.status_code >= 500:
+        response.raise_for_status()  # retryable
+    if response.status_code >= 400:
+        raise PermanentBookingError(f"HTTP {response.status_code}: {response.text[:200]}")
+    return response.json()
+
+
+BookFn = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class BookingWorker:
+    """Drains the outbox on the event loop with bounded concurrency and exponential backoff."""
+
+    def __init__(
+        self,
+        outbox: BookingOutbox,
+        book: BookFn,
+        concurrency: int = BOOKING_CONCURRENCY,
+        max_attempts: int = BOOKING_MAX_ATTEMPTS,
+        base_backoff: float = BOOKING_BASE_BACKOFF,
+        max_backoff: float = BOOKING_MAX_BACKOFF,
+        poll_interval: float = BOOKING_POLL_INTERVAL,
+        attempt_timeout: float = BOOKING_ATTEMPT_TIMEOUT,
+    ):
+        self.outbox = outbox
+        self.book = book
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.attempt_timeout = attempt_timeout
+        self._active: set = set()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        recovered = self.outbox.recover_in_progress()
+        if recovered:
+            print(f"--- ♻️ Booking outbox: re-queued {recovered} interrupted bookings ---")
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        print(f"--- 📬 Booking worker started (concurrency {self.concurrency}) ---")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # In-flight bookings are left in_progress and re-queued on the next start
+        for task in list(self._active):
+            task.cancel()
+        await asyncio.gather(*self._active, return_exceptions=True)
+
+    def notify(self) -> None:
+        """Wake the worker right away (called after enqueue)."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            # Bookings a crashed peer process left behind
+            expired = self.outbox.recover_in_progress(own=False)
+            if expired:
+                print(f"--- ♻️ Booking outbox: re-queued {expired} bookings with expired leases ---")
+            if self._active:
+                self.outbox.renew_leases()
+            for row in self.outbox.claim_due(self.concurrency - len(self._active)):
+                task = asyncio.create_task(self._process(row))
+                self._active.add(task)
+                task.add_done_callback(self._on_done)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self._active.discard(task)
+        if self._wake is not None:
+            self._wake.set()  # a slot freed up
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)  # jitter so retries don't arrive in lockstep
+
+    async def _process(self, row: Dict[str, Any]) -> None:
+        call_id = row["call_id"]
+        attempts = row["attempts"] + 1
+        try:
+            result = await asyncio.wait_for(self.book(row), timeout=self.attempt_timeout)
+        except PermanentBookingError as e:
+            print(f"--- ❌ Booking for {call_id} rejected: {e} ---")
+            self.outbox.mark_failed(call_id, str(e))
+        except Exception as e:
+            error = f"{type(e).__name__}: {e or f'no answer after {self.attempt_timeout:.0f}s'}"[:500]
+            if attempts >= self.max_attempts:
+                print(f"--- ❌ Booking for {call_id} failed after {attempts} attempts: {error} ---")
+                self.outbox.mark_failed(call_id, error)
+            else:
+                delay = self._backoff(attempts)
+                print(f"--- ⚠️ Booking for {call_id} failed (attempt {attempts}), retrying in {delay:.1f}s: {error} ---")
+                self.outbox.mark_retry(call_id, error, time.time() + delay)
+        else:
+            print(f"--- ✅ Calendly meeting scheduled for {call_id} ---")
+            self.outbox.mark_scheduled(call_id, result)
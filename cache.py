@@ -0,0 +1,125 @@
+"""
+In-process TTL cache shared by the PROMETHEO servers.
+
+One `TTLCache` per process; callers namespace their keys with `namespace(...)`
+so foundry_server.py, prompt.py and sch.py can share it when run through gateway.py.
+`SingleFlight` coalesces concurrent identical async work onto one future.
+"""
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after `ttl_seconds`."""
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] < time.monotonic():
+                if entry is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+shared_cache = TTLCache(
+    max_entries=int(os.getenv("PROMETHEO_CACHE_MAX_ENTRIES", "2048")),
+    ttl_seconds=float(os.getenv("PROMETHEO_CACHE_TTL", "3600")),
+)
+
+
+def namespace(name: str, *parts: Hashable) -> Tuple[Hashable, ...]:
+    """Build a cache key scoped to one feature, e.g. namespace("unsplash", query)."""
+    return (name, *parts)
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key: the first caller runs `factory()`,
+    everyone else awaits the same future. Nothing is remembered once it settles
+    (pair with a cache for that).
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+    def in_flight(self, key: Hashable) -> Optional[asyncio.Future]:
+        return self._inflight.get(key)
+
+    def claim(self, key: Hashable) -> asyncio.Future:
+        """
+        Lead `key` without a factory, for callers that compute many keys in one go
+        (a batch). Concurrent run()s for the key wait on it until settle(key, ...).
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        return future
+
+    def settle(self, key: Hashable, result: Any = None, error: Optional[BaseException] = None) -> None:
+        """Resolve a claimed key with its result or error (cancelled when the error is a CancelledError)."""
+        future = self._inflight.pop(key, None)
+        if future is None or future.done():
+            return
+        if isinstance(error, asyncio.CancelledError):
+            future.cancel()
+        elif error is not None:
+            future.set_exception(error)
+            future.exception()  # mark retrieved so an unwaited failure isn't logged twice
+        else:
+            future.set_result(result)
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield: a cancelled waiter must not cancel the leader's work
+            return await asyncio.shield(future)
+
+        self.claim(key)
+        try:
+            result = await factory()
+        except BaseException as e:
+            self.settle(key, error=e)
+            raise
+        self.settle(key, result)
+        return result
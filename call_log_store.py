@@ -0,0 +1,65 @@
+"""
+Local SQLite store for call-log ingestion in sch.py.
+
+Telephony webhooks are retried, so each analysis is stored under
+(callId, transcript hash) and a repeated delivery is answered from here instead of
+re-running the LLM. (At-most-once booking is enforced by the booking outbox.)
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_DB_PATH = os.getenv("SCH_DB_PATH", "sch_state.db")
+
+CallKey = Tuple[str, str]
+
+
+def transcript_hash(transcript_text: str) -> str:
+    return hashlib.sha256(transcript_text.encode("utf-8")).hexdigest()
+
+
+def call_key(call_id: str, transcript_text: str) -> CallKey:
+    return (call_id, transcript_hash(transcript_text))
+
+
+class CallLogStore:
+    """Thread-safe wrapper around one SQLite connection (operations are tiny and local)."""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS call_analyses (
+                call_id          TEXT NOT NULL,
+                transcript_hash  TEXT NOT NULL,
+                response_json    TEXT NOT NULL,
+                created_at       REAL NOT NULL,
+                PRIMARY KEY (call_id, transcript_hash)
+            )
+            """
+        )
+
+    def get(self, key: CallKey) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response_json FROM call_analyses WHERE call_id = ? AND transcript_hash = ?", key
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: CallKey, response: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO call_analyses VALUES (?, ?, ?, ?)",
+                (*key, json.dumps(response), time.time()),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
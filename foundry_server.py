@@ -1,29 +1,42 @@
 import os
+import re
 import sys
+import json
 import asyncio
 import uvicorn 
 import time 
+import secrets
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Any
+from typing import Annotated, List, Dict, Optional, Any
 from datetime import datetime
-from langgraph.graph import StateGraph, END
-from langchain_groq import ChatGroq 
+from urllib.parse import urlsplit
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 import pprint
 from dotenv import load_dotenv
 
 # --- Imports for Research Agent ---
-from langchain_community.document_loaders import WebBaseLoader
-from langchain_tavily import TavilySearch
+# (langgraph, TavilySearch and fpdf are imported where they are used to keep startup fast)
 from langchain_core.runnables import RunnableParallel, RunnablePassthrough, RunnableLambda
 from langchain_core.output_parsers import StrOutputParser
 
 # --- NEW Imports for Design/BRD Agent ---
-import requests
-from fpdf import FPDF, XPos, YPos  # <-- Import with position enums
+
+from runtime import (Lazy, resolve, readiness, warm_up_lifespan, chat_groq, http_session, async_http_client,
+                     require_env, add_cors, register_chain, today)
+from cache import shared_cache, namespace, SingleFlight
+from scraper import FetchResult, SCRAPE_TIMEOUT, scraper
+import replay
+import gazetteer
+from blobstore import BlobText, BlobMissing, blob_store, offload, text_of
+from structured import TolerantOutputParser, structured_chain, parse_stats
+from vercel_deploy import VercelDeployer, VercelError, deploy_stats
+from quotas import BudgetExceeded, budget_exceeded_response, tenant_of, usage_ledger
+from resilience import (Unavailable, budgeted, campaign_deadline, campaign_clock, degrade, dependency,
+                        dependency_stats, outside_node, remaining, short_on_time)
 
 load_dotenv()
 
@@ -36,54 +49,37 @@ except ImportError:
 except Exception as e:
     print(f"--- ⚠️  Key rotation error: {e} ---")
 
-_grok_key0 = os.getenv("GROQ_API_KEY0")
-if _grok_key0:
-    print("--- 🔐 GROQ_API_KEY0 loaded — jurisdiction, research ---")
-else:
-    print("--- ⚠️  GROQ_API_KEY0 not found. Set GROQ_API_KEY0 in your environment or .env file. ---")
-
-_grok_key1 = os.getenv("GROQ_API_KEY1")
-if _grok_key1:
-    print("--- 🔐 GROQ_API_KEY1 loaded — planner, strategy, brd ---")
-else:
-    print("--- ⚠️  GROQ_API_KEY1 not found. Set GROQ_API_KEY1 in your environment or .env file. ---")
-
-_grok_key2 = os.getenv("GROQ_API_KEY2")
-if _grok_key2:
-    print("--- 🔐 GROQ_API_KEY2 loaded — content, design, web ---")
-else:
-    print("--- ⚠️  GROQ_API_KEY2 not found. Set GROQ_API_KEY2 in your environment or .env file. ---")
-
-_grok_key3 = os.getenv("GROQ_API_KEY3")
-if _grok_key3:
-    print("--- 🔐 GROQ_API_KEY3 loaded — strategy, breakdown, brd ---")
-else:
-    print("--- ⚠️  GROQ_API_KEY3 not found. Set GROQ_API_KEY3 in your environment or .env file. ---")
-
+_grok_key0 = os.getenv("GROQ_API_KEY0")  # jurisdiction, research
+_grok_key1 = os.getenv("GROQ_API_KEY1")  # planner, chatbot
+_grok_key2 = os.getenv("GROQ_API_KEY2")  # content, design, web
+_grok_key3 = os.getenv("GROQ_API_KEY3")  # strategy, breakdown, brd
 _tavily_key = os.getenv("TAVILY_API_KEY")
-if _tavily_key:
-    print("--- 🔐 TAVILY_API_KEY loaded from environment/.env ---")
-else:
-    print("--- ⚠️  TAVILY_API_KEY not found. Set TAVILY_API_KEY in your environment or .env file. ---")
-
 _unsplash_key = os.getenv("UNSPLASH_ACCESS_KEY")
-if _unsplash_key:
-    print("--- 🔐 UNSPLASH_ACCESS_KEY loaded from environment/.env ---")
-else:
-    print("--- ⚠️  UNSPLASH_ACCESS_KEY not found. Set UNSPLASH_ACCESS_KEY in your environment or .env file. ---")
-
-
-llm0 = ChatGroq(model_name="openai/gpt-oss-20b", temperature=0, api_key=_grok_key0)
-print(f"--- 🤖 Groq LLM (Key 0) Initialized — jurisdiction, research ---")
-
-llm1 = ChatGroq(model_name="openai/gpt-oss-20b", temperature=0, api_key=_grok_key1)
-print(f"--- 🤖 Groq LLM (Key 1) Initialized — planner ---")
-
-llm2 = ChatGroq(model_name="openai/gpt-oss-20b", temperature=0, api_key=_grok_key2)
-print(f"--- 🤖 Groq LLM (Key 2) Initialized — content, design, web ---")
 
-llm3 = ChatGroq(model_name="openai/gpt-oss-20b", temperature=0, api_key=_grok_key3)
-print(f"--- 🤖 Groq LLM (Key 3) Initialized — strategy, breakdown, brd ---") 
+_missing_keys = [
+    name for name, value in (
+        ("GROQ_API_KEY0", _grok_key0),
+        ("GROQ_API_KEY1", _grok_key1),
+        ("GROQ_API_KEY2", _grok_key2),
+        ("GROQ_API_KEY3", _grok_key3),
+        ("TAVILY_API_KEY", _tavily_key),
+        ("UNSPLASH_ACCESS_KEY", _unsplash_key),
+    ) if not value
+]
+if _missing_keys:
+    print(f"--- ⚠️  Missing keys: {', '.join(_missing_keys)}. Set them in your environment or .env file. ---")
+
+
+# LLM clients are built on first use (see runtime.Lazy) so importing this module is cheap
+# and does not need credentials.
+llm0 = Lazy(lambda: chat_groq("openai/gpt-oss-20b", temperature=0, api_key=_grok_key0),
+            "Groq LLM (Key 0) — jurisdiction, research")
+llm1 = Lazy(lambda: chat_groq("openai/gpt-oss-20b", temperature=0, api_key=_grok_key1),
+            "Groq LLM (Key 1) — planner")
+llm2 = Lazy(lambda: chat_groq("openai/gpt-oss-20b", temperature=0, api_key=_grok_key2),
+            "Groq LLM (Key 2) — content, design, web")
+llm3 = Lazy(lambda: chat_groq("openai/gpt-oss-20b", temperature=0, api_key=_grok_key3),
+            "Groq LLM (Key 3) — strategy, breakdown, brd")
 
 class EmailStep(BaseModel):
     """A single email in the nurture sequence"""
@@ -103,6 +99,12 @@ class BrandKit(BaseModel):
     color_palette: List[str] = Field(description="List of 5 hex color codes")
     font_pair: str = Field(description="e.g., 'Inter and Roboto'")
 
+
+def _merge_locations(current: Dict[str, Dict[str, Any]], update: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """State reducer: location_agent runs for several locations in one step, each adding its own entry."""
+    return {**(current or {}), **(update or {})}
+
+
 class CampaignState(BaseModel):
     """
     The main state object passed between all agents.
@@ -117,6 +119,7 @@ class CampaignState(BaseModel):
     source_docs_url: Optional[str] = None
     campaign_date: Optional[datetime] = None
     location: Optional[str] = None
+    plan_token: Optional[str] = None  # /infer_plan result to reuse instead of calling the planner LLM
 
     # --- 2. Filled by Research_Agent ---
     audience_persona: Optional[Dict[str, str]] = None
@@ -137,18 +140,18 @@ class CampaignState(BaseModel):
     generated_assets: Dict[str, str] = {} # e.g., {"logo_url": "...", "webinar_banner_url": "..."}
 
     # --- 5. Filled by Web_Agent ---
-    landing_page_code: Optional[str] = None
+    landing_page_code: BlobText = None  # large text fields hold a BlobRef (see blobstore.py)
     landing_page_url: Optional[str] = None
     
     # --- 6. Filled by BRD_Agent ---
     brd_url: Optional[str] = None
-    brd_markdown: Optional[str] = None  # Raw markdown text of the BRD (used by chatbot)
+    brd_markdown: BlobText = None  # Raw markdown text of the BRD (used by chatbot)
     
     # --- 7. Filled by Strategy_Agent (MODIFIED) ---
-    strategy_markdown: Optional[str] = None # <-- CHANGED
+    strategy_markdown: BlobText = None # <-- CHANGED
     
     # --- 9. Filled by Validation Agent ---
-    raw_govt_content: Optional[str] = None          # raw text scraped from govt website (always preserved)
+    raw_govt_content: BlobText = None               # raw text scraped from govt website (always preserved)
     validation_rounds: int = 0                       # how many re-validation loops we've done
     step_confidence: Dict[str, float] = {}           # {"0": 0.9, "1": 0.4, ...} keyed by step index str
     document_confidence: Dict[str, float] = {}       # {"Certificate of Incorporation": 0.87, ...}
@@ -158,6 +161,10 @@ class CampaignState(BaseModel):
     
     # --- 8. Filled by Ops_Agent ---
     automation_status: Dict[str, Any] = {}  # Changed from Dict[str, str] to Dict[str, Any] to support complex data
+
+    # --- 10. Multi-location mode (StreamRequest.locations) ---
+    locations: List[str] = []                        # target countries; the first one is the primary
+    location_results: Annotated[Dict[str, Dict[str, Any]], _merge_locations] = {}  # location → its LOCATION_FIELDS (JSON form)
     
     class Config:
         json_encoders = {
@@ -177,7 +184,7 @@ class PlannerOutput(BaseModel):
     campaign_date: Optional[datetime] = Field(description="The target date for the campaign, in YYYY-MM-DD format. Infer from context. If not mentioned, leave as null.")
     location: Optional[str] = Field(default=None, description="The country or region for the campaign. Infer from brief if present; otherwise null.")
 
-planner_parser = PydanticOutputParser(pydantic_object=PlannerOutput)
+planner_parser = TolerantOutputParser(pydantic_object=PlannerOutput)
 planner_prompt = ChatPromptTemplate.from_messages(
     [
         (
@@ -185,7 +192,7 @@ planner_prompt = ChatPromptTemplate.from_messages(
             "You are an expert parsing assistant. You are part of an automated workflow and your "
             "output will be programmatically parsed. Your *only* job is to parse a user's unstructured "
             "campaign brief into a structured JSON object. "
-            "Today's date is " + str(datetime.now().date()) +
+            "Today's date is {today}"
             "\n\n{format_instructions}\n\n"
             "IMPORTANT: Your response MUST be ONLY the JSON object, with no other text, "
             "markdown, or commentary before or after the JSON. The JSON must be the only "
@@ -196,9 +203,30 @@ planner_prompt = ChatPromptTemplate.from_messages(
             "Parse the following campaign brief:\n\n{brief}"
         ),
     ]
-).partial(format_instructions=planner_parser.get_format_instructions())
-planner_chain = planner_prompt | llm1 | planner_parser
-print("--- 📋 Planner Agent LCEL Chain Compiled ---")
+).partial(format_instructions=planner_parser.get_format_instructions(), today=today)
+planner_chain = register_chain("Planner Agent LCEL Chain",
+                               lambda: structured_chain(planner_prompt, resolve(llm1), planner_parser))
+
+# /infer_plan results, kept so the campaign stream can reuse them instead of re-running the planner.
+# Tokens live in this process's cache: with several workers a token that lands on another worker
+# (or has expired) is simply a miss, and the planner agent calls the LLM as before.
+PLAN_TOKEN_TTL = float(os.getenv("PLAN_TOKEN_TTL", "3600"))
+plan_flight = SingleFlight()
+
+
+def store_plan(brief: str, plan: dict) -> str:
+    token = secrets.token_urlsafe(16)
+    shared_cache.set(namespace("plan", token), {"brief": brief, "plan": plan}, ttl_seconds=PLAN_TOKEN_TTL)
+    return token
+
+
+def load_plan(token: str, brief: str) -> Optional[dict]:
+    """The stored plan for `token`, or None if it is unknown, expired or was made for another brief."""
+    entry = shared_cache.get(namespace("plan", token))
+    if entry is None or entry["brief"] != brief:
+        print("--- ⚠️ Plan token unknown, expired or for a different prompt; running the planner. ---")
+        return None
+    return entry["plan"]
 
 
 # --- 3.2: RESEARCH AGENT — MULTI-STEP (Jurisdiction → Scrape → Documents) ---
@@ -210,7 +238,7 @@ class JurisdictionInfo(BaseModel):
     department_url: str = Field(description="The official website URL of this department (must be a real, valid URL).")
     jurisdiction_type: str = Field(description="The type of jurisdiction, e.g., 'Company Registration', 'Business Licensing', 'Startup Registration'.")
 
-jurisdiction_parser = PydanticOutputParser(pydantic_object=JurisdictionInfo)
+jurisdiction_parser = TolerantOutputParser(pydantic_object=JurisdictionInfo)
 jurisdiction_prompt = ChatPromptTemplate.from_messages(
     [
         (
@@ -233,7 +261,27 @@ jurisdiction_prompt = ChatPromptTemplate.from_messages(
         ),
     ]
 ).partial(format_instructions=jurisdiction_parser.get_format_instructions())
-print("--- 🏛️  Jurisdiction Discovery Chain Compiled ---")
+
+# Jurisdiction discovery off the country's business portal, and off a web search when there is no portal
+portal_jurisdiction_prompt = ChatPromptTemplate.from_messages([
+    ("system",
+     "Task: From this government portal content, find the ONE agency that handles business/startup/company registration. "
+     "Return JSON only (name + real URL). Do not hallucinate.\n{format_instructions}"),
+    ("human",
+     "Country: {country}\nTopic: {topic}\n\nCONTENT:\n{content}")
+]).partial(format_instructions=jurisdiction_parser.get_format_instructions())
+portal_jurisdiction_chain = register_chain(
+    "Portal Jurisdiction Chain", lambda: structured_chain(portal_jurisdiction_prompt, resolve(llm0), jurisdiction_parser))
+
+fallback_jurisdiction_prompt = ChatPromptTemplate.from_messages([
+    ("system",
+     "Task: Use search results to identify the correct real government department for company/startup registration. "
+     "Return JSON only.\n{format_instructions}"),
+    ("human",
+     "Country: {country}\nTopic: {topic}\nCompany: {company_name}\nSearch:\n{search_results}")
+]).partial(format_instructions=jurisdiction_parser.get_format_instructions())
+fallback_jurisdiction_chain = register_chain(
+    "Fallback Jurisdiction Chain", lambda: structured_chain(fallback_jurisdiction_prompt, resolve(llm0), jurisdiction_parser))
 
 
 # --- Step 2: Department Website Procedure Extraction ---
@@ -241,7 +289,7 @@ class ProcedureOutput(BaseModel):
     """Registration procedure extracted from the department website."""
     registration_steps: List[str] = Field(description="An ordered list of step-by-step instructions for registering a startup, as found on the department's website.")
 
-procedure_parser = PydanticOutputParser(pydantic_object=ProcedureOutput)
+procedure_parser = TolerantOutputParser(pydantic_object=ProcedureOutput)
 procedure_prompt = ChatPromptTemplate.from_messages(
     [
         (
@@ -265,7 +313,8 @@ procedure_prompt = ChatPromptTemplate.from_messages(
         ),
     ]
 ).partial(format_instructions=procedure_parser.get_format_instructions())
-print("--- 📋 Procedure Extraction Chain Compiled ---")
+procedure_chain = register_chain("Procedure Extraction Chain",
+                                 lambda: structured_chain(procedure_prompt, resolve(llm0), procedure_parser))
 
 
 # --- Step 3 Models: Full Research Output with Documents ---
@@ -281,8 +330,54 @@ class ResearchOutput(BaseModel):
     core_messaging: Dict[str, str] = Field(description="A 3-key dictionary for the marketing strategy, with keys 'value_proposition', 'tone_of_voice', and 'call_to_action'.")
     required_documents: List[RequiredDocument] = Field(default_factory=list, description="A list of regulatory, legal, or compliance documents required to launch this startup in the specified country by the campaign date. Derive these from the registration procedure and department website. If no location is provided, return an empty list.")
 
-research_parser = PydanticOutputParser(pydantic_object=ResearchOutput)
-tavily_tool = TavilySearch(max_results=5)
+research_parser = TolerantOutputParser(pydantic_object=ResearchOutput)
+def _build_tavily_tool():
+    def build():
+        from langchain_tavily import TavilySearch
+        return TavilySearch(max_results=5)
+    return replay.tool("search", build)
+
+tavily_tool = Lazy(_build_tavily_tool, "Tavily Search Tool")
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "20"))
+# Searches are idempotent reads: hedged, and skipped (CircuitOpen) while Tavily keeps failing
+search_dependency = dependency("tavily", timeout=SEARCH_TIMEOUT, hedge=True)
+
+
+def web_search(query: str):
+    """`tavily_tool.invoke(query)` through the Tavily circuit breaker and the campaign deadline."""
+    return search_dependency.call(tavily_tool.invoke, query)
+
+
+# Searches every location of a multi-location campaign asks alike (the audience research)
+# run once: concurrent callers wait for the call in flight, later ones get the cached result.
+SHARED_SEARCH_TTL = float(os.getenv("SHARED_SEARCH_TTL", "600"))
+_shared_searches: Dict[str, Future] = {}
+_shared_searches_lock = threading.Lock()
+
+
+def shared_web_search(query: str):
+    """`web_search(query)`, shared between campaigns and locations asking the same query."""
+    cache_key = namespace("search", query)
+    cached = shared_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    with _shared_searches_lock:
+        future = _shared_searches.get(query)
+        owner = future is None
+        if owner:
+            future = _shared_searches[query] = Future()
+    if owner:
+        try:
+            result = web_search(query)
+            shared_cache.set(cache_key, result, ttl_seconds=SHARED_SEARCH_TTL)
+            future.set_result(result)
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with _shared_searches_lock:
+                del _shared_searches[query]
+    return future.result()
+
 research_prompt = ChatPromptTemplate.from_messages(
     [
         (
@@ -291,7 +386,7 @@ research_prompt = ChatPromptTemplate.from_messages(
             "Your job is to synthesize product information and audience research into a clear marketing strategy, "
             "AND to generate the exact list of required documents based on the registration procedure "
             "and regulatory research for the target country. "
-            "Today's date is " + str(datetime.now().date()) + ". "
+            "Today's date is {today}. "
             "Factor in any recent regulatory changes or upcoming deadlines relative to the campaign date. "
             "Respond ONLY with the required JSON object, with no other text."
             "\n\n{format_instructions}"
@@ -322,8 +417,9 @@ research_prompt = ChatPromptTemplate.from_messages(
             "If no location is provided, return an empty list for required_documents."
         ),
     ]
-).partial(format_instructions=research_parser.get_format_instructions())
-print("--- 🧠 Research Agent LCEL Chain Compiled (Multi-Step) ---")
+).partial(format_instructions=research_parser.get_format_instructions(), today=today)
+research_chain = register_chain("Research Agent Chain",
+                                lambda: structured_chain(research_prompt, resolve(llm0), research_parser))
 
 
 # --- 3.2.5: VALIDATION AGENT MODEL & CHAIN ---
@@ -368,7 +464,7 @@ class ValidationOutput(BaseModel):
         description="Registration steps found in web research that are absent from registration_procedure."
     )
 
-validation_parser = PydanticOutputParser(pydantic_object=ValidationOutput)
+validation_parser = TolerantOutputParser(pydantic_object=ValidationOutput)
 
 validation_prompt = ChatPromptTemplate.from_messages([
     (
@@ -405,8 +501,8 @@ validation_prompt = ChatPromptTemplate.from_messages([
     )
 ]).partial(format_instructions=validation_parser.get_format_instructions())
 
-validation_chain = validation_prompt | llm0 | validation_parser
-print("--- 🔍 Validation Agent Chain Compiled ---")
+validation_chain = register_chain("Validation Agent Chain",
+                                  lambda: structured_chain(validation_prompt, resolve(llm0), validation_parser))
 
 
 # --- 3.3: CONTENT AGENT SCHEMA & CHAIN (MODIFIED) ---
@@ -419,7 +515,7 @@ class ContentAgentOutput(BaseModel):
     webinar_details: WebinarDetails
     social_posts: List[SocialPost] = Field(description="A list of 2 social media posts for the campaign (1 Instagram, 1 X/Twitter).")
     webinar_image_prompt: str = Field(description="A stock photo search query for the main webinar banner.")
-content_parser = PydanticOutputParser(pydantic_object=ContentAgentOutput)
+content_parser = TolerantOutputParser(pydantic_object=ContentAgentOutput)
 content_prompt = ChatPromptTemplate.from_messages(
     [
         (
@@ -445,23 +541,39 @@ content_prompt = ChatPromptTemplate.from_messages(
         ),
     ]
 ).partial(format_instructions=content_parser.get_format_instructions())
-content_chain = content_prompt | llm2 | content_parser
-print("--- ✍️  Content Agent LCEL Chain Compiled ---")
+content_chain = register_chain("Content Agent LCEL Chain",
+                               lambda: structured_chain(content_prompt, resolve(llm2), content_parser))
 
 
 # --- 3.4: DESIGN AGENT (Using Unsplash) ---
 UNSPLASH_API_URL = "https://api.unsplash.com/search/photos"
 UNSPLASH_HEADERS = {"Authorization": f"Client-ID {_unsplash_key}"}
-def get_unsplash_image(search_query: str) -> str:
+image_dependency = dependency("unsplash", timeout=10, hedge=True)
+IMAGE_LOOKUP_SECONDS = 1.0  # typical Unsplash round trip; the design agent's time check uses it
+
+
+def _unsplash_search(params: dict) -> dict:
+    response = http_session().get(UNSPLASH_API_URL, headers=UNSPLASH_HEADERS, params=params, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+def get_unsplash_image(search_query: str, cached_only: bool = False) -> str:
+    cache_key = namespace("unsplash", search_query)
+    cached = shared_cache.get(cache_key)
+    if cached:
+        print(f"--- 🎨 Unsplash cache hit for: '{search_query}' ---")
+        return cached
+    if cached_only:
+        return f"https://placehold.co/800x400/CCCCCC/FFFFFF?text={search_query.replace(' ', '+')}"
     print(f"--- 🎨 Querying Unsplash for: '{search_query}' ---")
     params = {"query": search_query, "per_page": 1, "orientation": "landscape"}
     try:
-        response = requests.get(UNSPLASH_API_URL, headers=UNSPLASH_HEADERS, params=params, timeout=10)
-        response.raise_for_status() 
-        data = response.json()
+        data = image_dependency.call(_unsplash_search, params)
         if data["results"]:
             image_url = data["results"][0]["urls"]["regular"]
             print(f"--- 🎨 Found image URL: {image_url[:50]}... ---")
+            shared_cache.set(cache_key, image_url)
             return image_url
         else:
             print(f"--- ⚠️ Unsplash found no results for '{search_query}', using placeholder. ---")
@@ -492,8 +604,8 @@ web_sections_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-web_sections_chain = web_sections_prompt | llm2 | StrOutputParser()
-print("--- 🕸️  Web Agent LCEL Chain Compiled (Sections + Hardcoded Boilerplate) ---")
+web_sections_chain = register_chain("Web Agent LCEL Chain (Sections + Hardcoded Boilerplate)",
+                                    lambda: web_sections_prompt | resolve(llm2) | StrOutputParser())
 
 
 def _extract_body_like_html(raw: str) -> str:
@@ -664,8 +776,8 @@ brd_agent_prompt = ChatPromptTemplate.from_messages(
         ),
     ]
 )
-brd_agent_chain = brd_agent_prompt | llm3 | StrOutputParser()
-print("--- 📄 BRD Agent LCEL Chain Compiled (Uses Key 3) ---")
+brd_agent_chain = register_chain("BRD Agent LCEL Chain (Uses Key 3)",
+                                 lambda: brd_agent_prompt | resolve(llm3) | StrOutputParser())
 
 
 # --- 3.7: STRATEGY AGENT (NEW) ---
@@ -686,8 +798,8 @@ strategy_agent_prompt = ChatPromptTemplate.from_messages(
         ),
     ]
 )
-strategy_agent_chain = strategy_agent_prompt | llm3 | StrOutputParser()
-print("--- 📈 Strategy Agent LCEL Chain Compiled (Uses Key 3) ---")
+strategy_agent_chain = register_chain("Strategy Agent LCEL Chain (Uses Key 3)",
+                                      lambda: strategy_agent_prompt | resolve(llm3) | StrOutputParser())
 
 
 # --- 4. AGENT "WORKSTATIONS" (The Nodes) ---
@@ -699,6 +811,7 @@ def save_markdown_as_pdf(markdown_text: str, filename: str) -> str:
     Includes improved formatting with proper margins, spacing, and fonts.
     """
     try:
+        from fpdf import FPDF, XPos, YPos  # <-- Import with position enums
         pdf = FPDF()
         pdf.set_margins(15, 15, 15)  # Left, top, right margins
         pdf.add_page()
@@ -802,22 +915,25 @@ def save_markdown_as_pdf(markdown_text: str, filename: str) -> str:
         traceback.print_exc()
         return None
 
+PLANNER_FIELDS = ("goal", "topic", "target_audience", "company_name", "source_docs_url", "campaign_date", "location")
+
+
 def planner_agent_node(state: CampaignState) -> dict:
     print("--- 1. 📋 Calling Planner Agent ---")
     # If fields are already populated (user confirmed an edited plan), skip LLM
     if state.goal and state.topic and state.target_audience:
         print("--- 📋 Planner Agent: Using pre-populated fields (user override). Skipping LLM. ---")
         # Return the pre-populated fields so they appear in the state diff
-        return {
-            "goal": state.goal,
-            "topic": state.topic,
-            "target_audience": state.target_audience,
-            "company_name": state.company_name,
-            "source_docs_url": state.source_docs_url,
-            "campaign_date": state.campaign_date,
-            "location": state.location,
-        }
+        return {field: getattr(state, field) for field in PLANNER_FIELDS}
+    # The frontend already ran the planner via /infer_plan; reuse that plan and
+    # let anything the user edited take precedence.
+    stored_plan = load_plan(state.plan_token, state.initial_prompt) if state.plan_token else None
+    if stored_plan is not None:
+        print("--- 📋 Planner Agent: Hydrated from /infer_plan result. Skipping LLM. ---")
+        return {field: getattr(state, field) or stored_plan.get(field) for field in PLANNER_FIELDS}
     brief = state.initial_prompt
+    if JURISDICTION_SPECULATION:
+        speculate_jurisdiction(state)
     try:
         planner_output: PlannerOutput = planner_chain.invoke({"brief": brief})
         return planner_output.model_dump()
@@ -846,31 +962,21 @@ KNOWN_COUNTRY_PORTALS = {
     "egypt": "https://www.gafi.gov.eg",
     "morocco": "https://www.invest.gov.ma",
 }
-print(f"--- 🌍 Loaded {len(KNOWN_COUNTRY_PORTALS)} known country portals ---")
 
 
 def resolve_jurisdiction_from_portal(portal_url: str, country: str, topic: str):
     print(f"--- Portal scrape: {portal_url} ---")
-    try:
-        docs = WebBaseLoader(portal_url).load()
-        content = docs[0].page_content[:4000] if docs else ""
-    except:
+    page = fetch_govt_page(portal_url)
+    if not page.ok:
+        print(f"--- ⚠️ Portal scrape failed for {portal_url}: {page.error or page.kind} ---")
         return None
+    content = page.text[:4000]
 
     if not content.strip():
         return None
 
-    prompt = ChatPromptTemplate.from_messages([
-        ("system",
-         "Task: From this government portal content, find the ONE agency that handles business/startup/company registration. "
-         "Return JSON only (name + real URL). Do not hallucinate.\n{format_instructions}"),
-        ("human",
-         "Country: {country}\nTopic: {topic}\n\nCONTENT:\n{content}")
-    ]).partial(format_instructions=jurisdiction_parser.get_format_instructions())
-
     try:
-        chain = prompt | llm0 | jurisdiction_parser
-        r = chain.invoke({"country": country, "topic": topic, "content": content})
+        r = portal_jurisdiction_chain.invoke({"country": country, "topic": topic, "content": content})
         if r.department_url not in ("", "N/A", "Unknown"):
             return r
     except Exception as e:
@@ -881,24 +987,15 @@ def resolve_jurisdiction_from_portal(portal_url: str, country: str, topic: str):
 def search_jurisdiction_fallback_with_extract(country: str, topic: str, company_name: str):
     print(f"--- Fallback search: {country} ---")
     try:
-        search = tavily_tool.invoke(
+        search = web_search(
             f"official agency for business/startup/company registration in {country} {topic}"
         )
     except Exception as e:
         print("Tavily fail:", e)
         return None
 
-    prompt = ChatPromptTemplate.from_messages([
-        ("system",
-         "Task: Use search results to identify the correct real government department for company/startup registration. "
-         "Return JSON only.\n{format_instructions}"),
-        ("human",
-         "Country: {country}\nTopic: {topic}\nCompany: {company_name}\nSearch:\n{search_results}")
-    ]).partial(format_instructions=jurisdiction_parser.get_format_instructions())
-
     try:
-        chain = prompt | llm0 | jurisdiction_parser
-        r = chain.invoke({
+        r = fallback_jurisdiction_chain.invoke({
             "country": country,
             "topic": topic,
             "company_name": company_name,
@@ -932,6 +1029,91 @@ def finalize_jurisdiction(country: str, topic: str, company_name: str):
     return None
 
 
+def discover_jurisdiction(location: str, topic: str, company_name: str) -> tuple:
+    """STEP 1 plus the department-website scrape of STEP 2: (jurisdiction or None, scrape or None)."""
+    print(f"--- STEP 1: Jurisdiction for {location} ({topic}) ---")
+    jurisdiction = finalize_jurisdiction(location, topic, company_name)
+    if not jurisdiction or not jurisdiction.department_url:
+        return jurisdiction, None
+    print(f"--- 📋 STEP 2: Reading department website: {jurisdiction.department_url} ---")
+    return jurisdiction, _scrape_govt_website(jurisdiction.department_url)
+
+
+# --- Speculative jurisdiction discovery ---
+# Jurisdiction is the slowest stage and mostly depends on the country alone, which is
+# usually plain from the brief. With JURISDICTION_SPECULATION=1 the planner node guesses
+# the country (the location sent with the request, else a gazetteer match on the brief)
+# and runs discover_jurisdiction for it while the planner LLM call is in flight. The
+# jurisdiction node keeps that result when the planner's location is in the same
+# country and discards it otherwise. The speculative lookup cannot know the planner's
+# topic; the procedure extraction that follows uses the real one.
+JURISDICTION_SPECULATION = os.getenv("JURISDICTION_SPECULATION", "0") == "1"
+SPECULATION_MAX_AGE = 600.0  # unclaimed speculations (failed runs) are dropped after this
+_speculation_pool = ThreadPoolExecutor(max_workers=int(os.getenv("JURISDICTION_SPECULATION_WORKERS", "8")),
+                                       thread_name_prefix="speculate")
+_speculations: Dict[str, dict] = {}
+_speculations_lock = threading.Lock()
+speculation_stats = {"started": 0, "hits": 0, "misses": 0, "no_guess": 0, "errors": 0,
+                     "saved_seconds": 0.0, "wasted_seconds": 0.0}
+
+
+def speculate_jurisdiction(state: CampaignState) -> None:
+    """Start discover_jurisdiction for the brief's likely country in the background."""
+    country = gazetteer.guess_country(state.location or "") or gazetteer.guess_country(state.initial_prompt)
+    if not country:
+        speculation_stats["no_guess"] += 1
+        return
+    entry = {"country": country, "started": time.monotonic(), "finished": None}
+
+    def run():
+        try:
+            with outside_node():  # outlives the planner node; only the campaign deadline applies
+                return discover_jurisdiction(country, state.topic or "", state.company_name or "")
+        finally:
+            entry["finished"] = time.monotonic()
+
+    with _speculations_lock:
+        for key in [k for k, v in _speculations.items() if entry["started"] - v["started"] > SPECULATION_MAX_AGE]:
+            del _speculations[key]
+        if state.initial_prompt in _speculations:  # same brief already being speculated on
+            return
+        speculation_stats["started"] += 1
+        # The copied context carries the campaign deadline into the speculation thread
+        entry["future"] = _speculation_pool.submit(contextvars.copy_context().run, run)
+        _speculations[state.initial_prompt] = entry
+    print(f"--- 🔮 Speculating jurisdiction for {country} while the planner runs ---")
+
+
+def claim_speculation(state: CampaignState) -> Optional[tuple]:
+    """The speculative discover_jurisdiction result if it matches the planned location, else None."""
+    with _speculations_lock:
+        entry = _speculations.pop(state.initial_prompt, None)
+    if entry is None:
+        return None
+    claimed = time.monotonic()
+    country = gazetteer.guess_country(state.location or "")
+    if country != entry["country"]:
+        speculation_stats["misses"] += 1
+        print(f"--- 🔮 Speculation discarded: guessed {entry['country']}, planner chose {state.location!r} ---")
+
+        def count_waste(_):
+            speculation_stats["wasted_seconds"] += entry["finished"] - entry["started"]
+        entry["future"].add_done_callback(count_waste)
+        return None
+    try:
+        result = entry["future"].result()
+    except Exception as e:
+        speculation_stats["errors"] += 1
+        print(f"--- ⚠️ Speculative jurisdiction lookup failed ({e}); running it now ---")
+        return None
+    # Time the lookup had already been running (or had finished) before this node needed it
+    saved = min(entry["finished"], claimed) - entry["started"]
+    speculation_stats["hits"] += 1
+    speculation_stats["saved_seconds"] += saved
+    print(f"--- 🔮 Speculation hit for {entry['country']}: {saved:.2f}s saved ---")
+    return result
+
+
 def jurisdiction_agent_node(state: CampaignState) -> dict:
     """Step 3 in user flow: discover jurisdiction & ministries, scrape procedures."""
     print("--- 2. 🏛️ Calling Jurisdiction Agent ---")
@@ -941,6 +1123,7 @@ def jurisdiction_agent_node(state: CampaignState) -> dict:
     campaign_date = state.campaign_date.isoformat() if state.campaign_date else ""
 
     result = {}
+    speculated = claim_speculation(state) if JURISDICTION_SPECULATION else None
 
     if not location:
         print("--- ⚠️ No location provided — skipping jurisdiction discovery ---")
@@ -956,8 +1139,7 @@ def jurisdiction_agent_node(state: CampaignState) -> dict:
         # ========================================
         # STEP 1: Jurisdiction Discovery
         # ========================================
-        print(f"--- STEP 1: Jurisdiction for {location} ({topic}) ---")
-        jurisdiction = finalize_jurisdiction(location, topic, company_name)
+        jurisdiction, scraped = speculated or discover_jurisdiction(location, topic, company_name)
 
         if jurisdiction:
             result["jurisdiction_info"] = jurisdiction.model_dump()
@@ -975,13 +1157,12 @@ def jurisdiction_agent_node(state: CampaignState) -> dict:
         # ========================================
         # STEP 2: Scrape Department Website + Extract Procedure
         # ========================================
-        if jurisdiction.department_url:
-            print(f"--- 📋 STEP 2: Reading department website: {jurisdiction.department_url} ---")
-            website_content, raw_govt_content = _scrape_govt_website(jurisdiction.department_url)
-            result["raw_govt_content"] = raw_govt_content   # save full scrape to state for validation
+        if scraped:
+            website_content, raw_govt_content = scraped
+            result["raw_govt_content"] = offload(raw_govt_content)   # save full scrape to state for validation
 
             try:
-                procedure_search = tavily_tool.invoke(
+                procedure_search = web_search(
                     f"how to register startup company at {jurisdiction.department_name} {location} "
                     f"step by step procedure requirements {campaign_date}"
                 )
@@ -993,7 +1174,6 @@ def jurisdiction_agent_node(state: CampaignState) -> dict:
                     "website_content": website_content,
                     "procedure_search": procedure_search,
                 }
-                procedure_chain = procedure_prompt | llm0 | procedure_parser
                 procedure_output = procedure_chain.invoke(procedure_inputs)
                 result["registration_procedure"] = procedure_output.registration_steps
                 print(f"--- 📋 Extracted {len(procedure_output.registration_steps)} registration steps ---")
@@ -1010,41 +1190,32 @@ def jurisdiction_agent_node(state: CampaignState) -> dict:
         return result if result else {}
 
 
+def _unreachable(page) -> bool:
+    # No HTTP response at all (timeout, DNS, connection refused); a 404 is the site answering
+    return page.error is not None and page.status is None
+
+
+def fetch_govt_page(url: str):
+    """`scraper.fetch_sync(url)` behind a per-host circuit breaker; an open breaker or spent deadline is a failed page."""
+    site = dependency(f"govt:{urlsplit(url).netloc.lower()}", is_failure=_unreachable)
+    try:
+        return site.call(scraper.fetch_sync, url, timeout=remaining(SCRAPE_TIMEOUT))
+    except Unavailable as e:
+        return FetchResult(url=url, error=str(e))
+
+
 def _scrape_govt_website(url: str) -> tuple:
     """
     Scrape the government website and return (truncated_content, full_raw_content).
     Always returns at least empty strings — never raises.
     """
-    raw = ""
-    try:
-        # Try WebBaseLoader first
-        loader = WebBaseLoader(url)
-        docs = loader.load()
-        if docs and len(docs[0].page_content) > 100:  # Only trust if we got substantial content
-            raw = docs[0].page_content
-            print(f"--- 📋 Scraped {len(raw)} chars from govt website ---")
-            truncated = raw[:4000] if raw else "Could not load website."
-            return truncated, raw
-    except Exception as e:
-        print(f"--- ⚠️ WebBaseLoader failed for {url}: {str(e)[:100]} ---")
-    
-    # Fallback: Try requests + beautifulsoup
-    if not raw:
-        try:
-            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-            response = requests.get(url, timeout=5, headers=headers)
-            if response.status_code == 200:
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(response.content, 'html.parser')
-                # Extract text from main content areas
-                main_content = soup.find(['main', 'article', 'div']) or soup.body
-                if main_content:
-                    raw = main_content.get_text(separator='\n', strip=True)
-                    if raw:
-                        print(f"--- 📋 Scraped {len(raw)} chars (fallback method) ---")
-        except Exception as e:
-            print(f"--- ⚠️ Fallback scrape also failed: {str(e)[:100]} ---")
-    
+    page = fetch_govt_page(url)
+    raw = page.text if page.ok else ""
+    if raw:
+        print(f"--- 📋 Scraped {len(raw)} chars from govt website{' (truncated download)' if page.truncated else ''} ---")
+    else:
+        print(f"--- ⚠️ Could not scrape {url}: {page.error or f'no text ({page.kind})'} ---")
+
     truncated = raw[:4000] if raw else "Could not load website. Using default documents."
     return truncated, raw
 
@@ -1112,19 +1283,19 @@ def research_agent_node(state: CampaignState) -> dict:
     try:
         print("--- 🔎 Running full research chain (audience + documents) ---")
 
-        search_results = tavily_tool.invoke(
+        search_results = shared_web_search(
             f"common pain points for {target_audience} related to {topic}"
         )
 
         regulatory_news = ""
         if location:
-            regulatory_news = tavily_tool.invoke(
+            regulatory_news = web_search(
                 f"latest regulatory changes startup business registration {location} {campaign_date} news"
             )
 
         # Use the raw govt website content scraped by jurisdiction_agent as
         # primary product context.
-        raw_govt = state.raw_govt_content or ""
+        raw_govt = text_of(state.raw_govt_content)
         if raw_govt and len(raw_govt) > 100:  # Substantial content available
             scraped_content = (
                 "=== OFFICIAL GOVERNMENT WEBSITE CONTENT (use as primary source for documents) ===\n"
@@ -1157,7 +1328,6 @@ def research_agent_node(state: CampaignState) -> dict:
         }
 
         try:
-            research_chain = research_prompt | llm0 | research_parser
             research_output: ResearchOutput = research_chain.invoke(research_inputs)
             research_dict = research_output.model_dump()
 
@@ -1202,7 +1372,7 @@ def validation_agent_node(state: CampaignState) -> dict:
 
     location    = state.location or ""
     topic       = state.topic    or ""
-    raw_content = state.raw_govt_content or ""
+    raw_content = text_of(state.raw_govt_content)
     steps       = state.registration_procedure or []
     docs        = state.required_documents or []
 
@@ -1232,7 +1402,7 @@ def validation_agent_node(state: CampaignState) -> dict:
 
     for query in search_queries:
         try:
-            result_chunk = tavily_tool.invoke(query)
+            result_chunk = web_search(query)
             web_search_results += f"\n--- Query: {query} ---\n{result_chunk}\n"
         except Exception as e:
             print(f"--- ⚠️ Tavily search failed for '{query}': {e} ---")
@@ -1332,6 +1502,14 @@ def validation_agent_node(state: CampaignState) -> dict:
     return result
 
 
+def _revalidation_fits() -> bool:
+    clock = campaign_clock()
+    if clock is None or clock.deadline is None:
+        return True
+    round_seconds = clock.last_run("research_agent") + clock.last_run("validation_agent")
+    return clock.remaining() - round_seconds >= clock.reserved_after("validation_agent")
+
+
 def route_after_validation(state: CampaignState) -> str:
     """
     Conditional router after validation_agent.
@@ -1342,6 +1520,8 @@ def route_after_validation(state: CampaignState) -> str:
       - There are actual mismatches to correct.
 
     Otherwise: proceed to strategy_agent (even if imperfect — govt scrape is the safety net).
+    Under a campaign deadline the extra round is also skipped when it would eat into the
+    time planned for the nodes after validation (judged by how long the last round took).
     """
     rounds      = state.validation_rounds or 0
     confidence  = state.overall_confidence if state.overall_confidence is not None else 1.0
@@ -1353,6 +1533,10 @@ def route_after_validation(state: CampaignState) -> str:
         and len(mismatches) > 0
     )
 
+    if needs_rerun and not _revalidation_fits():
+        degrade(f"skipped re-validation round {rounds + 1}", node="validation_agent")
+        needs_rerun = False
+
     if needs_rerun:
         print(
             f"--- 🔄 Routing back to research_agent "
@@ -1394,13 +1578,18 @@ def design_agent_node(state: CampaignState) -> dict:
     )
     
     generated_assets = {}
+    # Short on time: only images already in the cache, placeholders for the rest
+    cached_only = short_on_time(IMAGE_LOOKUP_SECONDS * (1 + len(state.social_posts)))
+    if cached_only:
+        degrade("used cached or placeholder images")
     
     print("--- 🎨 Generating Webinar Banner... ---")
-    generated_assets["webinar_banner_url"] = get_unsplash_image(state.webinar_image_prompt or state.topic or "abstract")
+    generated_assets["webinar_banner_url"] = get_unsplash_image(state.webinar_image_prompt or state.topic or "abstract",
+                                                                cached_only=cached_only)
     
     for i, post in enumerate(state.social_posts):
         print(f"--- 🎨 Generating image for social post {i+1} ({post.platform})... ---")
-        image_url = get_unsplash_image(post.image_prompt)
+        image_url = get_unsplash_image(post.image_prompt, cached_only=cached_only)
         generated_assets[f"post_{i+1}_image_url"] = image_url
 
     print("--- ✅ Design Agent finished ---")
@@ -1428,7 +1617,7 @@ def web_agent_node(state: CampaignState) -> dict:
         sections_html = _extract_body_like_html(sections_raw)
         html_code = build_landing_page_html(company_name=company_name, sections_html=sections_html)
 
-        return {"landing_page_code": html_code, "landing_page_url": "campaign_preview.html"}
+        return {"landing_page_code": offload(html_code), "landing_page_url": "campaign_preview.html"}
 
     except Exception as e:
         print(f"--- ❌ ERROR in Web Agent: {e} ---")
@@ -1439,7 +1628,7 @@ def web_agent_node(state: CampaignState) -> dict:
 def brd_agent_node(state: CampaignState) -> dict:
     print("--- 7. 📄 Calling BRD Agent (Generate BRD via Key 3) ---")
     try:
-        strategy_markdown = state.strategy_markdown or "# Strategic Approach\n\nNo strategy available."
+        strategy_markdown = text_of(state.strategy_markdown) or "# Strategic Approach\n\nNo strategy available."
         
         # Call BRD agent to generate full BRD based on strategy
         inputs = {"strategy_markdown": strategy_markdown}
@@ -1455,7 +1644,7 @@ def brd_agent_node(state: CampaignState) -> dict:
         filename = f"{output_dir}/{topic_slug}_brd.pdf"
         pdf_path = save_markdown_as_pdf(brd_markdown, filename)
         
-        return {"brd_url": pdf_path, "brd_markdown": brd_markdown}
+        return {"brd_url": pdf_path, "brd_markdown": offload(brd_markdown)}
 
     except Exception as e:
         print(f"--- ❌ ERROR in BRD Agent: {e} ---")
@@ -1473,7 +1662,7 @@ def strategy_agent_node(state: CampaignState) -> dict:
         print("--- 📈 Generating Strategy Markdown via Key 3... ---")
         strategy_markdown = strategy_agent_chain.invoke(inputs)
         
-        return {"strategy_markdown": strategy_markdown}
+        return {"strategy_markdown": offload(strategy_markdown)}
 
     except Exception as e:
         print(f"--- ❌ ERROR in Strategy Agent: {e} ---")
@@ -1528,7 +1717,7 @@ def ops_agent_node(state: CampaignState) -> dict:
                 else:
                     slack_payload = {"text": text}
 
-                resp = requests.post(
+                resp = http_session().post(
                     SLACK_WEBHOOK,
                     json=slack_payload,
                     timeout=10
@@ -1552,13 +1741,13 @@ def ops_agent_node(state: CampaignState) -> dict:
                 print(f"📤 Sending post {i+1} to Telegram...")
 
                 if image_url:
-                    tg_resp = requests.post(
+                    tg_resp = http_session().post(
                         f"https://api.telegram.org/bot{BOT_TOKEN}/sendPhoto",
                         data={"chat_id": CHAT_ID, "caption": text, "photo": image_url},
                         timeout=10
                     ).json()
                 else:
-                    tg_resp = requests.post(
+                    tg_resp = http_session().post(
                         f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage",
                         data={"chat_id": CHAT_ID, "text": text},
                         timeout=10
@@ -1589,78 +1778,190 @@ def ops_agent_node(state: CampaignState) -> dict:
 
 # --- 5. LANGGRAPH "FACTORY FLOOR" (The Graph) ---
 
-graph_builder = StateGraph(CampaignState)
-
-# Add all nodes
-graph_builder.add_node("planner_agent",      planner_agent_node)
-graph_builder.add_node("jurisdiction_agent",  jurisdiction_agent_node)
-graph_builder.add_node("research_agent",      research_agent_node)
-graph_builder.add_node("validation_agent",    validation_agent_node)   # ← NEW
-graph_builder.add_node("content_agent",       content_agent_node)
-graph_builder.add_node("design_agent",        design_agent_node)
-graph_builder.add_node("web_agent",           web_agent_node)
-graph_builder.add_node("brd_agent",           brd_agent_node)
-graph_builder.add_node("strategy_agent",      strategy_agent_node)
-graph_builder.add_node("ops_agent",           ops_agent_node)
-
-# Linear flow up to validation
-graph_builder.set_entry_point("planner_agent")
-graph_builder.add_edge("planner_agent",      "jurisdiction_agent")
-graph_builder.add_edge("jurisdiction_agent", "research_agent")
-graph_builder.add_edge("research_agent",     "validation_agent")    # ← NEW
-
-# Conditional loop: validation → research_agent (retry) OR strategy_agent (proceed)
-graph_builder.add_conditional_edges(
-    "validation_agent",
-    route_after_validation,
-    {
-        "research_agent":  "research_agent",   # re-run with corrections
-        "strategy_agent":  "strategy_agent",   # proceed
-    }
+def _add_location_nodes(graph_builder, after_validation: str) -> None:
+    """jurisdiction → research → validation, looping back to research until validated."""
+    graph_builder.add_node("jurisdiction_agent",  budgeted("jurisdiction_agent", jurisdiction_agent_node))
+    graph_builder.add_node("research_agent",      budgeted("research_agent", research_agent_node))
+    graph_builder.add_node("validation_agent",    budgeted("validation_agent", validation_agent_node))   # ← NEW
+
+    graph_builder.add_edge("jurisdiction_agent", "research_agent")
+    graph_builder.add_edge("research_agent",     "validation_agent")    # ← NEW
+
+    # Conditional loop: validation → research_agent (retry) OR proceed
+    graph_builder.add_conditional_edges(
+        "validation_agent",
+        route_after_validation,
+        {
+            "research_agent":  "research_agent",   # re-run with corrections
+            "strategy_agent":  after_validation,   # proceed
+        }
+    )
+
+
+def _add_shared_nodes(graph_builder) -> None:
+    """strategy → content → design → web → brd → ops: the nodes that do not depend on the location."""
+    from langgraph.graph import END
+
+    graph_builder.add_node("content_agent",       budgeted("content_agent", content_agent_node))
+    graph_builder.add_node("design_agent",        budgeted("design_agent", design_agent_node))
+    graph_builder.add_node("web_agent",           budgeted("web_agent", web_agent_node))
+    graph_builder.add_node("brd_agent",           budgeted("brd_agent", brd_agent_node))
+    graph_builder.add_node("strategy_agent",      budgeted("strategy_agent", strategy_agent_node))
+    graph_builder.add_node("ops_agent",           budgeted("ops_agent", ops_agent_node))
+
+    graph_builder.add_edge("strategy_agent", "content_agent")
+    graph_builder.add_edge("content_agent",  "design_agent")
+    graph_builder.add_edge("design_agent",   "web_agent")
+    graph_builder.add_edge("web_agent",      "brd_agent")
+    graph_builder.add_edge("brd_agent",      "ops_agent")
+    graph_builder.add_edge("ops_agent",      END)
+
+
+def _build_foundry_graph():
+    from langgraph.graph import StateGraph
+
+    graph_builder = StateGraph(CampaignState)
+
+    graph_builder.add_node("planner_agent",      budgeted("planner_agent", planner_agent_node))
+    _add_location_nodes(graph_builder, after_validation="strategy_agent")
+    _add_shared_nodes(graph_builder)
+
+    graph_builder.set_entry_point("planner_agent")
+    graph_builder.add_edge("planner_agent",      "jurisdiction_agent")
+
+    sys.setrecursionlimit(200)
+    return graph_builder.compile()
+
+
+# Compiled on first use
+foundry_app = Lazy(_build_foundry_graph, "AI Campaign Foundry Graph (with Validation Loop)")
+
+
+# --- Multi-location mode ---
+# With StreamRequest.locations, the planner and the location-independent nodes run once,
+# and jurisdiction → research → validation runs for every location in parallel.
+
+# What location_agent produces per location
+LOCATION_FIELDS = (
+    "location", "jurisdiction_info", "registration_procedure", "required_documents", "raw_govt_content",
+    "audience_persona", "core_messaging", "validation_rounds", "step_confidence", "document_confidence",
+    "validation_mismatches", "govt_fallback_only", "overall_confidence",
 )
 
-# Remainder of pipeline unchanged
-graph_builder.add_edge("strategy_agent", "content_agent")
-graph_builder.add_edge("content_agent",  "design_agent")
-graph_builder.add_edge("design_agent",   "web_agent")
-graph_builder.add_edge("web_agent",      "brd_agent")
-graph_builder.add_edge("brd_agent",      "ops_agent")
-graph_builder.add_edge("ops_agent",      END)
+
+def _build_location_graph():
+    from langgraph.graph import StateGraph, END
+
+    graph_builder = StateGraph(CampaignState)
+    _add_location_nodes(graph_builder, after_validation=END)
+    graph_builder.set_entry_point("jurisdiction_agent")
+    return graph_builder.compile()
+
+
+location_graph = Lazy(_build_location_graph, "Per-Location Graph (jurisdiction → research → validation)")
+
+
+def _location_view(values: Dict[str, Any]) -> Dict[str, Any]:
+    """A location's fields in the JSON form the stream sends (large text as {"blob", "size"})."""
+    fields = {key: values[key] for key in LOCATION_FIELDS if key in values}
+    return CampaignState.model_validate({"initial_prompt": "", **fields}).model_dump(mode="json", include=set(fields))
 
 
-# Compile the graph
-print("--- 🏭 Compiling AI Campaign Foundry Graph (with Validation Loop) ---")
-sys.setrecursionlimit(200) 
-foundry_app = graph_builder.compile()
-print("--- ✅ Foundry Graph Compiled ---")
+def fan_out_locations(state: CampaignState) -> list:
+    """After the planner: one location_agent run per requested location, all in the same step."""
+    from langgraph.types import Send
+
+    return [Send("location_agent", state.model_copy(update={"location": location})) for location in state.locations]
+
+
+def location_agent_node(state: CampaignState) -> dict:
+    """
+    jurisdiction → research → validation for `state.location`, as a subgraph.
+
+    Each subgraph step is streamed as a custom event tagged with the location. The result
+    lands in `location_results`; the primary (first) location also fills the top-level
+    fields, which is what content_agent and the other shared nodes read.
+    """
+    from langgraph.config import get_stream_writer
+
+    write = get_stream_writer()
+    location = state.location
+    values = {"location": location}
+    for step in location_graph.stream(state, stream_mode="updates"):
+        for node, diff in step.items():
+            values.update(diff or {})
+            write({"location": location, "node": node, "data": _location_view(values)})
+
+    result = {"location_results": {location: _location_view(values)}}
+    if location == state.locations[0]:
+        result.update({key: value for key, value in values.items() if key in LOCATION_FIELDS})
+    return result
+
+
+def _build_multi_location_graph():
+    from langgraph.graph import StateGraph
+
+    graph_builder = StateGraph(CampaignState)
+
+    graph_builder.add_node("planner_agent",      budgeted("planner_agent", planner_agent_node))
+    graph_builder.add_node("location_agent",     location_agent_node)   # nodes inside are budgeted
+    _add_shared_nodes(graph_builder)
+
+    graph_builder.set_entry_point("planner_agent")
+    graph_builder.add_conditional_edges("planner_agent", fan_out_locations, ["location_agent"])
+    graph_builder.add_edge("location_agent",     "strategy_agent")     # waits for every location
+
+    return graph_builder.compile()
+
+
+foundry_multi_location_app = Lazy(_build_multi_location_graph, "Multi-Location Campaign Graph")
 
 
 # --- 6. FASTAPI SERVER (The Streaming Endpoint) ---
 
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 
-app = FastAPI()
+# Everything that is built lazily; /ready reports on these and PROMETHEO_WARMUP=1 builds them at startup.
+# (regen/chatbot chains are defined further down and appended there.)
+LAZY_COMPONENTS = [
+    llm0, llm1, llm2, llm3, tavily_tool,
+    planner_chain, portal_jurisdiction_chain, fallback_jurisdiction_chain, procedure_chain, research_chain,
+    validation_chain, content_chain, web_sections_chain,
+    brd_agent_chain, strategy_agent_chain, foundry_app, location_graph, foundry_multi_location_app,
+]
+
+app = FastAPI(lifespan=warm_up_lifespan(LAZY_COMPONENTS))
 
 # Add CORS middleware to allow frontend requests
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:5173",
-        "http://127.0.0.1:5173",
-        "http://localhost:5174",
-        "http://127.0.0.1:5174",
-        "https://ai-foundry-frontend.vercel.app"
-    ],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+CORS_ORIGINS = [
+    "http://localhost:5173",
+    "http://127.0.0.1:5173",
+    "http://localhost:5174",
+    "http://127.0.0.1:5174",
+    "https://ai-foundry-frontend.vercel.app"
+]
+add_cors(app, CORS_ORIGINS)
+app.add_exception_handler(BudgetExceeded, budget_exceeded_response)
 
 class InferPlanRequest(BaseModel):
     initial_prompt: str
 
+# Seconds a whole campaign run may take (LLM calls, searches, images, scrapes); 0 = no limit
+CAMPAIGN_DEADLINE = float(os.getenv("CAMPAIGN_DEADLINE", "0"))
+# How the deadline is split, in pipeline order: each node gets its share of the time still
+# left (relative to itself and the nodes after it), so unused time flows downstream.
+# research/validation re-runs come out of what is left, see route_after_validation.
+NODE_BUDGET_SHARES = {
+    "planner_agent": 1, "jurisdiction_agent": 3, "research_agent": 2, "validation_agent": 2,
+    "strategy_agent": 2, "content_agent": 2, "design_agent": 1, "web_agent": 2, "brd_agent": 2, "ops_agent": 1,
+}
+
 class StreamRequest(BaseModel):
     initial_prompt: str
+    # Token returned by /infer_plan — the planner agent reuses that plan instead of calling the LLM again
+    plan_token: Optional[str] = None
+    # Seconds this campaign run may take (default CAMPAIGN_DEADLINE)
+    deadline_seconds: Optional[float] = None
     # Optional planner overrides — if provided, planner agent will use these instead of LLM
     goal: Optional[str] = None
     topic: Optional[str] = None
@@ -1669,6 +1970,8 @@ class StreamRequest(BaseModel):
     source_docs_url: Optional[str] = None
     campaign_date: Optional[str] = None
     location: Optional[str] = None
+    # Several target countries: research and validation run per location, the rest once
+    locations: Optional[List[str]] = None
 
 
 
@@ -1682,46 +1985,209 @@ class RegenerateWebRequest(BaseModel):
 
 
 # Separate LLM with temperature for regeneration variety
-regen_llm = ChatGroq(model_name="openai/gpt-oss-20b", temperature=0.9, api_key=_grok_key2)
-print(f"--- 🤖 Regen LLM (Key 2) Initialized ---")
-regen_sections_chain = web_sections_prompt | regen_llm | StrOutputParser()
+regen_llm = Lazy(lambda: chat_groq("openai/gpt-oss-20b", temperature=0.9, api_key=_grok_key2),
+                 "Regen LLM (Key 2)")
+regen_sections_chain = register_chain("Regen Sections Chain",
+                                      lambda: web_sections_prompt | resolve(regen_llm) | StrOutputParser())
+LAZY_COMPONENTS += [regen_llm, regen_sections_chain]
 
 
 @app.post("/regenerate_landing_page")
-async def regenerate_landing_page(request: RegenerateWebRequest):
+async def regenerate_landing_page(request: RegenerateWebRequest, http_request: Request):
     """Regenerate the landing page HTML by calling the Web Agent only."""
-    try:
-        company_name = request.company_name or request.topic or "Company"
-        inputs = {
+    async with usage_ledger.admission(tenant_of(http_request), "regenerate"):
+        try:
+            company_name = request.company_name or request.topic or "Company"
+            inputs = {
+                "topic": request.topic or "",
+                "audience_persona": request.audience_persona or {},
+                "core_messaging": request.core_messaging or {},
+                "company_name": company_name,
+                "generated_assets": request.generated_assets or {},
+            }
+
+            sections_raw = regen_sections_chain.invoke(inputs)
+            sections_html = _extract_body_like_html(sections_raw)
+            html_code = build_landing_page_html(company_name=company_name, sections_html=sections_html)
+            return {"success": True, "html": html_code}
+
+        except Exception as e:
+            print(f"--- ❌ ERROR regenerating landing page: {e} ---")
+            return {"success": False, "error": str(e)}
+
+# --- Variants (A/B testing): N landing pages / social post sets in one request ---
+VARIANTS_MAX = int(os.getenv("VARIANTS_MAX", "8"))                   # per kind and request
+VARIANT_CONCURRENCY = int(os.getenv("VARIANT_CONCURRENCY", "4"))     # LLM calls in flight per request
+# Word-trigram Jaccard similarity at or above which a variant counts as a duplicate of one already sent
+VARIANT_SIMILARITY = float(os.getenv("VARIANT_SIMILARITY", "0.8"))
+VARIANT_KINDS = ("landing_page", "social_posts")
+# One per variant, so the N calls do not all write the same page
+VARIANT_ANGLES = (
+    "lead with the audience's main pain point",
+    "lead with the outcome they get, in concrete terms",
+    "lead with how simple and fast it is",
+    "lead with urgency: the date and what they miss by waiting",
+    "lead with trust: expertise, official sources, compliance",
+    "open with a question the reader is asking themselves",
+    "lead with a short story of one typical customer",
+    "lead with numbers: steps, minutes, documents",
+)
+# Appended after the regular prompt: every variant of a request shares the same prompt prefix
+# (persona, messaging, assets), which providers with prompt caching reuse across the N calls.
+VARIANT_INSTRUCTION = (
+    "human",
+    "This is variant {variant} of {count} for an A/B test. Angle: {angle}. "
+    "Use a different headline and wording than a generic version would."
+)
+variant_sections_prompt = ChatPromptTemplate.from_messages([*web_sections_prompt.messages, VARIANT_INSTRUCTION])
+variant_content_prompt = ChatPromptTemplate.from_messages(
+    [*content_prompt.messages, VARIANT_INSTRUCTION]
+).partial(format_instructions=content_parser.get_format_instructions())
+variant_sections_chain = register_chain("Variant Sections Chain",
+                                        lambda: variant_sections_prompt | resolve(regen_llm) | StrOutputParser())
+variant_content_chain = register_chain("Variant Content Chain",
+                                       lambda: structured_chain(variant_content_prompt, resolve(regen_llm), content_parser))
+LAZY_COMPONENTS += [variant_sections_chain, variant_content_chain]
+variant_stats = {"requests": 0, "llm_calls": 0, "sent": 0, "duplicates": 0, "errors": 0}
+
+
+class VariantsRequest(RegenerateWebRequest):
+    target_audience: Optional[str] = None
+    count: int = 3
+    kinds: List[str] = list(VARIANT_KINDS)
+
+
+def _fingerprint(text: str) -> set:
+    """Word trigrams of `text` (tags stripped), for near-duplicate checks."""
+    words = re.findall(r"\w+", re.sub(r"<[^>]+>", " ", text).lower())
+    return {" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))}
+
+
+def _similarity(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+async def _stream_variants(request: VariantsRequest):
+    company_name = request.company_name or request.topic or "Company"
+    shared = {
+        "landing_page": {
             "topic": request.topic or "",
             "audience_persona": request.audience_persona or {},
             "core_messaging": request.core_messaging or {},
             "company_name": company_name,
             "generated_assets": request.generated_assets or {},
-        }
+        },
+        "social_posts": {
+            "goal": request.goal or "",
+            "topic": request.topic or "",
+            "target_audience": request.target_audience or "",
+            "persona": request.audience_persona or {},
+            "messaging": request.core_messaging or {},
+        },
+    }
+    chains = {"landing_page": variant_sections_chain, "social_posts": variant_content_chain}
+    gate = asyncio.Semaphore(VARIANT_CONCURRENCY)
+
+    async def generate(kind: str, variant: int):
+        inputs = {**shared[kind], "variant": variant + 1, "count": request.count,
+                  "angle": VARIANT_ANGLES[variant % len(VARIANT_ANGLES)]}
+        async with gate:
+            variant_stats["llm_calls"] += 1
+            try:
+                return kind, variant, await chains[kind].ainvoke(inputs)
+            except Exception as e:
+                return kind, variant, e
 
-        sections_raw = regen_sections_chain.invoke(inputs)
-        sections_html = _extract_body_like_html(sections_raw)
-        html_code = build_landing_page_html(company_name=company_name, sections_html=sections_html)
-        return {"success": True, "html": html_code}
+    sent: Dict[str, List[tuple]] = {kind: [] for kind in request.kinds}  # kind -> [(variant, fingerprint)]
+    tasks = [asyncio.ensure_future(generate(kind, i)) for kind in request.kinds for i in range(request.count)]
+    try:
+        for next_variant in asyncio.as_completed(tasks):
+            kind, variant, output = await next_variant
+            record = {"kind": kind, "variant": variant}
+            if isinstance(output, Exception):
+                variant_stats["errors"] += 1
+                print(f"--- ❌ {kind} variant {variant} failed: {output} ---")
+                yield json.dumps({**record, "status": "error", "message": str(output)}) + "\n"
+                continue
+            if kind == "landing_page":
+                html = build_landing_page_html(company_name=company_name,
+                                               sections_html=_extract_body_like_html(output))
+                fields, text = {"html": html}, output
+            else:
+                posts = [post.model_dump() for post in output.social_posts]
+                fields, text = {"social_posts": posts}, " ".join(post["content"] for post in posts)
+            fingerprint = _fingerprint(text)
+            twin = max(((other, _similarity(fingerprint, seen)) for other, seen in sent[kind]),
+                       key=lambda match: match[1], default=None)
+            if twin and twin[1] >= VARIANT_SIMILARITY:
+                variant_stats["duplicates"] += 1
+                yield json.dumps({**record, "status": "duplicate", "similar_to": twin[0],
+                                  "similarity": round(twin[1], 3)}) + "\n"
+                continue
+            sent[kind].append((variant, fingerprint))
+            variant_stats["sent"] += 1
+            yield json.dumps({**record, "status": "ok", **fields}) + "\n"
+    finally:
+        for task in tasks:  # client went away: stop the calls still waiting
+            task.cancel()
+
+
+@app.post("/variants")
+async def generate_variants(request: VariantsRequest, http_request: Request):
+    """
+    Generate `count` variants of each of `kinds` ("landing_page", "social_posts") in one request,
+    for A/B testing. The variants are generated concurrently from the same context and stream
+    back as NDJSON in completion order, one line per variant:
+    {"kind", "variant", "status": "ok" | "duplicate" | "error", "html" | "social_posts" | "similar_to" | "message"}.
+    A variant too similar to one already sent (VARIANT_SIMILARITY) comes back as "duplicate".
+    """
+    unknown = set(request.kinds) - set(VARIANT_KINDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown variant kinds: {sorted(unknown)}")
+    if not 1 <= request.count <= VARIANTS_MAX:
+        raise HTTPException(status_code=400, detail=f"count must be between 1 and {VARIANTS_MAX}.")
+    request.kinds = list(dict.fromkeys(request.kinds))
+    work = await usage_ledger.admit(tenant_of(http_request), "variants")
+    variant_stats["requests"] += 1
+    return StreamingResponse(usage_ledger.charged(work, _stream_variants(request)), media_type="application/x-ndjson")
+
+
+@app.get("/variants/stats")
+async def variants_statistics():
+    """Variant requests, LLM calls, and variants sent, dropped as duplicates, or failed."""
+    return dict(variant_stats)
 
-    except Exception as e:
-        print(f"--- ❌ ERROR regenerating landing page: {e} ---")
-        return {"success": False, "error": str(e)}
 
 @app.post("/infer_plan")
-async def infer_plan(request: InferPlanRequest):
-    """Run only the planner agent to infer a business plan from the prompt."""
-    try:
-        planner_output: PlannerOutput = planner_chain.invoke({"brief": request.initial_prompt})
-        result = planner_output.model_dump()
-        # Convert datetime to string for JSON serialization
-        if result.get("campaign_date"):
-            result["campaign_date"] = result["campaign_date"].isoformat() if hasattr(result["campaign_date"], 'isoformat') else str(result["campaign_date"])
-        return {"success": True, "plan": result}
-    except Exception as e:
-        print(f"--- ❌ ERROR in /infer_plan: {e} ---")
-        return {"success": False, "error": str(e)}
+async def infer_plan(request: InferPlanRequest, http_request: Request):
+    """Run only the planner agent to infer a business plan from the prompt.
+
+    The plan is kept for PLAN_TOKEN_TTL seconds under the returned `plan_token`; sending that
+    token with the StreamRequest lets the planner agent reuse it instead of calling the LLM again.
+    """
+    async with usage_ledger.admission(tenant_of(http_request), "infer_plan"):
+        try:
+            # Identical prompts in flight at once (double clicks, retries) share one LLM call
+            planner_output: PlannerOutput = await plan_flight.run(
+                request.initial_prompt, lambda: planner_chain.ainvoke({"brief": request.initial_prompt})
+            )
+            plan_token = store_plan(request.initial_prompt, planner_output.model_dump())
+            result = planner_output.model_dump()
+            # Convert datetime to string for JSON serialization
+            if result.get("campaign_date"):
+                result["campaign_date"] = result["campaign_date"].isoformat() if hasattr(result["campaign_date"], 'isoformat') else str(result["campaign_date"])
+            return {"success": True, "plan": result, "plan_token": plan_token}
+        except Exception as e:
+            print(f"--- ❌ ERROR in /infer_plan: {e} ---")
+            return {"success": False, "error": str(e)}
+
+
+def _blob_refs(fields: Dict[str, Any]) -> set:
+    """Digests of the {"blob", "size"} references among `fields`' values."""
+    return {
+        value["blob"] for value in fields.values()
+        if isinstance(value, dict) and value.keys() == {"blob", "size"}
+    }
 
 
 @app.websocket("/ws_stream_campaign")
@@ -1733,6 +2199,8 @@ async def websocket_endpoint(websocket: WebSocket):
         request_data = StreamRequest(**json_data)
         
         initial_input = {"initial_prompt": request_data.initial_prompt}
+        if request_data.plan_token:
+            initial_input["plan_token"] = request_data.plan_token
         
         # If planner overrides are provided, pre-populate the state
         if request_data.goal:
@@ -1752,36 +2220,71 @@ async def websocket_endpoint(websocket: WebSocket):
                 pass
         if request_data.location:
             initial_input["location"] = request_data.location
+        locations = list(dict.fromkeys(loc.strip() for loc in request_data.locations or [] if loc.strip()))
+        if locations:
+            initial_input["location"] = locations[0]
+        if len(locations) > 1:
+            initial_input["locations"] = locations
+        graph = foundry_multi_location_app if len(locations) > 1 else foundry_app
+        # Waits for one of the tenant's campaign slots (TENANT_MAX_CONCURRENT); BudgetExceeded if none frees up
+        work = await usage_ledger.admit(tenant_of(websocket), "campaign", slot=True)
         
         current_state_dict = initial_input.copy()
+        sent_blobs = set()
         
         print(f"--- 🚀 Received input, starting stream... ---")
         
-        async for s in foundry_app.astream(initial_input):
-            node_that_ran = list(s.keys())[0]
-            state_snapshot_diff = s[node_that_ran]  # Dict of only the fields this node changed
-
-            if state_snapshot_diff:
-                # Always replace — never mutate. extend/update would corrupt lists and dicts
-                for key, value in state_snapshot_diff.items():
-                    current_state_dict[key] = value
-
-            # model_dump() returns a plain dict — NOT a string.
-            state_dict = CampaignState.model_validate(current_state_dict).model_dump(mode="json")
-
-            await websocket.send_json({
-                "event": "step",
-                "node": node_that_ran,
-                "data": state_dict   # plain dict → frontend receives a proper object
-            })
+        deadline = request_data.deadline_seconds if request_data.deadline_seconds is not None else CAMPAIGN_DEADLINE
+        with usage_ledger.running(work), campaign_deadline(deadline, NODE_BUDGET_SHARES) as clock:
+            async for mode, s in graph.astream(initial_input, stream_mode=["updates", "custom"]):
+                if mode == "custom":
+                    # A step of one location's subgraph (multi-location mode): only that location's fields
+                    message = {"event": "step", "node": s["node"], "location": s["location"], "data": s["data"]}
+                    new_blobs = _blob_refs(s["data"]) - sent_blobs
+                else:
+                    node_that_ran = list(s.keys())[0]
+                    state_snapshot_diff = s[node_that_ran]  # Dict of only the fields this node changed
+
+                    if state_snapshot_diff:
+                        # Always replace — never mutate. extend/update would corrupt lists and dicts
+                        for key, value in state_snapshot_diff.items():
+                            if key == "location_results":  # one location per update, see _merge_locations
+                                value = _merge_locations(current_state_dict.get(key), value)
+                            current_state_dict[key] = value
+
+                    # model_dump() returns a plain dict — NOT a string.
+                    state_dict = CampaignState.model_validate(current_state_dict).model_dump(mode="json")
+                    message = {
+                        "event": "step",
+                        "node": node_that_ran,
+                        "data": state_dict   # plain dict → frontend receives a proper object
+                    }
+                    new_blobs = _blob_refs(state_dict) - sent_blobs
+                    for result in state_dict["location_results"].values():
+                        new_blobs |= _blob_refs(result) - sent_blobs
+                # Large fields are {"blob", "size"} references; each blob's text goes out once per connection
+                if new_blobs:
+                    message["blobs"] = {digest: blob_store.get(digest) for digest in new_blobs}
+                    sent_blobs |= new_blobs
+
+                await websocket.send_json(message)
             
-        await websocket.send_json({"event": "done"})
+        await websocket.send_json({"event": "done", "budget": clock.report(), "usage": work.report()})
         print("--- ✨ Stream Complete ---")
         
         await websocket.close()
 
     except WebSocketDisconnect:
         print("--- 🔌 WebSocket Disconnected ---")
+
+    except BudgetExceeded as e:
+        print(f"--- 🚫 Campaign over budget: {e} ---")
+        try:
+            await websocket.send_json({"event": "error", "data": str(e), "code": "budget_exceeded",
+                                       "retry_after": e.retry_after})
+            await websocket.close()
+        except Exception:
+            pass
     
     except Exception as e:
         print(f"--- ❌ WebSocket Error: {e} ---")
@@ -1803,6 +2306,42 @@ async def websocket_endpoint(websocket: WebSocket):
 async def root():
     return {"message": "AI Campaign Foundry Server is running. Connect via WebSocket."}
 
+@app.get("/ready")
+async def ready():
+    """Report whether LLM clients, tools and chains are built (warm) or still deferred (cold)."""
+    return readiness(LAZY_COMPONENTS)
+
+@app.get("/blobs/{digest}")
+async def get_blob(digest: str):
+    """Text behind a {"blob", "size"} reference from a campaign stream."""
+    try:
+        return PlainTextResponse(blob_store.get(digest))
+    except BlobMissing:
+        raise HTTPException(status_code=404, detail="Unknown or expired blob.")
+
+@app.get("/parsing/stats")
+async def parsing_stats():
+    """Structured-output outcomes per schema: clean, locally repaired, re-asked, failed."""
+    return parse_stats()
+
+@app.get("/resilience/stats")
+async def resilience_stats():
+    """Circuit breaker state, timeouts, hedges and latency per external dependency."""
+    return dependency_stats()
+
+@app.get("/usage")
+async def usage(tenant: Optional[str] = None):
+    """LLM usage per tenant against its budgets: window tokens/requests, running and queued work, totals."""
+    return usage_ledger.report(tenant)
+
+
+@app.get("/speculation/stats")
+async def speculation_statistics():
+    """Hit rate and seconds saved by speculative jurisdiction discovery (JURISDICTION_SPECULATION=1)."""
+    decided = speculation_stats["hits"] + speculation_stats["misses"]
+    return {"enabled": JURISDICTION_SPECULATION, **speculation_stats,
+            "hit_rate": speculation_stats["hits"] / decided if decided else None}
+
 @app.get("/download_brd/{filename}")
 async def download_brd(filename: str):
     """Serve BRD PDF files for download"""
@@ -1824,69 +2363,53 @@ class DeployRequest(BaseModel):
     html_content: str
     project_name: str
 
+
+vercel_deployer = Lazy(lambda: VercelDeployer(require_env("VERCEL_TOKEN"), async_http_client), "Vercel Deployer")
+
+
 @app.post("/deploy_to_vercel")
 async def deploy_to_vercel(request: DeployRequest):
-    """Deploy HTML content to Vercel"""
-    
-    VERCEL_TOKEN = os.getenv("VERCEL_TOKEN")
-    
-    if not VERCEL_TOKEN:
+    """Deploy HTML content to Vercel (returns once the deployment is created, see /deploy_to_vercel/stream)"""
+    if not os.getenv("VERCEL_TOKEN"):
         return {"error": "VERCEL_TOKEN not found in environment variables"}
-    
     try:
-        # Create deployment payload
-        deployment_payload = {
-            "name": request.project_name,
-            "files": [
-                {
-                    "file": "index.html",
-                    "data": request.html_content
-                }
-            ],
-            "projectSettings": {
-                "framework": None
-            }
-        }
-        
-        # Deploy to Vercel
-        headers = {
-            "Authorization": f"Bearer {VERCEL_TOKEN}",
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.post(
-            "https://api.vercel.com/v13/deployments",
-            headers=headers,
-            json=deployment_payload,
-            timeout=30
-        )
-        
-        if response.status_code in [200, 201]:
-            data = response.json()
-            deployment_url = data.get("url", "")
-            
-            # Vercel returns URL without protocol
-            if deployment_url and not deployment_url.startswith("http"):
-                deployment_url = f"https://{deployment_url}"
-            
-            return {
-                "success": True,
-                "url": deployment_url,
-                "id": data.get("id"),
-                "name": data.get("name")
-            }
-        else:
-            error_data = response.json()
-            return {
-                "error": error_data.get("error", {}).get("message", "Deployment failed"),
-                "status_code": response.status_code
-            }
-            
+        return await vercel_deployer.deploy(request.project_name, {"index.html": request.html_content})
+    except VercelError as e:
+        return {"error": str(e), "status_code": e.status_code}
     except Exception as e:
         print(f"--- ❌ ERROR deploying to Vercel: {e} ---")
         return {"error": str(e)}
 
 
+@app.post("/deploy_to_vercel/stream")
+async def deploy_to_vercel_stream(request: DeployRequest):
+    """
+    Deploy HTML content to Vercel and follow it until it is live. Streams NDJSON:
+    {"event": "created", "url", "id", ...}, then {"event": "status", "state"} on every state
+    change (QUEUED, BUILDING, ... READY | ERROR | CANCELED), or {"event": "error", "error"}.
+    """
+    if not os.getenv("VERCEL_TOKEN"):
+        raise HTTPException(status_code=503, detail="VERCEL_TOKEN not found in environment variables")
+
+    async def events():
+        try:
+            created = await vercel_deployer.deploy(request.project_name, {"index.html": request.html_content})
+            yield json.dumps({"event": "created", **created}) + "\n"
+            async for status in vercel_deployer.watch(created["id"]):
+                yield json.dumps({"event": "status", **status}) + "\n"
+        except Exception as e:
+            print(f"--- ❌ ERROR deploying to Vercel: {e} ---")
+            yield json.dumps({"event": "error", "error": str(e), "status_code": getattr(e, "status_code", None)}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.get("/deploy/stats")
+async def deploy_statistics():
+    """Deployments created, coalesced and superseded; files uploaded vs reused by SHA; status polls."""
+    return dict(deploy_stats)
+
+
 # --- 8. CHATBOT ENDPOINT (BRD-Grounded Q&A) ---
 
 # Chatbot prompt — answers user questions grounded in BRD + Strategy context
@@ -1904,8 +2427,9 @@ chatbot_prompt = ChatPromptTemplate.from_messages([
     ),
     ("human", "{question}"),
 ])
-chatbot_chain = chatbot_prompt | llm1 | StrOutputParser()
-print("--- 💬 Chatbot Chain Compiled (BRD-grounded Q&A) ---")
+chatbot_chain = register_chain("Chatbot Chain (BRD-grounded Q&A)",
+                               lambda: chatbot_prompt | resolve(llm1) | StrOutputParser())
+LAZY_COMPONENTS.append(chatbot_chain)
 
 
 class ChatRequest(BaseModel):
@@ -1916,32 +2440,33 @@ class ChatRequest(BaseModel):
 
 
 @app.post("/chat")
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http_request: Request):
     """Answer user questions grounded in the BRD and strategy documents."""
-    try:
-        brd_context = request.brd_markdown or "No BRD document available yet."
-        strategy_context = request.strategy_markdown or "No strategy document available yet."
-
-        # Format conversation history
-        history_text = ""
-        if request.history:
-            for msg in request.history[-10:]:  # Keep last 10 messages for context window
-                role = msg.get("role", "user")
-                content = msg.get("content", "")
-                history_text += f"{role.upper()}: {content}\n"
-
-        answer = chatbot_chain.invoke({
-            "brd_markdown": brd_context[:8000],       # Truncate to avoid token limits
-            "strategy_markdown": strategy_context[:4000],
-            "history": history_text,
-            "question": request.question,
-        })
+    async with usage_ledger.admission(tenant_of(http_request), "chat"):
+        try:
+            brd_context = request.brd_markdown or "No BRD document available yet."
+            strategy_context = request.strategy_markdown or "No strategy document available yet."
+
+            # Format conversation history
+            history_text = ""
+            if request.history:
+                for msg in request.history[-10:]:  # Keep last 10 messages for context window
+                    role = msg.get("role", "user")
+                    content = msg.get("content", "")
+                    history_text += f"{role.upper()}: {content}\n"
+
+            answer = chatbot_chain.invoke({
+                "brd_markdown": brd_context[:8000],       # Truncate to avoid token limits
+                "strategy_markdown": strategy_context[:4000],
+                "history": history_text,
+                "question": request.question,
+            })
 
-        return {"success": True, "answer": answer}
+            return {"success": True, "answer": answer}
 
-    except Exception as e:
-        print(f"--- ❌ ERROR in /chat: {e} ---")
-        return {"success": False, "error": str(e)}
+        except Exception as e:
+            print(f"--- ❌ ERROR in /chat: {e} ---")
+            return {"success": False, "error": str(e)}
 
 
 if __name__ == "__main__":
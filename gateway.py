@@ -0,0 +1,98 @@
+"""
+Single ASGI entry point for all PROMETHEO services.
+
+Mounts the three FastAPI apps in one process so they share one LLM client pool,
+one HTTP connection pool and one cache (see runtime.py / cache.py):
+
+    /foundry/...   foundry_server.py  (campaign graph, WebSocket stream, chat, deploy)
+    /prompt/...    prompt.py          (dynamic sales prompt generator)
+    /sch/...       sch.py             (call-log analysis + scheduling)
+    /...           foundry_server.py  (also served at the root so the existing frontend keeps working)
+
+Run:
+    python gateway.py                  # single process on :8000
+    python gateway.py --workers 4      # multi-worker (each worker has its own pools; their
+                                       # booking workers share sch_state.db under per-row leases)
+    uvicorn gateway:app --workers 4
+
+The standalone entry points (python foundry_server.py / prompt.py / sch.py) are unchanged.
+"""
+import os
+import argparse
+from contextlib import asynccontextmanager
+
+import uvicorn
+from fastapi import FastAPI
+
+import runtime
+import foundry_server
+import prompt
+import sch
+from cache import shared_cache
+from scraper import scraper
+from blobstore import blob_store
+from structured import parse_stats
+from resilience import dependency_stats
+
+MOUNTS = {
+    "/foundry": foundry_server,
+    "/prompt": prompt,
+    "/sch": sch,
+}
+
+
+def _all_components():
+    return [c for module in MOUNTS.values() for c in module.LAZY_COMPONENTS]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Lifespans of mounted sub-apps are not run by Starlette, so warm-up, the
+    # booking worker and pool shutdown for all three services are handled here.
+    runtime.warm_up_in_background(_all_components())
+    await sch.start_background_workers()
+    try:
+        yield
+    finally:
+        await sch.stop_background_workers()
+        await runtime.close_http_clients()
+
+
+app = FastAPI(title="PROMETHEO Gateway", lifespan=lifespan)
+
+
+@app.get("/gateway/ready")
+async def gateway_ready():
+    """Readiness of every mounted service plus shared pool/cache stats."""
+    services = {prefix.strip("/"): runtime.readiness(module.LAZY_COMPONENTS) for prefix, module in MOUNTS.items()}
+    return {
+        "status": "warm" if all(s["status"] == "warm" for s in services.values()) else "cold",
+        "services": services,
+        "llm_clients": runtime.llm_pool_size(),
+        "cache": shared_cache.stats(),
+        "scraper": scraper.stats(),
+        "blobs": blob_store.stats(),
+        "parsing": parse_stats(),
+        "dependencies": dependency_stats(),
+    }
+
+
+for _prefix, _module in MOUNTS.items():
+    app.mount(_prefix, _module.app)
+# Root fallback must be mounted last: it matches every path.
+app.mount("/", foundry_server.app)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run all PROMETHEO services in one process.")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    args = parser.parse_args()
+
+    print(f"--- 🚀 Starting PROMETHEO gateway on http://{args.host}:{args.port} ({args.workers} worker(s)) ---")
+    if args.workers > 1:
+        # Multi-worker mode needs an import string so each worker imports its own app.
+        uvicorn.run("gateway:app", host=args.host, port=args.port, workers=args.workers)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
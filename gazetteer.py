@@ -0,0 +1,106 @@
+"""
+Offline country lookup for campaign briefs.
+
+A small table of country names, common abbreviations, demonyms and well-known cities,
+states and provinces, matched on word boundaries in one regex pass. Used to guess the
+campaign's country from the brief before the planner LLM answers (see speculative
+jurisdiction discovery in foundry_server.py), so it only has to be cheap and cautious:
+a text that mentions places in more than one country gets no guess.
+"""
+import re
+from typing import Dict, Optional, Set
+
+# "Canonical name: alias, alias, ..." — aliases are matched case-insensitively, except
+# those in CASE_SENSITIVE (abbreviations and words with an everyday meaning).
+_TABLE = """
+United States: united states, united states of america, USA, US, U.S., U.S.A., new york, san francisco, los angeles, chicago, boston, seattle, austin, miami, silicon valley, california, texas, florida, new jersey, massachusetts, illinois, ohio, michigan, pennsylvania, arizona, colorado, oregon, nevada, utah, minnesota, wisconsin, tennessee, north carolina, south carolina, virginia, maryland, delaware
+United Kingdom: united kingdom, UK, U.K., great britain, britain, british, england, scotland, scottish, wales, welsh, northern ireland, london, manchester, birmingham, edinburgh, glasgow, leeds, bristol, cardiff, belfast
+Canada: canada, canadian, toronto, vancouver, montreal, ottawa, calgary, ontario, quebec, british columbia, alberta
+Australia: australia, australian, sydney, melbourne, brisbane, perth, adelaide, canberra, new south wales, queensland
+India: india, indian, bharat, mumbai, bombay, delhi, new delhi, bangalore, bengaluru, chennai, kolkata, pune, ahmedabad, gurgaon, gurugram, noida, karnataka, maharashtra, tamil nadu, kerala, gujarat, telangana
+Germany: germany, deutschland, berlin, munich, münchen, hamburg, frankfurt, cologne, stuttgart, bavaria
+France: france, paris, lyon, marseille, toulouse, Nice, bordeaux
+Singapore: singapore, singaporean
+United Arab Emirates: united arab emirates, UAE, U.A.E., emirati, dubai, abu dhabi, sharjah
+South Africa: south africa, south african, johannesburg, cape town, durban, pretoria
+Nigeria: nigeria, nigerian, lagos, abuja, ibadan, port harcourt
+Kenya: kenya, kenyan, nairobi, mombasa
+Brazil: brazil, brasil, brazilian, são paulo, sao paulo, rio de janeiro, brasília, brasilia
+Japan: japan, tokyo, osaka, kyoto, yokohama
+Egypt: egypt, egyptian, cairo, alexandria, giza
+Morocco: morocco, moroccan, casablanca, rabat, marrakech, tangier
+Ireland: ireland, republic of ireland, irish, dublin, cork
+Netherlands: netherlands, the netherlands, holland, amsterdam, rotterdam, the hague, utrecht, eindhoven
+Spain: spain, madrid, barcelona, valencia, seville
+Italy: italy, rome, milan, naples, turin, florence
+Portugal: portugal, lisbon, porto
+Switzerland: switzerland, swiss, zurich, geneva, basel, bern
+Sweden: sweden, stockholm, gothenburg
+Norway: norway, oslo
+Denmark: denmark, copenhagen
+Finland: finland, helsinki
+Poland: poland, warsaw, krakow
+Belgium: belgium, belgian, brussels, antwerp
+Austria: austria, austrian, vienna
+Israel: israel, israeli, tel aviv, jerusalem
+Saudi Arabia: saudi arabia, saudi, KSA, riyadh, jeddah
+Qatar: qatar, qatari, doha
+Pakistan: pakistan, pakistani, karachi, lahore, islamabad
+Bangladesh: bangladesh, bangladeshi, dhaka
+Sri Lanka: sri lanka, sri lankan, colombo
+Indonesia: indonesia, indonesian, jakarta, bali
+Malaysia: malaysia, malaysian, kuala lumpur
+Philippines: philippines, filipino, manila
+Vietnam: vietnam, viet nam, hanoi, ho chi minh city
+Thailand: thailand, bangkok
+China: China, beijing, shanghai, shenzhen, guangzhou
+South Korea: south korea, korea, seoul, busan
+New Zealand: new zealand, NZ, auckland, wellington
+Mexico: mexico, mexican, mexico city, guadalajara, monterrey
+Argentina: argentina, argentinian, argentine, buenos aires
+Chile: chile, chilean, santiago
+Colombia: colombia, colombian, bogotá, bogota, medellín, medellin
+Ghana: ghana, ghanaian, accra
+Ethiopia: ethiopia, ethiopian, addis ababa
+Tanzania: tanzania, tanzanian, dar es salaam
+Uganda: uganda, ugandan, kampala
+Rwanda: rwanda, rwandan, kigali
+Turkey: Turkey, türkiye, turkiye, istanbul, ankara
+Ukraine: ukraine, ukrainian, kyiv, kiev
+"""
+CASE_SENSITIVE = {"USA", "US", "U.S.", "U.S.A.", "UK", "U.K.", "UAE", "U.A.E.", "KSA", "NZ", "Turkey", "Nice", "China"}
+
+_ALIASES: Dict[str, str] = {}
+_EXACT: Dict[str, str] = {}
+for _line in _TABLE.strip().splitlines():
+    _country, _names = _line.split(":", 1)
+    for _name in (n.strip() for n in _names.split(",")):
+        if _name in CASE_SENSITIVE:
+            _EXACT[_name] = _country
+        else:
+            _ALIASES[_name.lower()] = _country
+
+
+def _alternation(names) -> str:
+    # Longest first so "new south wales" wins over "wales"; lookarounds instead of \b
+    # because some aliases end in "."
+    return "|".join(re.escape(n) for n in sorted(names, key=len, reverse=True))
+
+
+_ALIAS_RE = re.compile(rf"(?<![\w.])({_alternation(_ALIASES)})(?![\w])", re.IGNORECASE)
+_EXACT_RE = re.compile(rf"(?<![\w.])({_alternation(_EXACT)})(?![\w])")
+
+
+def countries_in(text: str) -> Set[str]:
+    """Every country the text mentions by name, abbreviation, demonym or place."""
+    if not text:
+        return set()
+    found = {_ALIASES[m.group(1).lower()] for m in _ALIAS_RE.finditer(text)}
+    found.update(_EXACT[m.group(1)] for m in _EXACT_RE.finditer(text))
+    return found
+
+
+def guess_country(text: str) -> Optional[str]:
+    """The one country `text` points to, or None when it names none or several."""
+    found = countries_in(text)
+    return found.pop() if len(found) == 1 else None
@@ -0,0 +1,424 @@
+"""
+Main-content extraction for scraped HTML pages.
+
+Government portals wrap a few paragraphs of useful text in mega-menus, breadcrumbs,
+cookie banners, sidebars of related links and multi-column footers. Taking all visible
+text (WebBaseLoader) or the first main/article/div (old fallback) either buries the
+requirements under navigation or returns a tiny nav div, and the research prompt only
+sees the first 4000 characters. `extract()` returns the text of the main content block:
+
+  1. parse once with a streaming tree builder: lxml's C parser when it is installed,
+     the stdlib html.parser otherwise (both much cheaper than a BeautifulSoup tree)
+  2. drop invisible and boilerplate subtrees: script/style/svg, nav/aside/footer, page
+     headers, ARIA landmarks, hidden elements, cookie banners, breadcrumbs, share bars
+     (html/body/main/article and role=main are never dropped, only their descendants)
+  3. score blocks by text density and link ratio: every paragraph-like block with
+     enough prose credits its parent and grandparent, class/id names nudge the score,
+     and each container is scaled down by its share of link text and when it carries
+     little text per tag (form fields, icon grids, layout tables)
+  4. render the best container (plus strong sibling blocks) one line per block,
+     skipping link-heavy lists; fall back to the whole cleaned page when the winner
+     holds too little of the page's text
+
+`html_to_text()` is the (text, title) shortcut used by the scrape engine.
+"""
+import os
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+try:
+    from lxml import etree
+except ImportError:  # optional: the stdlib parser is used instead
+    etree = None
+
+EXTRACT_BACKEND = os.getenv("EXTRACT_BACKEND", "lxml" if etree is not None else "stdlib")
+EXTRACT_MIN_CHARS = int(os.getenv("EXTRACT_MIN_CHARS", "200"))
+EXTRACT_MIN_SHARE = float(os.getenv("EXTRACT_MIN_SHARE", "0.2"))
+# Non-link characters per descendant tag below which a container counts as markup-heavy
+EXTRACT_DENSITY_FLOOR = float(os.getenv("EXTRACT_DENSITY_FLOOR", "10"))
+
+# Never visible: skipped with everything inside (<title> is captured separately)
+SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "math", "iframe", "object",
+    "embed", "canvas", "select", "button", "title",
+}
+BOILERPLATE_TAGS = {"nav", "aside", "footer"}
+BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "complementary", "search", "menubar", "dialog", "alertdialog"}
+# The page and its main content: never dropped, whatever their class/role/hidden state
+# (a body with "modal-open cookie-consent" or aria-hidden while a dialog shows is common)
+CONTENT_ROOT_TAGS = {"html", "body", "main", "article"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "body", "caption", "dd", "details", "dialog",
+    "div", "dl", "dt", "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3",
+    "h4", "h5", "h6", "header", "html", "legend", "li", "main", "nav", "ol", "p", "pre",
+    "section", "summary", "table", "tbody", "tfoot", "thead", "tr", "ul",
+}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+PARAGRAPH_TAGS = {"p", "pre", "td", "blockquote", "li", "dd"}
+# Containers that hold prose directly (text + <br>) on older portals
+DIV_LIKE_TAGS = {"div", "section", "article", "main", "td"}
+TAG_WEIGHTS = {
+    "main": 10, "article": 10, "div": 5, "section": 3, "pre": 3, "td": 3, "blockquote": 3,
+    "address": -3, "ol": -3, "ul": -3, "dl": -3, "dd": -3, "dt": -3, "li": -3, "form": -3,
+    "h1": -5, "h2": -5, "h3": -5, "h4": -5, "h5": -5, "h6": -5, "th": -5,
+}
+# Closing one of these implicitly closes an open sibling (only the stdlib parser needs this)
+IMPLIED_CLOSE = {"li": ("li",), "dt": ("dt", "dd"), "dd": ("dt", "dd"), "tr": ("tr", "td", "th"), "td": ("td", "th"), "th": ("td", "th")}
+IMPLIED_SCOPE = {"ul", "ol", "dl", "table", "tbody", "thead", "tfoot"}
+
+
+def _tokens(*words: str) -> "re.Pattern":
+    return re.compile(r"(?:^|[\s_-])(?:%s)(?:$|[\s_-])" % "|".join(words))
+
+
+# class/id tokens that never wrap main content: always dropped
+HARD_BOILERPLATE_RE = _tokens(
+    r"cookies?", "consent", "gdpr", r"breadcrumbs?", "crumbs", "skip", r"skip-?links?",
+    "share", "sharing", "social", "pagination", "pager", "newsletter", "subscribe",
+    "popup", "modal", r"advert\w*", "ads?",
+)
+# class/id tokens that usually mark boilerplate: penalised, dropped when small or link-heavy
+NEGATIVE_RE = _tokens(
+    "nav", "navbar", "navigation", r"menu\w*", "footer", "header", "masthead", r"side-?bar",
+    "aside", "related", "banner", r"promo\w*", "widget", "toolbar", "utility", "tags",
+    r"comments?", r"sponsor\w*", "alert", "search",
+)
+POSITIVE_RE = _tokens(
+    "article", "content", "maincontent", "contentarea", "main", "body", "bodytext", "post",
+    "entry", "story", "text", "prose", "richtext", "rte",
+)
+HIDDEN_STYLE_RE = re.compile(r"display\s*:\s*none|visibility\s*:\s*hidden")
+XML_DECLARATION_RE = re.compile(r"^\s*<\?xml[^>]*\?>")
+
+
+class Extraction(BaseModel):
+    text: str = ""
+    title: Optional[str] = None
+    strategy: str = "empty"  # "main" (scored content block) | "page" (whole cleaned page) | "empty"
+    backend: str = EXTRACT_BACKEND
+    page_chars: int = 0      # visible non-boilerplate text on the page (whitespace-trimmed)
+
+
+class _Node:
+    __slots__ = ("tag", "parent", "children", "weight", "soft", "text_len", "link_len",
+                 "own_len", "commas", "tags", "score", "has_h1")
+
+    def __init__(self, tag: str, parent: Optional["_Node"], weight: int = 0, soft: bool = False):
+        self.tag = tag
+        self.parent = parent
+        self.children: List = []  # str (text), None (line break) or _Node
+        self.weight = weight
+        self.soft = soft
+        self.text_len = 0
+        self.link_len = 0
+        self.own_len = 0  # text not inside block-level children
+        self.commas = 0
+        self.tags = 0
+        self.score = 0.0
+        self.has_h1 = False
+
+    @property
+    def link_density(self) -> float:
+        return self.link_len / self.text_len if self.text_len else 0.0
+
+    @property
+    def text_density(self) -> float:
+        return (self.text_len - self.link_len) / (self.tags + 1)
+
+    @property
+    def final_score(self) -> float:
+        density = min(1.0, self.text_density / EXTRACT_DENSITY_FLOOR)
+        return (self.score + self.weight) * (1.0 - self.link_density) * density
+
+
+class _TreeBuilder:
+    """Parser target (lxml target interface) building a pruned tree with text/link statistics."""
+
+    def __init__(self, implied_close: bool = True):
+        self.implied_close = implied_close
+        self.root = _Node("#root", None)
+        self.node = self.root
+        self.skip_tag: Optional[str] = None
+        self.skip_depth = 0
+        self.links = 0
+        self.content_depth = 0
+        self.title_parts: List[str] = []
+        self.candidates: List[_Node] = []
+
+    # -- parser callbacks --
+
+    def start(self, tag: str, attrs: Dict[str, Optional[str]]) -> None:
+        tag = tag.lower()
+        if self.skip_tag is not None:
+            if tag == self.skip_tag:
+                self.skip_depth += 1
+            return
+        if tag in VOID_TAGS:
+            if tag in ("br", "hr"):
+                self.node.children.append(None)
+            return
+        if self.implied_close:
+            self._implied_close(tag)
+
+        classid = f"{attrs.get('class') or ''} {attrs.get('id') or ''}".lower()
+        role = (attrs.get("role") or "").lower()
+        content_root = tag in CONTENT_ROOT_TAGS or role == "main"
+        if tag in SKIP_TAGS or not content_root and (
+            tag in BOILERPLATE_TAGS
+            or role in BOILERPLATE_ROLES
+            or (tag == "header" and not self.content_depth)
+            or HARD_BOILERPLATE_RE.search(classid)
+            or self._hidden(attrs)
+        ):
+            self.skip_tag, self.skip_depth = tag, 1
+            return
+
+        negative = bool(NEGATIVE_RE.search(classid))
+        positive = bool(POSITIVE_RE.search(classid)) or role == "main"
+        weight = TAG_WEIGHTS.get(tag, 0) + 25 * positive - 25 * negative
+        node = _Node(tag, self.node, weight, soft=negative)
+        self.node.children.append(node)
+        self.node = node
+        if tag == "a":
+            self.links += 1
+        if tag in ("main", "article") or role == "main":
+            self.content_depth += 1
+
+    def end(self, tag: str) -> None:
+        tag = tag.lower()
+        if self.skip_tag is not None:
+            if tag == self.skip_tag:
+                self.skip_depth -= 1
+                if not self.skip_depth:
+                    self.skip_tag = None
+            return
+        node = self.node
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is self.root:  # stray end tag
+            return
+        while True:
+            closing = self.node
+            self._close(closing)
+            if closing is node:
+                break
+
+    def data(self, text: str) -> None:
+        if self.skip_tag is not None:
+            if self.skip_tag == "title":
+                self.title_parts.append(text)
+            return
+        size = len(text.strip())
+        if not size:
+            self.node.children.append(" ")
+            return
+        node = self.node
+        node.children.append(text)
+        node.text_len += size
+        node.own_len += size
+        node.commas += text.count(",")
+        if self.links:
+            node.link_len += size
+
+    def close(self) -> "_TreeBuilder":
+        while self.node is not self.root:
+            self._close(self.node)
+        return self
+
+    # -- helpers --
+
+    @staticmethod
+    def _hidden(attrs: Dict[str, Optional[str]]) -> bool:
+        if "hidden" in attrs or (attrs.get("aria-hidden") or "").lower() == "true":
+            return True
+        style = attrs.get("style")
+        return bool(style and HIDDEN_STYLE_RE.search(style.lower()))
+
+    def _implied_close(self, tag: str) -> None:
+        if self.node.tag == "p" and tag in BLOCK_TAGS:
+            self._close(self.node)
+        siblings = IMPLIED_CLOSE.get(tag)
+        if not siblings:
+            return
+        node = self.node
+        while node is not self.root and node.tag not in IMPLIED_SCOPE:
+            if node.tag in siblings:
+                while True:
+                    closing = self.node
+                    self._close(closing)
+                    if closing is node:
+                        return
+            node = node.parent
+
+    def _close(self, node: _Node) -> None:
+        parent = node.parent
+        self.node = parent
+        if node.tag == "a":
+            self.links -= 1
+        elif node.tag in ("main", "article") and self.content_depth:
+            self.content_depth -= 1
+        parent.text_len += node.text_len
+        parent.link_len += node.link_len
+        parent.commas += node.commas
+        parent.tags += node.tags + 1
+        parent.has_h1 = parent.has_h1 or node.has_h1 or node.tag == "h1"
+        if node.tag not in BLOCK_TAGS:
+            parent.own_len += node.own_len
+
+        if node.link_density > 0.5:
+            return
+        if node.tag in PARAGRAPH_TAGS and node.text_len >= 25:
+            credit = 1 + node.commas + min(node.text_len // 100, 3)
+            self._credit(parent, credit)
+            if parent.parent is not None:
+                self._credit(parent.parent, credit / 2)
+        elif node.tag in DIV_LIKE_TAGS and node.own_len >= 25:
+            # prose held directly (text + <br>) counts as a paragraph inside the container
+            credit = 1 + min(node.commas, node.own_len // 40) + min(node.own_len // 100, 3)
+            self._credit(node, credit)
+            self._credit(parent, credit / 2)
+
+    def _credit(self, node: _Node, credit: float) -> None:
+        if not node.score:
+            self.candidates.append(node)
+        node.score += credit
+
+
+class _StdlibParser(HTMLParser):
+    """Feeds html.parser events into a _TreeBuilder (used when lxml is not installed)."""
+
+    def __init__(self, target: _TreeBuilder):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self.target.start(tag, dict(attrs))
+        if tag not in VOID_TAGS:
+            self.target.end(tag)
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+
+def _parse(html: str, backend: str) -> _TreeBuilder:
+    if backend == "lxml" and etree is not None:
+        builder = _TreeBuilder(implied_close=False)  # libxml2 already closes implied tags
+        parser = etree.HTMLParser(target=builder, recover=True, no_network=True)
+        parser.feed(XML_DECLARATION_RE.sub("", html, count=1))
+        parser.close()
+        return builder
+    builder = _TreeBuilder()
+    parser = _StdlibParser(builder)
+    parser.feed(html)
+    parser.close()
+    return builder.close()
+
+
+def _render(node: _Node, lines: List[str], line: List[str]) -> None:
+    for child in node.children:
+        if child is None:
+            _flush(lines, line)
+        elif isinstance(child, str):
+            line.append(child)
+        elif child.soft and not child.has_h1 and (child.link_density > 0.25 or child.text_len < 140):
+            continue
+        elif child.tag in BLOCK_TAGS:
+            if child.link_density > 0.5 and child.tag not in ("p", "li") and child.tag not in HEADING_TAGS:
+                continue  # menus, link lists, tag clouds
+            _flush(lines, line)
+            first = len(lines)
+            _render(child, lines, line)
+            _flush(lines, line)
+            if child.tag == "li" and len(lines) > first:
+                lines[first] = "- " + lines[first]
+        elif child.tag in ("td", "th"):
+            if "".join(line).strip():
+                line.append(" | ")
+            _render(child, lines, line)
+        else:
+            _render(child, lines, line)
+
+
+def _flush(lines: List[str], line: List[str]) -> None:
+    if line:
+        text = " ".join("".join(line).split())
+        if text:
+            lines.append(text)
+        line.clear()
+
+
+def _render_text(nodes: List[_Node]) -> str:
+    lines: List[str] = []
+    for node in nodes:
+        line: List[str] = []
+        _render(node, lines, line)
+        _flush(lines, line)
+    return "\n".join(lines)
+
+
+def _main_nodes(top: _Node) -> List[_Node]:
+    """The top candidate plus siblings that look like part of the same article."""
+    parent = top.parent
+    if parent is None:
+        return [top]
+    threshold = max(10.0, top.final_score * 0.2)
+    siblings = [c for c in parent.children if isinstance(c, _Node)]
+    keep = [
+        s is top
+        or (s.score and s.final_score >= threshold)
+        or (s.tag == "p" and s.text_len > 80 and s.link_density < 0.25)
+        for s in siblings
+    ]
+    # headings introduce the block that follows them
+    for i in range(len(siblings) - 1):
+        if siblings[i].tag in HEADING_TAGS and keep[i + 1]:
+            keep[i] = True
+    return [s for s, k in zip(siblings, keep) if k]
+
+
+def extract(html: str, backend: Optional[str] = None) -> Extraction:
+    """Main-content text and title of an HTML document (see module docstring)."""
+    backend = backend or EXTRACT_BACKEND
+    if etree is None:
+        backend = "stdlib"
+    if not html or not html.strip():
+        return Extraction(backend=backend)
+    try:
+        builder = _parse(html, backend)
+    except Exception:
+        if backend == "stdlib":
+            raise
+        backend = "stdlib"
+        builder = _parse(html, backend)
+
+    title = " ".join("".join(builder.title_parts).split()) or None
+    root = builder.root
+    page_chars = root.text_len - root.link_len
+    result = Extraction(title=title, backend=backend, page_chars=page_chars)
+    if not root.text_len:
+        return result
+
+    if builder.candidates:
+        top = max(builder.candidates, key=lambda n: n.final_score)
+        text = _render_text(_main_nodes(top))
+        if len(text) >= EXTRACT_MIN_CHARS and len(text) >= EXTRACT_MIN_SHARE * page_chars:
+            result.text, result.strategy = text, "main"
+            return result
+    result.text, result.strategy = _render_text([root]), "page"
+    return result
+
+
+def html_to_text(html: str) -> Tuple[str, Optional[str]]:
+    """(main-content text, title) of an HTML document."""
+    extraction = extract(html)
+    return extraction.text, extraction.title
@@ -0,0 +1,309 @@
+"""
+Rule-based meeting extraction for call transcripts (fast path for sch.py).
+
+Pulls the four `MeetingAnalysis` fields deterministically:
+  - email: regex, plus spoken forms ("john dot smith at gmail dot com")
+  - time:  "tomorrow at 2pm", "Monday at 10:30 am", "October 21 at 3pm", ... resolved
+           relative to the call timestamp
+  - name:  "my name is ...", "I'm ...", "this is ...", "call me ..." in the user's turns
+  - meeting_scheduled: the user agrees (in a statement, not a question) at or after the
+           turn that proposed the time, the assistant then confirms in a statement in one of
+           its last two turns, and nobody refuses, defers or asks for another time
+
+`extract_meeting()` returns the fields plus a confidence score. sch.py only skips the
+LLM when confidence reaches FAST_PATH_CONFIDENCE; anything ambiguous still goes to
+`log_analysis_chain`.
+"""
+import os
+import re
+from datetime import datetime, timedelta, time as dtime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+FAST_PATH_CONFIDENCE = float(os.getenv("MEETING_FAST_PATH_CONFIDENCE", "0.85"))
+
+# --- Emails ---
+EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+_TLDS = r"(?:com|org|net|io|co|ai|in|uk|de|fr|us|ca|au|edu|gov|biz|info|me|app|dev)"
+SPOKEN_EMAIL_RE = re.compile(
+    r"\b([a-z0-9_-]+(?:\s+(?:dot|underscore)\s+[a-z0-9_-]+)*)\s+at\s+"
+    r"([a-z0-9-]+(?:\s+dot\s+[a-z0-9-]+)*\s+dot\s+" + _TLDS + r")\b",
+    re.IGNORECASE,
+)
+
+# --- Dates & times ---
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_MONTH_NAME = r"(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sept?(?:ember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+
+TIME_12H_RE = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)(?![a-z])", re.IGNORECASE)
+TIME_24H_RE = re.compile(r"\b([01]?\d|2[0-3]):([0-5]\d)\b(?!\s*(?:am|pm|a\.m\.|p\.m\.))", re.IGNORECASE)
+NOON_RE = re.compile(r"\bnoon\b", re.IGNORECASE)
+
+RELATIVE_DAY_RE = re.compile(r"\b(day after tomorrow|tomorrow|today|tonight)\b", re.IGNORECASE)
+WEEKDAY_RE = re.compile(r"\b(next\s+)?(" + "|".join(_WEEKDAYS) + r")\b", re.IGNORECASE)
+ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+MONTH_DAY_RE = re.compile(_MONTH_NAME + r"\.?\s+(\d{1,2})(?:st|nd|rd|th)?\b", re.IGNORECASE)
+DAY_MONTH_RE = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?" + _MONTH_NAME + r"\b", re.IGNORECASE)
+
+# --- Names ---
+NAME_RE = re.compile(
+    r"(?i:\b(?:my name is|my name's|i am|i'm|this is|call me))\s+"
+    r"([A-Z][a-zA-Z'-]+(?:\s+[A-Z][a-zA-Z'-]+){0,2})"
+)
+_NOT_NAMES = {
+    "sure", "fine", "good", "free", "available", "interested", "not", "here", "busy", "happy",
+    "great", "okay", "ok", "yes", "no", "just", "looking", "calling", "afraid", "sorry",
+    "glad", "the", "a", "in", "on", "at", "actually", "really", "still", "also", "and",
+    # Dates and times: "this is Tuesday at 3pm", "I'm June 5th"
+    *_WEEKDAYS, "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december", "jan", "feb", "mar", "apr", "jun", "jul",
+    "aug", "sep", "sept", "oct", "nov", "dec", "noon", "midnight", "morning", "afternoon",
+    "evening", "tonight", "today", "tomorrow", "next", "week", "weekend",
+}
+
+# --- Agreement / confirmation ---
+AGREEMENT_RE = re.compile(
+    r"\b(yes|yeah|yep|sure|sounds good|that works|works for me|works|perfect|great|okay|ok|book it|let's do)\b",
+    re.IGNORECASE,
+)
+CONFIRMATION_RE = re.compile(
+    r"\b(you're booked|you are booked|i've booked|i have booked|booked you|"
+    r"(?:you're|you are|it's|it is|that's|that is|we're|we are|meeting is|demo is|call is)\s+(?:all\s+)?"
+    r"(?:set|scheduled|confirmed|booked)|(?:i've|i have|we've|we have)\s+(?:scheduled|confirmed)|"
+    r"i'll send (?:you )?(?:a |the )?(?:calendar )?invite|see you (?:then|on|at|tomorrow))\b",
+    re.IGNORECASE,
+)
+REFUSAL_RE = re.compile(
+    r"\b(not interested|no thanks|no thank you|don't call|do not call|remove me|can't make|cannot make|"
+    r"doesn't work|does not work|won't work|cancel|maybe later|call me later|i'll think about it)\b",
+    re.IGNORECASE,
+)
+# The user putting it off or asking for another time: "let me check my calendar", "next week instead"
+DEFERRAL_RE = re.compile(
+    r"\b(let me check|check my calendar|get back to you|i'll let you know|not sure|not great|no good|"
+    r"not good|works better|instead|another (?:day|time)|different (?:day|time)|next week|reschedule)\b",
+    re.IGNORECASE,
+)
+SENTENCE_RE = re.compile(r"[^.!?\n]+[.!?]*")
+QUESTION_START_RE = re.compile(
+    r"^\W*(?:can|could|would|will|shall|should|do|does|did|is|are|may|how about|what about|when)\b",
+    re.IGNORECASE,
+)
+
+
+class FastPathExtraction(BaseModel):
+    """Result of the rule-based extractor; same fields as sch.MeetingAnalysis plus confidence."""
+    meeting_scheduled: bool = False
+    time: Optional[str] = None
+    name: Optional[str] = None
+    email: Optional[str] = None
+    confidence: float = 0.0
+    reasons: List[str] = Field(default_factory=list)
+
+    @property
+    def is_confident(self) -> bool:
+        return self.confidence >= FAST_PATH_CONFIDENCE
+
+
+def parse_call_time(timestamp: Optional[str]) -> datetime:
+    """Parse the call's ISO timestamp (naive local time); fall back to now."""
+    if timestamp:
+        try:
+            parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+            return parsed.replace(tzinfo=None)
+        except ValueError:
+            pass
+    return datetime.now()
+
+
+def _turns(transcript_msgs: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    return [
+        (str(m.get("role", "")).lower(), str(m["transcript"]))
+        for m in transcript_msgs if m.get("transcript")
+    ]
+
+
+def find_emails(text: str) -> List[str]:
+    emails = [e.rstrip(".").lower() for e in EMAIL_RE.findall(text)]
+    for local, domain in SPOKEN_EMAIL_RE.findall(text):
+        local = re.sub(r"\s+dot\s+", ".", local, flags=re.IGNORECASE)
+        local = re.sub(r"\s+underscore\s+", "_", local, flags=re.IGNORECASE)
+        domain = re.sub(r"\s+dot\s+", ".", domain, flags=re.IGNORECASE)
+        emails.append(f"{local}@{domain}".replace(" ", "").lower())
+    return emails
+
+
+def _find_date(text: str, call_time: datetime) -> Optional[datetime]:
+    """Resolve the first date expression in `text` relative to the call."""
+    today = call_time.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    m = ISO_DATE_RE.search(text)
+    if m:
+        try:
+            return datetime(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+        except ValueError:
+            pass
+
+    m = RELATIVE_DAY_RE.search(text)
+    if m:
+        word = m.group(1).lower()
+        return today + timedelta(days={"today": 0, "tonight": 0, "tomorrow": 1, "day after tomorrow": 2}[word])
+
+    for regex, month_group, day_group in ((MONTH_DAY_RE, 1, 2), (DAY_MONTH_RE, 2, 1)):
+        m = regex.search(text)
+        if m:
+            month = _MONTHS[m.group(month_group).lower()[:3]]
+            try:
+                candidate = datetime(today.year, month, int(m.group(day_group)))
+            except ValueError:
+                continue
+            if candidate < today:
+                candidate = candidate.replace(year=today.year + 1)
+            return candidate
+
+    m = WEEKDAY_RE.search(text)
+    if m:
+        # "Monday" / "next Monday" both mean the next Monday strictly after the call
+        target = _WEEKDAYS.index(m.group(2).lower())
+        days_ahead = (target - today.weekday()) % 7 or 7
+        return today + timedelta(days=days_ahead)
+    return None
+
+
+def _find_times(text: str) -> List[dtime]:
+    times = []
+    for m in TIME_12H_RE.finditer(text):
+        hour, minute = int(m.group(1)), int(m.group(2) or 0)
+        if not 1 <= hour <= 12 or minute > 59:
+            continue
+        is_pm = m.group(3).lower().startswith("p")
+        hour = hour % 12 + (12 if is_pm else 0)
+        times.append(dtime(hour, minute))
+    for m in TIME_24H_RE.finditer(text):
+        times.append(dtime(int(m.group(1)), int(m.group(2))))
+    if NOON_RE.search(text):
+        times.append(dtime(12, 0))
+    return times
+
+
+def find_meeting_times(turns: List[Tuple[str, str]], call_time: datetime) -> List[datetime]:
+    """Every concrete datetime mentioned, in conversation order. Dates carry over to later turns."""
+    return [when for _, when in _times_by_turn(turns, call_time)]
+
+
+def _times_by_turn(turns: List[Tuple[str, str]], call_time: datetime) -> List[Tuple[int, datetime]]:
+    found = []
+    last_date = None
+    for index, (_, text) in enumerate(turns):
+        date = _find_date(text, call_time)
+        if date is not None:
+            last_date = date
+        for t in _find_times(text):
+            day = date or last_date or call_time.replace(hour=0, minute=0, second=0, microsecond=0)
+            found.append((index, datetime.combine(day.date(), t)))
+    return found
+
+
+def _statements(text: str) -> List[str]:
+    """The sentences of `text` that aren't questions ("Can we get that scheduled?" confirms nothing)."""
+    return [s for s in SENTENCE_RE.findall(text) if not s.rstrip().endswith("?") and not QUESTION_START_RE.match(s)]
+
+
+def _states(regex: "re.Pattern", text: str) -> bool:
+    return any(regex.search(sentence) for sentence in _statements(text))
+
+
+def find_name(turns: List[Tuple[str, str]]) -> Optional[str]:
+    for role, text in turns:
+        if role == "assistant":
+            continue
+        for m in NAME_RE.finditer(text):
+            words = m.group(1).split()
+            while words and words[-1].lower() in _NOT_NAMES:
+                words.pop()
+            if words and words[0].lower() not in _NOT_NAMES:
+                return " ".join(words)
+    return None
+
+
+def extract_meeting(transcript_msgs: List[Dict[str, Any]], call_timestamp: Optional[str] = None) -> FastPathExtraction:
+    """Extract meeting details from raw transcript messages and score how sure we are."""
+    call_time = parse_call_time(call_timestamp)
+    turns = _turns(transcript_msgs)
+    all_text = "\n".join(t for _, t in turns)
+
+    result = FastPathExtraction()
+    reasons = result.reasons
+
+    emails = list(dict.fromkeys(find_emails(all_text)))
+    if len(emails) == 1:
+        result.email = emails[0]
+    elif emails:
+        reasons.append(f"{len(emails)} different emails")
+    else:
+        reasons.append("no email")
+
+    timed = _times_by_turn(turns, call_time)
+    times = [when for _, when in timed]
+    if times:
+        # The last time mentioned is the one the conversation settled on
+        result.time = times[-1].strftime("%Y-%m-%dT%H:%M:%S")
+    else:
+        reasons.append("no explicit time")
+
+    result.name = find_name(turns)
+    if not result.name:
+        reasons.append("no name")
+
+    # The user agrees once the settled time is on the table, and the assistant confirms after
+    # that in one of its closing turns; questions and hedges don't count either way
+    proposed_at = next((i for i, when in timed if when == times[-1]), None) if times else None
+    agreed_at = next((i for i, (role, text) in enumerate(turns)
+                      if role != "assistant" and proposed_at is not None and i >= proposed_at
+                      and _states(AGREEMENT_RE, text)), None)
+    closing_assistant = [i for i, (role, _) in enumerate(turns) if role == "assistant"][-2:]
+    confirmed = agreed_at is not None and any(
+        i > agreed_at and _states(CONFIRMATION_RE, turns[i][1]) for i in closing_assistant
+    )
+    deferred = proposed_at is not None and any(
+        role != "assistant" and DEFERRAL_RE.search(text) for role, text in turns[proposed_at:]
+    )
+    # Only the end of the call matters for refusals ("not interested" then "ok, fine, book it")
+    closing_text = "\n".join(t for _, t in turns[-3:])
+    refused = bool(REFUSAL_RE.search(closing_text))
+    result.meeting_scheduled = bool(agreed_at is not None and confirmed and not refused and not deferred
+                                    and result.email and result.time and result.name)
+
+    if refused:
+        reasons.append("refusal near end of call")
+    if deferred:
+        reasons.append("user deferred or asked for another time")
+    if agreed_at is None:
+        reasons.append("no user agreement after the proposed time")
+    elif not confirmed:
+        reasons.append("no assistant confirmation after the agreement")
+
+    if not result.meeting_scheduled:
+        result.confidence = 0.0
+        return result
+
+    confidence = 1.0
+    if len(set(times)) > 1:
+        confidence -= 0.2
+        reasons.append("several times mentioned")
+    if not any(_find_date(t, call_time) for _, t in turns):
+        confidence -= 0.1
+        reasons.append("time without a date")
+    if len(result.name.split()) < 2:
+        confidence -= 0.1
+        reasons.append("first name only")
+    if not EMAIL_RE.search(all_text):
+        confidence -= 0.1
+        reasons.append("spoken email")
+    result.confidence = round(max(confidence, 0.0), 2)
+    return result
@@ -1,84 +1,87 @@
 import os
+import json
+import time
+import hashlib
 import uvicorn
 import asyncio
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import Dict, Any
-from langchain_community.document_loaders import WebBaseLoader
-from langchain_groq import ChatGroq
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import Dict, Any, Tuple, List, Optional, AsyncIterator
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
-from fastapi.middleware.cors import CORSMiddleware
+from runtime import Lazy, resolve, readiness, register_chain, require_env, warm_up_lifespan, chat_groq, add_cors
+from cache import SingleFlight, shared_cache, namespace
+from scraper import scraper
+from quotas import BudgetExceeded, budget_exceeded_response, tenant_of, usage_ledger
 
 # --- 1. Load Environment Variables ---
 load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
-    raise ValueError("❌ GROQ_API_KEY missing. Please set it in your .env file.")
+    print("--- ⚠️  GROQ_API_KEY missing. /generate-prompt will fail until it is set in your .env file. ---")
 
 # --- 2. FastAPI App & LLM Setup ---
-app = FastAPI(title="Dynamic Prompt Generator API")
-llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0.4)
+# The LLM is built on first use; the key is checked then rather than at import.
+llm = Lazy(lambda: chat_groq("llama-3.1-8b-instant", temperature=0.4, api_key=require_env("GROQ_API_KEY")),
+           "Prompt Generator LLM")
+LAZY_COMPONENTS = [llm]  # the chain is added once registered below
+
+app = FastAPI(title="Dynamic Prompt Generator API", lifespan=warm_up_lifespan(LAZY_COMPONENTS))
 
 # --- 3. Add CORS Middleware ---
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allows all origins
-    allow_credentials=True,
-    allow_methods=["*"],  # Allows all methods
-    allow_headers=["*"],  # Allows all headers
-)
+add_cors(app, ["*"])  # Allows all origins, methods and headers
+app.add_exception_handler(BudgetExceeded, budget_exceeded_response)
 
 # --- 4. The "Meta-Prompt" (A prompt that generates a prompt) ---
 # This is the core logic.
-async def create_system_prompt(product_name: str, product_url: str) -> str:
-    print(f"Generating system prompt for {product_name}...")
-    
-    # --- A. Scrape the website ---
-    loader = WebBaseLoader(product_url)
-    try:
-        # Run the synchronous .load() in a separate thread
-        docs = await asyncio.to_thread(loader.load)
-    except Exception as e:
-        print(f"Error scraping {product_url}: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to scrape URL: {e}")
+meta_prompt = ChatPromptTemplate.from_messages([
+    (
+        "system",
+        "You are an expert prompt engineer. Your task is to generate a complete system prompt for a friendly AI sales assistant named Alex."
+    ),
+    (
+        "human",
+        """
+        The AI will be pitching a product called: "{product_name}"
+        
+        Use this scraped website content for all product knowledge:
+        ---
+        {content}
+        ---
+
+        Generate a complete system prompt that instructs the AI to do the following:
+        1.  **First Message:** The AI's first message MUST be: "Hi, my name is Alex, and I'm a conversational AI. I'm calling today about {product_name}. Do you have 30 seconds for me to explain?"
+        2.  **The Pitch:** If the user agrees, the AI must deliver a concise, compelling 5-6 line pitch based *only* on the provided website content.
+        3.  **Next Step:** After delivering the pitch, the AI must ask a follow-up question to see if the user is interested in scheduling a meeting.
+        
+        Respond with *only* the system prompt itself, starting with "You are a friendly AI sales assistant...". Do not include any other text.
+        """
+    ),
+])
+prompt_chain = register_chain("Prompt Generator Chain", lambda: meta_prompt | resolve(llm) | StrOutputParser())
+LAZY_COMPONENTS.append(prompt_chain)
 
-    if not docs:
+
+async def scrape_product_page(product_url: str) -> str:
+    """Scraped page text (first 15k chars) for the meta-prompt."""
+    page = await scraper.fetch(product_url)
+    if page.error:
+        print(f"Error scraping {product_url}: {page.error}")
+        raise HTTPException(status_code=500, detail=f"Failed to scrape URL: {page.error}")
+
+    if not page.ok or not page.text.strip():
         print("Failed to load content.")
         raise HTTPException(status_code=404, detail="Could not load any content from the URL.")
-        
-    content = "\n\n".join(d.page_content for d in docs)[:15000]
-    
-    # --- B. Generate the new system prompt using the content ---
-    prompt_template = ChatPromptTemplate.from_messages([
-        (
-            "system",
-            "You are an expert prompt engineer. Your task is to generate a complete system prompt for a friendly AI sales assistant named Alex."
-        ),
-        (
-            "human",
-            """
-            The AI will be pitching a product called: "{product_name}"
-            
-            Use this scraped website content for all product knowledge:
-            ---
-            {content}
-            ---
-
-            Generate a complete system prompt that instructs the AI to do the following:
-            1.  **First Message:** The AI's first message MUST be: "Hi, my name is Alex, and I'm a conversational AI. I'm calling today about {product_name}. Do you have 30 seconds for me to explain?"
-            2.  **The Pitch:** If the user agrees, the AI must deliver a concise, compelling 5-6 line pitch based *only* on the provided website content.
-            3.  **Next Step:** After delivering the pitch, the AI must ask a follow-up question to see if the user is interested in scheduling a meeting.
-            
-            Respond with *only* the system prompt itself, starting with "You are a friendly AI sales assistant...". Do not include any other text.
-            """
-        ),
-    ])
-    chain = prompt_template | llm | StrOutputParser()
 
+    return page.text[:15000]
+
+
+async def generate_system_prompt(product_name: str, content: str) -> str:
     try:
-        system_prompt = await chain.ainvoke({
+        system_prompt = await prompt_chain.ainvoke({
             "product_name": product_name,
             "content": content
         })
@@ -88,7 +91,129 @@ async def create_system_prompt(product_name: str, product_url: str) -> str:
         print(f"Error calling Groq: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate prompt with LLM: {e}")
 
-# --- 5. Define Request and Response Models ---
+
+async def create_system_prompt(product_name: str, product_url: str) -> str:
+    """Uncached: scrape the page and generate a prompt from it."""
+    print(f"Generating system prompt for {product_name}...")
+    content = await scrape_product_page(product_url)
+    return await generate_system_prompt(product_name, content)
+
+
+# --- 5. Prompt Cache ---
+# The dialer asks for the same product's prompt once per outbound batch, often many
+# times at once. Generated prompts are cached under (product_name, normalized URL,
+# page content hash): a refresh that finds the page unchanged reuses the prompt
+# without an LLM call. Entries older than PROMPT_CACHE_TTL are still served while a
+# background refresh runs; after PROMPT_CACHE_MAX_STALE they are rebuilt inline.
+PROMPT_CACHE_TTL = float(os.getenv("PROMPT_CACHE_TTL", "3600"))
+PROMPT_CACHE_MAX_STALE = float(os.getenv("PROMPT_CACHE_MAX_STALE", "86400"))
+_TRACKING_PARAMS = ("utm_", "gclid", "fbclid", "mc_cid", "mc_eid")
+
+prompt_flight = SingleFlight()
+prompt_cache_stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0,
+                      "unchanged_refreshes": 0, "scrapes": 0, "llm_calls": 0}
+_refresh_tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form so trivially different URLs share a cache entry."""
+    parts = urlsplit(url.strip())
+    if not parts.scheme or not parts.netloc:
+        return url.strip()  # not an absolute URL; let the scraper report it
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _store_prompt(product_name: str, url: str, digest: str, system_prompt: str) -> None:
+    shared_cache.set(namespace("prompt", "system", product_name, url, digest), system_prompt,
+                     ttl_seconds=PROMPT_CACHE_MAX_STALE)
+    shared_cache.set(namespace("prompt", "latest", product_name, url),
+                     {"content_hash": digest, "checked_at": time.time()},
+                     ttl_seconds=PROMPT_CACHE_MAX_STALE)
+
+
+async def _build_prompt(product_name: str, url: str) -> str:
+    """Scrape (once per URL at a time), then generate (once per page version) and cache."""
+    async def scrape():
+        prompt_cache_stats["scrapes"] += 1
+        return await scrape_product_page(url)
+
+    async def generate():
+        prompt_cache_stats["llm_calls"] += 1
+        return await generate_system_prompt(product_name, content)
+
+    print(f"Generating system prompt for {product_name}...")
+    content = await prompt_flight.run(("scrape", url), scrape)
+    digest = content_hash(content)
+    prompt_key = namespace("prompt", "system", product_name, url, digest)
+
+    system_prompt = shared_cache.get(prompt_key)
+    if system_prompt is None:
+        system_prompt = await prompt_flight.run(("llm",) + prompt_key, generate)
+    else:
+        prompt_cache_stats["unchanged_refreshes"] += 1
+    _store_prompt(product_name, url, digest, system_prompt)
+    return system_prompt
+
+
+def _refresh_in_background(product_name: str, url: str) -> None:
+    if (product_name, url) in _refresh_tasks:
+        return
+    prompt_cache_stats["refreshes"] += 1
+
+    async def refresh():
+        try:
+            await prompt_flight.run(("build", product_name, url), lambda: _build_prompt(product_name, url))
+        except Exception as e:
+            # Keep serving the stale prompt; the next request tries again
+            print(f"--- ⚠️ Background prompt refresh for {product_name} failed: {e} ---")
+        finally:
+            del _refresh_tasks[(product_name, url)]
+
+    _refresh_tasks[(product_name, url)] = asyncio.create_task(refresh())
+
+
+def cached_system_prompt(product_name: str, url: str) -> Optional[Tuple[str, str]]:
+    """(prompt, "hit" | "stale") from the cache without waiting; stale entries get a background refresh."""
+    latest = shared_cache.get(namespace("prompt", "latest", product_name, url))
+    if latest is None:
+        return None
+    system_prompt = shared_cache.get(namespace("prompt", "system", product_name, url, latest["content_hash"]))
+    if system_prompt is None:
+        return None
+    if time.time() - latest["checked_at"] < PROMPT_CACHE_TTL:
+        prompt_cache_stats["hits"] += 1
+        return system_prompt, "hit"
+    prompt_cache_stats["stale_hits"] += 1
+    _refresh_in_background(product_name, url)
+    return system_prompt, "stale"
+
+
+async def get_system_prompt(product_name: str, product_url: str) -> Tuple[str, str]:
+    """Cached prompt for a product and how it was served: hit, stale or miss."""
+    url = normalize_url(product_url)
+    cached = cached_system_prompt(product_name, url)
+    if cached is not None:
+        return cached
+
+    prompt_cache_stats["misses"] += 1
+    # Concurrent identical requests share one scrape + one LLM call
+    system_prompt = await prompt_flight.run(("build", product_name, url), lambda: _build_prompt(product_name, url))
+    return system_prompt, "miss"
+
+
+# --- 6. Define Request and Response Models ---
 class PromptRequest(BaseModel):
     product_name: str
     product_url: str
@@ -96,20 +221,171 @@ class PromptRequest(BaseModel):
 class PromptResponse(BaseModel):
     system_prompt: str
 
-# --- 6. The API Endpoint ---
+# --- 7. The API Endpoint ---
 @app.post("/generate-prompt", response_model=PromptResponse)
-async def handle_generate_prompt(req: PromptRequest):
+async def handle_generate_prompt(req: PromptRequest, response: Response, request: Request):
     print(f"Received API request for {req.product_name}")
-    prompt_text = await create_system_prompt(
-        product_name=req.product_name,
-        product_url=req.product_url
-    )
+    async with usage_ledger.admission(tenant_of(request), "prompt"):
+        prompt_text, cache_status = await get_system_prompt(
+            product_name=req.product_name,
+            product_url=req.product_url
+        )
+    response.headers["X-Prompt-Cache"] = cache_status
     return PromptResponse(system_prompt=prompt_text)
 
+@app.get("/generate-prompt/stats")
+async def prompt_stats():
+    """Prompt cache counters; `coalesced` counts requests that joined an in-flight scrape/build/LLM call."""
+    return {**prompt_cache_stats, "coalesced": prompt_flight.coalesced}
+
+@app.get("/usage")
+async def usage(tenant: Optional[str] = None):
+    """LLM usage per tenant against its budgets: window tokens/requests, running and queued work, totals."""
+    return usage_ledger.report(tenant)
+
 @app.get("/")
 async def root():
     return {"message": "Dynamic Prompt Server is running. POST to /generate-prompt"}
 
-# --- 7. Run the Server ---
+@app.get("/ready")
+async def ready():
+    return readiness(LAZY_COMPONENTS)
+
+# --- 8. Bulk Prompt Generation ---
+# Catalog onboarding: many products per request. Pages are scraped concurrently (the
+# scrape engine enforces the per-host limits, see scraper.py), then prompts are
+# generated with a bounded-concurrency abatch. Results stream back as NDJSON in
+# completion order; a failed item never fails the batch.
+PROMPT_BULK_CONCURRENCY = int(os.getenv("PROMPT_BULK_CONCURRENCY", "8"))
+PROMPT_SCRAPE_CONCURRENCY = int(os.getenv("PROMPT_SCRAPE_CONCURRENCY", "16"))
+
+
+def _bulk_record(index: Optional[int], req: Optional[PromptRequest], status: str, **fields: Any) -> bytes:
+    record = {"index": index, "status": status}
+    if req is not None:
+        record.update(product_name=req.product_name, product_url=req.product_url)
+    record.update(fields)
+    return (json.dumps(record) + "\n").encode()
+
+
+async def _stream_bulk(items: List[Any]) -> AsyncIterator[bytes]:
+    """
+    Answer cache hits and invalid items right away, scrape the remaining unique URLs
+    concurrently, then generate the missing prompts with abatch_as_completed.
+    """
+    misses: Dict[Tuple[str, str], List[Tuple[int, PromptRequest]]] = {}  # (name, url) -> items asking for it
+    for index, item in enumerate(items):
+        if isinstance(item, Exception):
+            yield _bulk_record(index, None, "error", message=f"Invalid JSON line: {item}")
+            continue
+        try:
+            req = PromptRequest.model_validate(item)
+        except ValidationError as e:
+            yield _bulk_record(index, None, "error", message=f"Invalid product: {e.errors()[0]['msg']}")
+            continue
+        key = (req.product_name, normalize_url(req.product_url))
+        if key not in misses:
+            cached = cached_system_prompt(*key)
+            if cached is not None:
+                yield _bulk_record(index, req, "ok", cache=cached[1], system_prompt=cached[0])
+                continue
+            prompt_cache_stats["misses"] += 1
+            misses[key] = []
+        misses[key].append((index, req))
+    if not misses:
+        return
+
+    # --- A. Scrape every unique URL, politely ---
+    scrape_slots = asyncio.Semaphore(PROMPT_SCRAPE_CONCURRENCY)
+
+    async def scrape(url: str) -> Tuple[str, Any]:
+        async def polite_scrape():
+            prompt_cache_stats["scrapes"] += 1
+            async with scrape_slots:
+                return await scrape_product_page(url)
+        try:
+            return url, await prompt_flight.run(("scrape", url), polite_scrape)
+        except Exception as e:
+            return url, e
+
+    urls = {url for _, url in misses}
+    print(f"--- 🌐 Scraping {len(urls)} pages for {len(misses)} products ---")
+    pages: Dict[str, Tuple[str, str]] = {}  # url -> (content, hash)
+    for next_scrape in asyncio.as_completed([scrape(url) for url in urls]):
+        url, content = await next_scrape
+        if isinstance(content, Exception):
+            message = content.detail if isinstance(content, HTTPException) else str(content)
+            for key in [key for key in misses if key[1] == url]:
+                for index, req in misses.pop(key):
+                    yield _bulk_record(index, req, "error", message=message)
+            continue
+        pages[url] = (content, content_hash(content))
+
+    # --- B. Reuse prompts for unchanged pages, generate the rest in one bounded batch ---
+    pending: List[Tuple[str, str]] = []
+    for (name, url), waiting in misses.items():
+        content, digest = pages[url]
+        system_prompt = shared_cache.get(namespace("prompt", "system", name, url, digest))
+        if system_prompt is not None:
+            prompt_cache_stats["unchanged_refreshes"] += 1
+            _store_prompt(name, url, digest, system_prompt)
+            for index, req in waiting:
+                yield _bulk_record(index, req, "ok", cache="miss", system_prompt=system_prompt)
+            continue
+        pending.append((name, url))
+    if not pending:
+        return
+
+    print(f"--- 🧠 Generating {len(pending)} prompts (max concurrency {PROMPT_BULK_CONCURRENCY}) ---")
+    inputs = [{"product_name": name, "content": pages[url][0]} for name, url in pending]
+    async for i, system_prompt in prompt_chain.abatch_as_completed(
+        inputs, config={"max_concurrency": PROMPT_BULK_CONCURRENCY}, return_exceptions=True
+    ):
+        name, url = pending[i]
+        prompt_cache_stats["llm_calls"] += 1
+        if isinstance(system_prompt, Exception):
+            print(f"--- ❌ Prompt generation failed for {name}: {system_prompt} ---")
+            records = [_bulk_record(index, req, "error", message=f"Failed to generate prompt with LLM: {system_prompt}")
+                       for index, req in misses[(name, url)]]
+        else:
+            _store_prompt(name, url, pages[url][1], system_prompt)
+            records = [_bulk_record(index, req, "ok", cache="miss", system_prompt=system_prompt)
+                       for index, req in misses[(name, url)]]
+        for record in records:
+            yield record
+
+
+@app.post("/generate-prompt/bulk")
+async def handle_generate_prompt_bulk(request: Request):
+    """
+    Generate prompts for many products (JSON array of {product_name, product_url}, or
+    NDJSON with Content-Type: application/x-ndjson). Results stream back as NDJSON, one
+    line per product in completion order:
+    {"index", "status": "ok" | "error", "product_name", "product_url", "cache", "system_prompt" | "message"}.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        body = await request.body()
+        items = []
+        for line in body.splitlines():
+            if line.strip():
+                try:
+                    items.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    items.append(e)
+    else:
+        try:
+            items = await request.json()
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Body is not valid JSON.")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of products or an NDJSON stream.")
+
+    print(f"Received bulk request for {len(items)} products")
+    # One catalog, many prompts: bounded by the tenant's window budget rather than a per-request one
+    work = await usage_ledger.admit(tenant_of(request), "prompt_bulk", tokens=0, requests=0)
+    return StreamingResponse(usage_ledger.charged(work, _stream_bulk(items)), media_type="application/x-ndjson")
+
+# --- 9. Run the Server ---
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8003)
\ No newline at end of file
@@ -0,0 +1,449 @@
+"""
+Per-tenant and per-campaign LLM usage: accounting, budgets and admission control.
+
+Every pooled chat model (runtime.chat_groq) reports to `usage_callback`, which charges each
+request and its tokens to the work running in the current context (set by `admission()` /
+`running()`; ContextVars follow the graph into LangGraph's worker threads):
+
+  - a unit of work (one campaign run, one variants or regenerate request, one call log, ...)
+    has a token and a request budget (CAMPAIGN_TOKEN_BUDGET, CAMPAIGN_REQUEST_BUDGET); an LLM
+    call that would go over either fails with BudgetExceeded, and the node's usual fallback
+    takes over, so a validation loop cannot run away with the keys
+  - a tenant has a token and a request budget per rolling window (TENANT_TOKEN_BUDGET,
+    TENANT_REQUEST_BUDGET per TENANT_BUDGET_WINDOW seconds), checked on every call too, and at
+    most TENANT_MAX_CONCURRENT campaigns running at once; TENANT_BUDGETS (JSON, e.g.
+    {"acme": {"tokens": 5000000, "requests": 5000, "concurrent": 8}}) overrides them per tenant
+  - admission: new work waits (campaigns in a FIFO queue of at most TENANT_MAX_QUEUED per
+    tenant) for up to ADMISSION_WAIT seconds while its tenant has no free campaign slot or its
+    window has no room for the work's expected cost (the running average of that kind of
+    work for that tenant, capped at its token budget so work always fits an empty window), and
+    is rejected with BudgetExceeded (HTTP 429 with Retry-After: when enough of the
+    window expires for it to fit) if it does not get in
+
+A budget or limit of 0 is unlimited, and the tenant defaults are 0: out of the box every
+tenant, DEFAULT_TENANT included, is only accounted for, and the limits apply once set in
+the environment or per tenant in TENANT_BUDGETS. Token counts come from the provider's usage report, or a
+characters/4 estimate when there is none (replayed tapes, fakes). The ledger is per process:
+with several gateway workers each one enforces the budgets on its own share of the traffic.
+
+Tenants are named by the X-Tenant-ID header (or ?tenant= on WebSockets, which browsers
+cannot send headers on). Only tenants listed in TENANT_BUDGETS are told apart: requests
+naming any other tenant, or none, belong to DEFAULT_TENANT, so a made-up ID does not get a
+fresh budget. A tenant with nothing running, queued or left in its window is forgotten
+(with its totals and recent work) when another one is created.
+"""
+import os
+import json
+import time
+import asyncio
+import itertools
+import threading
+import contextvars
+from collections import Counter, deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Tenant defaults are unlimited (0): unlisted tenants all share DEFAULT_TENANT, so a default
+# cap would be a cap on the whole server
+TENANT_TOKEN_BUDGET = int(os.getenv("TENANT_TOKEN_BUDGET", "0"))
+TENANT_REQUEST_BUDGET = int(os.getenv("TENANT_REQUEST_BUDGET", "0"))
+TENANT_BUDGET_WINDOW = float(os.getenv("TENANT_BUDGET_WINDOW", "3600"))
+TENANT_MAX_CONCURRENT = int(os.getenv("TENANT_MAX_CONCURRENT", "0"))   # campaigns running at once
+TENANT_MAX_QUEUED = int(os.getenv("TENANT_MAX_QUEUED", "0"))           # campaigns waiting for a slot
+TENANT_BUDGETS: Dict[str, Dict[str, Any]] = json.loads(os.getenv("TENANT_BUDGETS", "{}"))
+CAMPAIGN_TOKEN_BUDGET = int(os.getenv("CAMPAIGN_TOKEN_BUDGET", "250000"))
+CAMPAIGN_REQUEST_BUDGET = int(os.getenv("CAMPAIGN_REQUEST_BUDGET", "100"))
+ADMISSION_WAIT = float(os.getenv("ADMISSION_WAIT", "30"))
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", "default")
+ADMISSION_POLL = 0.25  # seconds between checks while waiting for room in the window
+WORK_HISTORY = 50      # finished work kept per tenant for the usage API
+EXPECTED_WEIGHT = 0.2  # weight of the newest finished work in its tenant's expected cost of its kind
+
+
+class BudgetExceeded(Exception):
+    """Work was not admitted, or an LLM call would have gone over a tenant or campaign budget."""
+
+    def __init__(self, message: str, tenant: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.tenant = tenant
+        self.retry_after = retry_after
+
+
+@dataclass
+class Budget:
+    tokens: int
+    requests: int
+    concurrent: int
+
+
+def tenant_budget(tenant: str) -> Budget:
+    override = TENANT_BUDGETS.get(tenant, {})
+    return Budget(tokens=int(override.get("tokens", TENANT_TOKEN_BUDGET)),
+                  requests=int(override.get("requests", TENANT_REQUEST_BUDGET)),
+                  concurrent=int(override.get("concurrent", TENANT_MAX_CONCURRENT)))
+
+
+def approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+@dataclass
+class Work:
+    """One admitted unit of work and the LLM usage charged to it."""
+    id: str
+    tenant: str
+    kind: str
+    token_budget: int
+    request_budget: int
+    slot: bool
+    started: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+    queued_seconds: float = 0.0
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    reserved: int = 0  # estimated prompt tokens of calls in flight
+    rejected_calls: int = 0
+
+    @property
+    def tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "id": self.id, "kind": self.kind, "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens,
+            "tokens": self.tokens, "rejected_calls": self.rejected_calls,
+            "budget": {"tokens": self.token_budget, "requests": self.request_budget},
+            "queued_seconds": round(self.queued_seconds, 3),
+            "seconds": round((self.finished or time.time()) - self.started, 3),
+            "running": self.finished is None,
+        }
+
+
+@dataclass
+class _Tenant:
+    budget: Budget
+    window: Deque[Tuple[float, int, int]] = field(default_factory=deque)  # (time, tokens, requests)
+    window_tokens: int = 0
+    window_requests: int = 0
+    reserved: int = 0
+    works: Dict[int, Work] = field(default_factory=dict)  # running work, by id()
+    slots_used: int = 0
+    queue: Deque[object] = field(default_factory=deque)  # campaigns waiting for a slot, in arrival order
+    history: Deque[Work] = field(default_factory=lambda: deque(maxlen=WORK_HISTORY))
+    totals: Counter = field(default_factory=Counter)
+    expected: Dict[str, float] = field(default_factory=dict)  # kind -> average tokens of finished work
+
+    def expire(self, now: float, window: float) -> None:
+        while self.window and self.window[0][0] <= now - window:
+            _, tokens, requests = self.window.popleft()
+            self.window_tokens -= tokens
+            self.window_requests -= requests
+
+    def charge(self, now: float, tokens: int, requests: int) -> None:
+        self.window.append((now, tokens, requests))
+        self.window_tokens += tokens
+        self.window_requests += requests
+
+    def over_window(self, tokens: int, requests: int) -> Optional[str]:
+        """Which window budget `tokens` more tokens and `requests` more requests would exceed, if any."""
+        if self.budget.requests and self.window_requests + requests > self.budget.requests:
+            return "request"
+        if self.budget.tokens and self.window_tokens + self.reserved + tokens > self.budget.tokens:
+            return "token"
+        return None
+
+    def expected_cost(self, kind: str) -> int:
+        """The expected tokens of new `kind` work, capped at the token budget so it can always fit."""
+        expected = int(self.expected.get(kind, 0))
+        return min(expected, self.budget.tokens) if self.budget.tokens else expected
+
+    def learn(self, work: "Work") -> None:
+        previous = self.expected.get(work.kind)
+        self.expected[work.kind] = (work.tokens if previous is None
+                                    else previous + EXPECTED_WEIGHT * (work.tokens - previous))
+
+    def idle(self) -> bool:
+        """Nothing running, queued, in flight or left in the window (call `expire` first)."""
+        return not (self.works or self.queue or self.window or self.reserved)
+
+    def retry_after(self, now: float, window: float, tokens: int = 0, requests: int = 0) -> float:
+        """Seconds until enough charges leave the window for `tokens` more tokens and `requests` more requests."""
+        excess_tokens = self.window_tokens + self.reserved + tokens - self.budget.tokens if self.budget.tokens else 0
+        excess_requests = self.window_requests + requests - self.budget.requests if self.budget.requests else 0
+        until = now
+        for at, charged_tokens, charged_requests in self.window:
+            if excess_tokens <= 0 and excess_requests <= 0:
+                break
+            excess_tokens -= charged_tokens
+            excess_requests -= charged_requests
+            until = at + window
+        return max(1.0, until - now)
+
+
+_current: contextvars.ContextVar[Optional[Work]] = contextvars.ContextVar("usage_work", default=None)
+
+
+def current_work() -> Optional[Work]:
+    return _current.get()
+
+
+class UsageLedger:
+    """Budgets, admission and usage accounting for every tenant (one per process, `usage_ledger`)."""
+
+    def __init__(self, window: float = TENANT_BUDGET_WINDOW, admission_wait: float = ADMISSION_WAIT,
+                 max_queued: int = TENANT_MAX_QUEUED, budgets=tenant_budget):
+        self.window = window
+        self.admission_wait = admission_wait
+        self.max_queued = max_queued
+        self._budgets = budgets
+        self._tenants: Dict[str, _Tenant] = {}
+        self._pending: Dict[Any, Tuple[Optional[Work], str, int]] = {}  # LLM run id -> (work, tenant, estimate)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _tenant(self, name: str) -> _Tenant:
+        tenant = self._tenants.get(name)
+        if tenant is None:
+            self._evict_idle(time.time())
+            tenant = self._tenants[name] = _Tenant(self._budgets(name))
+        return tenant
+
+    def _evict_idle(self, now: float) -> None:
+        """Forget idle tenants, so tenant names that stop coming don't pile up."""
+        for name, state in list(self._tenants.items()):
+            state.expire(now, self.window)
+            if state.idle():
+                del self._tenants[name]
+
+    # --- Admission ---
+
+    async def admit(self, tenant: str, kind: str, work_id: Optional[str] = None, slot: bool = False,
+                    tokens: int = CAMPAIGN_TOKEN_BUDGET, requests: int = CAMPAIGN_REQUEST_BUDGET) -> Work:
+        """
+        Admit a unit of work for `tenant`, waiting up to `admission_wait` seconds for room.
+        `slot` work (campaigns) also needs one of the tenant's concurrent slots and waits for it
+        in arrival order. `tokens`/`requests` are the work's own budgets (0: unlimited).
+        Call `finish()` (or use `running()`) when the work is done.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + self.admission_wait
+        ticket = object()
+        with self._lock:
+            state = self._tenant(tenant)
+            expected = state.expected_cost(kind)
+            if slot:
+                if self.max_queued and len(state.queue) >= self.max_queued:
+                    state.totals["rejected"] += 1
+                    raise BudgetExceeded(f"Tenant {tenant!r} already has {len(state.queue)} campaigns waiting",
+                                         tenant, retry_after=self.admission_wait)
+                state.queue.append(ticket)
+        try:
+            waited = False
+            while True:
+                with self._lock:
+                    now = time.time()
+                    state = self._tenant(tenant)  # an idle tenant may have been evicted while we slept
+                    state.expire(now, self.window)
+                    reason = state.over_window(expected, 1)
+                    if reason is None and slot and (state.queue[0] is not ticket
+                                                    or 0 < state.budget.concurrent <= state.slots_used):
+                        reason = "concurrency"
+                    if reason is None:
+                        if slot:
+                            state.queue.popleft()
+                            state.slots_used += 1
+                        work = Work(id=work_id or f"{kind}-{next(self._ids)}", tenant=tenant, kind=kind,
+                                    token_budget=tokens, request_budget=requests, slot=slot,
+                                    queued_seconds=loop.time() - started)
+                        state.works[id(work)] = work
+                        state.totals["admitted"] += 1
+                        return work
+                    retry_after = (self.admission_wait if reason == "concurrency"
+                                   else state.retry_after(now, self.window, expected, 1))
+                    if loop.time() >= deadline:
+                        state.totals["rejected"] += 1
+                        raise BudgetExceeded(self._admission_message(tenant, reason), tenant, retry_after)
+                    if not waited:
+                        state.totals["queued"] += 1
+                        waited = True
+                await asyncio.sleep(min(ADMISSION_POLL, max(0.0, deadline - loop.time())))
+        finally:
+            with self._lock:
+                if ticket in state.queue:  # rejected or cancelled while waiting
+                    state.queue.remove(ticket)
+
+    @staticmethod
+    def _admission_message(tenant: str, reason: str) -> str:
+        if reason == "concurrency":
+            return f"Tenant {tenant!r} is running its maximum number of campaigns"
+        return f"Tenant {tenant!r} has used its LLM {reason} budget for this window"
+
+    def finish(self, work: Work) -> None:
+        """Release `work`'s slot and move it to the tenant's history (idempotent)."""
+        with self._lock:
+            if work.finished is not None:
+                return
+            work.finished = time.time()
+            state = self._tenant(work.tenant)
+            state.works.pop(id(work), None)
+            if work.slot:
+                state.slots_used -= 1
+            state.history.append(work)
+            if work.requests:
+                state.learn(work)
+
+    @contextmanager
+    def running(self, work: Work) -> Iterator[Work]:
+        """Charge the LLM calls made inside the block to `work`, and finish it at the end."""
+        token = _current.set(work)
+        try:
+            yield work
+        finally:
+            _current.reset(token)
+            self.finish(work)
+
+    @asynccontextmanager
+    async def admission(self, tenant: str, kind: str, **kwargs: Any):
+        """`admit()` and `running()` in one block."""
+        work = await self.admit(tenant, kind, **kwargs)
+        with self.running(work):
+            yield work
+
+    async def charged(self, work: Work, stream: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        """`stream` (a StreamingResponse body) with its LLM calls charged to `work`, finished when it ends."""
+        with self.running(work):
+            async for chunk in stream:
+                yield chunk
+
+    # --- LLM calls (usage_callback) ---
+
+    def start_call(self, run_id: Any, prompt_tokens: int) -> None:
+        """Check and charge one LLM request of about `prompt_tokens` against the current work and its tenant."""
+        work = _current.get()
+        tenant = work.tenant if work is not None else DEFAULT_TENANT
+        with self._lock:
+            now = time.time()
+            state = self._tenant(tenant)
+            state.expire(now, self.window)
+            problem = None
+            if work is not None and work.request_budget and work.requests + 1 > work.request_budget:
+                problem = f"{work.kind} {work.id!r} has used its {work.request_budget} LLM requests"
+            elif work is not None and work.token_budget and work.tokens + work.reserved + prompt_tokens > work.token_budget:
+                problem = f"{work.kind} {work.id!r} would go over its {work.token_budget} token budget"
+            else:
+                reason = state.over_window(prompt_tokens, 1)
+                if reason:
+                    problem = self._admission_message(tenant, reason)
+            if problem:
+                state.totals["rejected_calls"] += 1
+                if work is not None:
+                    work.rejected_calls += 1
+                raise BudgetExceeded(problem, tenant, state.retry_after(now, self.window, prompt_tokens, 1))
+            state.charge(now, 0, 1)
+            state.reserved += prompt_tokens
+            state.totals["requests"] += 1
+            if work is not None:
+                work.requests += 1
+                work.reserved += prompt_tokens
+            self._pending[run_id] = (work, tenant, prompt_tokens)
+
+    def end_call(self, run_id: Any, prompt_tokens: Optional[int] = None, completion_tokens: int = 0,
+                 failed: bool = False) -> None:
+        """Replace a call's estimate with its usage (`prompt_tokens` None: the estimate stands)."""
+        with self._lock:
+            pending = self._pending.pop(run_id, None)
+            if pending is None:
+                return
+            work, tenant, estimate = pending
+            state = self._tenant(tenant)
+            state.reserved -= estimate
+            if work is not None:
+                work.reserved -= estimate
+            if failed:
+                return
+            if prompt_tokens is None:
+                prompt_tokens = estimate
+            state.charge(time.time(), prompt_tokens + completion_tokens, 0)
+            state.totals["prompt_tokens"] += prompt_tokens
+            state.totals["completion_tokens"] += completion_tokens
+            if work is not None:
+                work.prompt_tokens += prompt_tokens
+                work.completion_tokens += completion_tokens
+
+    # --- Usage API ---
+
+    def report(self, tenant: Optional[str] = None) -> Dict[str, Any]:
+        """Window usage, budgets, running and queued work per tenant; with `tenant`, also its recent work."""
+        with self._lock:
+            now = time.time()
+            names = [tenant] if tenant is not None else sorted(self._tenants)
+            tenants = {}
+            for name in names:
+                state = self._tenants.get(name) or _Tenant(self._budgets(name))  # unknown: nothing used yet
+                state.expire(now, self.window)
+                tenants[name] = {
+                    "budget": {**asdict(state.budget), "window_seconds": self.window},
+                    "window": {"tokens": state.window_tokens, "requests": state.window_requests,
+                               "reserved_tokens": state.reserved},
+                    "campaigns_running": state.slots_used,
+                    "campaigns_queued": len(state.queue),
+                    "running": [work.report() for work in state.works.values()],
+                    "totals": {**state.totals, "tokens": state.totals["prompt_tokens"] + state.totals["completion_tokens"]},
+                    "expected_tokens": {kind: round(tokens) for kind, tokens in state.expected.items()},
+                }
+                if tenant is not None:
+                    tenants[name]["recent"] = [work.report() for work in reversed(state.history)]
+            return {"tenants": tenants}
+
+
+class UsageCallback(BaseCallbackHandler):
+    """Charges every chat model request to the current work (attached to the pooled models by runtime.chat_groq)."""
+
+    raise_error = True  # a BudgetExceeded from on_chat_model_start stops the call
+    run_inline = True   # and must run in the caller's context, where the current work is set
+
+    def __init__(self, ledger: UsageLedger):
+        self.ledger = ledger
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self.ledger.start_call(run_id, sum(approx_tokens(str(m.content)) for batch in messages for m in batch))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        generations = [g for batch in response.generations for g in batch]
+        usage = [getattr(getattr(g, "message", None), "usage_metadata", None) for g in generations]
+        if usage and all(usage):
+            prompt, completion = sum(u["input_tokens"] for u in usage), sum(u["output_tokens"] for u in usage)
+        else:
+            reported = (response.llm_output or {}).get("token_usage") or {}
+            if reported.get("prompt_tokens") is not None:
+                prompt, completion = reported["prompt_tokens"], reported.get("completion_tokens", 0)
+            else:
+                prompt, completion = None, sum(approx_tokens(g.text) for g in generations)
+        self.ledger.end_call(run_id, prompt, completion)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self.ledger.end_call(run_id, failed=True)
+
+
+usage_ledger = UsageLedger()
+usage_callback = UsageCallback(usage_ledger)
+
+
+def tenant_of(connection) -> str:
+    """The tenant a request or WebSocket belongs to (X-Tenant-ID header, or ?tenant=): DEFAULT_TENANT unless listed in TENANT_BUDGETS."""
+    name = (connection.headers.get("x-tenant-id") or connection.query_params.get("tenant") or "").strip()
+    return name if name in TENANT_BUDGETS else DEFAULT_TENANT
+
+
+async def budget_exceeded_response(request, exc: BudgetExceeded):
+    """FastAPI exception handler: 429 with Retry-After."""
+    from fastapi.responses import JSONResponse
+
+    headers = {"Retry-After": str(int(exc.retry_after + 0.999))} if exc.retry_after else None
+    return JSONResponse({"detail": str(exc), "tenant": exc.tenant}, status_code=429, headers=headers)
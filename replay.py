@@ -0,0 +1,529 @@
+"""
+Record/replay of external calls, for offline runs and benchmarks of the campaign graph.
+
+A `Tape` captures every call PROMETHEO makes to the outside world into a JSONL
+fixture file and plays it back later with configurable latency:
+
+    kind     captured at                                            matched on
+    llm      runtime.chat_groq models (every chain in every server)  model + messages
+    search   foundry_server.tavily_tool                              query
+    http     runtime.http_session() (Unsplash, Slack, Telegram,      method + masked URL + body digest
+             Vercel) and the scrape engine's httpx client
+
+Enable it with environment variables before the servers start:
+
+    PROMETHEO_TAPE=record|replay
+    PROMETHEO_TAPE_PATH=tapes/campaign.jsonl
+    PROMETHEO_TAPE_LATENCY=recorded | recorded*0.5 | 0 | llm=1.2,search=0.6,http=0.1
+    PROMETHEO_TAPE_STRICT=1          # fail on calls that were never recorded
+
+or call `replay.install(Tape(...))` before the first LLM, tool or HTTP pool is built.
+
+Secrets stay off the tape. Request headers are not stored, and token-like URL path
+segments (Telegram bot tokens, Slack webhook ids) and key/token query parameters are
+masked. ISO dates are ignored when matching, so prompts that embed today's date still
+replay. Recorded calls can be played any number of times (concurrent sessions, repeated
+runs; counted in `reused`). A call whose key was never recorded gets the next unplayed
+call of the same kind instead (counted in `fallbacks`), or raises with strict=True.
+"""
+import os
+import re
+import json
+import time
+import base64
+import asyncio
+import hashlib
+import threading
+from collections import Counter, defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+import resilience
+
+PROMETHEO_TAPE = os.getenv("PROMETHEO_TAPE", "").strip().lower()
+PROMETHEO_TAPE_PATH = os.getenv("PROMETHEO_TAPE_PATH", "prometheo_tape.jsonl")
+PROMETHEO_TAPE_LATENCY = os.getenv("PROMETHEO_TAPE_LATENCY", "recorded")
+PROMETHEO_TAPE_STRICT = os.getenv("PROMETHEO_TAPE_STRICT", "0") == "1"
+
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?")
+_SECRET_PARAM_RE = re.compile(r"key|token|secret|signature|password|client_id|sig$", re.IGNORECASE)
+_SECRET_SEGMENT_RE = re.compile(r"^(?=.*\d)(?=.*[A-Za-z])[\w:.~-]{8,}$")
+_KEPT_HEADERS = ("content-type", "location")
+
+
+class TapeMiss(LookupError):
+    """Raised in replay when a call has no recorded counterpart (strict mode, or an empty tape)."""
+
+
+# --- Matching helpers ---
+
+def mask_url(url: str) -> str:
+    """URL with token-like path segments and secret query parameters replaced by '*'."""
+    parts = urlsplit(url)
+    path = "/".join("*" if _SECRET_SEGMENT_RE.match(seg) else seg for seg in parts.path.split("/"))
+    query = urlencode([(k, "*" if _SECRET_PARAM_RE.search(k) else v) for k, v in parse_qsl(parts.query, keep_blank_values=True)])
+    return urlunsplit((parts.scheme, parts.netloc, path, query, ""))
+
+
+def body_digest(body: Any) -> Optional[str]:
+    if not body:
+        return None
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    if not isinstance(body, (bytes, bytearray)):
+        return None  # streamed/generator bodies are not matched on
+    return hashlib.sha1(_DATE_RE.sub("", body.decode("utf-8", errors="replace")).encode("utf-8")).hexdigest()[:16]
+
+
+def request_key(kind: str, request: Dict[str, Any]) -> str:
+    text = _DATE_RE.sub("", json.dumps(request, sort_keys=True, default=str))
+    return hashlib.sha1(f"{kind}|{text}".encode("utf-8")).hexdigest()[:20]
+
+
+def _pack_body(content: bytes) -> Dict[str, str]:
+    try:
+        return {"text": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"base64": base64.b64encode(content).decode("ascii")}
+
+
+def _unpack_body(data: Dict[str, str]) -> bytes:
+    if "base64" in data:
+        return base64.b64decode(data["base64"])
+    return data.get("text", "").encode("utf-8")
+
+
+class Latency:
+    """
+    Replay delay per call, parsed from a spec such as:
+      "recorded"          the latency seen while recording (default)
+      "recorded*0.5"      recorded latency scaled
+      "0" / "0.2"         the same fixed delay for every call
+      "llm=1.2,http=0.1"  fixed delay per kind; kinds not listed use the other terms
+    """
+
+    def __init__(self, spec: str = "recorded"):
+        self.spec = spec
+        self.per_kind: Dict[str, float] = {}
+        self.fixed: Optional[float] = None
+        self.scale = 1.0
+        for term in filter(None, (t.strip() for t in (spec or "recorded").split(","))):
+            if "=" in term:
+                kind, seconds = term.split("=", 1)
+                self.per_kind[kind.strip()] = float(seconds)
+            elif term.startswith("recorded"):
+                self.scale = float(term.split("*", 1)[1]) if "*" in term else 1.0
+            else:
+                self.fixed = float(term)
+
+    def seconds(self, kind: str, recorded: float) -> float:
+        if kind in self.per_kind:
+            return self.per_kind[kind]
+        if self.fixed is not None:
+            return self.fixed
+        return max(0.0, recorded * self.scale)
+
+
+# --- Tape ---
+
+class Tape:
+    """
+    One fixture file of recorded calls.
+    `backends` optionally replaces the real services while recording ({kind: factory}),
+    which is how synthetic demo tapes are produced without credentials.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", latency: str = "recorded", strict: bool = False,
+                 backends: Optional[Dict[str, Callable[..., Any]]] = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"tape mode must be 'record' or 'replay', not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.latency = Latency(latency)
+        self.strict = strict
+        self.backends = backends or {}
+        self._lock = threading.Lock()
+        self._by_key: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._by_kind: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._all_by_key: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._all_by_kind: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.calls: Counter = Counter()
+        self.fallbacks: Counter = Counter()
+        self.reused: Counter = Counter()
+        self._replays: Counter = Counter()
+        self.injected_seconds = 0.0
+        if mode == "replay":
+            self._load()
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            open(path, "w").close()
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _load(self) -> None:
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                entry["played"] = False
+                for index, name in ((self._by_key, entry["key"]), (self._by_kind, entry["kind"])):
+                    index[name].append(entry)
+                self._all_by_key[entry["key"]].append(entry)
+                self._all_by_kind[entry["kind"]].append(entry)
+
+    def rewind(self) -> None:
+        """Make every recorded call playable again (e.g. before the next benchmark run)."""
+        with self._lock:
+            self._by_key.clear()
+            self._by_kind.clear()
+            self.reused.clear()
+            self._replays.clear()
+            for entries in self._all_by_kind.values():
+                for entry in entries:
+                    entry["played"] = False
+                    self._by_key[entry["key"]].append(entry)
+                    self._by_kind[entry["kind"]].append(entry)
+
+    # -- record --
+
+    def record(self, kind: str, request: Dict[str, Any], response: Any, elapsed: float) -> None:
+        entry = {
+            "kind": kind,
+            "key": request_key(kind, request),
+            "request": request,
+            "response": response,
+            "elapsed": round(elapsed, 4),
+        }
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            self.calls[kind] += 1
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def backend(self, kind: str) -> Optional[Callable[..., Any]]:
+        return self.backends.get(kind)
+
+    # -- replay --
+
+    @staticmethod
+    def _take(queue: Optional[Deque[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        while queue:
+            entry = queue.popleft()
+            if not entry["played"]:
+                entry["played"] = True
+                return entry
+        return None
+
+    def lookup(self, kind: str, request: Dict[str, Any]) -> Tuple[Any, float]:
+        """(recorded response, delay to inject) for a call."""
+        key = request_key(kind, request)
+        with self._lock:
+            entry = self._take(self._by_key.get(key))
+            if entry is None and key in self._all_by_key:
+                # already played (concurrent sessions, repeated runs): replay the same call again
+                entry = self._cycle(key, self._all_by_key[key])
+                self.reused[kind] += 1
+            if entry is None:
+                if self.strict:
+                    raise TapeMiss(f"no recorded {kind} call matches {json.dumps(request, default=str)[:200]}")
+                entry = self._take(self._by_kind.get(kind))
+                if entry is None:
+                    if not self._all_by_kind.get(kind):
+                        raise TapeMiss(f"tape {self.path} has no {kind} calls")
+                    entry = self._cycle(kind, self._all_by_kind[kind])
+                self.fallbacks[kind] += 1
+            self.calls[kind] += 1
+            delay = self.latency.seconds(kind, entry.get("elapsed", 0.0))
+            self.injected_seconds += delay
+        return entry["response"], delay
+
+    def _cycle(self, name: str, entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        entry = entries[self._replays[name] % len(entries)]
+        self._replays[name] += 1
+        return entry
+
+    def play(self, kind: str, request: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        """The recorded response after the injected delay; a delay past `timeout` times out like the real client."""
+        response, delay = self.lookup(kind, request)
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"replayed {kind} call took {delay:.1f}s, timeout {timeout:.1f}s")
+        if delay:
+            time.sleep(delay)
+        return response
+
+    async def aplay(self, kind: str, request: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        response, delay = self.lookup(kind, request)
+        if timeout is not None and delay > timeout:
+            await asyncio.sleep(timeout)
+            raise TimeoutError(f"replayed {kind} call took {delay:.1f}s, timeout {timeout:.1f}s")
+        if delay:
+            await asyncio.sleep(delay)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "path": self.path,
+                "latency": self.latency.spec,
+                "calls": dict(self.calls),
+                "fallbacks": dict(self.fallbacks),
+                "reused": dict(self.reused),
+                "injected_seconds": round(self.injected_seconds, 3),
+            }
+
+
+_active: Optional[Tape] = None
+
+
+def install(tape: Optional[Tape]) -> Optional[Tape]:
+    """Make `tape` the active tape (None disables record/replay). Returns the previous one."""
+    global _active
+    previous, _active = _active, tape
+    return previous
+
+
+def active_tape() -> Optional[Tape]:
+    return _active
+
+
+def stats() -> Optional[Dict[str, Any]]:
+    return _active.stats() if _active is not None else None
+
+
+# --- LLM ---
+
+class TapeChatModel(BaseChatModel):
+    """Chat model that records the wrapped model's answers, or replays them without it."""
+
+    model_name: str
+    tape: Any
+    inner: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return f"tape-{self.tape.mode}"
+
+    def bind_tools(self, tools: List[Any], *, tool_choice: Any = None, **kwargs: Any):
+        # with_structured_output on a taped model always goes through tool calling;
+        # "any" is the OpenAI-style "required" on the wire
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools],
+                         tool_choice="required" if tool_choice == "any" else tool_choice, **kwargs)
+
+    def _request(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        request = {"model": self.model_name, "messages": [[m.type, m.content] for m in messages], "stop": stop}
+        if kwargs.get("tools"):  # only then, so tapes recorded before tool calling still match
+            request["tools"] = [t["function"]["name"] for t in kwargs["tools"]]
+        return request
+
+    @staticmethod
+    def _result(response: Dict[str, Any]) -> ChatResult:
+        message = AIMessage(content=response["content"], tool_calls=response.get("tool_calls") or [],
+                            usage_metadata=response.get("usage"))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    @staticmethod
+    def _response(message: BaseMessage) -> Dict[str, Any]:
+        response = {"content": message.content, "usage": getattr(message, "usage_metadata", None)}
+        if getattr(message, "tool_calls", None):
+            response["tool_calls"] = message.tool_calls
+        return response
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        request = self._request(messages, stop, kwargs)
+        if self.tape.replaying:
+            return self._result(self.tape.play("llm", request, kwargs.get("timeout", resilience.remaining())))
+        started = time.monotonic()
+        message = self.inner.invoke(messages, stop=stop, **kwargs)
+        response = self._response(message)
+        self.tape.record("llm", request, response, time.monotonic() - started)
+        return self._result(response)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        request = self._request(messages, stop, kwargs)
+        if self.tape.replaying:
+            return self._result(await self.tape.aplay("llm", request, kwargs.get("timeout", resilience.remaining())))
+        started = time.monotonic()
+        message = await self.inner.ainvoke(messages, stop=stop, **kwargs)
+        response = self._response(message)
+        self.tape.record("llm", request, response, time.monotonic() - started)
+        return self._result(response)
+
+
+def chat_model(model: str, factory: Callable[[], Any]) -> Any:
+    """`factory()` when no tape is active; otherwise a recording/replaying wrapper (the real model is not built for replay)."""
+    tape = _active
+    if tape is None:
+        return factory()
+    inner = None
+    if tape.recording:
+        backend = tape.backend("llm")
+        inner = backend(model) if backend else factory()
+    return TapeChatModel(model_name=model, tape=tape, inner=inner)
+
+
+# --- Tools (web search) ---
+
+class TapeTool:
+    """Tool wrapper with the `invoke`/`ainvoke` surface the nodes use."""
+
+    def __init__(self, kind: str, tape: Tape, inner: Any = None):
+        self.kind = kind
+        self.tape = tape
+        self.inner = inner
+        self.name = getattr(inner, "name", kind)
+
+    def invoke(self, input: Any, config: Any = None, **kwargs: Any) -> Any:
+        request = {"input": input}
+        if self.tape.replaying:
+            return self.tape.play(self.kind, request)
+        started = time.monotonic()
+        result = self.inner.invoke(input, config, **kwargs)
+        self.tape.record(self.kind, request, result, time.monotonic() - started)
+        return result
+
+    async def ainvoke(self, input: Any, config: Any = None, **kwargs: Any) -> Any:
+        request = {"input": input}
+        if self.tape.replaying:
+            return await self.tape.aplay(self.kind, request)
+        started = time.monotonic()
+        result = await self.inner.ainvoke(input, config, **kwargs)
+        self.tape.record(self.kind, request, result, time.monotonic() - started)
+        return result
+
+
+def tool(kind: str, factory: Callable[[], Any]) -> Any:
+    """`factory()` when no tape is active; otherwise a recording/replaying wrapper."""
+    tape = _active
+    if tape is None:
+        return factory()
+    inner = None
+    if tape.recording:
+        backend = tape.backend(kind)
+        inner = backend() if backend else factory()
+    return TapeTool(kind, tape, inner)
+
+
+# --- HTTP ---
+
+def _http_request(method: str, url: str, body: Any) -> Dict[str, Any]:
+    return {"method": method, "url": mask_url(url), "body": body_digest(body)}
+
+
+def _http_response(status: int, headers: Any, content: bytes) -> Dict[str, Any]:
+    kept = {k: headers[k] for k in _KEPT_HEADERS if k in headers}
+    return {"status": status, "headers": kept, **_pack_body(content)}
+
+
+class TapeAdapter(BaseAdapter):
+    """`requests` transport adapter that records through `inner` or replays from the tape."""
+
+    def __init__(self, tape: Tape, inner: Optional[BaseAdapter] = None):
+        super().__init__()
+        self.tape = tape
+        self.inner = inner
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        call = _http_request(request.method, request.url, request.body)
+        if self.tape.replaying:
+            return self._build(request, self.tape.play("http", call))
+        backend = self.tape.backend("http")
+        started = time.monotonic()
+        if backend:
+            data = backend(request.method, request.url, request.body)
+            self.tape.record("http", call, data, time.monotonic() - started)
+            return self._build(request, data)
+        response = self.inner.send(request, stream=False, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        self.tape.record("http", call, _http_response(response.status_code, response.headers, response.content),
+                         time.monotonic() - started)
+        return response
+
+    @staticmethod
+    def _build(request, data: Dict[str, Any]) -> requests.Response:
+        response = requests.Response()
+        response.status_code = data["status"]
+        response.headers = CaseInsensitiveDict(data.get("headers") or {})
+        response._content = _unpack_body(data)
+        response.url = request.url
+        response.request = request
+        response.reason = "Replayed"
+        return response
+
+    def close(self):
+        if self.inner is not None:
+            self.inner.close()
+
+
+class TapeAsyncTransport(httpx.AsyncBaseTransport):
+    """httpx transport that records through `inner` or replays from the tape."""
+
+    def __init__(self, tape: Tape, inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.tape = tape
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        try:
+            body = request.content
+        except httpx.RequestNotRead:
+            body = None
+        call = _http_request(request.method, str(request.url), body)
+        if self.tape.replaying:
+            return self._build(request, await self.tape.aplay("http", call))
+        backend = self.tape.backend("http")
+        started = time.monotonic()
+        if backend:
+            data = backend(request.method, str(request.url), body)
+        else:
+            response = await self.inner.handle_async_request(request)
+            try:
+                content = await response.aread()  # decoded: content-encoding is not kept
+            finally:
+                await response.aclose()
+            data = _http_response(response.status_code, response.headers, content)
+        self.tape.record("http", call, data, time.monotonic() - started)
+        return self._build(request, data)
+
+    @staticmethod
+    def _build(request: httpx.Request, data: Dict[str, Any]) -> httpx.Response:
+        return httpx.Response(data["status"], headers=data.get("headers") or {}, content=_unpack_body(data), request=request)
+
+    async def aclose(self) -> None:
+        if self.inner is not None:
+            await self.inner.aclose()
+
+
+def http_adapter(inner: BaseAdapter) -> BaseAdapter:
+    """`inner` when no tape is active; otherwise a recording/replaying adapter around it."""
+    return TapeAdapter(_active, inner) if _active is not None else inner
+
+
+def async_transport(factory: Callable[[], httpx.AsyncBaseTransport]) -> Optional[httpx.AsyncBaseTransport]:
+    """None (httpx default transport) when no tape is active; otherwise a recording/replaying transport."""
+    tape = _active
+    if tape is None:
+        return None
+    inner = factory() if tape.recording and not tape.backend("http") else None
+    return TapeAsyncTransport(tape, inner)
+
+
+if PROMETHEO_TAPE:
+    install(Tape(PROMETHEO_TAPE_PATH, PROMETHEO_TAPE, PROMETHEO_TAPE_LATENCY, PROMETHEO_TAPE_STRICT))
@@ -0,0 +1,390 @@
+"""
+Circuit breakers, hedged requests, campaign deadlines and per-node time budgets.
+
+Every outside call a campaign makes (Tavily searches, Unsplash lookups, government
+website scrapes) goes through a named `Dependency`:
+
+  - a circuit breaker opens after BREAKER_FAILURES consecutive failures; while it is
+    open, calls raise `CircuitOpen` immediately, so callers drop straight into their
+    existing fallbacks instead of waiting out the timeout again. After BREAKER_RESET
+    seconds one probe call is let through (half-open); its outcome closes or re-opens it
+  - hedged dependencies (idempotent reads only) send a backup request when the first
+    has not answered within the dependency's recent p95 latency (HEDGE_AFTER until
+    there is enough history), unless its last call failed; the first answer wins
+  - the campaign deadline set with `campaign_deadline(seconds)` caps every call's wait;
+    once it has passed, calls raise `DeadlineExceeded` without being made
+
+The deadline is split into per-node budgets (`node_budget`, `budgeted`): a node's
+calls are capped at the node's budget, nodes can check `short_on_time()` and
+`degrade()` (skip optional work), and `CampaignClock.report()` says per node what it
+was given, what it used and what it skipped. The LLM clients built by
+runtime.chat_groq take their request timeout from `remaining()` as well.
+
+Clock and budget live in context variables, so they follow the campaign into
+LangGraph's worker threads (and into the threads calls run on here) without being
+passed around. A call that times out is abandoned, not cancelled: its thread
+finishes in the background and is bounded by the client's own timeout.
+
+`dependency_stats()` reports breaker state, counters and latency per dependency.
+"""
+import os
+import time
+import functools
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "3"))
+BREAKER_RESET = float(os.getenv("BREAKER_RESET", "30"))
+HEDGE_AFTER = float(os.getenv("HEDGE_AFTER", "2.0"))
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+RESILIENCE_WORKERS = int(os.getenv("RESILIENCE_WORKERS", "32"))
+
+_pool = ThreadPoolExecutor(max_workers=RESILIENCE_WORKERS, thread_name_prefix="dependency")
+
+
+class Unavailable(Exception):
+    """The dependency was not called, or its answer was not waited for."""
+
+
+class CircuitOpen(Unavailable):
+    pass
+
+
+class DeadlineExceeded(Unavailable):
+    pass
+
+
+# --- Campaign deadline and node budgets ---
+
+class CampaignClock:
+    """
+    A campaign's deadline and where the time went. `plan` maps node names, in pipeline
+    order, to their share of the campaign. A node entering `node_budget(name)` gets its
+    share of the time still left, relative to itself and the nodes after it, so time one
+    node does not use flows on to the later ones. Without a deadline, nodes only have
+    their time recorded.
+    """
+
+    def __init__(self, seconds: Optional[float], plan: Optional[Dict[str, float]] = None):
+        self.started = time.monotonic()
+        self.seconds = seconds if seconds and seconds > 0 else None
+        self.deadline = self.started + self.seconds if self.seconds else None
+        self.plan = dict(plan or {})
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def remaining(self) -> Optional[float]:
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def allot(self, name: str) -> Optional[float]:
+        """The budget for a run of `name` starting now."""
+        left = self.remaining()
+        if left is None or name not in self.plan:
+            return left
+        names = list(self.plan)
+        later = names[names.index(name):]
+        return left * self.plan[name] / sum(self.plan[n] for n in later)
+
+    def reserved_after(self, name: str) -> float:
+        """Seconds the plan sets aside for the nodes after `name`."""
+        if not self.seconds or name not in self.plan:
+            return 0.0
+        names = list(self.plan)
+        later = sum(self.plan[n] for n in names[names.index(name) + 1:])
+        return self.seconds * later / sum(self.plan.values())
+
+    def last_run(self, name: str) -> float:
+        with self._lock:
+            return self.nodes.get(name, {}).get("last_s", 0.0)
+
+    def _entry(self, name: str) -> Dict[str, Any]:
+        return self.nodes.setdefault(name, {"runs": 0, "budget_s": None, "used_s": 0.0, "last_s": 0.0,
+                                            "exhausted": 0, "degraded": []})
+
+    def record(self, name: str, budget: Optional[float], used: float) -> None:
+        with self._lock:
+            entry = self._entry(name)
+            entry["runs"] += 1
+            entry["used_s"] += used
+            entry["last_s"] = used
+            if budget is not None:
+                entry["budget_s"] = (entry["budget_s"] or 0.0) + budget
+                entry["exhausted"] += used >= budget - 0.01  # ran until its budget was gone
+
+    def degrade(self, name: str, what: str) -> None:
+        with self._lock:
+            self._entry(name)["degraded"].append(what)
+
+    def report(self) -> Dict[str, Any]:
+        """Per-node budget usage for the `done` event."""
+        with self._lock:
+            nodes = {name: {**entry, "budget_s": None if entry["budget_s"] is None else round(entry["budget_s"], 2),
+                            "used_s": round(entry["used_s"], 2), "degraded": list(entry["degraded"])}
+                     for name, entry in self.nodes.items()}
+        for entry in nodes.values():
+            del entry["last_s"]
+        left = self.remaining()
+        return {"deadline_s": self.seconds, "elapsed_s": round(time.monotonic() - self.started, 2),
+                "remaining_s": None if left is None else round(left, 2), "nodes": nodes}
+
+
+_clock: contextvars.ContextVar[Optional[CampaignClock]] = contextvars.ContextVar("campaign_clock", default=None)
+_node: contextvars.ContextVar[Optional[tuple]] = contextvars.ContextVar("campaign_node", default=None)  # (name, deadline)
+
+
+@contextmanager
+def campaign_deadline(seconds: Optional[float], plan: Optional[Dict[str, float]] = None):
+    """
+    Give the calls made inside the block `seconds` in total (None or <= 0: no deadline),
+    split between nodes by `plan`. Yields the `CampaignClock`.
+    """
+    clock = CampaignClock(seconds, plan)
+    token = _clock.set(clock)
+    try:
+        yield clock
+    finally:
+        _clock.reset(token)
+
+
+def campaign_clock() -> Optional[CampaignClock]:
+    return _clock.get()
+
+
+@contextmanager
+def node_budget(name: str):
+    """Run the block as node `name`: calls inside are capped at the node's budget, and its time is recorded."""
+    clock = _clock.get()
+    if clock is None:
+        yield
+        return
+    budget = clock.allot(name)
+    started = time.monotonic()
+    token = _node.set((name, None if budget is None else started + budget))
+    try:
+        yield
+    finally:
+        _node.reset(token)
+        clock.record(name, budget, time.monotonic() - started)
+
+
+def budgeted(name: str, node: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    """Wrap a graph node so it runs under `node_budget(name)`."""
+    @functools.wraps(node)
+    def run(state):
+        with node_budget(name):
+            return node(state)
+    return run
+
+
+@contextmanager
+def outside_node():
+    """Work started by a node that outlives it (e.g. speculation) is held to the campaign deadline only."""
+    token = _node.set(None)
+    try:
+        yield
+    finally:
+        _node.reset(token)
+
+
+def degrade(what: str, node: Optional[str] = None) -> None:
+    """Record that `node` (default: the current one) cut `what` short to stay within its budget."""
+    clock, current = _clock.get(), _node.get()
+    name = node or (current[0] if current else "campaign")
+    print(f"--- ⏱️ {name}: {what} (short on time) ---")
+    if clock is not None:
+        clock.degrade(name, what)
+
+
+def remaining(default: Optional[float] = None) -> Optional[float]:
+    """Seconds left before the node's or the campaign's deadline, capped at `default`; None when none applies."""
+    clock, node = _clock.get(), _node.get()
+    deadlines = [d for d in (clock.deadline if clock else None, node[1] if node else None) if d is not None]
+    if not deadlines:
+        return default
+    left = max(0.0, min(deadlines) - time.monotonic())
+    return left if default is None else min(default, left)
+
+
+def short_on_time(seconds: float) -> bool:
+    """True when there is a deadline and fewer than `seconds` are left before it."""
+    left = remaining()
+    return left is not None and left < seconds
+
+
+# --- Dependencies ---
+
+class Dependency:
+    """One external dependency: a circuit breaker, a latency window for hedging, and counters."""
+
+    def __init__(self, name: str, timeout: Optional[float] = None, hedge: bool = False,
+                 failures: int = BREAKER_FAILURES, reset_after: float = BREAKER_RESET,
+                 is_failure: Optional[Callable[[Any], bool]] = None):
+        self.name = name
+        self.timeout = timeout
+        self.hedge = hedge
+        self.failures = failures
+        self.reset_after = reset_after
+        self.is_failure = is_failure  # for clients that report errors in their result instead of raising
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self.counters = {"calls": 0, "ok": 0, "failures": 0, "timeouts": 0, "short_circuits": 0,
+                         "deadline_skips": 0, "opened": 0, "hedges": 0, "hedge_wins": 0}
+
+    # -- breaker --
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._state == "open":
+                if time.monotonic() - self._opened_at < self.reset_after or self._probing:
+                    self.counters["short_circuits"] += 1
+                    raise CircuitOpen(f"{self.name}: circuit open after {self._consecutive} failures")
+                self._state, self._probing = "half_open", True
+            elif self._state == "half_open":
+                if self._probing:
+                    self.counters["short_circuits"] += 1
+                    raise CircuitOpen(f"{self.name}: circuit half-open, probe in flight")
+                self._probing = True
+            self.counters["calls"] += 1
+
+    def _settle(self, ok: bool, elapsed: Optional[float] = None) -> None:
+        with self._lock:
+            self._probing = False
+            if ok:
+                self.counters["ok"] += 1
+                self._consecutive = 0
+                self._state = "closed"
+                if elapsed is not None:
+                    self._latencies.append(elapsed)
+                return
+            self.counters["failures"] += 1
+            self._consecutive += 1
+            if self._state == "half_open" or self._consecutive >= self.failures:
+                if self._state != "open":
+                    self.counters["opened"] += 1
+                    print(f"--- ⚡ Circuit for {self.name} opened after {self._consecutive} failures ---")
+                self._state, self._opened_at = "open", time.monotonic()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_after:
+                return "half_open"
+            return self._state
+
+    # -- calls --
+
+    def hedge_delay(self) -> float:
+        """When to send the backup request: the recent p95 latency, or HEDGE_AFTER until there is enough history."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_AFTER
+        return samples[int(len(samples) * 0.95) - 1]
+
+    def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        `fn(*args, **kwargs)` through the breaker, the campaign deadline and, for hedged
+        dependencies, a backup request. Raises `Unavailable` (or what `fn` raised) on failure.
+        """
+        budget = remaining(self.timeout)
+        if budget is not None and budget <= 0:
+            with self._lock:
+                self.counters["deadline_skips"] += 1
+            raise DeadlineExceeded(f"{self.name}: time budget spent")
+        self._admit()
+        started = time.monotonic()
+        try:
+            if budget is None and not self.hedge:
+                result = fn(*args, **kwargs)
+            else:
+                result = self._wait(fn, args, kwargs, budget)
+        except DeadlineExceeded:
+            with self._lock:
+                self.counters["timeouts"] += 1
+                if self.timeout is None or budget < self.timeout:
+                    # Cut short by the campaign deadline, not the dependency's own timeout: no verdict
+                    self._probing = False
+                    raise
+            self._settle(False)
+            raise
+        except Exception:
+            self._settle(False)
+            raise
+        failed = self.is_failure is not None and self.is_failure(result)
+        self._settle(not failed, time.monotonic() - started)
+        return result
+
+    def _wait(self, fn: Callable[..., Any], args: tuple, kwargs: dict, budget: Optional[float]) -> Any:
+        started = time.monotonic()
+
+        def submit():
+            # The worker sees this campaign's deadline too
+            return _pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+        primary = submit()
+        pending = {primary}
+        with self._lock:
+            # A dependency that just failed is more likely down than slow; don't double its load
+            hedge = self.hedge and self._consecutive == 0
+        if hedge:
+            delay = self.hedge_delay()
+            if budget is None or delay < budget:
+                done, _ = wait(pending, timeout=delay)
+                if not done:
+                    with self._lock:
+                        self.counters["hedges"] += 1
+                    pending.add(submit())
+        error: Optional[BaseException] = None
+        while pending:
+            left = None if budget is None else budget - (time.monotonic() - started)
+            if left is not None and left <= 0:
+                break
+            done, pending = wait(pending, timeout=left, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        with self._lock:
+                            self.counters["hedge_wins"] += 1
+                    return future.result()
+                error = future.exception()
+        if error is not None and not pending:
+            raise error
+        raise DeadlineExceeded(f"{self.name}: no answer within {budget:.1f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._latencies)
+            counters = dict(self.counters)
+
+        def quantile(q):
+            return round(samples[max(0, int(len(samples) * q) - 1)] * 1000, 1) if samples else None
+
+        return {"state": self.state, **counters, "p50_ms": quantile(0.5), "p95_ms": quantile(0.95)}
+
+
+_dependencies: Dict[str, Dependency] = {}
+_dependencies_lock = threading.Lock()
+
+
+def dependency(name: str, **options: Any) -> Dependency:
+    """The `Dependency` registered under `name`, created with `options` on first use."""
+    with _dependencies_lock:
+        dep = _dependencies.get(name)
+        if dep is None:
+            dep = _dependencies[name] = Dependency(name, **options)
+        return dep
+
+
+def dependency_stats() -> Dict[str, Dict[str, Any]]:
+    with _dependencies_lock:
+        deps = list(_dependencies.values())
+    return {dep.name: dep.stats() for dep in deps}
@@ -0,0 +1,336 @@
+"""
+Shared runtime helpers for the PROMETHEO servers (foundry_server.py, prompt.py, sch.py).
+
+LLM clients, search tools and compiled chains are expensive to build and need
+credentials, so the servers wrap them in `Lazy` and only construct them on first use.
+`readiness()` reports which components are built and `warm_up()` builds them ahead
+of the first request.
+
+Chains are registered once by name (`register_chain`) and shared by every caller; prompts
+that mention the date take it from `today()` / `now()` partials, read when the prompt is
+formatted rather than when the module is imported.
+
+The servers also share one HTTP connection pool (`http_client`, `async_http_client`,
+`http_session`) and one pool of `ChatGroq` clients (`chat_groq`), so running them in
+one process via gateway.py doesn't triple connections and clients. Both pools go
+through replay.py, so a recorded tape can stand in for Groq and the REST services.
+"""
+import os
+import time
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+import requests
+
+import replay
+import resilience
+from quotas import usage_callback
+
+
+class Lazy:
+    """
+    Proxy that builds the wrapped object on first attribute access.
+
+    Call sites keep using the object as before (`planner_chain.invoke(...)`).
+    Code that needs the real object (e.g. to compose a chain with `|`) uses `resolve()`.
+    """
+
+    def __init__(self, factory: Callable[[], Any], name: str):
+        self._factory = factory
+        self._name = name
+        self._value = None
+        self._built = False
+        self._build_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def is_built(self) -> bool:
+        return self._built
+
+    @property
+    def build_seconds(self) -> Optional[float]:
+        return self._build_seconds
+
+    def _get(self) -> Any:
+        if self._built:
+            return self._value
+        with self._lock:
+            if not self._built:
+                started = time.perf_counter()
+                self._value = self._factory()
+                self._build_seconds = time.perf_counter() - started
+                self._built = True
+                print(f"--- 🔧 {self._name} initialized ({self._build_seconds * 1000:.0f} ms) ---")
+        return self._value
+
+    def __getattr__(self, item: str) -> Any:
+        # Only reached for attributes not defined on the proxy itself
+        if item.startswith("_"):
+            raise AttributeError(item)
+        return getattr(self._get(), item)
+
+    def __repr__(self) -> str:
+        state = "built" if self._built else "cold"
+        return f"<Lazy {self._name} ({state})>"
+
+
+def resolve(obj: Any) -> Any:
+    """Return the real object behind a `Lazy` proxy (or `obj` itself)."""
+    return obj._get() if isinstance(obj, Lazy) else obj
+
+
+_chains: Dict[str, Lazy] = {}
+# Read-only view of every registered chain, by name
+chains = MappingProxyType(_chains)
+
+
+def register_chain(name: str, factory: Callable[[], Any]) -> Lazy:
+    """
+    Register a chain that is built once, on first use, and shared by every caller.
+    Names are unique across the servers: registering a name twice is an error, so a
+    chain cannot be replaced or rebuilt per call.
+    """
+    if name in _chains:
+        raise ValueError(f"Chain {name!r} is already registered")
+    _chains[name] = chain = Lazy(factory, name)
+    return chain
+
+
+def today() -> str:
+    """Today's date for prompts; pass the function as a partial (`.partial(today=today)`) so it is read per call."""
+    return date.today().isoformat()
+
+
+def now() -> str:
+    """The current time, to the minute, for prompts (see `today`)."""
+    return datetime.now().isoformat(timespec="minutes")
+
+
+def require_env(name: str) -> str:
+    """Read a required environment variable, raising a clear error if it is missing."""
+    value = os.getenv(name)
+    if not value:
+        raise ValueError(f"❌ {name} missing. Please set it in your .env file.")
+    return value
+
+
+def readiness(components: Iterable[Lazy]) -> Dict[str, Any]:
+    """Summarize warm/cold state of a group of lazy components (used by `/ready`)."""
+    components = list(components)
+    built = {c.name: c.is_built for c in components}
+    return {
+        "status": "warm" if all(built.values()) else "cold",
+        "components": built,
+    }
+
+
+def warm_up(components: Iterable[Lazy]) -> Dict[str, str]:
+    """
+    Build every component now. Never raises — failures (e.g. a missing key)
+    are reported per component so the server can still start.
+    """
+    report = {}
+    for component in components:
+        try:
+            component._get()
+            report[component.name] = "ok"
+        except Exception as e:
+            print(f"--- ⚠️  Warm-up failed for {component.name}: {e} ---")
+            report[component.name] = f"error: {e}"
+    return report
+
+
+def warm_up_enabled() -> bool:
+    """Warm-up on startup is opt-in via PROMETHEO_WARMUP=1."""
+    return os.getenv("PROMETHEO_WARMUP", "").lower() in ("1", "true", "yes")
+
+
+def warm_up_in_background(components: Iterable[Lazy]) -> Optional[asyncio.Task]:
+    """Schedule `warm_up` off the event loop if PROMETHEO_WARMUP is set."""
+    if not warm_up_enabled():
+        return None
+    components = list(components)
+    print(f"--- 🔥 Warming up {len(components)} components in background ---")
+    return asyncio.ensure_future(asyncio.to_thread(warm_up, components))
+
+
+def warm_up_lifespan(components: Iterable[Lazy]):
+    """
+    Build a FastAPI `lifespan` that runs the optional background warm-up.
+    `components` is read at startup, so a list may still be extended after the app is created.
+    """
+
+    @asynccontextmanager
+    async def lifespan(app):
+        warm_up_in_background(components)
+        yield
+        await close_http_clients()
+
+    return lifespan
+
+
+# --- Shared HTTP connection pool ---
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("PROMETHEO_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("PROMETHEO_HTTP_MAX_KEEPALIVE", "20"))
+HTTP_TIMEOUT = float(os.getenv("PROMETHEO_HTTP_TIMEOUT", "60"))
+
+_http_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+_http_session: Optional[requests.Session] = None
+_close_hooks: List[Callable[[], Any]] = []
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE)
+
+
+def http_client() -> httpx.Client:
+    """Process-wide sync httpx client (keep-alive pool shared by all LLM clients)."""
+    global _http_client
+    with _http_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(limits=_http_limits(), timeout=HTTP_TIMEOUT)
+        return _http_client
+
+
+def async_http_client() -> httpx.AsyncClient:
+    """Process-wide async httpx client (keep-alive pool shared by all LLM clients)."""
+    global _async_http_client
+    with _http_lock:
+        if _async_http_client is None:
+            _async_http_client = httpx.AsyncClient(limits=_http_limits(), timeout=HTTP_TIMEOUT)
+        return _async_http_client
+
+
+def http_session() -> requests.Session:
+    """Process-wide `requests` session for the plain REST calls (Unsplash, Slack, Telegram, ...)."""
+    global _http_session
+    with _http_lock:
+        if _http_session is None:
+            _http_session = requests.Session()
+            adapter = replay.http_adapter(requests.adapters.HTTPAdapter(pool_connections=HTTP_MAX_KEEPALIVE,
+                                                                        pool_maxsize=HTTP_MAX_CONNECTIONS))
+            _http_session.mount("http://", adapter)
+            _http_session.mount("https://", adapter)
+        return _http_session
+
+
+def register_close_hook(hook: Callable[[], Any]) -> None:
+    """Run `hook()` (awaited if it returns a coroutine) when the shared pools close, e.g. another module's pool."""
+    _close_hooks.append(hook)
+
+
+async def close_http_clients() -> None:
+    """Close the shared pools (called on shutdown)."""
+    for hook in _close_hooks:
+        outcome = hook()
+        if asyncio.iscoroutine(outcome):
+            await outcome
+    global _http_client, _async_http_client, _http_session
+    with _http_lock:
+        client, async_client, session = _http_client, _async_http_client, _http_session
+        _http_client = _async_http_client = _http_session = None
+    if async_client is not None:
+        await async_client.aclose()
+    if client is not None:
+        client.close()
+    if session is not None:
+        session.close()
+
+
+# --- Shared LLM client pool ---
+
+_llm_lock = threading.Lock()
+_llm_pool: Dict[Tuple[str, float, Optional[str]], Any] = {}
+
+
+def _deadline_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    left = resilience.remaining()
+    if left is None or "timeout" in kwargs:
+        return kwargs
+    if left <= 0:
+        raise resilience.DeadlineExceeded("time budget spent before the LLM call")
+    return {**kwargs, "timeout": left}
+
+
+_budgeted_class = None
+
+
+def _budgeted_chat_groq():
+    """`ChatGroq` whose requests time out at the campaign/node deadline (langchain_groq is imported on first use)."""
+    global _budgeted_class
+    if _budgeted_class is None:
+        from langchain_groq import ChatGroq
+
+        class BudgetedChatGroq(ChatGroq):
+            def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+                return super()._generate(messages, stop, run_manager, **_deadline_kwargs(kwargs))
+
+            async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+                return await super()._agenerate(messages, stop, run_manager, **_deadline_kwargs(kwargs))
+
+            def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+                return super()._stream(messages, stop, run_manager, **_deadline_kwargs(kwargs))
+
+            def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+                return super()._astream(messages, stop, run_manager, **_deadline_kwargs(kwargs))
+
+        _budgeted_class = BudgetedChatGroq
+    return _budgeted_class
+
+
+def chat_groq(model: str, temperature: float = 0, api_key: Optional[str] = None):
+    """
+    Return a pooled `ChatGroq` for (model, temperature, api_key).
+    Identical configurations in different servers get the same client, and every
+    client talks through the shared HTTP pool. Inside a campaign deadline
+    (resilience.campaign_deadline) each request's timeout is the time left, and every
+    request is charged to the current tenant and campaign (quotas.usage_callback).
+    """
+    def build():
+        return _budgeted_chat_groq()(
+            model_name=model,
+            temperature=temperature,
+            api_key=api_key,
+            http_client=http_client(),
+            http_async_client=async_http_client(),
+        )
+
+    key = (model, float(temperature), api_key)
+    with _llm_lock:
+        llm = _llm_pool.get(key)
+        if llm is None:
+            llm = replay.chat_model(model, build)
+            llm.callbacks = [usage_callback]
+            _llm_pool[key] = llm
+        return llm
+
+
+def llm_pool_size() -> int:
+    return len(_llm_pool)
+
+
+# --- Shared CORS setup ---
+
+def add_cors(app, allow_origins: List[str]) -> None:
+    """Attach the CORS policy the servers share (all methods/headers, credentials allowed)."""
+    from fastapi.middleware.cors import CORSMiddleware
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=allow_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
@@ -1,16 +1,29 @@
 import os
+import re
+import json
+import time
+import asyncio
 import uvicorn
-import requests
 import pprint
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from pydantic import BaseModel, Field
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from contextlib import asynccontextmanager
+from pydantic import BaseModel, Field, ValidationError
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
-from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
-from fastapi.middleware.cors import CORSMiddleware
+from typing import Dict, Any, Optional, AsyncIterator, List, Tuple
+from datetime import datetime
+from runtime import (
+    Lazy, resolve, readiness, require_env, warm_up_lifespan, chat_groq, add_cors, async_http_client,
+    register_chain, now,
+)
+from booking_outbox import BookingOutbox, BookingWorker, PermanentBookingError, booking_window, post_calendly_booking
+from slot_availability import SlotScheduler, fetch_calendly_availability, mock_availability, parse_preferred_time
+from meeting_extractor import EMAIL_RE, extract_meeting
+from call_log_store import CallLogStore, CallKey, call_key
+from cache import SingleFlight
+from quotas import BudgetExceeded, budget_exceeded_response, tenant_of, usage_ledger
+from structured import TolerantOutputParser, structured_chain, parse_stats
 
 # --- 1. Load Environment Variables ---
 load_dotenv()
@@ -18,17 +31,20 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 CALENDLY_API_KEY = os.getenv("CALENDLY_API_KEY")
 CALENDLY_EVENT_TYPE_URL = os.getenv("CALENDLY_EVENT_TYPE_URL") # e.g., https://api.calendly.com/event_types/AABBC...
 
-if not GROQ_API_KEY:
-    raise ValueError("❌ GROQ_API_KEY not found in .env")
-if not CALENDLY_API_KEY:
-    raise ValueError("❌ CALENDLY_API_KEY not found in .env")
-if not CALENDLY_EVENT_TYPE_URL:
-    raise ValueError("❌ CALENDLY_EVENT_TYPE_URL not found in .env")
-    
+_missing_keys = [
+    name for name, value in (
+        ("GROQ_API_KEY", GROQ_API_KEY),
+        ("CALENDLY_API_KEY", CALENDLY_API_KEY),
+        ("CALENDLY_EVENT_TYPE_URL", CALENDLY_EVENT_TYPE_URL),
+    ) if not value
+]
+if _missing_keys:
+    print(f"--- ⚠️  Missing keys: {', '.join(_missing_keys)}. Set them in your .env file. ---")
+
 # --- 2. Initialize LLM ---
-print("--- 🧠 Initializing Log Analysis LLM ---")
-llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0)
-print("--- ✅ LLM Ready ---")
+# Built on first use; the key is checked then rather than at import.
+llm = Lazy(lambda: chat_groq("llama-3.1-8b-instant", temperature=0, api_key=require_env("GROQ_API_KEY")),
+           "Log Analysis LLM")
 
 
 # --- 3. Pydantic Models ---
@@ -47,14 +63,14 @@ class MeetingAnalysis(BaseModel):
     email: Optional[str] = Field(description="The user's email address.")
 
 # --- 4. LLM Analysis Chain ---
-log_analysis_parser = PydanticOutputParser(pydantic_object=MeetingAnalysis)
+log_analysis_parser = TolerantOutputParser(pydantic_object=MeetingAnalysis)
 
 log_analysis_prompt = ChatPromptTemplate.from_messages([
     (
         "system",
         "You are an expert log analyst. Your job is to read a call transcript and determine if a meeting was successfully scheduled. "
         "The user MUST have confirmed a specific time and provided at least an email. "
-        f"Today's date is {datetime.now().isoformat()}. "
+        "Today's date is {now}. "
         "If they say 'tomorrow at 2pm', calculate that date. "
         "Respond ONLY with the required JSON object."
         "\n\n{format_instructions}"
@@ -65,92 +81,259 @@ log_analysis_prompt = ChatPromptTemplate.from_messages([
         "Please analyze the transcript and extract the meeting details. "
         "If no meeting was confirmed, or if name/email is missing, set 'meeting_scheduled' to false."
     ),
-]).partial(format_instructions=log_analysis_parser.get_format_instructions())
+]).partial(format_instructions=log_analysis_parser.get_format_instructions(), now=now)
+
+log_analysis_chain = register_chain("Log Analysis Chain",
+                                    lambda: structured_chain(log_analysis_prompt, resolve(llm), log_analysis_parser))
+# Idempotent ingestion: analyses keyed by (callId, transcript hash); the SQLite file is opened on first use
+call_store = Lazy(CallLogStore, "Call Log Store")
+call_flight = SingleFlight()
+LAZY_COMPONENTS = [llm, log_analysis_chain, call_store]
+
+
+def format_transcript(logs: Dict[str, Any]) -> str:
+    """Flatten the provider's transcript messages into 'role: text' lines for the LLM."""
+    transcript_msgs = logs.get("transcript", []) or []
+    return "\n".join(
+        [f"{msg['role']}: {msg['transcript']}" for msg in transcript_msgs if 'transcript' in msg]
+    )
+
+
+# --- 4b. Cheap pre-filter (skip the LLM when a meeting is impossible) ---
+# A meeting needs both scheduling intent and an email; if either is absent we
+# already know the answer is meeting_scheduled=False.
+SCHEDULING_INTENT_RE = re.compile(
+    r"\b(meet|meeting|schedul\w*|book\w*|calendar|appointment|demo|call back|follow[- ]up|"
+    r"today|tomorrow|monday|tuesday|wednesday|thursday|friday|saturday|sunday|next week|"
+    r"\d{1,2}(:\d{2})?\s*(am|pm|a\.m\.|p\.m\.)|o'clock|noon)\b",
+    re.IGNORECASE,
+)
+# Voice transcripts often spell emails out: "john at gmail dot com"
+SPOKEN_EMAIL_RE = re.compile(r"\b[\w.]+\s+at\s+[\w-]+\s+dot\s+\w+\b", re.IGNORECASE)
+
+
+def has_scheduling_signals(transcript_text: str) -> bool:
+    """True if the transcript mentions scheduling and contains something that looks like an email."""
+    if not SCHEDULING_INTENT_RE.search(transcript_text):
+        return False
+    return bool(EMAIL_RE.search(transcript_text) or SPOKEN_EMAIL_RE.search(transcript_text))
+
+
+# --- 4c. Rule-based fast path + stats ---
+class AnalysisStats:
+    """Counts which path answered each transcript and how long it took (see /call-logs/stats)."""
+
+    PATHS = ("prefilter", "fast_path", "llm")
+
+    def __init__(self):
+        self.counts = {path: 0 for path in self.PATHS}
+        self.seconds = {path: 0.0 for path in self.PATHS}
+        self.timed = {path: 0 for path in self.PATHS}
+
+    def record(self, path: str, seconds: Optional[float] = None) -> None:
+        self.counts[path] += 1
+        if seconds is not None:
+            self.seconds[path] += seconds
+            self.timed[path] += 1
+
+    def _avg(self, path: str) -> Optional[float]:
+        return self.seconds[path] / self.timed[path] if self.timed[path] else None
+
+    def report(self) -> Dict[str, Any]:
+        total = sum(self.counts.values())
+        avg_llm = self._avg("llm")
+        skipped = self.counts["prefilter"] + self.counts["fast_path"]
+        return {
+            "total": total,
+            "counts": dict(self.counts),
+            "fast_path_hit_rate": round(self.counts["fast_path"] / total, 4) if total else 0.0,
+            "llm_skip_rate": round(skipped / total, 4) if total else 0.0,
+            "avg_ms": {p: round(a * 1000, 2) for p in self.PATHS if (a := self._avg(p)) is not None},
+            # Estimated LLM time not spent, using the observed average LLM latency
+            "estimated_seconds_saved": round(
+                avg_llm * skipped - self.seconds["prefilter"] - self.seconds["fast_path"], 3
+            ) if avg_llm is not None else None,
+        }
+
+
+analysis_stats = AnalysisStats()
+
+
+def analyze_locally(call_log: CallLogRequest, transcript_text: str) -> Optional[MeetingAnalysis]:
+    """
+    Answer without the LLM when we can: no scheduling signals → no meeting;
+    confident rule-based extraction → its fields. Returns None when the LLM is needed.
+    """
+    started = time.perf_counter()
+    if not has_scheduling_signals(transcript_text):
+        analysis_stats.record("prefilter", time.perf_counter() - started)
+        return MeetingAnalysis(meeting_scheduled=False, time=None, name=None, email=None)
 
-log_analysis_chain = log_analysis_prompt | llm | log_analysis_parser
-print("--- ✅ Log Analysis Chain Created ---")
+    extraction = extract_meeting(call_log.logs.get("transcript", []), call_log.timestamp)
+    if extraction.is_confident:
+        analysis_stats.record("fast_path", time.perf_counter() - started)
+        print(f"--- ⚡ Fast path hit for {call_log.callId} (confidence {extraction.confidence}) ---")
+        return MeetingAnalysis(**extraction.model_dump(include={"meeting_scheduled", "time", "name", "email"}))
+    return None
 
 # --- 5. Calendly API Function ---
-def schedule_calendly_meeting(name: str, email: str, start_time: str) -> Dict[str, Any]:
+# Real bookings go to CALENDLY_API_BASE (e.g. https://api.calendly.com, or a local stand-in).
+# Without it we keep the demo behaviour: mock availability and a simulated successful booking.
+CALENDLY_API_BASE = os.getenv("CALENDLY_API_BASE")
+
+
+async def fetch_availability(event_type_url: str, start: datetime, end: datetime):
+    """Free intervals of one event type between start and end (see slot_availability.py)."""
+    if CALENDLY_API_BASE:
+        return await fetch_calendly_availability(
+            async_http_client(), CALENDLY_API_BASE, require_env("CALENDLY_API_KEY"), event_type_url, start, end
+        )
+    return mock_availability(start, end)
+
+
+# Availability is cached per event type and concurrent bookings are batched onto free slots
+slot_scheduler = Lazy(lambda: SlotScheduler(fetch_availability), "Slot Scheduler")
+
+
+async def schedule_calendly_meeting(booking: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Schedules a meeting in Calendly.
-    NOTE: This is a simplified example. Calendly's API is complex.
-    This function *finds an available slot* near the requested time and books it.
+    Books one outbox row ({call_id, name, email, start_time}) in Calendly, at the free
+    slot nearest to the requested time. Raises on failure so the BookingWorker can retry.
     """
-    print(f"--- 📅 Attempting to book Calendly meeting for {email} around {start_time} ---")
-    
-    headers = {
-        "Authorization": f"Bearer {CALENDLY_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
-    # This is a simplified flow. A real app would first check for available slots.
-    # For this demo, we'll try to book it directly.
-    # We'll create an ISO-8601 end time 30 minutes after the start time
-    try:
-        start_time_dt = datetime.fromisoformat(start_time)
-        end_time_dt = start_time_dt + timedelta(minutes=30)
-        end_time = end_time_dt.isoformat()
-    except Exception:
-        # Fallback if LLM gives a bad time
-        start_time_dt = datetime.now() + timedelta(days=1) # Book for tomorrow
-        start_time = start_time_dt.isoformat()
-        end_time = (start_time_dt + timedelta(minutes=30)).isoformat()
-
-    booking_payload = {
-        "event_type": CALENDLY_EVENT_TYPE_URL,
-        "invitee": {
-            "name": name,
-            "email": email
-        },
-        "start_time": start_time,
-        "end_time": end_time,
-    }
+    call_id, name, email = booking["call_id"], booking["name"], booking["email"]
+    api_key = require_env("CALENDLY_API_KEY")
+    event_type_url = require_env("CALENDLY_EVENT_TYPE_URL")
 
-    try:
-        # This is a mock API call for demonstration.
-        # The actual Calendly booking API is at 'https://api.calendly.com/scheduled_events'
-        # response = requests.post("https://api.calendly.com/scheduled_events", headers=headers, json=booking_payload)
-        # response.raise_for_status()
-        
-        # --- MOCKING THE CALL ---
-        print("--- ⚠️ CALENDLY MOCK: Simulating successful booking. ---")
-        # In a real app, you would uncomment the 'requests.post' above.
-        # We will simulate the response.
-        mock_response = {
-            "resource": {
-                "uri": "https://api.calendly.com/scheduled_events/GBGBD...EXAMPLE",
-                "name": "Meeting with " + name,
-                "start_time": start_time,
-                "end_time": end_time
-            }
+    # A retry gets the slot it already holds
+    slot = await slot_scheduler.assign(event_type_url, parse_preferred_time(booking["start_time"]), call_id)
+    start_time = slot.isoformat()
+    print(f"--- 📅 Attempting to book Calendly meeting for {email} at {start_time} (asked for {booking['start_time']}) ---")
+
+    if CALENDLY_API_BASE:
+        try:
+            result = await post_calendly_booking(
+                async_http_client(), CALENDLY_API_BASE, api_key, event_type_url, name, email, start_time
+            )
+        except PermanentBookingError:
+            slot_scheduler.release(call_id)
+            raise
+        slot_scheduler.confirm(call_id)
+        return result
+
+    # --- MOCKING THE CALL ---
+    print("--- ⚠️ CALENDLY MOCK: Simulating successful booking. ---")
+    slot_scheduler.confirm(call_id)
+    start, end = booking_window(start_time)
+    return {
+        "resource": {
+            "uri": "https://api.calendly.com/scheduled_events/GBGBD...EXAMPLE",
+            "name": "Meeting with " + name,
+            "start_time": start,
+            "end_time": end
         }
-        # --- END MOCK ---
-        
-        print("--- ✅ Calendly meeting scheduled successfully. ---")
-        return {"status": "scheduled", "details": mock_response}
-    
-    except Exception as e:
-        print(f"--- ❌ CALENDLY ERROR: {e} ---")
-        return {"status": "failed", "error": str(e)}
+    }
+
+
+# Durable outbox drained by an async worker (see booking_outbox.py)
+booking_outbox = Lazy(BookingOutbox, "Booking Outbox")
+booking_worker = Lazy(lambda: BookingWorker(resolve(booking_outbox), schedule_calendly_meeting), "Booking Worker")
+LAZY_COMPONENTS += [slot_scheduler, booking_outbox, booking_worker]
+
+
+async def start_background_workers() -> None:
+    # Prefetch availability for the configured event type, then keep it fresh
+    slot_scheduler.start(prefetch=(CALENDLY_EVENT_TYPE_URL,) if CALENDLY_EVENT_TYPE_URL else ())
+    booking_worker.start()
+
+
+async def stop_background_workers() -> None:
+    if booking_worker.is_built:
+        await booking_worker.stop()
+    if slot_scheduler.is_built:
+        await slot_scheduler.stop()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with warm_up_lifespan(LAZY_COMPONENTS)(app):
+        await start_background_workers()
+        try:
+            yield
+        finally:
+            # Stop before the shared HTTP pool closes; unfinished rows resume on next start
+            await stop_background_workers()
 
 # --- 6. Create the FastAPI App ---
-app = FastAPI()
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+app = FastAPI(lifespan=lifespan)
+
+add_cors(app, ["*"])
+app.add_exception_handler(BudgetExceeded, budget_exceeded_response)
 
 @app.get("/")
 async def root():
     return {"message": "Call Log Analysis Server is running."}
 
+@app.get("/ready")
+async def ready():
+    return readiness(LAZY_COMPONENTS)
+
+@app.get("/bookings/{call_id}")
+async def booking_status(call_id: str):
+    """Outbox status of the booking for one call: pending, in_progress, scheduled or failed."""
+    booking = booking_outbox.get(call_id)
+    if booking is None:
+        raise HTTPException(status_code=404, detail="No booking for this callId.")
+    return booking
+
+@app.get("/availability/stats")
+async def availability_stats():
+    """Slot cache and batching counters: fetches per event type, batch sizes, how far bookings moved."""
+    return slot_scheduler.stats()
+
+@app.get("/call-logs/stats")
+async def call_log_stats():
+    """How often the pre-filter / fast path avoided the LLM, and the latency that saved."""
+    return analysis_stats.report()
+
+@app.get("/parsing/stats")
+async def parsing_stats():
+    """Structured-output outcomes per schema: clean, locally repaired, re-asked, failed."""
+    return parse_stats()
+
+@app.get("/usage")
+async def usage(tenant: Optional[str] = None):
+    """LLM usage per tenant against its budgets: window tokens/requests, running and queued work, totals."""
+    return usage_ledger.report(tenant)
+
+def _meeting_response(call_id: str, analysis: MeetingAnalysis) -> Dict[str, Any]:
+    """Build the API response and queue the booking in the outbox — at most once per callId."""
+    if analysis.meeting_scheduled and analysis.email and analysis.name and analysis.time:
+        if not booking_outbox.enqueue(call_id, analysis.name, analysis.email, analysis.time):
+            print(f"--- ♻️ Meeting for {call_id} was already booked, not booking again ---")
+            return {"status": "meeting_already_booked", "details": analysis.model_dump()}
+        print("--- ✅ Meeting detected! Queued for booking... ---")
+        booking_worker.notify()
+        return {"status": "meeting_booking_started", "details": analysis.model_dump()}
+    print("--- ℹ️ No meeting was scheduled in this call. ---")
+    return {"status": "no_meeting_detected", "details": analysis.model_dump()}
+
+
+async def _analyze_and_respond(request: CallLogRequest, transcript_text: str, key: CallKey) -> Dict[str, Any]:
+    analysis = analyze_locally(request, transcript_text)
+    if analysis is None:
+        print("--- 🧠 Analyzing transcript... ---")
+        # Ambiguous: call the LLM to analyze the transcript
+        started = time.perf_counter()
+        analysis = await log_analysis_chain.ainvoke({"transcript": transcript_text})
+        analysis_stats.record("llm", time.perf_counter() - started)
+
+    response = _meeting_response(request.callId, analysis)
+    call_store.put(key, response)
+    return response
+
+
 @app.post("/call-logs")
-async def handle_call_logs(request: CallLogRequest, background_tasks: BackgroundTasks):
+async def handle_call_logs(request: CallLogRequest, http_request: Request):
     """
     Receives call logs from the frontend, analyzes them, and
     schedules a meeting if one was booked.
@@ -164,33 +347,184 @@ async def handle_call_logs(request: CallLogRequest, background_tasks: Background
             print("--- ⚠️ No transcript found in logs. ---")
             return {"status": "error", "message": "No transcript to analyze."}
             
-        transcript_text = "\n".join(
-            [f"{msg['role']}: {msg['transcript']}" for msg in transcript_msgs if 'transcript' in msg]
-        )
-        
-        print("--- 🧠 Analyzing transcript... ---")
-        # Call the LLM to analyze the transcript
-        analysis = await log_analysis_chain.ainvoke({"transcript": transcript_text})
-        
-        if analysis.meeting_scheduled and analysis.email and analysis.name and analysis.time:
-            print("--- ✅ Meeting detected! Booking in background... ---")
-            # Schedule the meeting in the background
-            background_tasks.add_task(
-                schedule_calendly_meeting,
-                analysis.name,
-                analysis.email,
-                analysis.time
-            )
-            return {"status": "meeting_booking_started", "details": analysis.model_dump()}
-        else:
-            print("--- ℹ️ No meeting was scheduled in this call. ---")
-            return {"status": "no_meeting_detected", "details": analysis.model_dump()}
+        transcript_text = format_transcript(request.logs)
 
+        # Webhook retries: answer from the store, or wait on the identical in-flight analysis
+        key = call_key(request.callId, transcript_text)
+        cached = call_store.get(key)
+        if cached is not None:
+            print(f"--- ♻️ Duplicate delivery for {request.callId}, returning stored analysis ---")
+            return {**cached, "duplicate": True}
+        if call_flight.in_flight(key) is not None:
+            print(f"--- ⏳ {request.callId} already being analyzed, waiting on it ---")
+        async with usage_ledger.admission(tenant_of(http_request), "call_log", work_id=request.callId):
+            # Admission may have waited: the first delivery can have finished (and left call_flight) since
+            cached = call_store.get(key)
+            if cached is not None:
+                print(f"--- ♻️ Duplicate delivery for {request.callId}, returning stored analysis ---")
+                return {**cached, "duplicate": True}
+            return await call_flight.run(key, lambda: _analyze_and_respond(request, transcript_text, key))
+
+    except BudgetExceeded:
+        raise
     except Exception as e:
         print(f"--- ❌ Log Analysis ERROR: {e} ---")
         raise HTTPException(status_code=500, detail="Failed to analyze call logs.")
 
 
+# --- 7. Batch Call-Log Analysis ---
+BATCH_MAX_CONCURRENCY = int(os.getenv("CALL_LOG_BATCH_CONCURRENCY", "8"))
+
+
+def _decode_ndjson_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        return e
+
+
+def _batch_record(call_id: Optional[str], status: str, details: Optional[dict] = None, message: Optional[str] = None) -> bytes:
+    record = {"callId": call_id, "status": status}
+    if details is not None:
+        record["details"] = details
+    if message is not None:
+        record["message"] = message
+    return (json.dumps(record) + "\n").encode()
+
+
+def _response_record(call_id: str, response: Dict[str, Any]) -> bytes:
+    return (json.dumps({"callId": call_id, **response}) + "\n").encode()
+
+
+def _finish_analysis(call_log: CallLogRequest, key: CallKey, analysis: MeetingAnalysis) -> Dict[str, Any]:
+    response = _meeting_response(call_log.callId, analysis)
+    call_store.put(key, response)
+    return response
+
+
+async def _stream_batch(items: List[Any]) -> AsyncIterator[bytes]:
+    """
+    Validate and pre-filter every item (answering those immediately), then run the
+    rest through the LLM with bounded concurrency, yielding each result as it completes.
+    """
+    pending: List[Tuple[CallLogRequest, str, CallKey]] = []
+    repeats: Dict[CallKey, int] = {}                      # duplicates inside this batch, answered with their first copy
+    in_flight: List[Tuple[CallLogRequest, CallKey]] = []  # being analyzed by a concurrent /call-logs request
+    for item in items:
+        if isinstance(item, Exception):
+            yield _batch_record(None, "error", message=f"Invalid JSON line: {item}")
+            continue
+        try:
+            call_log = CallLogRequest.model_validate(item)
+        except ValidationError as e:
+            call_id = item.get("callId") if isinstance(item, dict) else None
+            yield _batch_record(call_id, "error", message=f"Invalid call log: {e.errors()[0]['msg']}")
+            continue
+
+        transcript_text = format_transcript(call_log.logs)
+        if not transcript_text:
+            yield _batch_record(call_log.callId, "error", message="No transcript to analyze.")
+            continue
+        key = call_key(call_log.callId, transcript_text)
+        cached = call_store.get(key)
+        if cached is not None:
+            yield _response_record(call_log.callId, {**cached, "duplicate": True})
+            continue
+        if key in repeats:
+            repeats[key] += 1
+            continue
+        if call_flight.in_flight(key) is not None:
+            in_flight.append((call_log, key))
+            continue
+        repeats[key] = 0
+
+        # Pre-filter / rule-based fast path → no LLM call needed
+        local = analyze_locally(call_log, transcript_text)
+        if local is not None:
+            response = _finish_analysis(call_log, key, local)
+            for _ in range(repeats[key] + 1):
+                yield _response_record(call_log.callId, response)
+            continue
+        pending.append((call_log, transcript_text, key))
+
+    # Claim the keys so a /call-logs retry during the batch waits on its analysis;
+    # one that started while the fast-path results were streaming is waited on instead
+    for entry in list(pending):
+        call_log, _, key = entry
+        if call_flight.in_flight(key) is not None:
+            pending.remove(entry)
+            in_flight.append((call_log, key))
+        else:
+            call_flight.claim(key)
+
+    if pending:
+        print(f"--- 🧠 Analyzing {len(pending)} transcripts (max concurrency {BATCH_MAX_CONCURRENCY}) ---")
+        inputs = [{"transcript": transcript} for _, transcript, _ in pending]
+        try:
+            async for index, analysis in log_analysis_chain.abatch_as_completed(
+                inputs, config={"max_concurrency": BATCH_MAX_CONCURRENCY}, return_exceptions=True
+            ):
+                call_log, _, key = pending[index]
+                analysis_stats.record("llm")  # per-call latency isn't observable inside a batch
+                if isinstance(analysis, Exception):
+                    print(f"--- ❌ Batch analysis failed for {call_log.callId}: {analysis} ---")
+                    call_flight.settle(key, error=analysis)
+                    record = _batch_record(call_log.callId, "error", message=str(analysis))
+                else:
+                    response = _finish_analysis(call_log, key, analysis)
+                    call_flight.settle(key, response)
+                    record = _response_record(call_log.callId, response)
+                for _ in range(repeats[key] + 1):
+                    yield record
+        finally:
+            # Client gone mid-batch: release what's still claimed (a no-op for settled keys)
+            for _, _, key in pending:
+                call_flight.settle(key, error=RuntimeError("The batch analyzing this call was cancelled."))
+
+    for call_log, key in in_flight:
+        future = call_flight.in_flight(key)
+        try:
+            response = await asyncio.shield(future) if future is not None else call_store.get(key)
+        except Exception as e:
+            response = None
+            print(f"--- ❌ Concurrent analysis failed for {call_log.callId}: {e} ---")
+        if response is None:
+            yield _batch_record(call_log.callId, "error", message="Concurrent analysis of this call failed.")
+        else:
+            yield _response_record(call_log.callId, {**response, "duplicate": True})
+
+
+@app.post("/call-logs/batch")
+async def handle_call_logs_batch(request: Request):
+    """
+    Analyze many call logs in one request (JSON array, or NDJSON with
+    Content-Type: application/x-ndjson). Results stream back as NDJSON, one
+    line per call in completion order: {"callId", "status", "details" | "message"}.
+    Detected meetings are queued in the booking outbox as they are found.
+
+    The body is read before streaming starts: a StreamingResponse can't keep
+    reading the request body while it sends.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        body = await request.body()
+        items = [_decode_ndjson_line(line) for line in body.splitlines() if line.strip()]
+    else:
+        try:
+            items = await request.json()
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Body is not valid JSON.")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of call logs or an NDJSON stream.")
+
+    print(f"--- 🪵 Received batch of {len(items)} call logs ---")
+    # Bounded by the tenant's window budget rather than a per-request one
+    work = await usage_ledger.admit(tenant_of(request), "call_log_batch", tokens=0, requests=0)
+    return StreamingResponse(
+        usage_ledger.charged(work, _stream_batch(items)),
+        media_type="application/x-ndjson",
+    )
+
 if __name__ == "__main__":
     print("--- 🚀 Starting Log Analysis Server on http://localhost:8004 ---")
     uvicorn.run(app, host="0.0.0.0", port=8004)
\ No newline at end of file
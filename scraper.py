@@ -0,0 +1,312 @@
+"""
+Async fetch-and-extract engine shared by every scraper in PROMETHEO.
+
+Used by foundry_server.py (government portals and agency websites) and prompt.py
+(product pages) instead of WebBaseLoader / ad-hoc `requests.get` calls:
+
+  - one keep-alive httpx pool for all scraping, with redirects followed
+  - at most SCRAPE_PER_HOST concurrent requests per host, spaced SCRAPE_HOST_DELAY apart
+  - bodies streamed and cut off at SCRAPE_MAX_BYTES (binary types are not downloaded)
+  - content type taken from the header, or sniffed from the first bytes when missing
+  - connect/read timeouts plus an overall deadline per fetch
+  - HTML reduced to its main content by html_extract.py (boilerplate stripped)
+
+The engine owns its event loop on a background thread, so the same pool and per-host
+limits serve async callers (`await scraper.fetch(url)`) and the sync LangGraph nodes,
+which LangGraph runs in worker threads (`scraper.fetch_sync(url)`).
+"""
+import os
+import re
+import time
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from pydantic import BaseModel
+
+import replay
+from html_extract import html_to_text
+from runtime import register_close_hook
+
+SCRAPE_MAX_BYTES = int(os.getenv("SCRAPE_MAX_BYTES", str(2 * 1024 * 1024)))
+SCRAPE_TIMEOUT = float(os.getenv("SCRAPE_TIMEOUT", "15"))
+SCRAPE_CONNECT_TIMEOUT = float(os.getenv("SCRAPE_CONNECT_TIMEOUT", "5"))
+SCRAPE_MAX_CONNECTIONS = int(os.getenv("SCRAPE_MAX_CONNECTIONS", "64"))
+SCRAPE_PER_HOST = int(os.getenv("SCRAPE_PER_HOST", "4"))
+SCRAPE_HOST_DELAY = float(os.getenv("SCRAPE_HOST_DELAY", "0.1"))
+SCRAPE_USER_AGENT = os.getenv(
+    "SCRAPE_USER_AGENT",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+)
+
+TEXT_KINDS = ("html", "text", "json", "xml")
+_BINARY_PREFIXES = ("image/", "audio/", "video/", "font/", "application/pdf", "application/zip",
+                    "application/octet-stream", "application/vnd.", "application/msword")
+_CHARSET_RE = re.compile(rb"""<meta[^>]+charset=["']?([A-Za-z0-9_-]+)""", re.IGNORECASE)
+
+
+class FetchResult(BaseModel):
+    """One fetched page. `text` is main-content text for HTML, the decoded body otherwise."""
+    url: str
+    final_url: Optional[str] = None
+    status: Optional[int] = None
+    content_type: Optional[str] = None
+    kind: str = "unknown"          # html | text | json | xml | pdf | binary | unknown
+    text: str = ""
+    title: Optional[str] = None
+    bytes_read: int = 0
+    truncated: bool = False
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.kind in TEXT_KINDS
+
+
+def classify(content_type: Optional[str], head: bytes = b"") -> str:
+    """Kind of document from the Content-Type header, sniffing the first bytes if it's missing or generic."""
+    mime = (content_type or "").split(";")[0].strip().lower()
+    if mime in ("text/html", "application/xhtml+xml"):
+        return "html"
+    if mime == "application/json" or mime.endswith("+json"):
+        return "json"
+    if mime in ("application/xml", "text/xml") or mime.endswith("+xml"):
+        return "xml"
+    if mime == "application/pdf":
+        return "pdf"
+    if mime.startswith("text/"):
+        return "text"
+    if mime and mime != "application/octet-stream" and mime.startswith(_BINARY_PREFIXES):
+        return "binary"
+
+    sample = head[:512].lstrip().lower()
+    if not sample:
+        return "unknown"
+    if sample.startswith((b"<!doctype html", b"<html", b"<head", b"<body")) or b"<html" in sample:
+        return "html"
+    if sample.startswith(b"%pdf"):
+        return "pdf"
+    if sample.startswith((b"{", b"[")):
+        return "json"
+    if sample.startswith(b"<?xml"):
+        return "xml"
+    if b"\x00" in sample:
+        return "binary"
+    return "text"
+
+
+def _charset(content_type: Optional[str], body: bytes) -> str:
+    match = re.search(r"charset=([\w-]+)", content_type or "", re.IGNORECASE)
+    if match:
+        return match.group(1)
+    match = _CHARSET_RE.search(body[:2048])
+    return match.group(1).decode("ascii") if match else "utf-8"
+
+
+def decode(body: bytes, content_type: Optional[str]) -> str:
+    charset = _charset(content_type, body)
+    try:
+        return body.decode(charset, errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+class ScrapeEngine:
+    """Pooled, per-host-limited fetcher running on its own event loop thread."""
+
+    def __init__(self, max_bytes: int = SCRAPE_MAX_BYTES, timeout: float = SCRAPE_TIMEOUT,
+                 connect_timeout: float = SCRAPE_CONNECT_TIMEOUT, max_connections: int = SCRAPE_MAX_CONNECTIONS,
+                 per_host: int = SCRAPE_PER_HOST, host_delay: float = SCRAPE_HOST_DELAY,
+                 user_agent: str = SCRAPE_USER_AGENT):
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.host_delay = host_delay
+        self.user_agent = user_agent
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._host_next_request: Dict[str, float] = {}
+        self._host_active: Dict[str, int] = defaultdict(int)
+        self.counters: Dict[str, float] = defaultdict(float)
+
+    # --- engine loop ---
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run, name="scrape-engine", daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Only called on the engine loop
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.max_connections,
+                                  max_keepalive_connections=self.max_connections)
+            self._client = httpx.AsyncClient(
+                limits=limits,
+                transport=replay.async_transport(lambda: httpx.AsyncHTTPTransport(limits=limits)),
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                follow_redirects=True,
+                headers={"User-Agent": self.user_agent, "Accept": "text/html,application/xhtml+xml,*/*;q=0.8"},
+            )
+        return self._client
+
+    async def close(self) -> None:
+        with self._lock:
+            loop, thread, self._loop, self._thread = self._loop, self._thread, None, None
+        if loop is None:
+            return
+
+        async def shutdown():
+            if self._client is not None:
+                await self._client.aclose()
+                self._client = None
+            self._host_slots.clear()
+
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(shutdown(), loop))
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+
+    # --- public API ---
+
+    async def fetch(self, url: str, max_bytes: Optional[int] = None, timeout: Optional[float] = None) -> FetchResult:
+        """Fetch and extract one URL. Never raises for a bad URL, network/HTTP problem or page; see `FetchResult.error`."""
+        loop = self._ensure_loop()
+        coro = self._fetch(url, max_bytes or self.max_bytes, timeout or self.timeout)
+        try:
+            if asyncio.get_running_loop() is loop:
+                return await coro
+        except RuntimeError:
+            pass
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def fetch_sync(self, url: str, max_bytes: Optional[int] = None, timeout: Optional[float] = None) -> FetchResult:
+        """Blocking `fetch` for sync code (e.g. graph nodes running in worker threads)."""
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("fetch_sync() called from the scrape engine's own loop; use await fetch()")
+        coro = self._fetch(url, max_bytes or self.max_bytes, timeout or self.timeout)
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    async def fetch_many(self, urls: List[str], **kwargs) -> List[FetchResult]:
+        return list(await asyncio.gather(*(self.fetch(url, **kwargs) for url in urls)))
+
+    def stats(self) -> Dict[str, float]:
+        stats = dict(self.counters)
+        fetches = stats.get("fetches", 0)
+        stats["avg_ms"] = round(stats.get("seconds", 0.0) / fetches * 1000, 1) if fetches else 0.0
+        stats["hosts_active"] = {host: n for host, n in self._host_active.items() if n}
+        return stats
+
+    # --- internals (engine loop) ---
+
+    @asynccontextmanager
+    async def _host_slot(self, host: str):
+        slot = self._host_slots.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with slot:
+            now = time.monotonic()
+            start_at = max(now, self._host_next_request.get(host, now))
+            self._host_next_request[host] = start_at + self.host_delay
+            if start_at > now:
+                await asyncio.sleep(start_at - now)
+            self._host_active[host] += 1
+            try:
+                yield
+            finally:
+                self._host_active[host] -= 1
+
+    async def _fetch(self, url: str, max_bytes: int, timeout: float) -> FetchResult:
+        result = FetchResult(url=url)
+        started = time.perf_counter()
+        try:
+            host = urlsplit(url).netloc.lower()
+        except ValueError:  # e.g. an unclosed IPv6 bracket
+            host = ""
+        if not host:
+            result.error = f"Invalid URL: {url!r}"
+            return result
+        body = b""
+        try:
+            async with self._host_slot(host):
+                # The deadline covers the network only; extraction happens after
+                body = await asyncio.wait_for(self._download(result, max_bytes), timeout=timeout)
+        except asyncio.TimeoutError:
+            result.error = f"Timed out after {timeout:.0f}s"
+            self.counters["timeouts"] += 1
+        except (httpx.HTTPError, httpx.InvalidURL, ValueError) as e:
+            result.error = f"{type(e).__name__}: {e}"
+        except Exception as e:  # one bad URL must not fail a whole fetch_many
+            result.error = f"Unexpected {type(e).__name__}: {e}"
+        if body:
+            try:
+                await self._extract(result, body)
+            except Exception as e:
+                result.error = f"Extraction failed: {type(e).__name__}: {e}"
+        result.elapsed = time.perf_counter() - started
+        self.counters["fetches"] += 1
+        self.counters["seconds"] += result.elapsed
+        self.counters["bytes"] += result.bytes_read
+        self.counters["truncated"] += result.truncated
+        self.counters["errors"] += result.error is not None
+        return result
+
+    async def _download(self, result: FetchResult, max_bytes: int) -> bytes:
+        """Stream the body up to `max_bytes`; returns b"" for errors and binary types."""
+        async with self._get_client().stream("GET", result.url) as response:
+            result.status = response.status_code
+            result.final_url = str(response.url)
+            result.content_type = response.headers.get("content-type")
+            result.kind = classify(result.content_type)
+            if response.status_code >= 400:
+                result.error = f"HTTP {response.status_code}"
+                return b""
+            if result.kind in ("binary", "pdf"):
+                return b""  # don't download what we can't extract
+
+            chunks, size = [], 0
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= max_bytes:
+                    result.truncated = True
+                    break
+            result.bytes_read = size
+            return b"".join(chunks)[:max_bytes]
+
+    async def _extract(self, result: FetchResult, body: bytes) -> None:
+        if result.kind == "unknown":
+            result.kind = classify(None, body)
+        if result.kind not in TEXT_KINDS:
+            return
+        text = decode(body, result.content_type)
+        if result.kind == "html":
+            # main-content extraction is CPU-bound; keep it off the engine loop
+            result.text, result.title = await asyncio.to_thread(html_to_text, text)
+        else:
+            result.text = text
+
+
+scraper = ScrapeEngine()
+register_close_hook(scraper.close)
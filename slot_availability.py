@@ -0,0 +1,426 @@
+"""
+Availability cache and batched slot assignment for Calendly bookings (used by sch.py).
+
+Instead of booking the exact LLM-produced time, each booking is moved to the nearest
+free slot of its event type:
+
+  - `FreeSlots` keeps the free time of one event type as sorted, disjoint intervals;
+    nearest-slot lookup, reserve and release are bisect operations.
+  - `AvailabilityCache` prefetches availability in fixed windows (Calendly allows at most
+    7 days per availability request) and refreshes them incrementally, one stale window
+    per tick, instead of querying availability once per booking. A window whose fetch
+    fails is retried with exponential backoff rather than on every tick.
+  - `SlotScheduler` collects concurrent `assign()` calls for a few milliseconds and
+    answers the whole batch from the cache in one pass, reserving each slot as it goes,
+    so two bookings never get the same slot.
+
+Slots are held per callId until the booking succeeds (`confirm`) or is rejected
+(`release`); a retried booking gets its held slot back. Times are naive local datetimes,
+like the rest of sch.py.
+"""
+import os
+import time
+import random
+import asyncio
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+SLOT_DURATION_MINUTES = int(os.getenv("SLOT_DURATION_MINUTES", "30"))
+SLOT_STEP_MINUTES = int(os.getenv("SLOT_STEP_MINUTES", "30"))
+SLOT_LEAD_MINUTES = int(os.getenv("SLOT_LEAD_MINUTES", "60"))
+SLOT_HORIZON_DAYS = int(os.getenv("SLOT_HORIZON_DAYS", "14"))
+SLOT_WINDOW_DAYS = int(os.getenv("SLOT_WINDOW_DAYS", "7"))
+SLOT_REFRESH_SECONDS = float(os.getenv("SLOT_REFRESH_SECONDS", "60"))
+SLOT_RETRY_BACKOFF = float(os.getenv("SLOT_RETRY_BACKOFF", "2"))        # after a failed availability fetch
+SLOT_RETRY_MAX_BACKOFF = float(os.getenv("SLOT_RETRY_MAX_BACKOFF", "300"))
+SLOT_BATCH_WINDOW_MS = float(os.getenv("SLOT_BATCH_WINDOW_MS", "10"))
+MOCK_AVAILABILITY_HOURS = os.getenv("MOCK_AVAILABILITY_HOURS", "9-17")
+
+Interval = Tuple[datetime, datetime]
+FetchFn = Callable[[str, datetime, datetime], Awaitable[List[Interval]]]
+
+
+class NoSlotAvailable(Exception):
+    """No free slot within the availability horizon (retried later by the booking worker)."""
+
+
+def _midnight(dt: datetime) -> datetime:
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def align_up(dt: datetime, step: timedelta) -> datetime:
+    """Round up to the slot grid (multiples of `step` from midnight)."""
+    base = _midnight(dt)
+    steps = -(-(dt - base) // step)  # ceil division
+    return base + steps * step
+
+
+def parse_preferred_time(value: Optional[str]) -> datetime:
+    """The LLM's ISO time as a naive datetime; bad or missing times fall back to tomorrow."""
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return datetime.now() + timedelta(days=1)
+    # Calendly returns UTC; convert aware times to naive local time
+    return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo else parsed
+
+
+class FreeSlots:
+    """Disjoint free intervals of one event type, kept sorted in two parallel lists."""
+
+    def __init__(self):
+        self.starts: List[datetime] = []
+        self.ends: List[datetime] = []
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def intervals(self) -> List[Interval]:
+        return list(zip(self.starts, self.ends))
+
+    def add(self, start: datetime, end: datetime) -> None:
+        """Mark [start, end) free, merging with overlapping or touching intervals."""
+        if end <= start:
+            return
+        lo = bisect_left(self.ends, start)      # first interval ending at/after start
+        hi = bisect_right(self.starts, end)     # intervals starting at/before end
+        if lo < hi:
+            start = min(start, self.starts[lo])
+            end = max(end, self.ends[hi - 1])
+        self.starts[lo:hi] = [start]
+        self.ends[lo:hi] = [end]
+
+    def remove(self, start: datetime, end: datetime) -> None:
+        """Mark [start, end) busy, splitting intervals that straddle it."""
+        if end <= start:
+            return
+        lo = bisect_right(self.ends, start)     # first interval ending after start
+        hi = bisect_left(self.starts, end)      # intervals starting before end
+        if lo >= hi:
+            return
+        keep = []
+        if self.starts[lo] < start:
+            keep.append((self.starts[lo], start))
+        if self.ends[hi - 1] > end:
+            keep.append((end, self.ends[hi - 1]))
+        self.starts[lo:hi] = [s for s, _ in keep]
+        self.ends[lo:hi] = [e for _, e in keep]
+
+    def replace(self, window_start: datetime, window_end: datetime, intervals: List[Interval]) -> None:
+        """Swap the contents of one window for freshly fetched intervals."""
+        self.remove(window_start, window_end)
+        for start, end in intervals:
+            self.add(max(start, window_start), min(end, window_end))
+
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        i = bisect_right(self.starts, start) - 1
+        return i >= 0 and self.ends[i] >= end
+
+    def _best_in(self, i: int, target: datetime, duration: timedelta, step: timedelta,
+                 not_before: datetime) -> Optional[datetime]:
+        lo = align_up(max(self.starts[i], not_before), step)
+        hi = self.ends[i] - duration
+        if lo > hi:
+            return None
+        if target <= lo:
+            return lo
+        below = lo + ((min(target, hi) - lo) // step) * step   # last grid point <= target
+        above = below + step
+        if above <= hi and above - target < target - below:
+            return above
+        return below
+
+    def nearest(self, target: datetime, duration: timedelta, step: timedelta,
+                not_before: datetime) -> Optional[datetime]:
+        """Start of the free slot closest to `target` (ties go to the earlier slot)."""
+        target = max(target, not_before)
+        best, best_gap = None, None
+        pivot = bisect_right(self.starts, target) - 1
+        # Walk outwards from the interval containing/preceding the target; stop once an
+        # interval is further away than the best slot found so far.
+        for i in range(pivot, -1, -1):
+            if self.ends[i] <= not_before or (best_gap is not None and target - self.ends[i] >= best_gap):
+                break
+            slot = self._best_in(i, target, duration, step, not_before)
+            if slot is not None and (best_gap is None or abs(slot - target) < best_gap):
+                best, best_gap = slot, abs(slot - target)
+        for i in range(pivot + 1, len(self.starts)):
+            if best_gap is not None and self.starts[i] - target >= best_gap:
+                break
+            slot = self._best_in(i, target, duration, step, not_before)
+            if slot is not None and (best_gap is None or abs(slot - target) < best_gap):
+                best, best_gap = slot, abs(slot - target)
+        return best
+
+
+class AvailabilityCache:
+    """Free slots of one event type, fetched and refreshed in SLOT_WINDOW_DAYS windows."""
+
+    def __init__(self, event_type: str, fetch: FetchFn, window_days: int = SLOT_WINDOW_DAYS,
+                 horizon_days: int = SLOT_HORIZON_DAYS, refresh_seconds: float = SLOT_REFRESH_SECONDS):
+        self.event_type = event_type
+        self.fetch = fetch
+        self.window = timedelta(days=window_days)
+        self.horizon = timedelta(days=horizon_days)
+        self.refresh_seconds = refresh_seconds
+        self.slots = FreeSlots()
+        self.holds: Dict[str, Interval] = {}           # callId -> reserved slot
+        self._fetched_at: Dict[datetime, float] = {}   # window start -> monotonic time
+        self._locks: Dict[datetime, asyncio.Lock] = {}
+        self._failures: Dict[datetime, Tuple[int, float]] = {}  # window start -> (failures in a row, retry at)
+        self.fetches = 0
+        self.fetch_errors = 0
+
+    def window_start(self, dt: datetime) -> datetime:
+        anchor = datetime(2000, 1, 3)  # a Monday, so windows line up with weeks
+        return anchor + ((_midnight(dt) - anchor) // self.window) * self.window
+
+    def horizon_windows(self, now: Optional[datetime] = None) -> List[datetime]:
+        now = now or datetime.now()
+        first = self.window_start(now)
+        return [first + k * self.window for k in range(-(-(now + self.horizon - first) // self.window))]
+
+    def is_loaded(self, window_start: datetime) -> bool:
+        return window_start in self._fetched_at
+
+    def stale_windows(self, now: Optional[datetime] = None) -> List[datetime]:
+        """Horizon windows never fetched or older than refresh_seconds (and not backing off), oldest first."""
+        clock = time.monotonic()
+        deadline = clock - self.refresh_seconds
+        windows = [w for w in self.horizon_windows(now)
+                   if self._fetched_at.get(w, deadline) <= deadline and self._failures.get(w, (0, clock))[1] <= clock]
+        return sorted(windows, key=lambda w: self._fetched_at.get(w, float("-inf")))
+
+    async def load(self, window_start: datetime, force: bool = False) -> None:
+        """Fetch one window (once, even with concurrent callers) and re-apply local holds."""
+        lock = self._locks.setdefault(window_start, asyncio.Lock())
+        async with lock:
+            if self.is_loaded(window_start) and not force:
+                return
+            window_end = window_start + self.window
+            try:
+                intervals = await self.fetch(self.event_type, window_start, window_end)
+            except Exception:
+                self.fetch_errors += 1
+                failures = self._failures.get(window_start, (0, 0.0))[0] + 1
+                delay = min(SLOT_RETRY_MAX_BACKOFF, SLOT_RETRY_BACKOFF * 2 ** (failures - 1))
+                self._failures[window_start] = (failures, time.monotonic() + delay * random.uniform(0.5, 1.0))
+                raise
+            self._failures.pop(window_start, None)
+            self.fetches += 1
+            self.slots.replace(window_start, window_end, intervals)
+            # Held slots may not be booked upstream yet; keep them out of the free set
+            for start, end in self.holds.values():
+                if start < window_end and end > window_start:
+                    self.slots.remove(start, end)
+            self._fetched_at[window_start] = time.monotonic()
+
+    def trim(self, now: Optional[datetime] = None) -> None:
+        """Forget the past: free time before now, windows and holds that have ended."""
+        now = now or datetime.now()
+        if self.slots.starts:
+            self.slots.remove(self.slots.starts[0], now)
+        current = self.window_start(now)
+        for w in [w for w in self._fetched_at if w < current]:
+            del self._fetched_at[w]
+            self._locks.pop(w, None)
+        for w in [w for w in self._failures if w < current]:
+            del self._failures[w]
+        for key in [k for k, (_, end) in self.holds.items() if end <= now]:
+            del self.holds[key]
+
+
+class SlotScheduler:
+    """Assigns the nearest free slot per booking, batching concurrent requests per event type."""
+
+    def __init__(self, fetch: FetchFn, duration_minutes: int = SLOT_DURATION_MINUTES,
+                 step_minutes: int = SLOT_STEP_MINUTES, lead_minutes: int = SLOT_LEAD_MINUTES,
+                 batch_window_ms: float = SLOT_BATCH_WINDOW_MS, **cache_options: Any):
+        self.fetch = fetch
+        self.duration = timedelta(minutes=duration_minutes)
+        self.step = timedelta(minutes=step_minutes)
+        self.lead = timedelta(minutes=lead_minutes)
+        self.batch_window = batch_window_ms / 1000
+        self.cache_options = cache_options
+        self.caches: Dict[str, AvailabilityCache] = {}
+        self._pending: Dict[str, List[Tuple[datetime, str, asyncio.Future]]] = {}
+        self._held_by: Dict[str, str] = {}  # callId -> event type
+        self._task: Optional[asyncio.Task] = None
+        self._flushes: set = set()  # pending batch flushes (the loop only keeps weak references to tasks)
+        self.requests = 0
+        self.batches = 0
+        self.exact = 0
+        self.moved = 0
+        self.no_slot = 0
+        self.shift_seconds = 0.0
+
+    def cache(self, event_type: str) -> AvailabilityCache:
+        if event_type not in self.caches:
+            self.caches[event_type] = AvailabilityCache(event_type, self.fetch, **self.cache_options)
+        return self.caches[event_type]
+
+    async def prefetch(self, event_type: str) -> None:
+        cache = self.cache(event_type)
+        await asyncio.gather(*(cache.load(w) for w in cache.horizon_windows()))
+
+    # --- assignment ---
+
+    async def assign(self, event_type: str, preferred: datetime, hold_key: str) -> datetime:
+        """Reserve the free slot nearest to `preferred` for `hold_key` and return its start."""
+        held = self.cache(event_type).holds.get(hold_key)
+        if held is not None:
+            return held[0]
+        future = asyncio.get_running_loop().create_future()
+        batch = self._pending.setdefault(event_type, [])
+        batch.append((preferred, hold_key, future))
+        if len(batch) == 1:
+            task = asyncio.create_task(self._flush(event_type))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+        return await future
+
+    async def _flush(self, event_type: str) -> None:
+        await asyncio.sleep(self.batch_window)
+        batch = self._pending.pop(event_type, [])
+        cache = self.cache(event_type)
+        self.batches += 1
+        self.requests += len(batch)
+        try:
+            not_before = align_up(datetime.now() + self.lead, self.step)
+            targets = {cache.window_start(max(p, not_before)) for p, _, _ in batch}
+            await asyncio.gather(*(cache.load(w) for w in targets | set(cache.horizon_windows())))
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for preferred, hold_key, future in sorted(batch, key=lambda item: item[0]):
+            if future.done():
+                continue
+            held = cache.holds.get(hold_key)  # same callId twice in one batch
+            slot = held[0] if held else cache.slots.nearest(preferred, self.duration, self.step, not_before)
+            if slot is None:
+                self.no_slot += 1
+                future.set_exception(NoSlotAvailable(f"No free {event_type} slot near {preferred.isoformat()}"))
+                continue
+            if not held:
+                cache.slots.remove(slot, slot + self.duration)
+                cache.holds[hold_key] = (slot, slot + self.duration)
+                self._held_by[hold_key] = event_type
+                shift = abs((slot - preferred).total_seconds())
+                self.shift_seconds += shift
+                if shift:
+                    self.moved += 1
+                else:
+                    self.exact += 1
+            future.set_result(slot)
+
+    def confirm(self, hold_key: str) -> None:
+        """The booking went through; the slot stays out of the free set until upstream reflects it."""
+        self._held_by.pop(hold_key, None)
+
+    def release(self, hold_key: str) -> None:
+        """The booking was rejected; give the slot back."""
+        event_type = self._held_by.pop(hold_key, None)
+        cache = self.caches.get(event_type) if event_type else None
+        if cache is not None and hold_key in cache.holds:
+            start, end = cache.holds.pop(hold_key)
+            cache.slots.add(start, end)
+
+    # --- background refresh ---
+
+    def start(self, prefetch: Tuple[str, ...] = ()) -> None:
+        if self._task is None or self._task.done():
+            for event_type in prefetch:
+                self.cache(event_type)
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def refresh_once(self) -> int:
+        """Refresh the stalest window of every event type; returns how many were fetched (failures back off)."""
+        refreshed = 0
+        for cache in list(self.caches.values()):
+            cache.trim()
+            stale = cache.stale_windows()
+            if stale:
+                try:
+                    await cache.load(stale[0], force=True)
+                    refreshed += 1
+                except Exception as e:
+                    print(f"--- ⚠️ Availability refresh for {cache.event_type} failed: {type(e).__name__}: {e} ---")
+        return refreshed
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            # Catch up quickly after start (prefetch), then one window per tick
+            if not await self.refresh_once():
+                await asyncio.sleep(1.0)
+
+    def stats(self) -> Dict[str, Any]:
+        assigned = self.exact + self.moved
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "assigned_exact": self.exact,
+            "assigned_moved": self.moved,
+            "no_slot": self.no_slot,
+            "avg_shift_minutes": round(self.shift_seconds / assigned / 60, 1) if assigned else 0.0,
+            "event_types": {
+                event_type: {
+                    "availability_fetches": cache.fetches,
+                    "availability_errors": cache.fetch_errors,
+                    "backing_off_windows": sum(1 for _, at in cache._failures.values() if at > time.monotonic()),
+                    "free_intervals": len(cache.slots),
+                    "held_slots": len(cache.holds),
+                    "loaded_windows": len(cache._fetched_at),
+                }
+                for event_type, cache in self.caches.items()
+            },
+        }
+
+
+# --- Availability sources ---
+
+def mock_availability(start: datetime, end: datetime, hours: str = MOCK_AVAILABILITY_HOURS) -> List[Interval]:
+    """Weekday business hours (default 9-17) between start and end."""
+    open_hour, close_hour = (int(h) for h in hours.split("-"))
+    intervals = []
+    day = _midnight(start)
+    while day < end:
+        if day.weekday() < 5:
+            intervals.append((day + timedelta(hours=open_hour), day + timedelta(hours=close_hour)))
+        day += timedelta(days=1)
+    return intervals
+
+
+async def fetch_calendly_availability(
+    client: httpx.AsyncClient, api_base: str, api_key: str, event_type_url: str,
+    start: datetime, end: datetime, duration: timedelta = timedelta(minutes=SLOT_DURATION_MINUTES),
+) -> List[Interval]:
+    """GET /event_type_available_times for one window; each available start becomes [start, start+duration)."""
+    response = await client.get(
+        f"{api_base.rstrip('/')}/event_type_available_times",
+        headers={"Authorization": f"Bearer {api_key}"},
+        params={"event_type": event_type_url, "start_time": start.isoformat(), "end_time": end.isoformat()},
+    )
+    response.raise_for_status()
+    intervals = []
+    for item in response.json().get("collection", []):
+        if item.get("status", "available") != "available":
+            continue
+        slot = parse_preferred_time(item["start_time"])
+        intervals.append((slot, slot + duration))
+    return intervals
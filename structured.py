@@ -0,0 +1,407 @@
+"""
+Tolerant structured-output parsing for the LCEL chains.
+
+`TolerantOutputParser` is a drop-in `PydanticOutputParser`: the strict parse runs
+first, and only when it fails is the reply repaired locally — code fences and prose
+around the JSON, trailing commas, comments, single quotes, Python literals, unquoted
+keys, smart quotes and truncated output (open strings/arrays/objects are closed) — and
+then coerced into the schema (missing Optional fields -> None, scalar -> one-item list,
+numbers/lists -> strings, "85%" -> 0.85, ...).
+
+`structured_chain(prompt, llm, parser)` builds `prompt | llm | parser` with one cheap
+re-ask when even the repaired reply does not parse: the model gets only its own broken
+reply, the error and the format instructions, not the original context.
+
+Chains can instead use the model's native structured output (`with_structured_output`:
+tool calling, or a JSON-schema response format), which drops the format instructions
+from the prompt; the schema travels as the tool/response-format definition. Replies
+that still do not validate go through the same repair and re-ask. The method is chosen
+per schema: STRUCTURED_OUTPUT_<SCHEMA> (e.g. STRUCTURED_OUTPUT_PLANNEROUTPUT=function_calling),
+else STRUCTURED_OUTPUT, default "parser".
+
+Outcomes are counted per schema, and per method for the native ones (`parse_stats()`,
+e.g. "PlannerOutput:function_calling"): clean, repaired, reasked and failed (the re-ask
+did not parse either).
+"""
+import os
+import re
+import json
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Type, Union, get_args, get_origin
+
+from pydantic import BaseModel, ValidationError
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.outputs import Generation
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+
+_stats: Dict[str, Counter] = defaultdict(Counter)
+_stats_lock = threading.Lock()
+
+REASK_MAX_CHARS = 12000  # the broken reply is re-sent; keep the re-ask cheap
+STRUCTURED_OUTPUT = os.getenv("STRUCTURED_OUTPUT", "parser")
+METHODS = ("parser", "function_calling", "json_schema", "json_mode")
+# Replaces {format_instructions} on the native paths; json_mode keeps the full instructions,
+# since it only guarantees valid JSON and the model still needs to be told the schema
+NATIVE_INSTRUCTIONS = "Answer in the structured output format you are given; fill in every field."
+
+
+def _count(schema: str, outcome: str) -> None:
+    with _stats_lock:
+        _stats[schema][outcome] += 1
+
+
+def parse_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-schema outcome counts plus repair and re-ask rates."""
+    with _stats_lock:
+        report = {}
+        for schema, c in _stats.items():
+            calls = c["clean"] + c["repaired"] + c["failed"]  # every call ends in exactly one of these
+            report[schema] = {**c, "calls": calls, "reask_ok": c["reasked"] - c["failed"],
+                              "repair_rate": c["repaired"] / calls if calls else 0.0,
+                              "reask_rate": c["reasked"] / calls if calls else 0.0}
+        return report
+
+
+# --- Local repair ---
+
+_FENCE_RE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+_QUOTES = {'"': '"', "'": "'", "“": "”", "‘": "’"}  # opening -> closing
+_LITERALS = {"True": "true", "False": "false", "None": "null", "true": "true", "false": "false", "null": "null"}
+
+
+def extract_json(text: str) -> str:
+    """The outermost JSON object (or array) in `text`, or everything from its start if it is cut off."""
+    fenced = _FENCE_RE.search(text)
+    if fenced and "{" in fenced.group(1):
+        text = fenced.group(1)
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=-1)
+    if start < 0:
+        raise ValueError("no JSON object in the reply")
+    depth, quote, escaped = 0, None, False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if quote:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return text[start:]
+
+
+def repair_json(text: str) -> Any:
+    """Parse `text` as JSON after fixing the defects LLMs commonly produce; raises ValueError."""
+    candidate = extract_json(text)
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        pass
+    out: List[str] = []
+    stack: List[str] = []        # open "{" / "["
+    expect_key: List[bool] = []  # per open object: is the next token a key?
+    pending_key = False          # a key was written but its ":" was not
+    key_at = 0                   # where in `out` the last key starts
+    i, n = 0, len(candidate)
+
+    def drop_trailing_comma():
+        while out and out[-1].isspace():
+            out.pop()
+        if out and out[-1] == ",":
+            out.pop()
+
+    while i < n:
+        ch = candidate[i]
+        if ch in _QUOTES:
+            # Re-emit every string double-quoted, whatever quote it used
+            closing, j, chars = _QUOTES[ch], i + 1, []
+            while j < n:
+                c = candidate[j]
+                if c == "\\" and j + 1 < n:
+                    escaped = candidate[j + 1]
+                    chars.append("'" if escaped == "'" else "\\" + escaped)  # \' is not a JSON escape
+                    j += 2
+                    continue
+                if c == closing:
+                    break
+                chars.append({'"': '\\"', "\n": "\\n", "\t": "\\t"}.get(c, c))
+                j += 1
+            if stack and stack[-1] == "{" and expect_key[-1]:
+                expect_key[-1], pending_key, key_at = False, True, len(out)
+            out.append('"' + "".join(chars) + '"')
+            i = j + 1
+            continue
+        if ch == "/" and candidate.startswith("//", i):
+            i = candidate.find("\n", i)
+            i = n if i < 0 else i
+            continue
+        if ch == "/" and candidate.startswith("/*", i):
+            end = candidate.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+            continue
+        if ch in "{[":
+            stack.append(ch)
+            expect_key.append(ch == "{")
+            out.append(ch)
+        elif ch in "}]":
+            if pending_key:  # {"a": 1, "b"} -> drop the dangling key
+                del out[key_at:]
+                pending_key = False
+            drop_trailing_comma()
+            if stack:
+                stack.pop()
+                expect_key.pop()
+            out.append(ch)
+        elif ch == ",":
+            out.append(ch)
+            if stack and stack[-1] == "{":
+                expect_key[-1] = True
+        elif ch == ":":
+            pending_key = False
+            out.append(ch)
+        elif ch.isalpha() or ch == "_" or (ch.isdigit() and stack and stack[-1] == "{" and expect_key[-1]):
+            j = i
+            while j < n and (candidate[j].isalnum() or candidate[j] in "_-"):
+                j += 1
+            word = candidate[i:j]
+            if stack and stack[-1] == "{" and expect_key[-1]:
+                expect_key[-1], pending_key, key_at = False, True, len(out)
+                out.append(json.dumps(word))  # unquoted key
+            else:
+                out.append(_LITERALS.get(word, word))
+            i = j
+            continue
+        else:
+            out.append(ch)
+        i += 1
+
+    # Truncated reply: drop a member cut off before its value, then close what is still open
+    while out and out[-1].isspace():
+        out.pop()
+    if pending_key or (out and out[-1] == ":"):
+        del out[key_at:]
+    for opener in reversed(stack):
+        drop_trailing_comma()
+        out.append("}" if opener == "{" else "]")
+    try:
+        return json.loads("".join(out))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"could not repair JSON: {e}") from None
+
+
+# --- Coercion into the schema ---
+
+def _allows(annotation: Any, kind: type) -> bool:
+    if annotation is kind or get_origin(annotation) is kind:
+        return True
+    return get_origin(annotation) is Union and any(_allows(a, kind) for a in get_args(annotation))
+
+
+def _number(value: str, integer: bool) -> Optional[float]:
+    match = re.search(r"-?\d+(?:\.\d+)?", value.replace(",", ""))
+    if not match:
+        return None
+    number = float(match.group())
+    if "%" in value and not integer:
+        number /= 100
+    return int(number) if integer else number
+
+
+def _fix(model: Type[BaseModel], data: Any, error: Dict[str, Any]) -> bool:
+    """Patch `data` in place for one validation error; False when there is nothing safe to do."""
+    loc, kind, value = error["loc"], error["type"], error.get("input")
+    parent = data
+    for key in loc[:-1]:
+        try:
+            parent = parent[key]
+        except (KeyError, IndexError, TypeError):
+            return False
+    key = loc[-1] if loc else None
+    if key is None or not isinstance(parent, (dict, list)):
+        return False
+    if kind == "missing":
+        field = model.model_fields.get(key) if len(loc) == 1 else None
+        if field is None:
+            return False
+        if _allows(field.annotation, type(None)):
+            parent[key] = None
+        elif _allows(field.annotation, list):
+            parent[key] = []
+        elif _allows(field.annotation, dict):
+            parent[key] = {}
+        else:
+            return False
+    elif kind == "list_type":
+        parent[key] = [] if value is None else [value]
+    elif kind == "dict_type" and value is None:
+        parent[key] = {}
+    elif kind == "string_type" and value is not None:
+        parent[key] = "\n".join(map(str, value)) if isinstance(value, list) else (
+            json.dumps(value) if isinstance(value, dict) else str(value))
+    elif kind in ("float_parsing", "int_parsing", "int_from_float") and isinstance(value, (str, float)):
+        number = _number(str(value), integer=kind != "float_parsing")
+        if number is None:
+            return False
+        parent[key] = number
+    else:
+        return False
+    return True
+
+
+def coerce(model: Type[BaseModel], data: Any) -> BaseModel:
+    """Validate `data`, fixing the type slips that can be fixed without guessing content."""
+    if isinstance(data, list) and len(data) == 1 and isinstance(data[0], dict):
+        data = data[0]  # [{...}] for a single object
+    for _ in range(5):
+        try:
+            return model.model_validate(data)
+        except ValidationError as e:
+            if not all([_fix(model, data, err) for err in e.errors()]):
+                raise
+    return model.model_validate(data)
+
+
+class TolerantOutputParser(PydanticOutputParser):
+    """PydanticOutputParser that repairs and coerces the reply before giving up."""
+
+    def parse_result(self, result: List[Generation], *, partial: bool = False) -> Any:
+        schema = self.pydantic_object.__name__
+        try:
+            parsed = super().parse_result(result, partial=partial)
+            _count(schema, "clean")
+            return parsed
+        except OutputParserException as strict_error:
+            if partial:
+                raise
+            text = result[0].text
+            try:
+                parsed = coerce(self.pydantic_object, repair_json(text))
+            except (ValueError, ValidationError) as e:
+                raise OutputParserException(f"{strict_error}\nRepair failed: {e}", llm_output=text) from e
+            _count(schema, "repaired")
+            return parsed
+
+
+_REASK_PROMPT = ChatPromptTemplate.from_messages([
+    ("system",
+     "Your previous reply could not be parsed. Reply with ONLY the corrected JSON object: no prose, "
+     "no markdown fences. Keep the content, fix the format.\n{format_instructions}"),
+    ("human", "Previous reply:\n{reply}\n\nParser error:\n{error}"),
+])
+
+
+def _reask_inputs(parser: PydanticOutputParser, reply: str, error: Exception) -> dict:
+    return {"format_instructions": parser.get_format_instructions(),
+            "reply": reply[:REASK_MAX_CHARS], "error": str(error)[:1000]}
+
+
+def output_method(schema: str) -> str:
+    """The structured-output method configured for `schema` (see the module docstring)."""
+    method = os.getenv(f"STRUCTURED_OUTPUT_{schema.upper()}", STRUCTURED_OUTPUT)
+    if method not in METHODS:
+        raise ValueError(f"Unknown structured output method {method!r} for {schema}; expected one of {METHODS}")
+    return method
+
+
+def structured_chain(prompt, llm, parser: PydanticOutputParser, method: Optional[str] = None):
+    """
+    `prompt | llm | parser`, re-asking the model once when its reply cannot be parsed or repaired.
+    `method` overrides the configured one; anything but "parser" uses the model's native structured output.
+    """
+    schema = parser.pydantic_object.__name__
+    method = method or output_method(schema)
+    if method != "parser":
+        return _native_chain(prompt, llm, parser, method)
+
+    def parse(message):
+        try:
+            return parser.invoke(message)
+        except OutputParserException as e:
+            _count(schema, "reasked")
+            retry = llm.invoke(_REASK_PROMPT.invoke(_reask_inputs(parser, message.content, e)))
+            return _after_reask(retry)
+
+    async def aparse(message):
+        try:
+            return parser.invoke(message)
+        except OutputParserException as e:
+            _count(schema, "reasked")
+            retry = await llm.ainvoke(_REASK_PROMPT.invoke(_reask_inputs(parser, message.content, e)))
+            return _after_reask(retry)
+
+    def _after_reask(retry):
+        try:
+            return parser.invoke(retry)  # counted as clean/repaired by the parser
+        except OutputParserException:
+            _count(schema, "failed")
+            raise
+
+    return prompt | llm | RunnableLambda(parse, afunc=aparse, name=f"Parse{schema}")
+
+
+def _raw_text(message) -> str:
+    """What the model produced: the tool call's arguments, or the message text when it did not call the tool."""
+    if getattr(message, "tool_calls", None):
+        return json.dumps(message.tool_calls[0]["args"])
+    invalid = getattr(message, "invalid_tool_calls", None)
+    if invalid and invalid[0].get("args"):
+        return invalid[0]["args"]
+    return message.content if isinstance(message.content, str) else json.dumps(message.content)
+
+
+def _native_chain(prompt, llm, parser: PydanticOutputParser, method: str):
+    """`prompt | llm.with_structured_output(...)`, with the tolerant repair and one re-ask for replies that do not validate."""
+    model = parser.pydantic_object
+    key = f"{model.__name__}:{method}"
+    if method != "json_mode" and "format_instructions" in prompt.partial_variables:
+        prompt = prompt.partial(format_instructions=NATIVE_INSTRUCTIONS)
+    native = llm.with_structured_output(model, method=method, include_raw=True)
+
+    def settle(result):
+        """The validated object, or the OutputParserException to re-ask with."""
+        if result["parsed"] is not None:
+            _count(key, "clean")
+            return result["parsed"]
+        text = _raw_text(result["raw"])
+        try:
+            parsed = coerce(model, repair_json(text))
+        except (ValueError, ValidationError) as e:
+            cause = result.get("parsing_error") or e
+            return OutputParserException(f"{model.__name__} ({method}): {cause}", llm_output=text)
+        _count(key, "repaired")
+        return parsed
+
+    def _after_reask(outcome):
+        if isinstance(outcome, OutputParserException):
+            _count(key, "failed")
+            raise outcome
+        return outcome
+
+    def run(inputs, config):
+        outcome = settle(native.invoke(prompt.invoke(inputs, config), config))
+        if isinstance(outcome, OutputParserException):
+            _count(key, "reasked")
+            reask = _REASK_PROMPT.invoke(_reask_inputs(parser, outcome.llm_output, outcome))
+            outcome = _after_reask(settle(native.invoke(reask, config)))
+        return outcome
+
+    async def arun(inputs, config):
+        outcome = settle(await native.ainvoke(await prompt.ainvoke(inputs, config), config))
+        if isinstance(outcome, OutputParserException):
+            _count(key, "reasked")
+            reask = _REASK_PROMPT.invoke(_reask_inputs(parser, outcome.llm_output, outcome))
+            outcome = _after_reask(settle(await native.ainvoke(reask, config)))
+        return outcome
+
+    return RunnableLambda(run, afunc=arun, name=f"Structured{model.__name__}")
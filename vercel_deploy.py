@@ -0,0 +1,208 @@
+"""
+Async Vercel deployment client (used by foundry_server.py).
+
+  - every call goes through one pooled httpx.AsyncClient (runtime.async_http_client)
+  - a deployment references its files by SHA-1; a file is uploaded (POST /v2/files) only
+    when Vercel does not have it yet, so redeploying unchanged content sends no file body
+  - deploys of the same project are coalesced: a deploy of the content already being
+    deployed joins that deployment, and of several deploys queued behind a running one
+    only the newest runs (the others get its result, marked `superseded`)
+  - `watch()` polls a deployment until it is READY, ERROR or CANCELED and yields each
+    state change
+
+VERCEL_API_BASE points the client at a local stand-in (benchmarks/vercel_standin.py).
+"""
+import os
+import time
+import asyncio
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+
+import httpx
+
+from cache import shared_cache, namespace
+
+VERCEL_API_BASE = os.getenv("VERCEL_API_BASE", "https://api.vercel.com")
+VERCEL_TIMEOUT = float(os.getenv("VERCEL_TIMEOUT", "30"))
+VERCEL_POLL_INTERVAL = float(os.getenv("VERCEL_POLL_INTERVAL", "2"))
+VERCEL_READY_TIMEOUT = float(os.getenv("VERCEL_READY_TIMEOUT", "300"))
+# How long an uploaded file is assumed to still be on Vercel (a deployment naming a file
+# Vercel no longer has fails with missing_files, and the file is uploaded again)
+VERCEL_FILE_TTL = float(os.getenv("VERCEL_FILE_TTL", "3600"))
+TERMINAL_STATES = ("READY", "ERROR", "CANCELED")
+
+deploy_stats = {"deploys": 0, "coalesced": 0, "superseded": 0, "created": 0, "failed": 0,
+                "files_uploaded": 0, "files_reused": 0, "bytes_uploaded": 0, "polls": 0}
+
+# (path, content, sha1)
+FileEntry = Tuple[str, bytes, str]
+
+
+class VercelError(Exception):
+    """The Vercel API rejected a call or a deployment did not become ready."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class _Project:
+    waiting: Dict[str, asyncio.Future] = field(default_factory=dict)  # content digest -> result
+    latest: Optional[Tuple[str, List[FileEntry]]] = None  # newest content queued
+    running: Optional[Tuple[str, asyncio.Future]] = None  # content being deployed
+    task: Optional[asyncio.Task] = None
+
+
+def _entries(files: Dict[str, Union[str, bytes]]) -> List[FileEntry]:
+    entries = []
+    for path, content in sorted(files.items()):
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        entries.append((path, data, hashlib.sha1(data).hexdigest()))
+    return entries
+
+
+def _https(url: Optional[str]) -> str:
+    # Vercel returns URL without protocol
+    return f"https://{url}" if url and not url.startswith("http") else url or ""
+
+
+def _error(response: httpx.Response) -> Dict[str, Any]:
+    try:
+        return response.json().get("error") or {}
+    except ValueError:
+        return {"message": response.text[:200]}
+
+
+class VercelDeployer:
+    """Creates deployments and watches them; one instance per token, on one event loop."""
+
+    def __init__(self, token: str, client: Callable[[], httpx.AsyncClient], api_base: str = VERCEL_API_BASE):
+        self.token = token
+        self.client = client
+        self.api_base = api_base.rstrip("/")
+        self._projects: Dict[str, _Project] = {}
+
+    @property
+    def _auth(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    async def deploy(self, project: str, files: Dict[str, Union[str, bytes]]) -> Dict[str, Any]:
+        """Deploy `files` ({path: content}) as `project`; returns once the deployment is created."""
+        deploy_stats["deploys"] += 1
+        entries = _entries(files)
+        digest = hashlib.sha1("\n".join(f"{path} {sha}" for path, _, sha in entries).encode()).hexdigest()
+        state = self._projects.setdefault(project, _Project())
+        if state.running is not None and state.running[0] == digest and state.latest is None:
+            deploy_stats["coalesced"] += 1
+            return await asyncio.shield(state.running[1])
+        future = state.waiting.get(digest)
+        if future is None:
+            future = state.waiting[digest] = asyncio.get_running_loop().create_future()
+        else:
+            deploy_stats["coalesced"] += 1
+        state.latest = (digest, entries)
+        if state.task is None:
+            state.task = asyncio.create_task(self._drain(project, state))
+        # A caller that goes away does not cancel a deployment others may be waiting for
+        return await asyncio.shield(future)
+
+    async def _drain(self, project: str, state: _Project) -> None:
+        try:
+            while state.latest is not None:
+                digest, entries = state.latest
+                waiting, state.waiting, state.latest = state.waiting, {}, None
+                current = waiting.pop(digest)
+                state.running = (digest, current)
+                try:
+                    result: Any = await self._create(project, entries)
+                    deploy_stats["created"] += 1
+                except Exception as e:
+                    deploy_stats["failed"] += 1
+                    result = e
+                deploy_stats["superseded"] += len(waiting)
+                for future, outcome in [(current, result), *((f, result) for f in waiting.values())]:
+                    if isinstance(outcome, Exception):
+                        future.set_exception(outcome)
+                    else:
+                        future.set_result(outcome if future is current else {**outcome, "superseded": True})
+                state.running = None
+        finally:
+            state.task = None
+            if self._projects.get(project) is state and not state.waiting:
+                del self._projects[project]
+
+    async def _upload(self, client: httpx.AsyncClient, path: str, data: bytes, sha: str) -> None:
+        response = await client.post(
+            f"{self.api_base}/v2/files",
+            headers={**self._auth, "Content-Type": "application/octet-stream", "x-vercel-digest": sha},
+            content=data,
+            timeout=VERCEL_TIMEOUT,
+        )
+        if response.status_code >= 400:
+            raise VercelError(_error(response).get("message", f"Upload of {path} failed"), response.status_code)
+        deploy_stats["files_uploaded"] += 1
+        deploy_stats["bytes_uploaded"] += len(data)
+        shared_cache.set(namespace("vercel_file", sha), True, ttl_seconds=VERCEL_FILE_TTL)
+
+    async def _create(self, project: str, entries: List[FileEntry]) -> Dict[str, Any]:
+        client = self.client()
+        missing = [entry for entry in entries if not shared_cache.get(namespace("vercel_file", entry[2]))]
+        payload = {
+            "name": project,
+            "files": [{"file": path, "sha": sha, "size": len(data)} for path, data, sha in entries],
+            "projectSettings": {"framework": None},
+        }
+        uploaded = set()
+        for attempt in range(2):
+            await asyncio.gather(*(self._upload(client, *entry) for entry in missing))
+            uploaded.update(sha for _, _, sha in missing)
+            response = await client.post(f"{self.api_base}/v13/deployments", headers=self._auth, json=payload,
+                                         timeout=VERCEL_TIMEOUT)
+            if response.status_code in (200, 201):
+                break
+            error = _error(response)
+            if error.get("code") == "missing_files" and attempt == 0:
+                # Vercel dropped files we uploaded earlier: send them and try once more
+                gone = set(error.get("missing") or [])
+                for sha in gone:
+                    shared_cache.delete(namespace("vercel_file", sha))
+                missing = [entry for entry in entries if entry[2] in gone]
+                continue
+            raise VercelError(error.get("message", "Deployment failed"), response.status_code)
+
+        reused = len(entries) - len(uploaded)
+        deploy_stats["files_reused"] += reused
+        data = response.json()
+        return {
+            "success": True,
+            "url": _https(data.get("url")),
+            "id": data.get("id"),
+            "name": data.get("name"),
+            "ready_state": data.get("readyState"),
+            "uploaded_files": len(uploaded),
+            "reused_files": reused,
+        }
+
+    async def watch(self, deployment_id: str, interval: float = VERCEL_POLL_INTERVAL,
+                    timeout: float = VERCEL_READY_TIMEOUT) -> AsyncIterator[Dict[str, Any]]:
+        """Poll a deployment until it reaches a terminal state, yielding {"id", "state", "url"} on each change."""
+        deadline = time.monotonic() + timeout
+        last = None
+        while True:
+            deploy_stats["polls"] += 1
+            response = await self.client().get(f"{self.api_base}/v13/deployments/{deployment_id}",
+                                               headers=self._auth, timeout=VERCEL_TIMEOUT)
+            if response.status_code >= 400:
+                raise VercelError(_error(response).get("message", "Status check failed"), response.status_code)
+            data = response.json()
+            state = data.get("readyState") or data.get("status")
+            if state != last:
+                last = state
+                yield {"id": deployment_id, "state": state, "url": _https(data.get("url"))}
+            if state in TERMINAL_STATES:
+                return
+            if time.monotonic() >= deadline:
+                raise VercelError(f"Deployment {deployment_id} not ready after {timeout:.0f}s ({state})")
+            await asyncio.sleep(interval)